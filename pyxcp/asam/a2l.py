@@ -0,0 +1,547 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""A2L (ASAM MCD-2 MC) measurement and calibration catalogue.
+
+Only the parts needed to measure and calibrate by name are ingested:
+MEASUREMENT, CHARACTERISTIC (incl. AXIS_DESCR), AXIS_PTS, RECORD_LAYOUT,
+COMPU_METHOD, COMPU_TAB, COMPU_VTAB, COMPU_VTAB_RANGE, MOD_COMMON and the
+XCP event channels from IF_DATA XCP. Everything else is skipped::
+
+    cat = A2LCatalogue.load("ecu.a2l")
+    m = cat["EngineSpeed"]
+    xm.setMta(m.address, m.ext)
+    value = cat.codec(m).decode(xm.upload(cat.codec(m).size))
+    rpm = cat.conversion(m).physical(value)
+
+The parsed catalogue is pickled next to the A2L file (or into `cacheDir`)
+together with a hash of the A2L contents; later loads of an unchanged
+file skip parsing. Only load caches you created yourself, unpickling
+executes arbitrary code.
+"""
+
+__copyright__ = """
+    pySART - Simplified AUTOSAR-Toolkit for Python.
+
+   (C) 2009-2019 by Christoph Schueler <cpu12.gems@googlemail.com>
+
+   All Rights Reserved
+
+  This program is free software; you can redistribute it and/or modify
+  it under the terms of the GNU General Public License as published by
+  the Free Software Foundation; either version 2 of the License, or
+  (at your option) any later version.
+
+  This program is distributed in the hope that it will be useful,
+  but WITHOUT ANY WARRANTY; without even the implied warranty of
+  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+  GNU General Public License for more details.
+
+  You should have received a copy of the GNU General Public License along
+  with this program; if not, write to the Free Software Foundation, Inc.,
+  51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+"""
+
+import bisect
+from collections import namedtuple
+import fnmatch
+import hashlib
+import os
+import pickle
+import re
+
+from pyxcp.asam import types
+from pyxcp.asam.compumethod import createCompuMethod, Identical
+from pyxcp.logger import Logger
+
+CACHE_VERSION = 2
+CACHE_SUFFIX = ".a2lcache"
+
+DATATYPES = {
+    "UBYTE": types.A_Uint8,
+    "SBYTE": types.A_Int8,
+    "UWORD": types.A_Uint16,
+    "SWORD": types.A_Int16,
+    "ULONG": types.A_Uint32,
+    "SLONG": types.A_Int32,
+    "A_UINT64": types.A_Uint64,
+    "A_INT64": types.A_Int64,
+    "FLOAT32_IEEE": types.A_Float32,
+    "FLOAT64_IEEE": types.A_Float64,
+}
+
+BYTE_ORDERS = {
+    "MSB_LAST": types.INTEL,
+    "LITTLE_ENDIAN": types.INTEL,
+    "MSB_FIRST": types.MOTOROLA,
+    "BIG_ENDIAN": types.MOTOROLA,
+}
+
+Measurement = namedtuple("Measurement",
+    "name datatype conversion lower upper address ext bitMask byteOrder dims events")
+Characteristic = namedtuple("Characteristic",
+    "name kind address recordLayout conversion lower upper ext bitMask byteOrder dims axes")
+AxisDescr = namedtuple("AxisDescr",
+    "attribute inputQuantity conversion maxAxisPoints lower upper fixAxis axisPtsRef byteOrder")
+AxisPts = namedtuple("AxisPts",
+    "name address inputQuantity recordLayout conversion maxAxisPoints lower upper ext byteOrder")
+RecordLayout = namedtuple("RecordLayout", "name components")
+CompuMethodDef = namedtuple("CompuMethodDef", "name kind format unit coeffs tabRef")
+CompuTab = namedtuple("CompuTab", "name kind pairs ranges default")
+
+# Optional keywords and their number of arguments (None: list of numbers).
+MEASUREMENT_KEYWORDS = {
+    "ECU_ADDRESS": 1, "ECU_ADDRESS_EXTENSION": 1, "BIT_MASK": 1,
+    "BYTE_ORDER": 1, "ARRAY_SIZE": 1, "MATRIX_DIM": None,
+}
+CHARACTERISTIC_KEYWORDS = {
+    "ECU_ADDRESS_EXTENSION": 1, "BIT_MASK": 1, "BYTE_ORDER": 1,
+    "NUMBER": 1, "MATRIX_DIM": None,
+}
+AXIS_PTS_KEYWORDS = {
+    "ECU_ADDRESS_EXTENSION": 1, "BYTE_ORDER": 1,
+}
+AXIS_DESCR_KEYWORDS = {
+    "FIX_AXIS_PAR": 3, "FIX_AXIS_PAR_DIST": 3, "AXIS_PTS_REF": 1, "BYTE_ORDER": 1,
+}
+COMPU_METHOD_KEYWORDS = {
+    "COEFFS": 6, "COEFFS_LINEAR": 2, "COMPU_TAB_REF": 1,
+}
+RECORD_LAYOUT_KEYWORDS = {
+    "FNC_VALUES": 4, "IDENTIFICATION": 2, "RESERVED": 2,
+    "STATIC_RECORD_LAYOUT": 0, "STATIC_ADDRESS_OFFSETS": 0,
+    "ALIGNMENT_BYTE": 1, "ALIGNMENT_WORD": 1, "ALIGNMENT_LONG": 1,
+    "ALIGNMENT_INT64": 1, "ALIGNMENT_FLOAT32_IEEE": 1, "ALIGNMENT_FLOAT64_IEEE": 1,
+}
+for _axis in ("X", "Y", "Z", "4", "5"):
+    RECORD_LAYOUT_KEYWORDS.update({
+        "AXIS_PTS_" + _axis: 4, "NO_AXIS_PTS_" + _axis: 2, "FIX_NO_AXIS_PTS_" + _axis: 1,
+        "SRC_ADDR_" + _axis: 2, "RIP_ADDR_" + _axis: 2, "SHIFT_OP_" + _axis: 2,
+        "OFFSET_" + _axis: 2, "DIST_OP_" + _axis: 2, "AXIS_RESCALE_" + _axis: 7,
+        "NO_RESCALE_" + _axis: 2,
+    })
+RECORD_LAYOUT_KEYWORDS["RIP_ADDR_W"] = 2
+del _axis
+
+# Blocks processed as soon as they are complete (direct children of MODULE).
+MODULE_BLOCKS = frozenset((
+    "MEASUREMENT", "CHARACTERISTIC", "AXIS_PTS", "RECORD_LAYOUT", "COMPU_METHOD", "COMPU_TAB",
+    "COMPU_VTAB", "COMPU_VTAB_RANGE", "MOD_COMMON", "IF_DATA",
+))
+
+TOKEN = re.compile(r'"(?:[^"\\]|\\.|"")*"|/\*.*?\*/|//[^\n]*|\S+', re.DOTALL)
+
+
+class A2LError(Exception):
+    """Malformed A2L file."""
+
+
+class String(str):
+    """Quoted string token, never taken for a keyword."""
+
+
+class Block(object):
+    """/begin name ... /end name"""
+
+    __slots__ = ("name", "items")
+
+    def __init__(self, name):
+        self.name = name
+        self.items = []
+
+    def blocks(self, name):
+        return [item for item in self.items if isinstance(item, Block) and item.name == name]
+
+    def walk(self):
+        yield self
+        for item in self.items:
+            if isinstance(item, Block):
+                for block in item.walk():
+                    yield block
+
+
+def tokenize(text):
+    """Tokens of A2L source `text`, comments removed and strings unquoted.
+    """
+    for match in TOKEN.finditer(text):
+        token = match.group()
+        first = token[0]
+        if first == '"':
+            yield String(token[1:-1].replace('\\"', '"').replace('""', '"'))
+        elif first == "/" and token[:2] in ("/*", "//"):
+            continue
+        else:
+            yield token
+
+
+def number(token):
+    try:
+        return int(token, 0)
+    except ValueError:
+        pass
+    try:
+        return int(token, 10)   # Leading zeros.
+    except ValueError:
+        return float(token)
+
+
+def isNumber(token):
+    if isinstance(token, (String, Block)):
+        return False
+    try:
+        number(token)
+    except ValueError:
+        return False
+    return True
+
+
+def keywordArgs(items, keywords):
+    """Collect optional keywords (s. *_KEYWORDS) following the fixed arguments.
+
+    Returns
+    -------
+    dict
+        keyword -> tuple of arguments; unknown keywords are skipped.
+    """
+    result = {}
+    idx = 0
+    count = len(items)
+    while idx < count:
+        item = items[idx]
+        idx += 1
+        if type(item) is not str or item not in keywords:
+            continue
+        arity = keywords[item]
+        if arity is None:
+            start = idx
+            while idx < count and isNumber(items[idx]):
+                idx += 1
+            result[item] = tuple(number(t) for t in items[start:idx])
+        else:
+            result[item] = tuple(items[idx:idx + arity])
+            idx += arity
+    return result
+
+
+def fileHash(filename):
+    digest = hashlib.sha1()
+    with open(filename, "rb") as inf:
+        for chunk in iter(lambda: inf.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class A2LCatalogue(object):
+    """Indexed symbol catalogue of an A2L file.
+
+    Use `load` (cached) or `fromString`.
+    """
+
+    def __init__(self):
+        self.measurements = {}
+        self.characteristics = {}
+        self.axisPts = {}
+        self.recordLayouts = {}
+        self.compuMethods = {}
+        self.compuTabs = {}
+        self.events = {}            # channel number -> name
+        self.byteOrder = types.INTEL
+        self._conversions = {}
+        self._addressIndex = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_conversions"] = {}
+        state["_addressIndex"] = None
+        return state
+
+    @classmethod
+    def load(cls, filename, cacheDir=None, useCache=True):
+        """Load `filename`, using/refreshing the binary cache.
+
+        Parameters
+        ----------
+        filename : str
+        cacheDir : str
+            Directory of the cache file, default is the directory of `filename`.
+        useCache : bool
+        """
+        logger = Logger("asam.A2L")
+        if not useCache:
+            with open(filename, encoding="latin-1") as inf:
+                return cls.fromString(inf.read())
+        digest = fileHash(filename)
+        cacheName = cls.cacheFilename(filename, cacheDir)
+        try:
+            with open(cacheName, "rb") as inf:
+                version, cachedDigest, catalogue = pickle.load(inf)
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ValueError, TypeError):
+            pass
+        else:
+            if version == CACHE_VERSION and cachedDigest == digest:
+                logger.debug("Using cached catalogue '%s'.", cacheName)
+                return catalogue
+        with open(filename, encoding="latin-1") as inf:
+            catalogue = cls.fromString(inf.read())
+        try:
+            tmpName = "{}.{}.tmp".format(cacheName, os.getpid())
+            with open(tmpName, "wb") as outf:
+                pickle.dump((CACHE_VERSION, digest, catalogue), outf, pickle.HIGHEST_PROTOCOL)
+            os.replace(tmpName, cacheName)
+        except OSError as e:
+            logger.warn("Could not write A2L cache '%s': %s", cacheName, e)
+        return catalogue
+
+    @staticmethod
+    def cacheFilename(filename, cacheDir=None):
+        if cacheDir is None:
+            return filename + CACHE_SUFFIX
+        return os.path.join(cacheDir, os.path.basename(filename) + CACHE_SUFFIX)
+
+    @classmethod
+    def fromString(cls, text):
+        catalogue = cls()
+        catalogue._parse(tokenize(text))
+        return catalogue
+
+    def _parse(self, tokens):
+        stack = [Block(None)]
+        for token in tokens:
+            if type(token) is not str:
+                stack[-1].items.append(token)
+            elif token == "/begin":
+                block = Block(next(tokens))
+                stack[-1].items.append(block)
+                stack.append(block)
+            elif token == "/end":
+                name = next(tokens)
+                block = stack.pop()
+                if block.name != name or not stack:
+                    raise A2LError("'/end {}' does not match '/begin {}'.".format(name, block.name))
+                parent = stack[-1]
+                if parent.name == "MODULE" and name in MODULE_BLOCKS:
+                    parent.items.pop()  # Keep memory footprint small.
+                    getattr(self, "_on{}".format(name.title().replace("_", "")))(block)
+            else:
+                stack[-1].items.append(token)
+        if len(stack) != 1:
+            raise A2LError("Unterminated block '{}'.".format(stack[-1].name))
+
+    def _byteOrder(self, kw):
+        if "BYTE_ORDER" in kw:
+            return BYTE_ORDERS[kw["BYTE_ORDER"][0]]
+        return None
+
+    def _onMeasurement(self, block):
+        items = block.items
+        name, _, datatype, conversion = items[:4]
+        lower, upper = number(items[6]), number(items[7])
+        kw = keywordArgs(items[8:], MEASUREMENT_KEYWORDS)
+        dims = kw.get("MATRIX_DIM") or ((number(kw["ARRAY_SIZE"][0]), ) if "ARRAY_SIZE" in kw else ())
+        events = []
+        for ifData in block.blocks("IF_DATA"):
+            if ifData.items and ifData.items[0] == "XCP":
+                for b in ifData.walk():
+                    if b.name == "DAQ_EVENT":
+                        events.extend(self._eventNumbers(b.items))
+        self.measurements[name] = Measurement(
+            name, datatype, conversion, lower, upper,
+            number(kw["ECU_ADDRESS"][0]) if "ECU_ADDRESS" in kw else None,
+            number(kw["ECU_ADDRESS_EXTENSION"][0]) if "ECU_ADDRESS_EXTENSION" in kw else 0,
+            number(kw["BIT_MASK"][0]) if "BIT_MASK" in kw else None,
+            self._byteOrder(kw), dims, tuple(events))
+
+    @staticmethod
+    def _eventNumbers(items):
+        return [number(items[idx + 1]) for idx, item in enumerate(items[:-1]) if item == "EVENT"]
+
+    def _onCharacteristic(self, block):
+        items = block.items
+        name, _, kind, address, deposit, _, conversion, lower, upper = items[:9]
+        kw = keywordArgs(items[9:], CHARACTERISTIC_KEYWORDS)
+        dims = kw.get("MATRIX_DIM") or ((number(kw["NUMBER"][0]), ) if "NUMBER" in kw else ())
+        axes = tuple(self._axisDescr(b) for b in block.blocks("AXIS_DESCR"))
+        self.characteristics[name] = Characteristic(
+            name, kind, number(address), deposit, conversion, number(lower), number(upper),
+            number(kw["ECU_ADDRESS_EXTENSION"][0]) if "ECU_ADDRESS_EXTENSION" in kw else 0,
+            number(kw["BIT_MASK"][0]) if "BIT_MASK" in kw else None,
+            self._byteOrder(kw), dims, axes)
+
+    def _onAxisPts(self, block):
+        items = block.items
+        name, _, address, inputQuantity, deposit, _, conversion, maxAxisPoints, lower, upper = items[:10]
+        kw = keywordArgs(items[10:], AXIS_PTS_KEYWORDS)
+        self.axisPts[name] = AxisPts(
+            name, number(address), inputQuantity, deposit, conversion, number(maxAxisPoints),
+            number(lower), number(upper),
+            number(kw["ECU_ADDRESS_EXTENSION"][0]) if "ECU_ADDRESS_EXTENSION" in kw else 0,
+            self._byteOrder(kw))
+
+    def _axisDescr(self, block):
+        items = block.items
+        attribute, inputQuantity, conversion, maxAxisPoints, lower, upper = items[:6]
+        kw = keywordArgs(items[6:], AXIS_DESCR_KEYWORDS)
+        fixAxis = None
+        if "FIX_AXIS_PAR" in kw:
+            offset, shift, count = (number(t) for t in kw["FIX_AXIS_PAR"])
+            fixAxis = tuple(offset + (i << shift) for i in range(count))
+        elif "FIX_AXIS_PAR_DIST" in kw:
+            offset, distance, count = (number(t) for t in kw["FIX_AXIS_PAR_DIST"])
+            fixAxis = tuple(offset + i * distance for i in range(count))
+        else:
+            for b in block.blocks("FIX_AXIS_PAR_LIST"):
+                fixAxis = tuple(number(t) for t in b.items)
+        return AxisDescr(
+            attribute, inputQuantity, conversion, number(maxAxisPoints), number(lower), number(upper),
+            fixAxis, kw["AXIS_PTS_REF"][0] if "AXIS_PTS_REF" in kw else None, self._byteOrder(kw))
+
+    def _onRecordLayout(self, block):
+        name = block.items[0]
+        components = {}
+        for keyword, args in keywordArgs(block.items[1:], RECORD_LAYOUT_KEYWORDS).items():
+            components[keyword] = tuple(number(a) if isNumber(a) else str(a) for a in args)
+        self.recordLayouts[name] = RecordLayout(name, components)
+
+    def _onCompuMethod(self, block):
+        items = block.items
+        name, _, kind, fmt, unit = items[:5]
+        kw = keywordArgs(items[5:], COMPU_METHOD_KEYWORDS)
+        coeffs = kw.get("COEFFS") or kw.get("COEFFS_LINEAR")
+        self.compuMethods[name] = CompuMethodDef(
+            name, kind, str(fmt), str(unit),
+            tuple(number(c) for c in coeffs) if coeffs else None,
+            kw["COMPU_TAB_REF"][0] if "COMPU_TAB_REF" in kw else None)
+
+    def _compuTab(self, items, start, width):
+        count = number(items[start - 1])
+        end = start + count * width
+        rows = [items[idx:idx + width] for idx in range(start, end, width)]
+        default = None
+        rest = items[end:]
+        for idx, item in enumerate(rest[:-1]):
+            if item == "DEFAULT_VALUE":
+                default = str(rest[idx + 1])
+            elif item == "DEFAULT_VALUE_NUMERIC":
+                default = number(rest[idx + 1])
+        return rows, default
+
+    def _onCompuTab(self, block):
+        name, _, kind = block.items[:3]
+        rows, default = self._compuTab(block.items, 4, 2)
+        pairs = tuple((number(x), number(y)) for x, y in rows)
+        self.compuTabs[name] = CompuTab(name, kind, pairs, (), default)
+
+    def _onCompuVtab(self, block):
+        name, _, kind = block.items[:3]
+        rows, default = self._compuTab(block.items, 4, 2)
+        pairs = tuple((number(x), str(text)) for x, text in rows)
+        self.compuTabs[name] = CompuTab(name, kind, pairs, (), default)
+
+    def _onCompuVtabRange(self, block):
+        name = block.items[0]
+        rows, default = self._compuTab(block.items, 3, 3)
+        ranges = tuple((number(lo), number(hi), str(text)) for lo, hi, text in rows)
+        self.compuTabs[name] = CompuTab(name, "TAB_VERB", (), ranges, default)
+
+    def _onModCommon(self, block):
+        kw = keywordArgs(block.items[1:], {"BYTE_ORDER": 1})
+        self.byteOrder = self._byteOrder(kw) or self.byteOrder
+
+    def _onIfData(self, block):
+        if not block.items or block.items[0] != "XCP":
+            return
+        for b in block.walk():
+            if b.name == "EVENT" and len(b.items) >= 3:
+                self.events[number(b.items[2])] = str(b.items[0])
+
+    def __len__(self):
+        return len(self.measurements) + len(self.characteristics) + len(self.axisPts)
+
+    def __contains__(self, name):
+        return name in self.measurements or name in self.characteristics or name in self.axisPts
+
+    def __getitem__(self, name):
+        """`Measurement`, `Characteristic` or `AxisPts` named `name`.
+        """
+        for symbols in (self.measurements, self.characteristics, self.axisPts):
+            symbol = symbols.get(name)
+            if symbol is not None:
+                return symbol
+        raise KeyError(name)
+
+    def find(self, pattern):
+        """Names of all symbols matching the shell-style `pattern`.
+        """
+        names = list(self.measurements) + list(self.characteristics) + list(self.axisPts)
+        return sorted(fnmatch.filter(names, pattern))
+
+    def symbolsAt(self, address, ext=0):
+        """Names of the symbols located at `address`.
+        """
+        if self._addressIndex is None:
+            index = [(s.ext, s.address, s.name) for s in self.measurements.values() if s.address is not None]
+            index.extend((s.ext, s.address, s.name) for s in self.characteristics.values())
+            index.extend((s.ext, s.address, s.name) for s in self.axisPts.values())
+            index.sort()
+            self._addressIndex = index
+        index = self._addressIndex
+        idx = bisect.bisect_left(index, (ext, address, ""))
+        result = []
+        while idx < len(index) and index[idx][:2] == (ext, address):
+            result.append(index[idx][2])
+            idx += 1
+        return result
+
+    def datatype(self, symbol):
+        """A2L datatype of `symbol` (function values resp. axis points for
+        characteristics and axis points).
+        """
+        symbol = self._symbol(symbol)
+        if isinstance(symbol, Measurement):
+            return symbol.datatype
+        component = "AXIS_PTS_X" if isinstance(symbol, AxisPts) else "FNC_VALUES"
+        layout = self.recordLayouts.get(symbol.recordLayout)
+        if layout is None or component not in layout.components:
+            raise KeyError("Record layout '{}' without {}.".format(symbol.recordLayout, component))
+        return layout.components[component][1]
+
+    def codec(self, symbol):
+        """`pyxcp.asam.types` codec of `symbol`, respecting its byte order.
+        """
+        symbol = self._symbol(symbol)
+        return DATATYPES[self.datatype(symbol)](symbol.byteOrder or self.byteOrder)
+
+    def conversion(self, symbol):
+        """`pyxcp.asam.compumethod.CompuMethod` of `symbol` (or a COMPU_METHOD name).
+        """
+        if not isinstance(symbol, str):
+            name = symbol.conversion
+        elif symbol in self:
+            name = self[symbol].conversion
+        else:
+            name = symbol
+        method = self._conversions.get(name)
+        if method is None:
+            method = self._conversions[name] = self._createConversion(name)
+        return method
+
+    def _createConversion(self, name):
+        if name == "NO_COMPU_METHOD":
+            return Identical()
+        definition = self.compuMethods[name]
+        kind = definition.kind
+        params = dict(unit=definition.unit, format=definition.format)
+        if kind in ("LINEAR", "RAT_FUNC"):
+            params["coeffs"] = definition.coeffs
+        elif kind in ("TAB_INTP", "TAB_NOINTP", "TAB_VERB"):
+            tab = self.compuTabs[definition.tabRef]
+            if kind == "TAB_VERB":
+                params.update(mapping=tab.pairs, ranges=tab.ranges, default=tab.default)
+            else:
+                params["pairs"] = tab.pairs
+                if kind == "TAB_NOINTP":
+                    params["default"] = tab.default
+        return createCompuMethod(kind, **params)
+
+    def _symbol(self, symbol):
+        return self[symbol] if isinstance(symbol, str) else symbol
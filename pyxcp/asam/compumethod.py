@@ -0,0 +1,354 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Conversion of raw (ECU internal) values to physical values (COMPU_METHOD).
+
+Supported kinds: IDENTICAL, LINEAR, RAT_FUNC, TAB_INTP, TAB_NOINTP and
+TAB_VERB (including COMPU_VTAB_RANGE ranges).
+
+Conversion functions are compiled once per method (closures over the
+coefficients, lookup tables precomputed) and applied to whole
+`numpy.ndarray` columns in a single vectorized call::
+
+    cm = createCompuMethod("LINEAR", coeffs=(0.1, -40.0), unit="degC")
+    temperatures = cm.physical(A_Int16("<").decodeArray(column))
+
+Scalars and lists are accepted as well (lists are returned as lists).
+"""
+
+__copyright__ = """
+    pySART - Simplified AUTOSAR-Toolkit for Python.
+
+   (C) 2009-2019 by Christoph Schueler <cpu12.gems@googlemail.com>
+
+   All Rights Reserved
+
+  This program is free software; you can redistribute it and/or modify
+  it under the terms of the GNU General Public License as published by
+  the Free Software Foundation; either version 2 of the License, or
+  (at your option) any later version.
+
+  This program is distributed in the hope that it will be useful,
+  but WITHOUT ANY WARRANTY; without even the implied warranty of
+  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+  GNU General Public License for more details.
+
+  You should have received a copy of the GNU General Public License along
+  with this program; if not, write to the Free Software Foundation, Inc.,
+  51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+"""
+
+from array import array
+import bisect
+
+try:
+    import numpy as np
+except ImportError:
+    HAS_NUMPY = False
+else:
+    HAS_NUMPY = True
+
+DENSE_LIMIT = 0x10000   # Max. span of a verbal table kept as dense lookup array.
+
+
+class CompuMethod(object):
+    """Base class of conversion methods.
+
+    Derived classes set `_toPhys`/`_toPhysVector` (and optionally
+    `_toRaw`/`_toRawVector`), the scalar resp. `numpy.ndarray` version of
+    the conversion.
+
+    Parameters
+    ----------
+    unit : str
+        Physical unit.
+    format : str
+        Display format, e.g. "%6.2".
+    """
+
+    KIND = None
+
+    def __init__(self, unit="", format=None):
+        self.unit = unit
+        self.format = format
+
+    def __call__(self, values):
+        return self.physical(values)
+
+    def __repr__(self):
+        return "{}(unit={!r})".format(self.__class__.__name__, self.unit)
+
+    def physical(self, values):
+        """Convert raw value(s) to physical value(s).
+
+        Parameters
+        ----------
+        values : number, sequence or `numpy.ndarray`
+
+        Returns
+        -------
+        Same shape as `values`.
+        """
+        return _apply(self._toPhys, self._toPhysVector, values)
+
+    def raw(self, values):
+        """Convert physical value(s) to raw value(s) (inverse of `physical`).
+        """
+        return _apply(self._toRaw, self._toRawVector, values)
+
+    def _toRaw(self, value):
+        raise NotImplementedError("{} can't be inverted.".format(self.KIND))
+
+    _toRawVector = _toRaw
+
+
+def _apply(scalar, vector, values):
+    if HAS_NUMPY:
+        if isinstance(values, np.ndarray):
+            return vector(values)
+        if isinstance(values, (list, tuple, array)):
+            return vector(np.asarray(values)).tolist()
+    elif isinstance(values, (list, tuple, array)):
+        return [scalar(v) for v in values]
+    return scalar(values)
+
+
+class Identical(CompuMethod):
+    """IDENTICAL: physical value equals raw value.
+    """
+
+    KIND = "IDENTICAL"
+
+    def __init__(self, unit="", format=None):
+        super(Identical, self).__init__(unit, format)
+        self._toPhys = self._toPhysVector = self._toRaw = self._toRawVector = lambda x: x
+
+
+class Linear(CompuMethod):
+    """LINEAR: phys = a * raw + b.
+
+    Parameters
+    ----------
+    coeffs : (a, b)
+    """
+
+    KIND = "LINEAR"
+
+    def __init__(self, coeffs, unit="", format=None):
+        super(Linear, self).__init__(unit, format)
+        a, b = coeffs
+        self.coeffs = (a, b)
+        self._toPhys = self._toPhysVector = lambda x: x * a + b
+        self._toRaw = self._toRawVector = lambda p: (p - b) / a
+
+
+class RatFunc(CompuMethod):
+    """RAT_FUNC: raw = (a * phys**2 + b * phys + c) / (d * phys**2 + e * phys + f).
+
+    As in ASAM MCD-2 MC the coefficients describe physical -> raw; the
+    physical value is obtained by inversion, which requires a = d = 0.
+
+    Parameters
+    ----------
+    coeffs : (a, b, c, d, e, f)
+    """
+
+    KIND = "RAT_FUNC"
+
+    def __init__(self, coeffs, unit="", format=None):
+        super(RatFunc, self).__init__(unit, format)
+        a, b, c, d, e, f = coeffs
+        self.coeffs = (a, b, c, d, e, f)
+        self._toRaw = self._toRawVector = lambda p: (a * p * p + b * p + c) / (d * p * p + e * p + f)
+        if a == 0 and d == 0:
+            self._toPhys = self._toPhysVector = lambda x: (c - f * x) / (e * x - b)
+        else:
+            self._toPhys = self._toPhysVector = self._notInvertible
+
+    def _notInvertible(self, value):
+        raise ValueError("RAT_FUNC with quadratic terms can't be converted to physical values.")
+
+
+class _Table(CompuMethod):
+
+    def __init__(self, pairs, unit="", format=None):
+        super(_Table, self).__init__(unit, format)
+        pairs = sorted(pairs.items() if isinstance(pairs, dict) else pairs)
+        if not pairs:
+            raise ValueError("Empty conversion table.")
+        self.xs = [x for x, _ in pairs]
+        self.ys = [y for _, y in pairs]
+        if HAS_NUMPY:
+            self._xs = np.array(self.xs, dtype=np.float64)
+            self._ys = np.array(self.ys, dtype=np.float64)
+
+
+class TabIntp(_Table):
+    """TAB_INTP: table with linear interpolation, clamped at the borders.
+
+    Parameters
+    ----------
+    pairs : dict or sequence of (raw, phys)
+    """
+
+    KIND = "TAB_INTP"
+
+    def _toPhys(self, x):
+        xs, ys = self.xs, self.ys
+        if x <= xs[0]:
+            return ys[0]
+        if x >= xs[-1]:
+            return ys[-1]
+        idx = bisect.bisect_right(xs, x)
+        x0, x1, y0, y1 = xs[idx - 1], xs[idx], ys[idx - 1], ys[idx]
+        return y0 + (y1 - y0) * (x - x0) / (x1 - x0)
+
+    def _toPhysVector(self, values):
+        return np.interp(values, self._xs, self._ys)
+
+
+class TabNoIntp(_Table):
+    """TAB_NOINTP: table without interpolation.
+
+    Raw values not in the table are mapped to `default`, or to the nearest
+    table entry if there is no default.
+
+    Parameters
+    ----------
+    pairs : dict or sequence of (raw, phys)
+    default : float
+        DEFAULT_VALUE_NUMERIC.
+    """
+
+    KIND = "TAB_NOINTP"
+
+    def __init__(self, pairs, default=None, unit="", format=None):
+        super(TabNoIntp, self).__init__(pairs, unit, format)
+        self.default = default
+        self._table = dict(zip(self.xs, self.ys))
+
+    def _toPhys(self, x):
+        y = self._table.get(x)
+        if y is not None:
+            return y
+        if self.default is not None:
+            return self.default
+        xs = self.xs
+        idx = bisect.bisect_left(xs, x)
+        if idx == len(xs) or (idx and x - xs[idx - 1] <= xs[idx] - x):
+            idx -= 1
+        return self.ys[idx]
+
+    def _toPhysVector(self, values):
+        xs = self._xs
+        values = np.asarray(values)
+        right = np.clip(np.searchsorted(xs, values), 0, len(xs) - 1)
+        if self.default is not None:
+            return np.where(xs[right] == values, self._ys[right], self.default)
+        left = np.clip(right - 1, 0, len(xs) - 1)
+        nearest = np.where(np.abs(values - xs[left]) <= np.abs(xs[right] - values), left, right)
+        return self._ys[nearest]
+
+
+class TabVerb(CompuMethod):
+    """TAB_VERB: verbal table (COMPU_VTAB / COMPU_VTAB_RANGE).
+
+    Parameters
+    ----------
+    mapping : dict
+        raw -> text.
+    ranges : sequence of (lower, upper, text)
+        Inclusive raw value ranges, checked if there is no exact match.
+    default : str
+        Text for unmatched raw values.
+    """
+
+    KIND = "TAB_VERB"
+
+    def __init__(self, mapping, ranges=(), default=None, unit="", format=None):
+        super(TabVerb, self).__init__(unit, format)
+        self.mapping = dict(mapping)
+        self.ranges = [tuple(r) for r in ranges]
+        self.default = default
+        self._inverse = {text: raw for raw, text in self.mapping.items()}
+        self._dense = None
+        if HAS_NUMPY and self.mapping:
+            keys = sorted(self.mapping)
+            self._keys = np.array(keys, dtype=np.float64)
+            self._texts = np.array([self.mapping[k] for k in keys], dtype=object)
+            lower, upper = keys[0], keys[-1]
+            if all(float(k).is_integer() for k in keys) and upper - lower < DENSE_LIMIT:
+                self._lower = int(lower)
+                dense = np.full(int(upper - lower) + 1, None, dtype=object)
+                dense[np.array(keys, dtype=np.int64) - self._lower] = self._texts
+                self._dense = dense
+
+    def _toPhys(self, x):
+        text = self.mapping.get(x)
+        if text is not None:
+            return text
+        for lower, upper, text in self.ranges:
+            if lower <= x <= upper:
+                return text
+        return self.default
+
+    def _toPhysVector(self, values):
+        values = np.asarray(values)
+        result = np.full(values.shape, None, dtype=object)
+        if self.mapping:
+            if self._dense is not None:
+                index = values.astype(np.int64) - self._lower
+                hit = (index >= 0) & (index < len(self._dense)) & (index + self._lower == values)
+                result[hit] = self._dense[index[hit]]
+            else:
+                index = np.clip(np.searchsorted(self._keys, values), 0, len(self._keys) - 1)
+                hit = self._keys[index] == values
+                result[hit] = self._texts[index[hit]]
+        if self.ranges or self.default is not None:
+            missing = np.equal(result, None)
+            for lower, upper, text in self.ranges:
+                inRange = missing & (values >= lower) & (values <= upper)
+                result[inRange] = text
+                missing &= ~inRange
+            if self.default is not None:
+                result[missing] = self.default
+        return result
+
+    def _toRaw(self, text):
+        raw = self._inverse.get(text)
+        if raw is None:
+            for lower, _, rangeText in self.ranges:
+                if rangeText == text:
+                    return lower
+            raise ValueError("Unknown text {!r}.".format(text))
+        return raw
+
+    def _toRawVector(self, texts):
+        return np.array([self._toRaw(t) for t in texts.ravel()]).reshape(texts.shape)
+
+
+COMPU_METHODS = {
+    Identical.KIND: Identical,
+    Linear.KIND: Linear,
+    RatFunc.KIND: RatFunc,
+    TabIntp.KIND: TabIntp,
+    TabNoIntp.KIND: TabNoIntp,
+    TabVerb.KIND: TabVerb,
+}
+
+
+def createCompuMethod(kind, **params):
+    """Create a conversion method by its A2L kind, e.g. "LINEAR".
+
+    Parameters
+    ----------
+    kind : str
+        s. `COMPU_METHODS`.
+    params :
+        Constructor arguments of the class.
+    """
+    try:
+        klass = COMPU_METHODS[kind.upper()]
+    except KeyError:
+        raise ValueError("Unsupported COMPU_METHOD '{}'.".format(kind)) from None
+    return klass(**params)
@@ -23,11 +23,22 @@ __copyright__ = """
   51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
 """
 
+from array import array
 import struct
+import sys
+
+try:
+    import numpy as np
+except ImportError:
+    HAS_NUMPY = False
+else:
+    HAS_NUMPY = True
 
 INTEL = "<"
 MOTOROLA = ">"
 
+NATIVE = INTEL if sys.byteorder == "little" else MOTOROLA
+
 """
     A_VOID: pseudo type for non-existing elements
     A_BIT: one bit
@@ -38,6 +49,17 @@ MOTOROLA = ">"
 """
 
 
+def arrayTypecode(fmt):
+    """`array.array` typecode with the (standard) size of struct format `fmt`.
+    """
+    size = struct.calcsize("<{}".format(fmt))
+    candidates = {"I": "IL", "i": "il", "Q": "QL", "q": "ql"}.get(fmt, fmt)
+    for code in candidates:
+        if array(code).itemsize == size:
+            return code
+    raise ValueError("No array typecode for format '{}'.".format(fmt))
+
+
 class AsamBaseType(object):
     """Base class for ASAM codecs.
 
@@ -46,6 +68,8 @@ class AsamBaseType(object):
     Always use derived classes.
     """
 
+    FMT = None
+
     def __init__(self, byteorder):
         """
 
@@ -58,6 +82,13 @@ class AsamBaseType(object):
         if byteorder not in ("<", ">"):
             raise ValueError("Invalid byteorder.")
         self.byteorder = byteorder
+        if self.FMT:
+            self._struct = struct.Struct("{}{}".format(byteorder, self.FMT))
+            self.size = self._struct.size
+            self.typecode = arrayTypecode(self.FMT)
+            self._swap = byteorder != NATIVE
+            if HAS_NUMPY:
+                self.dtype = np.dtype("{}{}".format(byteorder, self.FMT))
 
     def encode(self, value):
         """Encode a value.
@@ -74,7 +105,7 @@ class AsamBaseType(object):
         bytes
           Encoded value.
         """
-        return struct.pack("{}{}".format(self.byteorder, self.FMT), value)
+        return self._struct.pack(value)
 
     def decode(self, value):
         """Decode a value.
@@ -91,8 +122,55 @@ class AsamBaseType(object):
         data-type
           data-type is determined by derived class.
         """
-        return struct.unpack(
-            "{}{}".format(self.byteorder, self.FMT), bytes(value))[0]
+        try:
+            return self._struct.unpack(value)[0]
+        except TypeError:
+            return self._struct.unpack(bytes(value))[0]
+
+    def encodeArray(self, values):
+        """Encode a sequence of values at once.
+
+        Parameters
+        ----------
+        values: sequence, `array.array` or `numpy.ndarray`
+
+        Returns
+        -------
+        bytes
+          Encoded values, `self.size` bytes each.
+        """
+        if HAS_NUMPY:
+            return np.asarray(values, dtype=self.dtype).tobytes()
+        if isinstance(values, array) and values.typecode == self.typecode and not self._swap:
+            return values.tobytes()
+        result = array(self.typecode, values)
+        if self._swap:
+            result.byteswap()
+        return result.tobytes()
+
+    def decodeArray(self, data):
+        """Decode a buffer of values at once.
+
+        Parameters
+        ----------
+        data: bytes-like
+          Length must be a multiple of `self.size`.
+
+        Returns
+        -------
+        `numpy.ndarray` or `array.array`
+          A read-only view on `data` if NumPy is available (no copy),
+          otherwise an `array.array` in native byteorder.
+        """
+        if memoryview(data).nbytes % self.size:
+            raise ValueError("Buffer size must be a multiple of {}.".format(self.size))
+        if HAS_NUMPY:
+            return np.frombuffer(data, dtype=self.dtype)
+        result = array(self.typecode)
+        result.frombytes(data)
+        if self._swap:
+            result.byteswap()
+        return result
 
 
 class A_Uint8(AsamBaseType):
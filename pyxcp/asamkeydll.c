@@ -46,8 +46,27 @@
 
 uint8_t dllname[NP_BUFSIZE] = {0};
 
+uint8_t unhexlify(char const * const str, uint8_t * const buf)
+{
+    size_t len = strlen(str) >> 1;
+    char cbuf[3] = {0};
+    size_t idx;
+
+    if (len > KEY_BUFSIZE) {
+        len = KEY_BUFSIZE;
+    }
+    for (idx = 0; idx < len; ++idx) {
+        cbuf[0] = str[idx * 2];
+        cbuf[1] = str[(idx * 2) + 1];
+        buf[idx] = strtol(cbuf, 0, 16);
+    }
+    return (uint8_t)len;
+}
+
 DWORD GetKey(char * const dllName, BYTE privilege, BYTE lenSeed, BYTE * seed, BYTE * lenKey, BYTE * key);
 void hexlify(uint8_t const * const buf, uint16_t len);
+uint8_t unhexlify(char const * const str, uint8_t * const buf);
+int Serve(char * const dllName);
 
 typedef DWORD (*XCP_GetAvailablePrivilegesType)(BYTE * privilege);
 typedef DWORD (*XCP_ComputeKeyFromSeedType)(BYTE privilege, BYTE lenSeed, BYTE *seed, BYTE * lenKey, BYTE * key);
@@ -87,13 +106,56 @@ DWORD GetKey(char * const dllName, BYTE privilege, BYTE lenSeed, BYTE * seed, BY
 
 
 
+/*
+ * Pipe mode (s. pyxcp.seedkey): the DLL is loaded once, then every line
+ * "<privilege> <hex seed>" from stdin is answered by "<result> <hex key>".
+ */
+int Serve(char * const dllName)
+{
+    HANDLE hModule = LoadLibrary(dllName);
+    XCP_ComputeKeyFromSeedType XCP_ComputeKeyFromSeed = NULL;
+    char line[NP_BUFSIZE];
+    char hexSeed[NP_BUFSIZE];
+    unsigned int privilege;
+    DWORD res;
+
+    if (hModule != NULL) {
+        XCP_ComputeKeyFromSeed = (XCP_ComputeKeyFromSeedType)GetProcAddress(hModule, "XCP_ComputeKeyFromSeed");
+    }
+    while (fgets(line, sizeof(line), stdin) != NULL) {
+        hexSeed[0] = '\0';
+        if (sscanf(line, "%u %4095s", &privilege, hexSeed) < 1) {
+            continue;
+        }
+        seedlen = unhexlify(hexSeed, seedBuffer);
+        keylen = KEY_BUFSIZE;
+        if (hModule == NULL) {
+            res = ERR_COULD_NOT_LOAD_DLL;
+        } else if (XCP_ComputeKeyFromSeed == NULL) {
+            res = ERR_COULD_NOT_LOAD_FUNC;
+        } else {
+            res = XCP_ComputeKeyFromSeed((BYTE)privilege, seedlen, seedBuffer, &keylen, keyBuffer);
+        }
+        printf("%lu", res);
+        if (res == ERR_OK) {
+            printf(" ");
+            hexlify(keyBuffer, keylen);
+        }
+        printf("\n");
+        fflush(stdout);
+    }
+    return ERR_OK;
+}
+
 int main(int argc, char ** argv)
 {
     BYTE privilege = 0;
     int idx;
     DWORD res;
-    char cbuf[3] = {0};
 
+    if (argc == 2) {
+        return Serve(argv[1]);
+    }
     for (idx = 1; idx < argc; ++idx) {
         if (idx == 1) {
             strcpy(dllname, argv[idx]);
@@ -104,13 +166,7 @@ int main(int argc, char ** argv)
         }
     }
 
-    seedlen = strlen(nameBuffer) >> 1;
-    for (idx = 0; idx < seedlen; ++idx) {
-        cbuf[0] = nameBuffer[idx * 2];
-        cbuf[1] = nameBuffer[(idx * 2) + 1 ];
-        cbuf[2] = '\x00';
-        seedBuffer[idx] = strtol(cbuf, 0, 16);
-    }
+    seedlen = unhexlify(nameBuffer, seedBuffer);
 
     res = GetKey((char *)&dllname, privilege, seedlen, (BYTE *)&seedBuffer, &keylen, (BYTE *)&keyBuffer);
     printf("%d\n", res);
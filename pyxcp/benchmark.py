@@ -0,0 +1,327 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Reproducible benchmarks of the hot paths.
+
+Runs against the in-process simulator (`pyxcp.simulator`), so no hardware
+is required. Results are emitted as JSON for trend tracking::
+
+    python -m pyxcp.benchmark -o results.json
+    python -m pyxcp.benchmark --transport udp --only roundTrip fetch
+
+Benchmarks
+----------
+roundTrip
+    GET_STATUS request/response latency.
+fetch, download
+    Throughput vs. payload size.
+daqIngest
+    DTOs per second from simulator event to `daqQueue`.
+checksum
+    MB/s of the algorithms in `pyxcp.checksum`.
+parse
+    Parses per second of frequently used `pyxcp.types` constructs.
+"""
+
+__copyright__ = """
+    pySART - Simplified AUTOSAR-Toolkit for Python.
+
+   (C) 2009-2019 by Christoph Schueler <cpu12.gems@googlemail.com>
+
+   All Rights Reserved
+
+  This program is free software; you can redistribute it and/or modify
+  it under the terms of the GNU General Public License as published by
+  the Free Software Foundation; either version 2 of the License, or
+  (at your option) any later version.
+
+  This program is distributed in the hope that it will be useful,
+  but WITHOUT ANY WARRANTY; without even the implied warranty of
+  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+  GNU General Public License for more details.
+
+  You should have received a copy of the GNU General Public License along
+  with this program; if not, write to the Free Software Foundation, Inc.,
+  51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+"""
+
+import argparse
+from collections import OrderedDict
+import datetime
+import json
+import platform
+import queue
+import sys
+
+from pyxcp import checksum
+from pyxcp import types
+from pyxcp.master import Master
+from pyxcp.simulator import CanServer, EthServer, EventChannel, Slave
+from pyxcp.timing import perf_counter_ns
+from pyxcp.transport.can import Can
+from pyxcp.transport.eth import Eth
+from pyxcp.transport.virtualcan import VirtualCan
+from pyxcp.version import __version__
+
+TRANSPORTS = ("tcp", "udp", "can")
+CAN_CONFIG = {"CAN_ID_MASTER": 0x101, "CAN_ID_SLAVE": 0x102}
+SPORADIC_EVENT = 0
+
+# (iterations, sizes); `quick` is meant for smoke tests.
+SCALES = {
+    "full": dict(roundTrips=2000, transferSize=0x10000, daqFrames=50000, checksumSize=0x40000, parses=20000),
+    "quick": dict(roundTrips=50, transferSize=0x400, daqFrames=500, checksumSize=0x1000, parses=200),
+}
+
+
+def statistics(samples):
+    """Summary statistics of latency samples (ns).
+    """
+    values = sorted(samples)
+    count = len(values)
+
+    def percentile(p):
+        return values[min(count - 1, int(p / 100.0 * count))]
+    return OrderedDict((
+        ("count", count),
+        ("min", values[0]),
+        ("mean", sum(values) / count),
+        ("p50", percentile(50)),
+        ("p90", percentile(90)),
+        ("p99", percentile(99)),
+        ("max", values[-1]),
+    ))
+
+
+def result(name, value, unit, params=None, stats=None):
+    entry = OrderedDict((("name", name), ("value", value), ("unit", unit)))
+    if params:
+        entry["params"] = params
+    if stats:
+        entry["stats"] = stats
+    return entry
+
+
+class Session:
+    """Simulator plus connected master.
+
+    Parameters
+    ----------
+    transport : ["tcp", "udp", "can"]
+    """
+
+    def __init__(self, transport="tcp"):
+        if transport not in TRANSPORTS:
+            raise ValueError("transport must be one of {}.".format(TRANSPORTS))
+        self.transportName = transport
+        if transport == "can":
+            self.slave = Slave(events=(EventChannel("sporadic", 0), ))
+            self.server = CanServer(self.slave, channel="benchmark")
+            tr = Can(VirtualCan("benchmark"), config=CAN_CONFIG)
+        else:
+            self.slave = Slave(maxCto=255, maxDto=1400, events=(EventChannel("sporadic", 0), ))
+            self.server = EthServer(self.slave, protocol=transport.upper())
+            tr = Eth(port=self.server.port, protocol=transport.upper())
+        self.server.start()
+        self.master = Master(tr)
+        self.master.connect()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        self.master.disconnect()
+        self.master.close()
+        self.server.stop()
+
+    @property
+    def maxPayload(self):
+        return self.master.slaveProperties.maxCto - 1
+
+
+def benchRoundTrip(session, roundTrips, **kws):
+    xm = session.master
+    samples = []
+    for _ in range(roundTrips):
+        start = perf_counter_ns()
+        xm.getStatus()
+        samples.append(perf_counter_ns() - start)
+    stats = statistics(samples)
+    return [result("roundTrip", stats["p50"], "ns", {"command": "GET_STATUS"}, stats)]
+
+
+def payloadSizes(maxPayload):
+    if maxPayload <= 8:
+        return [maxPayload]
+    step = max(8, maxPayload // 8)
+    return sorted(set(list(range(8, maxPayload, step)) + [maxPayload]))
+
+
+def benchFetch(session, transferSize, **kws):
+    xm = session.master
+    results = []
+    for payload in payloadSizes(session.maxPayload):
+        xm.setMta(0)
+        start = perf_counter_ns()
+        xm.fetch(transferSize, payload if payload >= 8 else None)
+        elapsed = perf_counter_ns() - start
+        results.append(result("fetch", transferSize * 1e9 / elapsed, "B/s",
+                              {"payload": payload, "size": transferSize}))
+    return results
+
+
+def benchDownload(session, transferSize, **kws):
+    xm = session.master
+    results = []
+    data = bytes(range(256)) * (session.maxPayload // 256 + 1)
+    for payload in payloadSizes(session.master.slaveProperties.maxCto - 2):
+        chunk = data[:payload]
+        count = transferSize // payload
+        xm.setMta(0)
+        start = perf_counter_ns()
+        for _ in range(count):
+            xm.download(chunk)
+        elapsed = perf_counter_ns() - start
+        results.append(result("download", count * payload * 1e9 / elapsed, "B/s",
+                              {"payload": payload, "size": count * payload}))
+    return results
+
+
+def benchDaqIngest(session, daqFrames, **kws):
+    xm = session.master
+    slave = session.slave
+    odtSize = min(slave.maxDto, 64) - 1 - 4
+    xm.freeDaq()
+    xm.allocDaq(1)
+    xm.allocOdt(0, 1)
+    xm.allocOdtEntry(0, 0, 1)
+    xm.setDaqPtr(0, 0, 0)
+    xm.writeDaq(0xff, odtSize, 0, 0x0)
+    xm.setDaqListMode(0x10, 0, SPORADIC_EVENT, 1, 0)
+    xm.startStopDaqList(0x01, 0)
+    daqQueue = xm.transport.daqQueue
+    start = last = perf_counter_ns()
+    received = 0
+    for _ in range(daqFrames):
+        slave.trigger(SPORADIC_EVENT)
+        while True:     # Drain what is already there, bounded memory.
+            try:
+                last = daqQueue.get_nowait()[3]
+            except queue.Empty:
+                break
+            received += 1
+    while received < daqFrames:
+        try:
+            last = daqQueue.get(timeout=1.0)[3]
+        except queue.Empty:
+            break       # Lost frames (UDP), rate is based on the last one received.
+        received += 1
+    elapsed = max(last - start, 1)
+    xm.startStopDaqList(0x00, 0)
+    xm.freeDaq()
+    return [result("daqIngest", received * 1e9 / elapsed, "frames/s",
+                   {"frames": daqFrames, "received": received, "dtoSize": odtSize + 5})]
+
+
+def benchChecksum(session, checksumSize, **kws):
+    data = bytes(range(256)) * (checksumSize // 256)
+    results = []
+    for name in sorted(checksum.ALGO):
+        if name == "XCP_USER_DEFINED":
+            continue
+        start = perf_counter_ns()
+        checksum.check(data, name)
+        elapsed = perf_counter_ns() - start
+        results.append(result("checksum", len(data) / 1e6 * 1e9 / elapsed, "MB/s",
+                              {"algorithm": name, "size": len(data)}))
+    return results
+
+
+PARSE_SAMPLES = (
+    ("Response", types.Response, b"\xff"),
+    ("ConnectResponse", types.ConnectResponse, b"\x15\xc0\x08\x08\x00\x01\x01"),
+    ("GetStatusResponse", types.GetStatusResponse, b"\x00\x15\x00\x00\x00"),
+    ("GetDaqClockResponse", types.GetDaqClockResponse, b"\x00\x00\x00\x78\x56\x34\x12"),
+    ("DAQ", types.DAQ, b"\x00\x00\x01\x02\x03\x04\x05\x06"),
+)
+
+
+def benchParse(session, parses, **kws):
+    results = []
+    for name, construct, data in PARSE_SAMPLES:
+        parse = construct.parse
+        byteOrder = types.ByteOrder.INTEL
+        start = perf_counter_ns()
+        for _ in range(parses):
+            parse(data, byteOrder=byteOrder)
+        elapsed = perf_counter_ns() - start
+        results.append(result("parse", parses * 1e9 / elapsed, "parses/s", {"construct": name}))
+    return results
+
+
+BENCHMARKS = OrderedDict((
+    ("roundTrip", benchRoundTrip),
+    ("fetch", benchFetch),
+    ("download", benchDownload),
+    ("daqIngest", benchDaqIngest),
+    ("checksum", benchChecksum),
+    ("parse", benchParse),
+))
+
+
+def run(transport="tcp", scale="full", only=None):
+    """Run benchmarks.
+
+    Parameters
+    ----------
+    transport : ["tcp", "udp", "can"]
+    scale : ["full", "quick"]
+    only : list of str
+        Names from `BENCHMARKS`, default all.
+
+    Returns
+    -------
+    dict
+        JSON serializable results.
+    """
+    params = SCALES[scale]
+    names = only or list(BENCHMARKS)
+    for name in names:
+        if name not in BENCHMARKS:
+            raise ValueError("Unknown benchmark '{}'.".format(name))
+    results = []
+    with Session(transport) as session:
+        for name in names:
+            results.extend(BENCHMARKS[name](session, **params))
+    return OrderedDict((
+        ("meta", OrderedDict((
+            ("pyxcp", __version__),
+            ("python", platform.python_version()),
+            ("implementation", platform.python_implementation()),
+            ("platform", platform.platform()),
+            ("date", datetime.datetime.utcnow().isoformat()),
+            ("transport", transport),
+            ("scale", scale),
+        ))),
+        ("results", results),
+    ))
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description="pyXCP benchmarks.")
+    parser.add_argument("-t", "--transport", choices=TRANSPORTS, default="tcp")
+    parser.add_argument("-q", "--quick", action="store_true", help="Few iterations (smoke test).")
+    parser.add_argument("-o", "--output", type=argparse.FileType("w"), default=sys.stdout,
+                        help="JSON output file (default: stdout).")
+    parser.add_argument("--only", nargs="+", choices=list(BENCHMARKS), help="Run selected benchmarks.")
+    options = parser.parse_args(args)
+    results = run(options.transport, "quick" if options.quick else "full", options.only)
+    json.dump(results, options.output, indent=2)
+    options.output.write("\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,333 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Structured access to characteristics (VALUE, VAL_BLK, CURVE, MAP and
+AXIS_PTS) described by an A2L catalogue.
+
+An object is read in one coalesced transfer (one SET_MTA, consecutive
+UPLOADs) and decoded into NumPy arrays according to its RECORD_LAYOUT;
+axis points may be stored inline (STD_AXIS), fixed (FIX_AXIS) or shared
+(COM_AXIS, RES_AXIS referring to an AXIS_PTS object)::
+
+    cal = Calibration(xm, A2LCatalogue.load("ecu.a2l"))
+    ignition = cal.read("IgnitionMap")
+    ignition.values[3:5, :] += 2        # [x, y]
+    cal.write(ignition)                 # Only the modified cells are downloaded.
+
+MAP values are indexed `[x, y]`, independent of the index mode
+(COLUMN_DIR: y varies fastest in memory, ROW_DIR: x varies fastest).
+Only DIRECT addressing and byte address granularity are supported.
+"""
+
+__copyright__ = """
+    pySART - Simplified AUTOSAR-Toolkit for Python.
+
+   (C) 2009-2019 by Christoph Schueler <cpu12.gems@googlemail.com>
+
+   All Rights Reserved
+
+  This program is free software; you can redistribute it and/or modify
+  it under the terms of the GNU General Public License as published by
+  the Free Software Foundation; either version 2 of the License, or
+  (at your option) any later version.
+
+  This program is distributed in the hope that it will be useful,
+  but WITHOUT ANY WARRANTY; without even the implied warranty of
+  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+  GNU General Public License for more details.
+
+  You should have received a copy of the GNU General Public License along
+  with this program; if not, write to the Free Software Foundation, Inc.,
+  51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+"""
+
+from collections import namedtuple
+from functools import reduce
+import operator
+import struct
+
+try:
+    import numpy as np
+except ImportError:
+    HAS_NUMPY = False
+else:
+    HAS_NUMPY = True
+
+from pyxcp.asam.a2l import AxisPts, DATATYPES
+
+AXES = "XYZ45"
+
+# Unchanged bytes between two modified cells up to which one download is
+# cheaper than another SET_MTA.
+MERGE_GAP = 8
+
+ALIGNMENTS = {
+    "ALIGNMENT_BYTE": ("UBYTE", "SBYTE"),
+    "ALIGNMENT_WORD": ("UWORD", "SWORD"),
+    "ALIGNMENT_LONG": ("ULONG", "SLONG"),
+    "ALIGNMENT_INT64": ("A_UINT64", "A_INT64"),
+    "ALIGNMENT_FLOAT32_IEEE": ("FLOAT32_IEEE", ),
+    "ALIGNMENT_FLOAT64_IEEE": ("FLOAT64_IEEE", ),
+}
+
+# Sizes are also the default alignments.
+SIZES = {name: struct.calcsize("<{}".format(codec.FMT)) for name, codec in DATATYPES.items()}
+
+RESERVED_DATATYPES = {"BYTE": "UBYTE", "WORD": "UWORD", "LONG": "ULONG"}
+
+# Components with (position, datatype, ...) arguments and exactly one element.
+SCALAR_COMPONENTS = ("NO_AXIS_PTS_", "SRC_ADDR_", "RIP_ADDR_", "SHIFT_OP_", "OFFSET_", "DIST_OP_")
+
+Component = namedtuple("Component", "name offset datatype count order")
+
+
+def product(values):
+    return reduce(operator.mul, values, 1)
+
+
+class CalibrationObject(object):
+    """Decoded characteristic.
+
+    Attributes
+    ----------
+    values : `numpy.ndarray`
+        Raw function values (axis points for AXIS_PTS objects), writable.
+    axes : list of `numpy.ndarray`
+        Raw axis points, inline axes are writable.
+    """
+
+    def __init__(self, symbol, conversion, components, codecs, data):
+        self.symbol = symbol
+        self.name = symbol.name
+        self.address = symbol.address
+        self.ext = symbol.ext
+        self.conversion = conversion
+        self.components = components
+        self.codecs = codecs
+        self.data = data        # Snapshot of the ECU memory.
+        self.values = None
+        self.axes = []
+        self._arrays = {}       # component name -> ndarray
+
+    def __repr__(self):
+        return "CalibrationObject({!r}, shape={})".format(self.name, self.values.shape)
+
+    def physical(self):
+        """Function values converted to physical values.
+        """
+        return self.conversion.physical(self.values)
+
+    def setPhysical(self, values):
+        """Set function values from physical values.
+        """
+        raw = np.asarray(self.conversion.raw(np.asarray(values, dtype=np.float64)))
+        if self.values.dtype.kind in "iu":
+            info = np.iinfo(self.values.dtype)
+            raw = np.clip(np.rint(raw), info.min, info.max)
+        self.values[...] = raw
+
+    def encode(self):
+        """Memory image of the current values.
+        """
+        data = bytearray(self.data)
+        for name, array in self._arrays.items():
+            component = self.components[name]
+            encoded = self.codecs[name].encodeArray(array.ravel(order=component.order))
+            data[component.offset:component.offset + len(encoded)] = encoded
+        return data
+
+    @property
+    def modified(self):
+        return self.encode() != self.data
+
+    def dirtyRanges(self, data, gap=MERGE_GAP):
+        """Byte ranges `[(start, stop), ...]` differing between `data` and
+        the snapshot, extended to whole elements and merged if separated by
+        at most `gap` bytes.
+        """
+        dirty = np.frombuffer(bytes(data), dtype=np.uint8) != np.frombuffer(bytes(self.data), dtype=np.uint8)
+        for name in self._arrays:
+            component = self.components[name]
+            size = self.codecs[name].size
+            start = component.offset
+            stop = start + component.count * size
+            cells = dirty[start:stop].reshape(component.count, size).any(axis=1)
+            dirty[start:stop] = np.repeat(cells, size)
+        changed = np.flatnonzero(dirty)
+        if not len(changed):
+            return []
+        breaks = np.flatnonzero(np.diff(changed) > gap + 1)
+        starts = np.concatenate(([changed[0]], changed[breaks + 1]))
+        stops = np.concatenate((changed[breaks], [changed[-1]])) + 1
+        return list(zip(starts.tolist(), stops.tolist()))
+
+
+class Calibration(object):
+    """Read and write characteristics by name.
+
+    Parameters
+    ----------
+    master : `pyxcp.master.Master`
+        Connected master.
+    catalogue : `pyxcp.asam.a2l.A2LCatalogue`
+    """
+
+    def __init__(self, master, catalogue):
+        if not HAS_NUMPY:
+            raise RuntimeError("Calibration requires NumPy.")
+        self.master = master
+        self.catalogue = catalogue
+
+    def read(self, name):
+        """Read characteristic or axis points `name`.
+
+        Returns
+        -------
+        `CalibrationObject`
+        """
+        symbol = self.catalogue[name]
+        if isinstance(symbol, AxisPts):
+            return self._readAxisPts(symbol)
+        kind = symbol.kind
+        if kind not in ("VALUE", "VAL_BLK", "CURVE", "MAP"):
+            raise NotImplementedError("Characteristics of type {} are not supported.".format(kind))
+        counts, maxCounts, sharedAxes = {}, {}, {}
+        for letter, axis in zip(AXES, symbol.axes):
+            if axis.attribute == "STD_AXIS":
+                counts[letter] = maxCounts[letter] = axis.maxAxisPoints
+            elif axis.attribute == "FIX_AXIS":
+                counts[letter] = maxCounts[letter] = len(axis.fixAxis)
+                sharedAxes[letter] = np.array(axis.fixAxis)
+            elif axis.attribute in ("COM_AXIS", "RES_AXIS"):
+                shared = self.read(axis.axisPtsRef).values.copy()
+                counts[letter] = maxCounts[letter] = len(shared)
+                sharedAxes[letter] = shared
+            else:
+                raise NotImplementedError("{} is not supported.".format(axis.attribute))
+        if kind == "VAL_BLK":
+            dims = tuple(d for d in symbol.dims if d > 1) or (1, )
+        elif kind == "VALUE":
+            dims = ()
+        else:
+            dims = None
+        obj = self._read(symbol, counts, maxCounts, dims)
+        obj.axes = [sharedAxes[letter] if letter in sharedAxes else obj._arrays["AXIS_PTS_" + letter]
+                    for letter in AXES[:len(symbol.axes)]]
+        return obj
+
+    def _readAxisPts(self, symbol):
+        counts = {"X": symbol.maxAxisPoints}
+        obj = self._read(symbol, counts, dict(counts), None, valuesComponent="AXIS_PTS_X")
+        obj.axes = [obj.values]
+        return obj
+
+    def _read(self, symbol, counts, maxCounts, dims, valuesComponent="FNC_VALUES"):
+        catalogue = self.catalogue
+        layout = catalogue.recordLayouts[symbol.recordLayout].components
+        byteOrder = symbol.byteOrder or catalogue.byteOrder
+        static = "STATIC_RECORD_LAYOUT" in layout
+        for letter in AXES:
+            fixed = layout.get("FIX_NO_AXIS_PTS_" + letter)
+            if fixed:
+                counts[letter] = maxCounts[letter] = fixed[0]
+        _, size = self._layout(layout, dict(maxCounts), maxCounts, dims, static, byteOrder)
+        self.master.setMta(symbol.address, symbol.ext)
+        data = bytearray(self.master.fetch(size))
+        components, _ = self._layout(layout, counts, maxCounts, dims, static, byteOrder, data)
+        codecs = {name: DATATYPES[c.datatype](byteOrder) for name, c in components.items()}
+        obj = CalibrationObject(symbol, catalogue.conversion(symbol), components, codecs, data)
+        for name, component in components.items():
+            if name == valuesComponent or name.startswith("AXIS_PTS_"):
+                codec = codecs[name]
+                raw = codec.decodeArray(memoryview(data)[component.offset:component.offset + component.count * codec.size])
+                array = raw.astype(raw.dtype.newbyteorder("="))
+                if name == valuesComponent and name == "FNC_VALUES":
+                    shape = dims if dims is not None else tuple(counts[letter] for letter in AXES[:len(symbol.axes)])
+                    array = array.reshape(shape, order=component.order)
+                obj._arrays[name] = array
+        obj.values = obj._arrays[valuesComponent]
+        return obj
+
+    def _layout(self, layout, counts, maxCounts, dims, static, byteOrder, data=None):
+        """Offsets of the record layout components.
+
+        If `data` is given, the number of axis points stored in the
+        record (NO_AXIS_PTS_*) updates `counts`.
+
+        Returns
+        -------
+        tuple
+            (components, total size)
+        """
+        alignments = {}
+        for keyword, datatypes in ALIGNMENTS.items():
+            for datatype in datatypes:
+                alignments[datatype] = layout[keyword][0] if keyword in layout else SIZES[datatype]
+        components = {}
+        offset = 0
+        entries = [(args[0], name, args) for name, args in layout.items()
+                   if args and not name.startswith(("FIX_NO_AXIS_PTS_", "ALIGNMENT_"))]
+        for _, name, args in sorted(entries):
+            datatype = RESERVED_DATATYPES.get(args[1], args[1]) if name == "RESERVED" else args[1]
+            if name == "IDENTIFICATION" or name == "RESERVED" or name.startswith(SCALAR_COMPONENTS):
+                count = reserved = 1
+                order = "C"
+            elif name.startswith("AXIS_PTS_"):
+                letter = name[-1]
+                count = counts[letter]
+                reserved = maxCounts[letter] if static else count
+                if args[3] != "DIRECT":
+                    raise NotImplementedError("Addressing mode {} is not supported.".format(args[3]))
+                order = "C"
+            elif name == "FNC_VALUES":
+                if args[3] != "DIRECT":
+                    raise NotImplementedError("Addressing mode {} is not supported.".format(args[3]))
+                if dims is not None:
+                    count = reserved = product(dims)
+                else:
+                    letters = [letter for letter in AXES if letter in counts]
+                    count = product(counts[letter] for letter in letters)
+                    reserved = product(maxCounts[letter] for letter in letters) if static else count
+                indexMode = args[2]
+                if indexMode in ("COLUMN_DIR", "ROW_DIR"):
+                    order = "C" if indexMode == "COLUMN_DIR" else "F"
+                else:
+                    raise NotImplementedError("Index mode {} is not supported.".format(indexMode))
+            else:
+                raise NotImplementedError("Record layout component {} is not supported.".format(name))
+            codec = DATATYPES[datatype](byteOrder)
+            alignment = alignments[datatype]
+            offset = (offset + alignment - 1) // alignment * alignment
+            components[name] = Component(name, offset, datatype, count, order)
+            if data is not None and name.startswith("NO_AXIS_PTS_"):
+                actual = codec.decode(memoryview(data)[offset:offset + codec.size])
+                counts[name[-1]] = min(actual, maxCounts[name[-1]])
+            offset += reserved * codec.size
+        return components, offset
+
+    def write(self, obj, gap=MERGE_GAP):
+        """Download the modified cells of `obj`.
+
+        Parameters
+        ----------
+        obj : `CalibrationObject`
+        gap : int
+            s. `CalibrationObject.dirtyRanges`.
+
+        Returns
+        -------
+        int
+            Number of bytes downloaded.
+        """
+        data = obj.encode()
+        ranges = obj.dirtyRanges(data, gap)
+        chunkSize = self.master.slaveProperties.maxCto - 2
+        view = memoryview(data)
+        written = 0
+        for start, stop in ranges:
+            self.master.setMta(obj.address + start, obj.ext)
+            for offset in range(start, stop, chunkSize):
+                self.master.download(view[offset:min(offset + chunkSize, stop)])
+            written += stop - start
+        obj.data[:] = data
+        return written
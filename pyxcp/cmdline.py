@@ -49,10 +49,23 @@ else:
 from pyxcp.master import Master
 from pyxcp.transport import Eth
 from pyxcp.transport import SxI
+from pyxcp.transport.can import Can
+from pyxcp.transport.socketcan import SocketCAN
+from pyxcp.transport.virtualcan import VirtualCan
 
+CAN_DRIVERS = {
+    "socketcan": SocketCAN,
+    "virtual": VirtualCan,
+}
+
+# Driver specific constructor options.
+CAN_DRIVER_OPTIONS = {
+    "socketcan": ("fd", "batchSize", "timestamps"),
+    "virtual": (),
+}
 
 ARGUMENTS = {
-    "can": ("driver", "loglevel"),
+    "can": ("driver", "channel", "fd", "batchSize", "timestamps", "loglevel"),
     "eth": ("host", "port", "protocol", "ipv6", "loglevel"),
     "sxi": ("port", "baudrate", "bytesize", "parity", "stopbits", "loglevel"),
 }
@@ -93,10 +106,10 @@ def mergeParameters(transport, config, params):
     result = {}
     for arg in args:
         cvalue = config.get(arg.upper())
-        if cvalue:
+        if cvalue is not None:
             result[arg] = cvalue
         pvalue = params.get(arg)
-        if pvalue:
+        if pvalue is not None:
             result[arg] = pvalue
     return result
 
@@ -109,6 +122,23 @@ def removeParameters(transport, config):
     return {k: v for k, v in config.items() if not k in stoplist}
 
 
+def createCanTransport(config, driver="socketcan", channel=None, loglevel="WARN", **options):
+    """Instantiate CAN driver and XCPonCAN transport layer.
+
+    `options` are passed to the driver, s. `CAN_DRIVER_OPTIONS`.
+    """
+    driverClass = CAN_DRIVERS.get(driver.lower())
+    if driverClass is None:
+        raise ValueError("Unsupported CAN driver '{}' - choose from {}.".format(
+            driver, sorted(CAN_DRIVERS.keys())))
+    options = makeNonNullValuesDict(**options)
+    unsupported = sorted(set(options) - set(CAN_DRIVER_OPTIONS[driver.lower()]))
+    if unsupported:
+        raise ValueError("CAN driver '{}' doesn't support {}.".format(driver, unsupported))
+    driverParams = makeNonNullValuesDict(channel = channel, loglevel = loglevel, **options)
+    return Can(driverClass(**driverParams), config = config, loglevel = loglevel)
+
+
 class ArgumentParser:
     """
 
@@ -139,6 +169,14 @@ class ArgumentParser:
         eth.add_argument('-6', '--ipv6', const = True, metavar = "ipv6", action = "store_const")
         eth.add_argument('-H', '--host', help = "Host name or IP.")
 
+        can.add_argument('-d', '--driver', choices = sorted(CAN_DRIVERS.keys()))
+        can.add_argument('-C', '--channel', help = "CAN interface, e.g. vcan0.")
+        can.add_argument('--fd', const = True, action = "store_const", help = "CAN FD frames (socketcan).")
+        can.add_argument('--batch-size', type = int, dest = "batchSize",
+            help = "Frames read per wake-up (socketcan).")
+        can.add_argument('--no-timestamps', const = False, dest = "timestamps", action = "store_const",
+            help = "No kernel receive timestamps (socketcan).")
+
         sxi.add_argument('-p', '--port', help = "Name or number of your serial interface.")
         sxi.add_argument('-b', '--baudrate', type = int)
         sxi.add_argument('--bytesize', type = int)
@@ -174,11 +212,19 @@ class ArgumentParser:
                 parity = args.parity,
                 stopbits = args.stopbits,
                 loglevel = args.loglevel)
-            klass = SxI
+            Klass = SxI
         elif transport == "can":
-            raise NotImplementedError("No CAN support for now.")
+            params = makeNonNullValuesDict(
+                driver = args.driver,
+                channel = args.channel,
+                fd = args.fd,
+                batchSize = args.batchSize,
+                timestamps = args.timestamps,
+                loglevel = args.loglevel)
         params = mergeParameters(transport, config, params)
         config = removeParameters(transport, config)
+        if transport == "can":
+            return Master(createCanTransport(config, **params))
         params.update(config = config)
         tr = Klass(**params)
         return Master(tr)
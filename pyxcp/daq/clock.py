@@ -0,0 +1,323 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Correlation of slave DAQ clock and host clock.
+
+The slave clock is sampled via GET_DAQ_CLOCK round trips, offset and
+drift are estimated by a least squares fit over a sliding window of
+samples.  The fit is used to convert (truncated, wrapping) DTO timestamps
+to host time, i.e. to the `pyxcp.timing.perf_counter_ns` domain used for
+receive timestamps.
+"""
+
+__copyright__ = """
+    pySART - Simplified AUTOSAR-Toolkit for Python.
+
+   (C) 2009-2019 by Christoph Schueler <cpu12.gems@googlemail.com>
+
+   All Rights Reserved
+
+  This program is free software; you can redistribute it and/or modify
+  it under the terms of the GNU General Public License as published by
+  the Free Software Foundation; either version 2 of the License, or
+  (at your option) any later version.
+
+  This program is distributed in the hope that it will be useful,
+  but WITHOUT ANY WARRANTY; without even the implied warranty of
+  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+  GNU General Public License for more details.
+
+  You should have received a copy of the GNU General Public License along
+  with this program; if not, write to the Free Software Foundation, Inc.,
+  51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+"""
+
+from collections import deque, namedtuple
+
+try:
+    import numpy as np
+except ImportError:
+    HAS_NUMPY = False
+else:
+    HAS_NUMPY = True
+
+from pyxcp.timing import perf_counter_ns
+
+
+TIMESTAMP_UNIT_EXPONENTS = {
+    "DAQ_TIMESTAMP_UNIT_1PS": -12,
+    "DAQ_TIMESTAMP_UNIT_10PS": -11,
+    "DAQ_TIMESTAMP_UNIT_100PS": -10,
+    "DAQ_TIMESTAMP_UNIT_1NS": -9,
+    "DAQ_TIMESTAMP_UNIT_10NS": -8,
+    "DAQ_TIMESTAMP_UNIT_100NS": -7,
+    "DAQ_TIMESTAMP_UNIT_1US": -6,
+    "DAQ_TIMESTAMP_UNIT_10US": -5,
+    "DAQ_TIMESTAMP_UNIT_100US": -4,
+    "DAQ_TIMESTAMP_UNIT_1MS": -3,
+    "DAQ_TIMESTAMP_UNIT_10MS": -2,
+    "DAQ_TIMESTAMP_UNIT_100MS": -1,
+    "DAQ_TIMESTAMP_UNIT_1S": 0,
+}
+
+TIMESTAMP_SIZES = {
+    "NO_TIME_STAMP": 0,
+    "S1": 1,
+    "S2": 2,
+    "S4": 4,
+}
+
+DAQ_CLOCK_SIZE = 4  # GET_DAQ_CLOCK always returns a DWORD.
+
+ClockSample = namedtuple("ClockSample", "host ticks rtt")
+
+
+def timestampProperties(resolutionInfo):
+    """Extract DTO timestamp properties.
+
+    Parameters
+    ----------
+    resolutionInfo : `pyxcp.types.GetDaqResolutionInfoResponse`
+
+    Returns
+    -------
+    tuple (int, float)
+        Timestamp size in bytes and duration of one tick in nanoseconds.
+    """
+    mode = resolutionInfo.timestampMode
+    size = TIMESTAMP_SIZES.get(str(mode.size), 0)
+    exponent = TIMESTAMP_UNIT_EXPONENTS[str(mode.unit)]
+    tickNs = (10.0 ** (exponent + 9)) * resolutionInfo.timestampTicks
+    return size, tickNs
+
+
+def unwrap(ticks, size):
+    """Unwrap a sequence of wrapping counter values.
+
+    Parameters
+    ----------
+    ticks : sequence of int
+        Raw counter values in chronological order.
+    size : int
+        Counter size in bytes.
+
+    Returns
+    -------
+    list of int (or `numpy.ndarray` if `ticks` is one)
+    """
+    modulus = 1 << (8 * size)
+    if HAS_NUMPY and isinstance(ticks, np.ndarray):
+        values = ticks.astype(np.int64)
+        wraps = np.concatenate(([0], np.cumsum(np.diff(values) < 0)))
+        return values + wraps * modulus
+    result = []
+    epoch = 0
+    previous = None
+    for value in ticks:
+        if previous is not None and value < previous:
+            epoch += modulus
+        result.append(value + epoch)
+        previous = value
+    return result
+
+
+class ClockSync:
+    """Estimate offset and drift of the slave DAQ clock.
+
+    host_ns = offset + slope * ticks
+
+    Parameters
+    ----------
+    master : `pyxcp.master.Master`
+        Connected master, used for GET_DAQ_CLOCK and GET_DAQ_RESOLUTION_INFO.
+        May be `None` if samples are supplied via `addSample`.
+    windowSize : int
+        Number of samples used for the fit.
+    interval : float
+        Sampling interval in seconds, s. `update`.
+    timestampSize : int
+        DTO timestamp size in bytes (queried from slave if `None`).
+    tickNs : float
+        Duration of a tick in nanoseconds (queried from slave if `None`).
+
+    Note
+    ----
+    The master is not thread-safe, so sampling is done from the caller's
+    thread: call `update` regularly, e.g. from your DAQ processing loop.
+    """
+
+    def __init__(self, master=None, windowSize=32, interval=1.0,
+                 timestampSize=None, tickNs=None):
+        self.master = master
+        self.windowSize = windowSize
+        self.interval = interval
+        if (timestampSize is None or tickNs is None) and master is not None:
+            size, ns = timestampProperties(master.getDaqResolutionInfo())
+            timestampSize = size if timestampSize is None else timestampSize
+            tickNs = ns if tickNs is None else tickNs
+        self.timestampSize = timestampSize or DAQ_CLOCK_SIZE
+        self.tickNs = tickNs or 1000.0
+        self.samples = deque(maxlen=windowSize)
+        self.offset = None
+        self.slope = None
+        self._nextSample = 0
+        self._clockModulus = 1 << (8 * DAQ_CLOCK_SIZE)
+        self._lastRaw = None
+        self._epoch = 0
+
+    def sample(self):
+        """Sample the slave clock by a GET_DAQ_CLOCK round trip.
+
+        Returns
+        -------
+        `ClockSample`
+        """
+        transport = self.master.transport
+        start = perf_counter_ns()
+        ticks = self.master.getDaqClock()
+        stop = transport.timestampResponse or perf_counter_ns()
+        if stop < start:
+            stop = perf_counter_ns()
+        # The slave sampled its clock somewhere within the round trip.
+        return self.addSample(start + (stop - start) // 2, ticks, stop - start)
+
+    def update(self):
+        """Sample if `interval` has elapsed since the last sample.
+
+        Returns
+        -------
+        bool
+            `True` if a sample was taken.
+        """
+        now = perf_counter_ns()
+        if now < self._nextSample:
+            return False
+        self._nextSample = now + int(self.interval * 1000000000)
+        self.sample()
+        return True
+
+    def addSample(self, host, ticks, rtt=0):
+        """Add a host/slave time pair and refit.
+
+        Parameters
+        ----------
+        host : int
+            Host time (`perf_counter_ns`).
+        ticks : int
+            Raw 32-bit DAQ clock value.
+        rtt : int
+            Round trip time in nanoseconds (used to reject outliers).
+        """
+        ticks = self._unwrapClock(host, ticks)
+        sample = ClockSample(host, ticks, rtt)
+        self.samples.append(sample)
+        self.fit()
+        return sample
+
+    def _unwrapClock(self, host, raw):
+        modulus = self._clockModulus
+        if self.slope is not None:
+            # Nearest value with matching lower bits.
+            predicted = int(round(self.hostToTicks(host)))
+            delta = (raw - predicted) % modulus
+            if delta >= modulus // 2:
+                delta -= modulus
+            return predicted + delta
+        if self._lastRaw is not None and raw < self._lastRaw:
+            self._epoch += modulus
+        self._lastRaw = raw
+        return raw + self._epoch
+
+    def fit(self):
+        """Least squares fit over the current window.
+
+        Samples with a round trip time above 1.5 times the median are
+        ignored, they are most likely disturbed by scheduling jitter.
+        """
+        samples = list(self.samples)
+        if len(samples) > 2:
+            rtts = sorted(s.rtt for s in samples)
+            limit = rtts[len(rtts) // 2] * 1.5
+            samples = [s for s in samples if s.rtt <= limit] or samples
+        if not samples:
+            return
+        if len(samples) == 1:
+            self.slope = self.tickNs
+            self.offset = samples[0].host - self.slope * samples[0].ticks
+            return
+        n = len(samples)
+        x0 = samples[0].ticks
+        y0 = samples[0].host
+        xs = [s.ticks - x0 for s in samples]
+        ys = [s.host - y0 for s in samples]
+        mx = sum(xs) / n
+        my = sum(ys) / n
+        sxx = sum((x - mx) ** 2 for x in xs)
+        if sxx == 0:
+            return
+        sxy = sum((x - mx) * (y - my) for x, y in zip(xs, ys))
+        self.slope = sxy / sxx
+        self.offset = (y0 + my) - self.slope * (x0 + mx)
+
+    @property
+    def synchronized(self):
+        return self.slope is not None
+
+    @property
+    def driftPpm(self):
+        """Deviation of the slave clock rate from nominal in ppm.
+        """
+        if self.slope is None:
+            return None
+        return (self.slope / self.tickNs - 1.0) * 1e6
+
+    def ticksToHost(self, ticks):
+        """Convert unwrapped slave ticks to host time (ns).
+        """
+        return self.offset + self.slope * ticks
+
+    def hostToTicks(self, host):
+        """Convert host time (ns) to unwrapped slave ticks.
+        """
+        return (host - self.offset) / self.slope
+
+    def convert(self, timestamps, receiveTimes):
+        """Bulk-convert DTO timestamps to host time.
+
+        Truncated timestamps are reconstructed using the receive time of
+        the packet: the full tick value is the latest one (not later than
+        the receive time, plus a small guard for estimation errors) whose
+        lower bits match. Transport latency must therefore stay below
+        15/16 of the timestamp wrap-around period.
+
+        Parameters
+        ----------
+        timestamps : sequence of int or `numpy.ndarray`
+            Raw DTO timestamps (`timestampSize` bytes).
+        receiveTimes : sequence of int or `numpy.ndarray`
+            Receive timestamps of the carrying packets (`perf_counter_ns`).
+
+        Returns
+        -------
+        list of float or `numpy.ndarray` (float64)
+            Sampling times in `perf_counter_ns` domain.
+        """
+        if self.slope is None:
+            raise RuntimeError("Clock not synchronized, take samples first.")
+        modulus = 1 << (8 * self.timestampSize)
+        guard = modulus // 16
+        offset = self.offset
+        slope = self.slope
+        if HAS_NUMPY and (isinstance(timestamps, np.ndarray) or
+                          isinstance(receiveTimes, np.ndarray)):
+            ts = np.asarray(timestamps, dtype=np.int64)
+            rx = np.asarray(receiveTimes, dtype=np.float64)
+            predicted = np.floor((rx - offset) / slope).astype(np.int64) + guard
+            full = predicted - np.mod(predicted - ts, modulus)
+            return offset + slope * full.astype(np.float64)
+        result = []
+        for ts, rx in zip(timestamps, receiveTimes):
+            predicted = int((rx - offset) // slope) + guard
+            full = predicted - ((predicted - ts) % modulus)
+            result.append(offset + slope * full)
+        return result
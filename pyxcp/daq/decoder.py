@@ -0,0 +1,379 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Decoding of DAQ DTOs into column batches.
+
+The ODTs of a DAQ list are concatenated (without identification fields)
+into one fixed-length sample record; the records of all complete samples
+are collected in a `bytearray` and exposed column-wise as
+`numpy.ndarray` views (a structured dtype with field offsets), i.e. the
+only per-frame Python work is appending the DTO payload::
+
+    decoder = DaqDecoder.fromMaster(xm)
+    decoder.addList(0, firstPid, [[("speed", "H"), ("rpm", A_Uint16("<"))], [("temp", "h")]])
+    with RecorderReader("run.xcprec") as reader:
+        for batch in decoder.batches(reader.frames()):
+            print(batch.daqList, batch.timestamps[-1], batch.columns["speed"].mean())
+
+Samples with missing or out-of-order ODTs are dropped (and counted).
+"""
+
+__copyright__ = """
+    pySART - Simplified AUTOSAR-Toolkit for Python.
+
+   (C) 2009-2019 by Christoph Schueler <cpu12.gems@googlemail.com>
+
+   All Rights Reserved
+
+  This program is free software; you can redistribute it and/or modify
+  it under the terms of the GNU General Public License as published by
+  the Free Software Foundation; either version 2 of the License, or
+  (at your option) any later version.
+
+  This program is distributed in the hope that it will be useful,
+  but WITHOUT ANY WARRANTY; without even the implied warranty of
+  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+  GNU General Public License for more details.
+
+  You should have received a copy of the GNU General Public License along
+  with this program; if not, write to the Free Software Foundation, Inc.,
+  51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+"""
+
+from array import array
+from collections import namedtuple
+import struct
+
+try:
+    import numpy as np
+except ImportError:
+    HAS_NUMPY = False
+else:
+    HAS_NUMPY = True
+
+from pyxcp.asam.types import AsamBaseType
+from pyxcp.daq.clock import timestampProperties
+import pyxcp.types as types
+
+# Size of the identification field (PID [+ DAQ list number]).
+IDENTIFICATION_SIZES = {
+    "IDF_ABS_ODT_NUMBER": 1,
+    "IDF_REL_ODT_NUMBER_ABS_DAQ_LIST_NUMBER_BYTE": 2,
+    "IDF_REL_ODT_NUMBER_ABS_DAQ_LIST_NUMBER_WORD": 3,
+    "IDF_REL_ODT_NUMBER_ABS_DAQ_LIST_NUMBER_WORD_ALIGNED": 4,
+}
+
+TIMESTAMP_FORMATS = {1: "B", 2: "H", 4: "I"}
+
+DEFAULT_BATCH_FRAMES = 65536
+
+Field = namedtuple("Field", "name offset codec conversion")    # offset in sample record
+RecordBatch = namedtuple("RecordBatch", "layout timestamps records")
+RecordBatch.__doc__ = """Complete samples of one DAQ list as `DaqListLayout.recordSize` byte records.
+"""
+ColumnBatch = namedtuple("ColumnBatch", "daqList timestamps slaveTimestamps columns")
+ColumnBatch.__doc__ = """Decoded samples of one DAQ list.
+
+timestamps : int64 receive timestamps (`perf_counter_ns`) of ODT 0.
+slaveTimestamps : DTO timestamps (ticks) or None.
+columns : dict name -> values.
+Arrays are `numpy.ndarray` (`array.array` resp. lists without numpy).
+"""
+
+
+def structOf(codec, byteOrder="<"):
+    """`struct.Struct` from a struct format or `pyxcp.asam.types` codec.
+
+    Formats without byte order character get `byteOrder`.
+    """
+    if isinstance(codec, AsamBaseType):
+        return codec._struct
+    if isinstance(codec, struct.Struct):
+        return codec
+    if codec[0] not in "<>!=@":
+        codec = byteOrder + codec
+    return struct.Struct(codec)
+
+
+class DaqListLayout(object):
+    """Sample record of a DAQ list.
+
+    Parameters
+    ----------
+    daqList : int
+    firstPid : int
+    odts : sequence of sequences of (name, codec[, conversion])
+        Entries of every ODT in order, `codec` as in `structOf`,
+        `conversion` a `pyxcp.asam.compumethod.CompuMethod`.
+    timestampSize : int
+        Size of the DTO timestamp in ODT 0 (0 = none).
+    byteOrder : char
+    """
+
+    def __init__(self, daqList, firstPid, odts, timestampSize=0, byteOrder="<"):
+        self.daqList = daqList
+        self.firstPid = firstPid
+        self.timestampSize = timestampSize
+        self.byteOrder = byteOrder
+        self.fields = []
+        self.odtSizes = []
+        offset = timestampSize
+        for number, entries in enumerate(odts):
+            size = timestampSize if number == 0 else 0
+            for entry in entries:
+                name, codec = entry[:2]
+                codec = structOf(codec, byteOrder)
+                self.fields.append(Field(name, offset, codec, entry[2] if len(entry) > 2 else None))
+                offset += codec.size
+                size += codec.size
+            self.odtSizes.append(size)
+        self.recordSize = offset
+        names = [f.name for f in self.fields]
+        if len(set(names)) != len(names):
+            raise ValueError("Duplicate signal names in DAQ list {}.".format(daqList))
+
+    def __len__(self):
+        return len(self.odtSizes)
+
+    @property
+    def dtype(self):
+        """Structured `numpy.dtype` of the sample record (signals only).
+        """
+        return np.dtype({
+            "names": [f.name for f in self.fields],
+            "formats": [np.dtype(f.codec.format) for f in self.fields],
+            "offsets": [f.offset for f in self.fields],
+            "itemsize": self.recordSize,
+        })
+
+    @property
+    def timestampDtype(self):
+        """Structured `numpy.dtype` of the DTO timestamp in the sample record.
+        """
+        return np.dtype({
+            "names": ["timestamp"],
+            "formats": [np.dtype(self.byteOrder + TIMESTAMP_FORMATS[self.timestampSize])],
+            "offsets": [0],
+            "itemsize": self.recordSize,
+        })
+
+    @property
+    def recordFormat(self):
+        """struct format of the sample record (without numpy).
+        """
+        fmt = [self.byteOrder]
+        if self.timestampSize:
+            fmt.append(TIMESTAMP_FORMATS[self.timestampSize])
+        fmt.extend(f.codec.format.lstrip("<>!=@") for f in self.fields)
+        return "".join(fmt)
+
+
+class _ListState(object):
+
+    def __init__(self, layout):
+        self.layout = layout
+        self.odts = len(layout)
+        self.records = bytearray()
+        self.timestamps = array("q")
+        self.sample = bytearray()
+        self.sampleTimestamp = 0
+        self.expected = -1
+        self.samples = 0
+        self.dropped = 0
+
+
+class DaqDecoder(object):
+    """Decode DTOs of several DAQ lists.
+
+    Parameters
+    ----------
+    idSize : int
+        Size of the identification field, s. `IDENTIFICATION_SIZES`.
+    timestampSize : int
+        DTO timestamp size, used for lists added with `timestamp=True`.
+    byteOrder : char
+        Byte order of the slave ('<' or '>').
+    """
+
+    def __init__(self, idSize=1, timestampSize=0, byteOrder="<"):
+        if idSize not in (1, 2, 3, 4):
+            raise ValueError("Invalid identification field size {}.".format(idSize))
+        self.idSize = idSize
+        self.timestampSize = timestampSize
+        self.byteOrder = byteOrder
+        self.layouts = {}
+        self._states = {}
+        self._byPid = [None] * 256
+        self._listNumber = struct.Struct("{}H".format(byteOrder))
+        self.unknownFrames = 0
+
+    @classmethod
+    def fromMaster(cls, master):
+        """Decoder for the DAQ processor of a connected slave.
+        """
+        info = master.getDaqProcessorInfo()
+        idSize = IDENTIFICATION_SIZES[str(info.daqKeyByte.Identification_Field)]
+        timestampSize, _ = timestampProperties(master.getDaqResolutionInfo())
+        byteOrder = "<" if master.slaveProperties.byteOrder == types.ByteOrder.INTEL else ">"
+        return cls(idSize, timestampSize, byteOrder)
+
+    def addList(self, daqList, firstPid, odts, timestamp=False):
+        """Describe a DAQ list, s. `DaqListLayout`.
+
+        Returns
+        -------
+        `DaqListLayout`
+        """
+        layout = DaqListLayout(daqList, firstPid, odts, self.timestampSize if timestamp else 0, self.byteOrder)
+        state = _ListState(layout)
+        self.layouts[daqList] = layout
+        self._states[daqList] = state
+        if self.idSize == 1:
+            for number in range(len(layout)):
+                self._byPid[firstPid + number] = (state, number)
+        return layout
+
+    def add(self, payload, timestamp):
+        """Decode a single DTO.
+
+        Parameters
+        ----------
+        payload : bytes-like
+            DTO (PID + data).
+        timestamp : int
+            Receive timestamp (`perf_counter_ns`).
+        """
+        idSize = self.idSize
+        if idSize == 1:
+            entry = self._byPid[payload[0]]
+            if entry is None:
+                self.unknownFrames += 1
+                return
+            state, odt = entry
+        else:
+            odt = payload[0]
+            if idSize == 2:
+                daqList = payload[1]
+            else:
+                daqList = self._listNumber.unpack_from(payload, idSize - 2)[0]
+            state = self._states.get(daqList)
+            if state is None or odt >= state.odts:
+                self.unknownFrames += 1
+                return
+        if odt == 0:
+            if state.expected > 0:
+                state.dropped += 1      # Previous sample incomplete.
+            state.sample[:] = payload[idSize:]
+            state.sampleTimestamp = timestamp
+            state.expected = 1
+        elif odt == state.expected:
+            state.sample.extend(payload[idSize:])
+            state.expected += 1
+        else:
+            if state.expected > 0:
+                state.dropped += 1
+            state.expected = -1
+            return
+        if state.expected == state.odts:
+            if len(state.sample) >= state.layout.recordSize:
+                state.records.extend(state.sample[:state.layout.recordSize])
+                state.timestamps.append(state.sampleTimestamp)
+                state.samples += 1
+            else:
+                state.dropped += 1
+            state.expected = -1
+
+    def addFrames(self, frames):
+        """Decode `pyxcp.daq.recorder.Frame`s (timestamp, counter, payload).
+        """
+        add = self.add
+        for timestamp, _, payload in frames:
+            add(payload, timestamp)
+
+    def addPackets(self, packets):
+        """Decode packets as queued by the transport-layer.
+
+        Parameters
+        ----------
+        packets : iterable of (response, counter, length, timestamp)
+        """
+        add = self.add
+        for response, _, _, timestamp in packets:
+            add(response, timestamp)
+
+    def flushRecords(self):
+        """Raw sample records decoded so far (no column split, no conversion).
+
+        Returns
+        -------
+        list of `RecordBatch`
+            Lists without new samples are omitted.
+        """
+        result = []
+        for daqList, state in sorted(self._states.items()):
+            if not state.timestamps:
+                continue
+            result.append(RecordBatch(state.layout, state.timestamps, bytes(state.records)))
+            state.records = bytearray()
+            state.timestamps = array("q")
+        return result
+
+    def flush(self):
+        """Column batches of the samples decoded so far.
+
+        Returns
+        -------
+        list of `ColumnBatch`
+            Lists without new samples are omitted.
+        """
+        return [self._columns(*batch) for batch in self.flushRecords()]
+
+    def batches(self, frames, batchFrames=DEFAULT_BATCH_FRAMES):
+        """Decode a stream of frames, yielding `ColumnBatch`es every `batchFrames` frames.
+
+        Parameters
+        ----------
+        frames : iterable of `pyxcp.daq.recorder.Frame`
+        """
+        add = self.add
+        count = 0
+        for timestamp, _, payload in frames:
+            add(payload, timestamp)
+            count += 1
+            if count == batchFrames:
+                count = 0
+                for batch in self.flush():
+                    yield batch
+        for batch in self.flush():
+            yield batch
+
+    def _columns(self, layout, timestamps, records):
+        if HAS_NUMPY:
+            table = np.frombuffer(records, dtype=layout.dtype)
+            columns = {f.name: table[f.name] for f in layout.fields}
+            if layout.timestampSize:
+                slaveTimestamps = np.frombuffer(records, dtype=layout.timestampDtype)["timestamp"]
+            else:
+                slaveTimestamps = None
+            timestamps = np.frombuffer(timestamps, dtype=np.int64)
+        else:
+            rows = list(zip(*struct.iter_unpack(layout.recordFormat, records)))
+            if layout.timestampSize:
+                slaveTimestamps, rows = list(rows[0]), rows[1:]
+            else:
+                slaveTimestamps = None
+            columns = {f.name: list(values) for f, values in zip(layout.fields, rows)}
+        for field in layout.fields:
+            if field.conversion is not None:
+                columns[field.name] = field.conversion.physical(columns[field.name])
+        return ColumnBatch(layout.daqList, timestamps, slaveTimestamps, columns)
+
+    def statistics(self):
+        """Decoded and dropped samples.
+
+        Returns
+        -------
+        dict
+            DAQ list -> (samples, dropped)
+        """
+        return {daqList: (state.samples, state.dropped) for daqList, state in self._states.items()}
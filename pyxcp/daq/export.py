@@ -0,0 +1,289 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Columnar export of decoded DAQ data.
+
+Exporters consume `pyxcp.daq.decoder.ColumnBatch`es and append them chunk
+by chunk, so a recording is converted without ever being materialized::
+
+    decoder = DaqDecoder(idSize=1)
+    decoder.addList(0, 0, odts)
+    with RecorderReader("run.xcprec") as reader:
+        with ParquetExporter("run.parquet", columnCompression={"speed": "snappy"},
+                timestampOrigin=reader.timestampOrigin) as exporter:
+            exportRecording(reader, decoder, exporter)
+
+Every DAQ list has its own time base: `ArrowExporter` resp.
+`ParquetExporter` write one file per DAQ list (``run_daq0.parquet``, ...),
+`HDF5Exporter` one group per DAQ list (``/daq0``). The time index is the
+column/dataset ``timestamp`` (receive time in ns, since the epoch if
+`timestampOrigin` is given).
+
+Requires `pyarrow` resp. `h5py`.
+"""
+
+__copyright__ = """
+    pySART - Simplified AUTOSAR-Toolkit for Python.
+
+   (C) 2009-2019 by Christoph Schueler <cpu12.gems@googlemail.com>
+
+   All Rights Reserved
+
+  This program is free software; you can redistribute it and/or modify
+  it under the terms of the GNU General Public License as published by
+  the Free Software Foundation; either version 2 of the License, or
+  (at your option) any later version.
+
+  This program is distributed in the hope that it will be useful,
+  but WITHOUT ANY WARRANTY; without even the implied warranty of
+  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+  GNU General Public License for more details.
+
+  You should have received a copy of the GNU General Public License along
+  with this program; if not, write to the Free Software Foundation, Inc.,
+  51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+"""
+
+import abc
+import os
+
+try:
+    import numpy as np
+except ImportError:
+    HAS_NUMPY = False
+else:
+    HAS_NUMPY = True
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    HAS_PYARROW = False
+else:
+    HAS_PYARROW = True
+
+try:
+    import h5py
+except ImportError:
+    HAS_H5PY = False
+else:
+    HAS_H5PY = True
+
+from pyxcp.daq.decoder import DEFAULT_BATCH_FRAMES
+
+TIME_INDEX = "timestamp"
+DEFAULT_CHUNK_ROWS = 65536
+
+
+def listFilename(filename, daqList):
+    """Name of the file of a DAQ list, e.g. "run.parquet" -> "run_daq0.parquet".
+    """
+    root, ext = os.path.splitext(filename)
+    return "{}_daq{}{}".format(root, daqList, ext)
+
+
+def exportRecording(reader, decoder, exporter, batchFrames=DEFAULT_BATCH_FRAMES):
+    """Decode a recording and pass the batches to an exporter.
+
+    Parameters
+    ----------
+    reader : `pyxcp.daq.recorder.RecorderReader`
+    decoder : `pyxcp.daq.decoder.DaqDecoder`
+        DAQ lists already added.
+    exporter : `Exporter`
+    batchFrames : int
+        Frames per batch, bounds the memory used.
+
+    Returns
+    -------
+    dict
+        s. `pyxcp.daq.decoder.DaqDecoder.statistics`.
+    """
+    for batch in decoder.batches(reader.frames(), batchFrames):
+        exporter.write(batch)
+    return decoder.statistics()
+
+
+class Exporter(metaclass=abc.ABCMeta):
+    """Base class of exporters.
+
+    Parameters
+    ----------
+    timestampOrigin : tuple (float, int)
+        (wall clock, `perf_counter_ns`), converts the time index to ns
+        since the epoch; raw receive timestamps if None.
+    columnCompression : dict
+        Column name -> compression, overrides the default compression.
+    """
+
+    def __init__(self, timestampOrigin=None, columnCompression=None):
+        if not HAS_NUMPY:
+            raise RuntimeError("Export requires NumPy.")
+        self.timestampOrigin = timestampOrigin
+        self.columnCompression = columnCompression or {}
+        self.rows = {}      # DAQ list -> rows written
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def timeIndex(self, batch):
+        timestamps = np.asarray(batch.timestamps, dtype=np.int64)
+        if self.timestampOrigin is None:
+            return timestamps
+        wall, perf = self.timestampOrigin
+        return timestamps + (int(wall * 1000000000) - perf)
+
+    def write(self, batch):
+        """Append a `pyxcp.daq.decoder.ColumnBatch`.
+        """
+        self._write(batch)
+        self.rows[batch.daqList] = self.rows.get(batch.daqList, 0) + len(batch.timestamps)
+
+    @abc.abstractmethod
+    def _write(self, batch):
+        pass
+
+    def close(self):
+        pass
+
+
+def _native(values):
+    """Column as contiguous array in native byte order (what the libraries expect).
+    """
+    values = np.asarray(values)
+    if values.dtype.kind != "O" and not values.dtype.isnative:
+        values = values.astype(values.dtype.newbyteorder("="))
+    return np.ascontiguousarray(values)
+
+
+class ArrowExporter(Exporter):
+    """Write Arrow IPC files, one per DAQ list.
+
+    Parameters
+    ----------
+    filename : str
+        s. `listFilename`.
+    compression : str
+        IPC buffer compression ("lz4", "zstd" or None); Arrow IPC
+        compresses whole record batches, so `columnCompression` is
+        not supported.
+    """
+
+    def __init__(self, filename, compression=None, timestampOrigin=None):
+        if not HAS_PYARROW:
+            raise RuntimeError("Arrow export requires pyarrow.")
+        super(ArrowExporter, self).__init__(timestampOrigin)
+        self.filename = filename
+        self.compression = compression
+        self._writers = {}
+
+    def _table(self, batch):
+        arrays = [pa.array(self.timeIndex(batch),
+                           type=pa.timestamp("ns") if self.timestampOrigin else pa.int64())]
+        names = [TIME_INDEX]
+        for name, values in batch.columns.items():
+            arrays.append(pa.array(_native(values)))
+            names.append(name)
+        return pa.Table.from_arrays(arrays, names=names)
+
+    def _write(self, batch):
+        table = self._table(batch)
+        writer = self._writers.get(batch.daqList)
+        if writer is None:
+            writer = self._writers[batch.daqList] = self._open(listFilename(self.filename, batch.daqList), table.schema)
+        writer.write_table(table)
+
+    def _open(self, filename, schema):
+        options = pa.ipc.IpcWriteOptions(compression=self.compression)
+        return pa.ipc.new_file(filename, schema, options=options)
+
+    def close(self):
+        for writer in self._writers.values():
+            writer.close()
+        self._writers = {}
+
+
+class ParquetExporter(ArrowExporter):
+    """Write Parquet files, one per DAQ list (a row group per batch).
+
+    Parameters
+    ----------
+    filename : str
+        s. `listFilename`.
+    compression : str
+        Default codec, e.g. "snappy", "zstd", "gzip" or "none".
+    columnCompression : dict
+        Column name -> codec.
+    """
+
+    def __init__(self, filename, compression="snappy", columnCompression=None, timestampOrigin=None):
+        super(ParquetExporter, self).__init__(filename, compression, timestampOrigin)
+        self.columnCompression = columnCompression or {}
+
+    def _open(self, filename, schema):
+        compression = {name: self.columnCompression.get(name, self.compression) for name in schema.names}
+        return pq.ParquetWriter(filename, schema, compression=compression)
+
+
+class HDF5Exporter(Exporter):
+    """Write an HDF5 file, a group per DAQ list with a resizable dataset per column.
+
+    Parameters
+    ----------
+    filename : str
+    compression : str
+        Default filter, e.g. "gzip", "lzf" or None.
+    compressionOpts :
+        Options of the default filter (e.g. gzip level).
+    columnCompression : dict
+        Column name -> filter or (filter, options).
+    chunkRows : int
+        HDF5 chunk size in rows.
+    """
+
+    def __init__(self, filename, compression="gzip", compressionOpts=None, columnCompression=None,
+                 chunkRows=DEFAULT_CHUNK_ROWS, timestampOrigin=None):
+        if not HAS_H5PY:
+            raise RuntimeError("HDF5 export requires h5py.")
+        super(HDF5Exporter, self).__init__(timestampOrigin, columnCompression)
+        self.filename = filename
+        self.compression = compression
+        self.compressionOpts = compressionOpts
+        self.chunkRows = chunkRows
+        self._file = h5py.File(filename, "w")
+
+    def _dataset(self, group, name, values):
+        dataset = group.get(name)
+        if dataset is not None:
+            return dataset
+        compression = self.columnCompression.get(name, (self.compression, self.compressionOpts))
+        if not isinstance(compression, tuple):
+            compression = (compression, None)
+        dtype = h5py.string_dtype() if values.dtype.kind == "O" else values.dtype
+        return group.create_dataset(
+            name, shape=(0, ), maxshape=(None, ), dtype=dtype, chunks=(self.chunkRows, ),
+            compression=compression[0], compression_opts=compression[1])
+
+    def _write(self, batch):
+        groupName = "daq{}".format(batch.daqList)
+        group = self._file.get(groupName)
+        if group is None:
+            group = self._file.create_group(groupName)
+            group.attrs["daqList"] = batch.daqList
+            if self.timestampOrigin is not None:
+                group.attrs["timestampOrigin"] = self.timestampOrigin
+        columns = [(TIME_INDEX, self.timeIndex(batch))]
+        columns.extend((name, _native(values)) for name, values in batch.columns.items())
+        for name, values in columns:
+            dataset = self._dataset(group, name, values)
+            start = dataset.shape[0]
+            dataset.resize((start + len(values), ))
+            dataset[start:] = values
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
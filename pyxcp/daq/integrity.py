@@ -0,0 +1,351 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Integrity checking of DAQ streams.
+
+`IntegrityChecker` follows, in O(1) per frame,
+
+- the transport-layer counter (CTR of the XCP on Ethernet/SxI header),
+- the ODT order of every DAQ list and
+- optionally the DTO CTR of XCP 1.3 (a sample counter of the event
+  channel, following the identification field of ODT 0, s.
+  `pyxcp.master.Master.dtoCtrProperties`),
+
+and counts gaps, duplicates and reorders; the time windows affected by
+losses are kept as `LossEvent`s::
+
+    checker = IntegrityChecker.fromDecoder(decoder)
+    with Recorder(xm.transport, "run.xcprec", checker=checker):
+        ...
+    if not checker.complete:
+        print(checker.statistics(), list(checker.events))
+
+The slave increments the transport-layer counter for responses and events
+too; these never reach the DAQ queue, so the counter is only checked if
+the checker is attached to the transport-layer (`attach`, done by
+`pyxcp.daq.recorder.Recorder`), which reports the counters of all other
+packets. CAN has no transport-layer counter.
+"""
+
+__copyright__ = """
+    pySART - Simplified AUTOSAR-Toolkit for Python.
+
+   (C) 2009-2019 by Christoph Schueler <cpu12.gems@googlemail.com>
+
+   All Rights Reserved
+
+  This program is free software; you can redistribute it and/or modify
+  it under the terms of the GNU General Public License as published by
+  the Free Software Foundation; either version 2 of the License, or
+  (at your option) any later version.
+
+  This program is distributed in the hope that it will be useful,
+  but WITHOUT ANY WARRANTY; without even the implied warranty of
+  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+  GNU General Public License for more details.
+
+  You should have received a copy of the GNU General Public License along
+  with this program; if not, write to the Free Software Foundation, Inc.,
+  51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+"""
+
+from collections import deque, namedtuple
+import struct
+
+TRANSPORT_COUNTER_MODULUS = 0x10000
+DTO_CTR_MODULUS = 0x100
+MAX_EVENTS = 1000
+MAX_SKIPPED = 0x1000
+
+# Kinds of `LossEvent`s.
+TRANSPORT_GAP = "TRANSPORT_GAP"
+ODT_GAP = "ODT_GAP"
+SAMPLE_GAP = "SAMPLE_GAP"
+
+LossEvent = namedtuple("LossEvent", "kind daqList start end count")
+LossEvent.__doc__ = """Frames lost between receive timestamps `start` and `end`.
+
+daqList is None for `TRANSPORT_GAP`s; count is the number of missing
+packets, ODTs resp. samples.
+"""
+TransportStatistics = namedtuple("TransportStatistics", "packets missing duplicates reorders lossRate")
+ListStatistics = namedtuple("ListStatistics",
+    "odts samples missingOdts duplicates reorders lostSamples lossRate")
+
+
+def dtoCtrPresent(master, eventChannel):
+    """Query (without changing anything) if DTOs of `eventChannel` carry a DTO CTR.
+
+    Parameters
+    ----------
+    master : `pyxcp.master.Master`
+    eventChannel : int
+    """
+    response = master.dtoCtrProperties(0, eventChannel, 0, 0)
+    return bool(response.properties.evtCtrPresent)
+
+
+class _ListState(object):
+
+    def __init__(self, daqList, odtCount, dtoCtr):
+        self.daqList = daqList
+        self.odtCount = odtCount
+        self.dtoCtr = dtoCtr
+        self.lastOdt = odtCount - 1
+        self.lastCtr = None
+        self.lastTimestamp = None
+        self.odts = 0
+        self.samples = 0
+        self.missingOdts = 0
+        self.duplicates = 0
+        self.reorders = 0
+        self.lostSamples = 0
+        self.pending = 0    # Bit mask of ODTs missing from the current sample.
+
+
+class IntegrityChecker(object):
+    """Streaming check of counters and ODT sequences.
+
+    Parameters
+    ----------
+    idSize : int
+        Size of the identification field, s.
+        `pyxcp.daq.decoder.IDENTIFICATION_SIZES`.
+    transportCounter : bool
+        Check the transport-layer counter; None: only when attached to a
+        transport-layer with counter (not CAN), s. `attach`.
+    byteOrder : char
+        Byte order of the slave (DAQ list numbers of 3/4 byte identification
+        fields).
+    maxEvents : int
+        Number of `LossEvent`s kept (the latest).
+    """
+
+    def __init__(self, idSize=1, transportCounter=None, byteOrder="<", maxEvents=MAX_EVENTS):
+        self.idSize = idSize
+        self.transportCounter = bool(transportCounter)
+        self._autoCounter = transportCounter is None
+        self._skipped = deque(maxlen=MAX_SKIPPED)   # Counters of non-DAQ packets.
+        self.events = deque(maxlen=maxEvents)
+        self._states = {}
+        self._byPid = [None] * 256
+        self._listNumber = struct.Struct("{}H".format(byteOrder))
+        self._lastCounter = None
+        self._lastTimestamp = None
+        self.packets = 0
+        self.missing = 0
+        self.duplicates = 0
+        self.reorders = 0
+        self.unknownFrames = 0
+
+    @classmethod
+    def fromDecoder(cls, decoder, transportCounter=None, dtoCtr=()):
+        """Checker for the DAQ lists of a `pyxcp.daq.decoder.DaqDecoder`.
+
+        Parameters
+        ----------
+        dtoCtr : iterable of int
+            DAQ lists with DTO CTR.
+        """
+        checker = cls(decoder.idSize, transportCounter, decoder.byteOrder)
+        dtoCtr = set(dtoCtr)
+        for daqList, layout in sorted(decoder.layouts.items()):
+            checker.addList(daqList, layout.firstPid, len(layout), daqList in dtoCtr)
+        return checker
+
+    def attach(self, transport):
+        """Follow the counters of the non-DAQ packets of `transport`.
+
+        Enables the transport-layer counter check if `transportCounter` was
+        None and `transport` has a counter.
+        """
+        if self._autoCounter:
+            self.transportCounter = transport.HAS_COUNTER
+        if self.transportCounter:
+            transport.counterObserver = self._skipped.append
+
+    def detach(self, transport):
+        if transport.counterObserver == self._skipped.append:
+            transport.counterObserver = None
+
+    def addList(self, daqList, firstPid, odtCount, dtoCtr=False):
+        """Check DAQ list `daqList` with ODTs `firstPid` ... `firstPid + odtCount - 1`.
+        """
+        state = _ListState(daqList, odtCount, dtoCtr)
+        self._states[daqList] = state
+        if self.idSize == 1:
+            for number in range(odtCount):
+                self._byPid[firstPid + number] = (state, number)
+
+    def add(self, payload, counter, timestamp):
+        """Check a single DTO.
+
+        Parameters
+        ----------
+        payload : bytes-like
+            DTO (PID + data).
+        counter : int
+            Transport-layer counter.
+        timestamp : int
+            Receive timestamp (`perf_counter_ns`).
+        """
+        self.packets += 1
+        if self.transportCounter:
+            self._checkCounter(counter, timestamp)
+        idSize = self.idSize
+        if idSize == 1:
+            entry = self._byPid[payload[0]]
+            if entry is None:
+                self.unknownFrames += 1
+                return
+            state, odt = entry
+        else:
+            odt = payload[0]
+            daqList = payload[1] if idSize == 2 else self._listNumber.unpack_from(payload, idSize - 2)[0]
+            state = self._states.get(daqList)
+            if state is None or odt >= state.odtCount:
+                self.unknownFrames += 1
+                return
+        state.odts += 1
+        expected = (state.lastOdt + 1) % state.odtCount
+        if odt != expected:
+            if odt == state.lastOdt:
+                state.duplicates += 1
+                return
+            if state.pending >> odt & 1:
+                state.pending &= ~(1 << odt)
+                state.reorders += 1     # Late ODT of this sample, was counted as missing.
+                state.missingOdts -= 1
+                return
+            # ODTs missing (at the end of the previous sample resp. within this one).
+            count = (odt - expected) % state.odtCount
+            state.missingOdts += count
+            self.events.append(LossEvent(ODT_GAP, state.daqList, state.lastTimestamp, timestamp, count))
+            if expected and odt > expected:
+                state.pending |= ((1 << odt) - 1) & ~((1 << expected) - 1)
+            else:
+                state.pending = (1 << odt) - 1      # New sample, ODTs before `odt` lost.
+        elif odt == 0:
+            state.pending = 0
+        if odt == 0:
+            state.samples += 1
+            if state.dtoCtr:
+                self._checkDtoCtr(state, payload[idSize], timestamp)
+        state.lastOdt = odt
+        state.lastTimestamp = timestamp
+
+    def _checkCounter(self, counter, timestamp):
+        last = self._lastCounter
+        if last is not None:
+            delta = (counter - last) % TRANSPORT_COUNTER_MODULUS
+            if delta == 0:
+                self.duplicates += 1
+                return
+            if delta > TRANSPORT_COUNTER_MODULUS // 2:
+                self.reorders += 1  # Late packet, was counted as missing.
+                if self.missing:
+                    self.missing -= 1
+                return
+            if delta > 1:
+                count = delta - 1 - self._skip(last, delta)
+                if count:
+                    self.missing += count
+                    self.events.append(LossEvent(TRANSPORT_GAP, None, self._lastTimestamp, timestamp, count))
+        self._lastCounter = counter
+        self._lastTimestamp = timestamp
+
+    def _skip(self, last, delta):
+        """Number of non-DAQ packets between counters `last` and `last + delta`.
+        """
+        skipped = 0
+        pending = self._skipped
+        while pending:
+            offset = (pending[0] - last) % TRANSPORT_COUNTER_MODULUS
+            if delta <= offset <= TRANSPORT_COUNTER_MODULUS // 2:
+                break   # Follows the current packet.
+            pending.popleft()
+            if 0 < offset < delta:
+                skipped += 1
+        return skipped
+
+    def _checkDtoCtr(self, state, ctr, timestamp):
+        last = state.lastCtr
+        if last is not None:
+            delta = (ctr - last) % DTO_CTR_MODULUS
+            if delta == 0:
+                state.duplicates += 1
+                return
+            if delta > DTO_CTR_MODULUS // 2:
+                state.reorders += 1
+                if state.lostSamples:
+                    state.lostSamples -= 1
+                return
+            if delta > 1:
+                state.lostSamples += delta - 1
+                self.events.append(LossEvent(SAMPLE_GAP, state.daqList, state.lastTimestamp, timestamp, delta - 1))
+        state.lastCtr = ctr
+
+    def addFrames(self, frames):
+        """Check `pyxcp.daq.recorder.Frame`s (timestamp, counter, payload).
+        """
+        add = self.add
+        for timestamp, counter, payload in frames:
+            add(payload, counter, timestamp)
+
+    def addPackets(self, packets):
+        """Check packets as queued by the transport-layer.
+
+        Parameters
+        ----------
+        packets : iterable of (response, counter, length, timestamp)
+        """
+        add = self.add
+        for response, counter, _, timestamp in packets:
+            add(response, counter, timestamp)
+
+    @property
+    def complete(self):
+        """True if no losses, duplicates or reorders were detected so far.
+        """
+        if self.missing or self.duplicates or self.reorders:
+            return False
+        return not any(s.missingOdts or s.duplicates or s.reorders or s.lostSamples
+                       for s in self._states.values())
+
+    def statistics(self):
+        """Loss statistics.
+
+        Returns
+        -------
+        tuple (`TransportStatistics`, dict)
+            Transport-layer statistics and DAQ list -> `ListStatistics`;
+            loss rates are lost / (received + lost).
+        """
+        transport = TransportStatistics(
+            self.packets, self.missing, self.duplicates, self.reorders,
+            _rate(self.missing, self.packets))
+        lists = {}
+        for daqList, s in sorted(self._states.items()):
+            if s.dtoCtr:
+                lossRate = _rate(s.lostSamples, s.samples)
+            else:
+                lossRate = _rate(s.missingOdts, s.odts)
+            lists[daqList] = ListStatistics(
+                s.odts, s.samples, s.missingOdts, s.duplicates, s.reorders, s.lostSamples, lossRate)
+        return transport, lists
+
+
+def _rate(lost, received):
+    total = lost + received
+    return lost / total if total else 0.0
+
+
+def checkRecording(reader, checker):
+    """Check a `pyxcp.daq.recorder.RecorderReader` recording.
+
+    Returns
+    -------
+    `IntegrityChecker`
+    """
+    checker.addFrames(reader.frames())
+    return checker
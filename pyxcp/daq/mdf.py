@@ -0,0 +1,329 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""ASAM MDF 4.1 writer for DAQ data.
+
+Every DAQ list becomes a data group with a single channel group. A record
+consists of the receive time (INT64 ns, master channel "time") followed
+by the sample record of `pyxcp.daq.decoder.DaqListLayout`, i.e. the
+concatenated ODT payloads as sent by the slave; records are written
+without touching the individual signals::
+
+    decoder = DaqDecoder.fromMaster(xm)
+    decoder.addList(0, firstPid, odts)
+    with MdfWriter("run.mf4", decoder, catalogue) as mdf:
+        mdf.addPackets(packets)         # or addFrames(reader.frames())
+
+Records are appended as DT blocks while recording; the metadata (DG, CG,
+CN, CC, ... blocks) is written by `close`. Until then the file is marked
+as unfinalized.
+
+Conversions (LINEAR, RAT_FUNC, TAB_INTP, TAB_NOINTP, TAB_VERB) and units
+are taken from the decoder fields, limits from the A2L catalogue.
+"""
+
+__copyright__ = """
+    pySART - Simplified AUTOSAR-Toolkit for Python.
+
+   (C) 2009-2019 by Christoph Schueler <cpu12.gems@googlemail.com>
+
+   All Rights Reserved
+
+  This program is free software; you can redistribute it and/or modify
+  it under the terms of the GNU General Public License as published by
+  the Free Software Foundation; either version 2 of the License, or
+  (at your option) any later version.
+
+  This program is distributed in the hope that it will be useful,
+  but WITHOUT ANY WARRANTY; without even the implied warranty of
+  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+  GNU General Public License for more details.
+
+  You should have received a copy of the GNU General Public License along
+  with this program; if not, write to the Free Software Foundation, Inc.,
+  51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+"""
+
+import struct
+import time
+from xml.sax.saxutils import escape
+
+try:
+    import numpy as np
+except ImportError:
+    HAS_NUMPY = False
+else:
+    HAS_NUMPY = True
+
+from pyxcp.asam.compumethod import Linear, RatFunc, TabIntp, TabNoIntp, TabVerb
+from pyxcp.daq.decoder import DEFAULT_BATCH_FRAMES, TIMESTAMP_FORMATS
+from pyxcp.timing import perf_counter_ns
+from pyxcp import __version__
+
+ID_BLOCK = struct.Struct("<8s8s8s4xH30xHH")
+BLOCK_HEADER = struct.Struct("<4s4xQQ")     # id, length, link count
+HD_DATA = struct.Struct("<QhhBBBxdd")
+FH_DATA = struct.Struct("<QhhB3x")
+DG_DATA = struct.Struct("<B7x")
+CG_DATA = struct.Struct("<QQHH4xII")
+CN_DATA = struct.Struct("<BBBBIIIIBBHdddddd")
+CC_HEADER = struct.Struct("<BBHHHdd")
+DL_HEADER = struct.Struct("<B3xI")
+
+FINALIZED = b"MDF     "
+UNFINALIZED = b"UnFinMF "
+MDF_VERSION = 410
+HD_OFFSET = ID_BLOCK.size
+HD_LINKS = 6
+
+TIME_SIZE = 8
+
+# Channel types / sync types / data types.
+CN_FIXED_LENGTH = 0
+CN_MASTER = 2
+SYNC_NONE = 0
+SYNC_TIME = 1
+DATA_TYPES = {      # struct format char -> (little-endian, big-endian)
+    "B": (0, 1), "H": (0, 1), "I": (0, 1), "L": (0, 1), "Q": (0, 1),
+    "b": (2, 3), "h": (2, 3), "i": (2, 3), "l": (2, 3), "q": (2, 3),
+    "f": (4, 5), "d": (4, 5),
+}
+CN_LIMIT_VALID = 0x10
+
+# Conversion types.
+CC_LINEAR = 1
+CC_RATIONAL = 2
+CC_TAB_INTP = 4
+CC_TAB = 5
+CC_VALUE_TO_TEXT = 7
+CC_RANGE_TO_TEXT = 8
+
+
+def _align(size):
+    return (size + 7) & ~7
+
+
+def dataType(fmt):
+    """MDF data type of a struct format (e.g. "<H").
+    """
+    order = 1 if fmt[0] in ">!" else 0
+    return DATA_TYPES[fmt.lstrip("<>!=@")][order]
+
+
+class MdfWriter(object):
+    """Write DAQ data to an MDF 4.1 file.
+
+    Parameters
+    ----------
+    filename : str
+    decoder : `pyxcp.daq.decoder.DaqDecoder`
+        DAQ lists already added.
+    catalogue : `pyxcp.asam.a2l.A2LCatalogue`
+        Optional, limits and conversions of signals without conversion.
+    timestampOrigin : tuple (float, int)
+        (wall clock, `perf_counter_ns`) pair, start time of the measurement.
+    comment : str
+        File history comment.
+    batchFrames : int
+        Frames decoded before records are written.
+    """
+
+    def __init__(self, filename, decoder, catalogue=None, timestampOrigin=None, comment="",
+                 batchFrames=DEFAULT_BATCH_FRAMES):
+        if not HAS_NUMPY:
+            raise RuntimeError("MDF export requires NumPy.")
+        self.filename = filename
+        self.decoder = decoder
+        self.catalogue = catalogue
+        self.timestampOrigin = timestampOrigin or (time.time(), perf_counter_ns())
+        self.comment = comment
+        self.batchFrames = batchFrames
+        self.dataBlocks = {}    # DAQ list -> [(offset, size), ...] of DT blocks
+        self.cycles = {}
+        self._pending = 0
+        self._file = open(filename, "wb")
+        self._file.write(ID_BLOCK.pack(UNFINALIZED, b"4.10    ", b"pyXCP   ", MDF_VERSION, 0, 0))
+        self._writeBlock(b"##HD", [0] * HD_LINKS, bytes(HD_DATA.size))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def add(self, payload, timestamp):
+        """Add a single DTO, s. `pyxcp.daq.decoder.DaqDecoder.add`.
+        """
+        self.decoder.add(payload, timestamp)
+        self._pending += 1
+        if self._pending >= self.batchFrames:
+            self.flush()
+
+    def addFrames(self, frames):
+        """Add `pyxcp.daq.recorder.Frame`s.
+        """
+        add = self.add
+        for timestamp, _, payload in frames:
+            add(payload, timestamp)
+
+    def addPackets(self, packets):
+        """Add packets as queued by the transport-layer.
+        """
+        add = self.add
+        for response, _, _, timestamp in packets:
+            add(response, timestamp)
+
+    def flush(self):
+        """Write the records decoded so far (one DT block per DAQ list).
+        """
+        self._pending = 0
+        for batch in self.decoder.flushRecords():
+            self.writeRecords(*batch)
+
+    def writeRecords(self, layout, timestamps, records):
+        """Append sample records of a DAQ list.
+
+        Parameters
+        ----------
+        layout : `pyxcp.daq.decoder.DaqListLayout`
+        timestamps : sequence of int
+            Receive timestamps (`perf_counter_ns`).
+        records : bytes-like
+            `len(timestamps)` records of `layout.recordSize` bytes.
+        """
+        count = len(timestamps)
+        if not count:
+            return
+        out = np.empty(count, dtype=[("time", "<i8"), ("record", "V{}".format(layout.recordSize))])
+        out["time"] = np.asarray(timestamps, dtype=np.int64) - self.timestampOrigin[1]
+        out["record"] = np.frombuffer(records, dtype="V{}".format(layout.recordSize))
+        offset = self._writeBlock(b"##DT", [], out)
+        self.dataBlocks.setdefault(layout.daqList, []).append((offset, out.nbytes))
+        self.cycles[layout.daqList] = self.cycles.get(layout.daqList, 0) + count
+
+    def close(self):
+        """Write remaining records and the metadata, finalize the file.
+        """
+        if self._file is None:
+            return
+        self.flush()
+        fhFirst = self._writeFileHistory()
+        dgFirst = 0
+        for daqList in sorted(self.decoder.layouts, reverse=True):
+            dgFirst = self._writeDataGroup(self.decoder.layouts[daqList], dgFirst)
+        wall, _ = self.timestampOrigin
+        self._file.seek(HD_OFFSET + BLOCK_HEADER.size)
+        self._file.write(struct.pack("<{}Q".format(HD_LINKS), dgFirst, fhFirst, 0, 0, 0, 0))
+        self._file.write(HD_DATA.pack(int(wall * 1000000000), 0, 0, 0, 0, 0, 0.0, 0.0))
+        self._file.seek(0)
+        self._file.write(FINALIZED)
+        self._file.close()
+        self._file = None
+
+    def _writeBlock(self, blockId, links, data):
+        """Write a block (8-byte aligned), return its offset.
+        """
+        file = self._file
+        file.seek(0, 2)
+        offset = file.tell()
+        dataSize = memoryview(data).nbytes
+        length = BLOCK_HEADER.size + 8 * len(links) + dataSize
+        file.write(BLOCK_HEADER.pack(blockId, length, len(links)))
+        if links:
+            file.write(struct.pack("<{}Q".format(len(links)), *links))
+        file.write(data)
+        padding = _align(length) - length
+        if padding:
+            file.write(bytes(padding))
+        return offset
+
+    def _writeText(self, text, blockId=b"##TX"):
+        if not text:
+            return 0
+        data = text.encode("utf-8") + b"\x00"
+        return self._writeBlock(blockId, [], data + bytes(_align(len(data)) - len(data)))
+
+    def _writeFileHistory(self):
+        comment = "<FHcomment><TX>{}</TX><tool_id>pyXCP</tool_id><tool_vendor>pySART</tool_vendor>" \
+            "<tool_version>{}</tool_version></FHcomment>".format(escape(self.comment), __version__)
+        md = self._writeText(comment, b"##MD")
+        return self._writeBlock(b"##FH", [0, md], FH_DATA.pack(int(time.time() * 1000000000), 0, 0, 0))
+
+    def _writeDataGroup(self, layout, nextDg):
+        blocks = self.dataBlocks.get(layout.daqList, [])
+        data = 0
+        if blocks:
+            links, offsets, position = [0], [], 0
+            for offset, size in blocks:
+                links.append(offset)
+                offsets.append(position)
+                position += size
+            data = self._writeBlock(b"##DL", links, DL_HEADER.pack(0, len(blocks)) +
+                                    struct.pack("<{}Q".format(len(offsets)), *offsets))
+        cnFirst = self._writeChannels(layout)
+        acqName = self._writeText("DAQ list {}".format(layout.daqList))
+        recordSize = TIME_SIZE + layout.recordSize
+        cg = self._writeBlock(b"##CG", [0, cnFirst, acqName, 0, 0, 0],
+                              CG_DATA.pack(0, self.cycles.get(layout.daqList, 0), 0, 0, recordSize, 0))
+        return self._writeBlock(b"##DG", [nextDg, cg, data, 0], DG_DATA.pack(0))
+
+    def _writeChannels(self, layout):
+        channels = [("time", CN_MASTER, SYNC_TIME, 2, 0, 64, Linear((1e-9, 0.0), unit="s"), None)]
+        if layout.timestampSize:
+            channels.append(("timestamp", CN_FIXED_LENGTH, SYNC_NONE,
+                             dataType(layout.byteOrder + TIMESTAMP_FORMATS[layout.timestampSize]),
+                             TIME_SIZE, 8 * layout.timestampSize, None, None))
+        for field in layout.fields:
+            conversion, limits = field.conversion, None
+            if self.catalogue is not None and field.name in self.catalogue:
+                symbol = self.catalogue[field.name]
+                limits = (symbol.lower, symbol.upper)
+                if conversion is None:
+                    conversion = self.catalogue.conversion(symbol)
+            channels.append((field.name, CN_FIXED_LENGTH, SYNC_NONE, dataType(field.codec.format),
+                             TIME_SIZE + field.offset, 8 * field.codec.size, conversion, limits))
+        nextCn = 0
+        for name, cnType, syncType, dtype, byteOffset, bitCount, conversion, limits in reversed(channels):
+            txName = self._writeText(name)
+            cc = self._writeConversion(conversion)
+            unit = self._writeText(conversion.unit if conversion is not None else "")
+            flags, lower, upper = (CN_LIMIT_VALID, ) + limits if limits else (0, 0.0, 0.0)
+            nextCn = self._writeBlock(b"##CN", [nextCn, 0, txName, 0, cc, 0, unit, 0], CN_DATA.pack(
+                cnType, syncType, dtype, 0, byteOffset, bitCount, flags, 0, 0, 0, 0,
+                0.0, 0.0, lower, upper, 0.0, 0.0))
+        return nextCn
+
+    def _writeConversion(self, conversion):
+        """CC block of a `pyxcp.asam.compumethod.CompuMethod` (0 if identical or unsupported).
+        """
+        refs = []
+        if isinstance(conversion, Linear):
+            a, b = conversion.coeffs
+            ccType, values = CC_LINEAR, [b, a]
+        elif isinstance(conversion, RatFunc):
+            a, b, c, d, e, f = conversion.coeffs
+            if a or d:
+                return 0
+            # phys = (c - f * raw) / (e * raw - b)
+            ccType, values = CC_RATIONAL, [0.0, -f, c, 0.0, e, -b]
+        elif isinstance(conversion, (TabIntp, TabNoIntp)):
+            ccType = CC_TAB_INTP if isinstance(conversion, TabIntp) else CC_TAB
+            values = [v for pair in zip(conversion.xs, conversion.ys) for v in pair]
+        elif isinstance(conversion, TabVerb):
+            keys = sorted(conversion.mapping)
+            if conversion.ranges:
+                ccType = CC_RANGE_TO_TEXT
+                ranges = [(k, k, conversion.mapping[k]) for k in keys] + list(conversion.ranges)
+                values = [v for lower, upper, _ in ranges for v in (lower, upper)]
+                texts = [text for _, _, text in ranges]
+            else:
+                ccType = CC_VALUE_TO_TEXT
+                values = keys
+                texts = [conversion.mapping[k] for k in keys]
+            refs = [self._writeText(text) for text in texts] + [self._writeText(conversion.default or "")]
+        else:
+            return 0
+        unit = self._writeText(conversion.unit)
+        data = CC_HEADER.pack(ccType, 0, 0, len(refs), len(values), 0.0, 0.0) + \
+            struct.pack("<{}d".format(len(values)), *values)
+        return self._writeBlock(b"##CC", [0, unit, 0, 0] + refs, data)
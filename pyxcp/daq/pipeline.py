@@ -0,0 +1,414 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Multi-process DAQ processing fed by a shared memory ring.
+
+The receive side only copies DTOs (as `pyxcp.daq.recorder` records) into
+slots of a `multiprocessing.shared_memory` ring; full slots are handed to
+worker processes by slot number, so decoding, conversion and persistence
+run on other cores without contending for the GIL of the receiving
+process::
+
+    def decoder():
+        d = DaqDecoder()
+        d.addList(0, 0, odts)
+        return d
+
+    def exporter(index):
+        return ParquetExporter("run_w{}.parquet".format(index))
+
+    with Pipeline(partial(DecodeHandler, decoder, exporter), workers=4) as pipeline:
+        pipeline.attach(xm.transport)       # drain `daqQueue`
+        ...
+    print(pipeline.results, pipeline.overruns)
+
+Every published slot gets a sequence number. If all slots are in use the
+receive side never blocks: frames are dropped until a slot is released,
+and the sequence number skips one, so handlers (and `statistics`) see
+the gap. Slots are cut preferably before the first ODT of a DAQ list
+(`startPids`), so multi-ODT samples are not split between workers.
+"""
+
+__copyright__ = """
+    pySART - Simplified AUTOSAR-Toolkit for Python.
+
+   (C) 2009-2019 by Christoph Schueler <cpu12.gems@googlemail.com>
+
+   All Rights Reserved
+
+  This program is free software; you can redistribute it and/or modify
+  it under the terms of the GNU General Public License as published by
+  the Free Software Foundation; either version 2 of the License, or
+  (at your option) any later version.
+
+  This program is distributed in the hope that it will be useful,
+  but WITHOUT ANY WARRANTY; without even the implied warranty of
+  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+  GNU General Public License for more details.
+
+  You should have received a copy of the GNU General Public License along
+  with this program; if not, write to the Free Software Foundation, Inc.,
+  51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+"""
+
+from collections import namedtuple
+import multiprocessing
+import queue
+import struct
+import threading
+
+try:
+    from multiprocessing import shared_memory
+except ImportError:
+    HAS_SHARED_MEMORY = False   # Python < 3.8
+else:
+    HAS_SHARED_MEMORY = True
+
+from pyxcp.daq.recorder import iterRecords, RECORD_HEADER
+from pyxcp.logger import Logger
+
+SLOT_HEADER = struct.Struct("<QII")     # sequence, size, frames
+DEFAULT_SLOTS = 32
+DEFAULT_SLOT_SIZE = 1024 * 1024
+MAX_DTO_SIZE = 0xffff
+
+PipelineStatistics = namedtuple("PipelineStatistics", "published frames overruns droppedFrames")
+WorkerStatistics = namedtuple("WorkerStatistics", "batches frames mismatches")
+WorkerResult = namedtuple("WorkerResult", "index statistics result")
+
+
+class DecodeHandler(object):
+    """Worker-side handler: decode batches and pass them to an exporter.
+
+    Parameters
+    ----------
+    decoderFactory : callable
+        Returns a `pyxcp.daq.decoder.DaqDecoder` with the DAQ lists added.
+    exporterFactory : callable
+        `exporterFactory(index)` returns a `pyxcp.daq.export.Exporter`
+        (resp. anything with `write(batch)` and `close()`), or None.
+    index : int
+        Worker number.
+
+    Note
+    ----
+    Factories must be picklable (module level functions) on platforms
+    that spawn worker processes.
+    """
+
+    def __init__(self, decoderFactory, exporterFactory, index):
+        self.index = index
+        self.decoder = decoderFactory()
+        self.exporter = exporterFactory(index) if exporterFactory is not None else None
+        self.sequences = []
+
+    def __call__(self, sequence, frames):
+        self.sequences.append(sequence)
+        self.decoder.addFrames(frames)
+        batches = self.decoder.flush()
+        if self.exporter is not None:
+            for batch in batches:
+                self.exporter.write(batch)
+
+    def close(self):
+        """Returns decoder statistics and the sequence numbers processed.
+        """
+        if self.exporter is not None:
+            self.exporter.close()
+        return self.decoder.statistics(), self.sequences
+
+
+def _attach(name):
+    """Attach to the ring, the creating process is responsible for unlinking.
+    """
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python < 3.13: workers share the resource tracker of the parent,
+        # registering again is a no-op.
+        return shared_memory.SharedMemory(name=name)
+
+
+def _worker(index, shmName, slotSize, workQueue, freeQueue, resultQueue, handlerFactory):
+    shm = _attach(shmName)
+    batches = frames = mismatches = 0
+    try:
+        handler = handlerFactory(index)
+        while True:
+            item = workQueue.get()
+            if item is None:
+                break
+            slot, sequence = item
+            base = slot * slotSize
+            slotSequence, size, count = SLOT_HEADER.unpack_from(shm.buf, base)
+            if slotSequence != sequence:
+                mismatches += 1
+                freeQueue.put(slot)
+                continue
+            data = bytes(shm.buf[base + SLOT_HEADER.size:base + SLOT_HEADER.size + size])
+            freeQueue.put(slot)     # Released before processing.
+            handler(sequence, iterRecords(data, 0, count))
+            batches += 1
+            frames += count
+        result = handler.close() if hasattr(handler, "close") else None
+    except Exception as e:
+        result = e
+    finally:
+        shm.close()
+    resultQueue.put(WorkerResult(index, WorkerStatistics(batches, frames, mismatches), result))
+
+
+class Pipeline(object):
+    """Process DAQ packets in worker processes.
+
+    Parameters
+    ----------
+    handlerFactory : callable
+        `handlerFactory(index)` is called in every worker process and
+        returns a callable `handler(sequence, frames)`, called with the
+        sequence number and the `pyxcp.daq.recorder.Frame`s of every slot.
+        If the handler has a `close` method its return value is collected
+        in `results`. s. `DecodeHandler`.
+    workers : int
+        Number of worker processes.
+    slots : int
+        Number of slots of the ring.
+    slotSize : int
+        Size of a slot in bytes.
+    startPids : iterable of int
+        PIDs starting a sample (ODT 0 of the DAQ lists), preferred slot
+        boundaries.
+    context : `multiprocessing.context.BaseContext`
+        Default is the platform's default.
+    """
+
+    POLL_INTERVAL = 0.05
+
+    def __init__(self, handlerFactory, workers=2, slots=DEFAULT_SLOTS, slotSize=DEFAULT_SLOT_SIZE,
+                 startPids=(), context=None):
+        if not HAS_SHARED_MEMORY:
+            raise RuntimeError("Pipeline requires multiprocessing.shared_memory (Python >= 3.8).")
+        if slotSize < SLOT_HEADER.size + RECORD_HEADER.size + MAX_DTO_SIZE:
+            raise ValueError("slotSize too small.")
+        if slots < 2:
+            raise ValueError("At least two slots are required.")
+        self.logger = Logger("daq.Pipeline")
+        self.handlerFactory = handlerFactory
+        self.workerCount = workers
+        self.slots = slots
+        self.slotSize = slotSize
+        self.startPids = frozenset(startPids)
+        self._softLimit = slotSize - slotSize // 4
+        self._context = context or multiprocessing.get_context()
+        self.results = []
+        self.sequence = 0
+        self.published = 0
+        self.frames = 0
+        self.overruns = 0
+        self.droppedFrames = 0
+        self._droppedAtPublish = 0
+        self._shm = None
+        self._workers = []
+        self._slot = None
+        self._thread = None
+        self._stopEvent = threading.Event()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def start(self):
+        """Create the ring and start the worker processes.
+        """
+        ctx = self._context
+        self._shm = shared_memory.SharedMemory(create=True, size=self.slots * self.slotSize)
+        self._buffer = self._shm.buf
+        self._workQueue = ctx.Queue()
+        self._freeQueue = ctx.Queue()
+        self._resultQueue = ctx.Queue()
+        self._free = list(range(self.slots))   # Slots known to be free (producer-side cache).
+        for index in range(self.workerCount):
+            process = ctx.Process(
+                target=_worker, name="DAQ-Worker-{}".format(index),
+                args=(index, self._shm.name, self.slotSize, self._workQueue, self._freeQueue,
+                      self._resultQueue, self.handlerFactory))
+            process.daemon = True
+            process.start()
+            self._workers.append(process)
+        self._slot = None
+        self._acquire()
+
+    def _acquire(self):
+        """Get a free slot without blocking.
+        """
+        if not self._free:
+            try:
+                while True:
+                    self._free.append(self._freeQueue.get_nowait())
+            except queue.Empty:
+                pass
+        if not self._free:
+            return False
+        self._slot = self._free.pop()
+        self._base = self._slot * self.slotSize
+        self._pos = self._base + SLOT_HEADER.size
+        self._count = 0
+        return True
+
+    def add(self, payload, counter, timestamp):
+        """Add a single packet (called from the receiving thread).
+
+        Parameters
+        ----------
+        payload : bytes-like
+            DTO (PID + data).
+        counter : int
+            Transport-layer counter.
+        timestamp : int
+            Receive timestamp (`perf_counter_ns`).
+        """
+        length = len(payload)
+        if self._slot is not None:
+            used = self._pos - self._base
+            if used + RECORD_HEADER.size + length > self.slotSize or (
+                    used >= self._softLimit and payload[0] in self.startPids):
+                self.publish()
+        if self._slot is None and not self._acquire():
+            self.droppedFrames += 1
+            return
+        pos = self._pos
+        RECORD_HEADER.pack_into(self._buffer, pos, timestamp, counter & 0xffff, length)
+        pos += RECORD_HEADER.size
+        self._buffer[pos:pos + length] = payload
+        self._pos = pos + length
+        self._count += 1
+
+    def addMany(self, packets):
+        """Add packets as queued by the transport-layer.
+
+        Parameters
+        ----------
+        packets : iterable of (response, counter, length, timestamp)
+        """
+        add = self.add
+        for response, counter, _, timestamp in packets:
+            add(response, counter, timestamp)
+
+    def publish(self):
+        """Hand the current slot (if not empty) to the workers.
+        """
+        if self._slot is None or not self._count:
+            return
+        if self.droppedFrames != self._droppedAtPublish:
+            self.sequence += 1      # Gap marks the overrun.
+            self.overruns += 1
+        self._droppedAtPublish = self.droppedFrames
+        SLOT_HEADER.pack_into(self._buffer, self._base, self.sequence, self._pos - self._base - SLOT_HEADER.size,
+                              self._count)
+        self._workQueue.put((self._slot, self.sequence))
+        self.sequence += 1
+        self.published += 1
+        self.frames += self._count
+        self._slot = None
+
+    def attach(self, transport):
+        """Drain `transport.daqQueue` into the ring from a thread until `stop`.
+        """
+        self._thread = threading.Thread(target=self._drain, args=(transport.daqQueue, ), name="DAQ-Pipeline")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _drain(self, daqQueue):
+        get = daqQueue.get
+        get_nowait = daqQueue.get_nowait
+        add = self.add
+        stopped = self._stopEvent.is_set
+        while not stopped():
+            try:
+                response, counter, _, timestamp = get(timeout=self.POLL_INTERVAL)
+            except queue.Empty:
+                self.publish()      # Idle, don't keep data back.
+                continue
+            add(response, counter, timestamp)
+        # Packets pending at stop time are processed, later ones are left to the caller.
+        for _ in range(daqQueue.qsize()):
+            try:
+                response, counter, _, timestamp = get_nowait()
+            except queue.Empty:
+                break
+            add(response, counter, timestamp)
+
+    def stop(self):
+        """Publish remaining data, stop the workers and collect their results.
+
+        Returns
+        -------
+        list of `WorkerResult`
+            Ordered by worker index; workers that died have statistics
+            None and a `RuntimeError` as result.
+        """
+        if self._shm is None:
+            return self.results
+        self._stopEvent.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.publish()
+        if self.droppedFrames != self._droppedAtPublish:
+            self.overruns += 1      # Lost at the end, no further slot shows the gap.
+            self._droppedAtPublish = self.droppedFrames
+        for _ in self._workers:
+            self._workQueue.put(None)
+        results = self._collect()
+        for process in self._workers:
+            process.join()
+        self._workers = []
+        self.results = sorted(results, key=lambda r: r.index)
+        for result in self.results:
+            if isinstance(result.result, Exception):
+                self.logger.error("DAQ worker %d failed: %s", result.index, result.result)
+        del self._buffer
+        self._shm.close()
+        self._shm.unlink()
+        self._shm = None
+        return self.results
+
+    def _collect(self):
+        """Wait for the results of all workers; workers that died without
+        one get a `RuntimeError` result.
+        """
+        results = {}
+        while len(results) < len(self._workers):
+            try:
+                result = self._resultQueue.get(timeout=self.POLL_INTERVAL)
+            except queue.Empty:
+                if any(process.is_alive() for index, process in enumerate(self._workers) if index not in results):
+                    continue
+                # Results are flushed before a worker exits, so a last look suffices.
+                try:
+                    while len(results) < len(self._workers):
+                        result = self._resultQueue.get(timeout=self.POLL_INTERVAL)
+                        results[result.index] = result
+                except queue.Empty:
+                    pass
+                for index, process in enumerate(self._workers):
+                    if index not in results:
+                        results[index] = WorkerResult(index, None, RuntimeError(
+                            "DAQ worker {} exited with code {}.".format(index, process.exitcode)))
+                break
+            results[result.index] = result
+        return list(results.values())
+
+    def statistics(self):
+        """Receive-side statistics.
+
+        Returns
+        -------
+        `PipelineStatistics`
+            `overruns` is the number of sequence gaps, `droppedFrames` the
+            number of frames lost because no slot was free.
+        """
+        return PipelineStatistics(self.published, self.frames, self.overruns, self.droppedFrames)
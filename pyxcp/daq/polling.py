@@ -0,0 +1,250 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Polling measurement for slaves without DAQ support.
+
+Signals are grouped by rate; within a rate group adjacent signals are
+merged into blocks read by a single SHORT_UPLOAD (larger blocks are read
+by SET_MTA + UPLOAD). Cycles are scheduled on absolute deadlines
+(`perf_counter_ns`), so the jitter of one cycle does not accumulate; the
+last fraction of every wait is spent spinning for sub-millisecond
+accuracy. Missed deadlines are counted as overruns and skipped::
+
+    with PollingScheduler(xm) as poller:
+        poller.add("speed", 0x1BE068, 2, rate=100)
+        poller.addMeasurement(catalogue, "EngineTemp", rate=10)
+        poller.start()
+        ...
+        timestamp, rate, values = poller.queue.get()    # values: name -> bytes
+        print(poller.statistics())
+"""
+
+__copyright__ = """
+    pySART - Simplified AUTOSAR-Toolkit for Python.
+
+   (C) 2009-2019 by Christoph Schueler <cpu12.gems@googlemail.com>
+
+   All Rights Reserved
+
+  This program is free software; you can redistribute it and/or modify
+  it under the terms of the GNU General Public License as published by
+  the Free Software Foundation; either version 2 of the License, or
+  (at your option) any later version.
+
+  This program is distributed in the hope that it will be useful,
+  but WITHOUT ANY WARRANTY; without even the implied warranty of
+  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+  GNU General Public License for more details.
+
+  You should have received a copy of the GNU General Public License along
+  with this program; if not, write to the Free Software Foundation, Inc.,
+  51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+"""
+
+from collections import namedtuple
+from functools import reduce
+import operator
+import queue
+import threading
+
+from pyxcp.logger import Logger
+from pyxcp.timing import perf_counter_ns, sleepUntil
+
+NS_PER_SECOND = 1000000000
+
+# Unchanged bytes between two signals up to which they are read together.
+MERGE_GAP = 8
+SPIN_TIME = 0.0005      # seconds
+
+Signal = namedtuple("Signal", "name address ext size rate")
+Block = namedtuple("Block", "address ext size signals")    # signals: ((name, offset, size), ...)
+RateStatistics = namedtuple("RateStatistics", "requested achieved cycles overruns errors maxCycleTime")
+
+
+class RateGroup(object):
+    """Signals polled with the same rate.
+    """
+
+    def __init__(self, rate, blocks):
+        self.rate = rate
+        self.period = int(round(NS_PER_SECOND / rate))
+        self.blocks = blocks
+        self.deadline = 0
+        self.cycles = 0
+        self.overruns = 0
+        self.errors = 0
+        self.maxCycleTime = 0
+        self.started = 0
+        self.lastCycle = 0
+
+
+def mergeSignals(signals, maxSize, gap=MERGE_GAP):
+    """Merge signals into blocks of at most `maxSize` bytes.
+
+    Signals (or parts of them) located at most `gap` bytes apart are read
+    together; a signal larger than `maxSize` gets a block of its own.
+
+    Returns
+    -------
+    list of `Block`
+    """
+    blocks = []
+    current = None
+    for signal in sorted(signals, key=lambda s: (s.ext, s.address)):
+        if current is not None:
+            address, ext, size, members = current
+            end = max(address + size, signal.address + signal.size)
+            if ext == signal.ext and signal.address - (address + size) <= gap and end - address <= maxSize:
+                members.append((signal.name, signal.address - address, signal.size))
+                current = [address, ext, end - address, members]
+                continue
+            blocks.append(Block(address, ext, size, tuple(members)))
+        current = [signal.address, signal.ext, signal.size, [(signal.name, 0, signal.size)]]
+    if current is not None:
+        blocks.append(Block(current[0], current[1], current[2], tuple(current[3])))
+    return blocks
+
+
+class PollingScheduler(object):
+    """Periodically read signals by SHORT_UPLOAD.
+
+    Parameters
+    ----------
+    master : `pyxcp.master.Master`
+        Connected master.
+    mergeGap : int
+        s. `mergeSignals`.
+    spinTime : float
+        Busy-wait so many seconds before a deadline instead of sleeping.
+    callback : callable
+        `callback(timestamp, rate, values)` called from the polling thread
+        for every cycle, default is to put the tuple into `queue`.
+    """
+
+    def __init__(self, master, mergeGap=MERGE_GAP, spinTime=SPIN_TIME, callback=None, loglevel="WARN"):
+        self.master = master
+        self.mergeGap = mergeGap
+        self.spinTime = int(spinTime * NS_PER_SECOND)
+        self.queue = queue.Queue()
+        self.callback = callback or (lambda *args: self.queue.put(args))
+        self.logger = Logger("daq.Polling")
+        self.logger.setLevel(loglevel)
+        self.signals = []
+        self.groups = []
+        self._thread = None
+        self._stopEvent = threading.Event()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def add(self, name, address, size, rate, ext=0):
+        """Poll `size` bytes at `address` `rate` times per second.
+        """
+        if self.running:
+            raise RuntimeError("Signals can't be added while polling.")
+        if rate <= 0:
+            raise ValueError("rate must be positive.")
+        self.signals.append(Signal(name, address, ext, size, rate))
+
+    def addMeasurement(self, catalogue, name, rate):
+        """Poll MEASUREMENT `name` of `pyxcp.asam.a2l.A2LCatalogue` `catalogue`.
+        """
+        measurement = catalogue.measurements[name]
+        size = catalogue.codec(measurement).size * reduce(operator.mul, measurement.dims, 1)
+        self.add(name, measurement.address, size, rate, measurement.ext)
+
+    def plan(self):
+        """Rate groups with their coalesced blocks, fastest first.
+
+        Returns
+        -------
+        list of `RateGroup`
+        """
+        maxSize = self.master.slaveProperties.maxCto - 1
+        rates = sorted({s.rate for s in self.signals}, reverse=True)
+        return [
+            RateGroup(rate, mergeSignals([s for s in self.signals if s.rate == rate], maxSize, self.mergeGap))
+            for rate in rates
+        ]
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.running:
+            return
+        self.groups = self.plan()
+        self._stopEvent.clear()
+        self._thread = threading.Thread(target=self.run, name="XCP-Polling")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        self._stopEvent.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def run(self):
+        groups = self.groups
+        if not groups:
+            return
+        now = perf_counter_ns()
+        for group in groups:
+            group.deadline = group.started = now
+        while not self._stopEvent.is_set():
+            group = min(groups, key=lambda g: g.deadline)
+            sleepUntil(group.deadline, self.spinTime, self._stopEvent)
+            if self._stopEvent.is_set():
+                break
+            start = perf_counter_ns()
+            self._poll(group, start)
+            finished = perf_counter_ns()
+            group.cycles += 1
+            group.lastCycle = start
+            group.maxCycleTime = max(group.maxCycleTime, finished - start)
+            group.deadline += group.period
+            if finished > group.deadline:
+                # Overrun, skip the missed cycles instead of bursting.
+                missed = (finished - group.deadline) // group.period + 1
+                group.overruns += missed
+                group.deadline += missed * group.period
+
+    def _poll(self, group, timestamp):
+        master = self.master
+        values = {}
+        try:
+            for block in group.blocks:
+                if block.size <= master.slaveProperties.maxCto - 1:
+                    data = master.shortUpload(block.size, block.address, block.ext)
+                else:
+                    master.setMta(block.address, block.ext)
+                    data = master.fetch(block.size)
+                for name, offset, size in block.signals:
+                    values[name] = data[offset:offset + size]
+        except Exception as e:
+            group.errors += 1
+            self.logger.error("Polling at %s Hz failed: %s", group.rate, e)
+            return
+        self.callback(timestamp, group.rate, values)
+
+    def statistics(self):
+        """Requested vs. achieved rates.
+
+        Returns
+        -------
+        dict
+            rate -> `RateStatistics` (`maxCycleTime` in seconds).
+        """
+        result = {}
+        for group in self.groups:
+            elapsed = group.lastCycle - group.started
+            achieved = (group.cycles - 1) * NS_PER_SECOND / elapsed if elapsed > 0 else 0.0
+            result[group.rate] = RateStatistics(
+                group.rate, achieved, group.cycles, group.overruns, group.errors,
+                group.maxCycleTime / NS_PER_SECOND)
+        return result
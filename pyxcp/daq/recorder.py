@@ -0,0 +1,384 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Binary recording of DAQ traffic.
+
+File layout (all values little-endian)::
+
+    FileHeader
+    Chunk*          CHUNK_HEADER followed by `size` bytes of records
+    Index           one INDEX_ENTRY per chunk
+    Trailer         INDEX_TRAILER
+
+A record consists of RECORD_HEADER (receive timestamp, transport-layer
+counter, length) followed by the raw DTO bytes.  Records are packed into a
+pre-allocated chunk buffer which is written with a single `write` call, so
+recording does not create per-frame garbage besides the packets
+themselves.  The index is only written by `close`; if a recording was not
+closed properly, `RecorderReader` rebuilds it by scanning the chunks.
+"""
+
+__copyright__ = """
+    pySART - Simplified AUTOSAR-Toolkit for Python.
+
+   (C) 2009-2019 by Christoph Schueler <cpu12.gems@googlemail.com>
+
+   All Rights Reserved
+
+  This program is free software; you can redistribute it and/or modify
+  it under the terms of the GNU General Public License as published by
+  the Free Software Foundation; either version 2 of the License, or
+  (at your option) any later version.
+
+  This program is distributed in the hope that it will be useful,
+  but WITHOUT ANY WARRANTY; without even the implied warranty of
+  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+  GNU General Public License for more details.
+
+  You should have received a copy of the GNU General Public License along
+  with this program; if not, write to the Free Software Foundation, Inc.,
+  51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+"""
+
+from collections import namedtuple
+import mmap
+import os
+import queue
+import struct
+import threading
+import time
+
+from pyxcp.logger import Logger
+from pyxcp.timing import perf_counter_ns
+
+MAGIC = b"XCPREC\x00\x00"
+VERSION = 1
+CHUNK_MAGIC = b"CHNK"
+INDEX_MAGIC = b"INDX"
+
+FILE_HEADER = struct.Struct("<8sHH4xdq")       # magic, version, flags, wall, perf
+CHUNK_HEADER = struct.Struct("<4sIIqq")        # magic, frames, size, first, last
+RECORD_HEADER = struct.Struct("<qHH")          # timestamp, counter, length
+INDEX_ENTRY = struct.Struct("<QIIqq")          # offset, frames, size, first, last
+INDEX_TRAILER = struct.Struct("<4sIQ")         # magic, count, offset of index
+
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+
+ChunkInfo = namedtuple("ChunkInfo", "offset frames size first last")
+Frame = namedtuple("Frame", "timestamp counter payload")
+
+
+class RecorderError(Exception):
+    pass
+
+
+def iterRecords(buffer, offset, count):
+    """Iterate over `count` records starting at `offset` of `buffer`.
+
+    Yields
+    ------
+    `Frame`
+        `payload` is a `memoryview` into `buffer`.
+    """
+    view = memoryview(buffer)
+    pos = offset
+    unpack_from = RECORD_HEADER.unpack_from
+    headerSize = RECORD_HEADER.size
+    for _ in range(count):
+        timestamp, counter, length = unpack_from(view, pos)
+        pos += headerSize
+        yield Frame(timestamp, counter, view[pos:pos + length])
+        pos += length
+
+
+class RecorderWriter:
+    """Append DAQ packets to a chunked binary file.
+
+    Parameters
+    ----------
+    filename : str
+    chunkSize : int
+        Size of the in-memory chunk buffer; chunks are flushed when full.
+    timestampOrigin : tuple (float, int)
+        (wall clock, `perf_counter_ns`) pair, s.
+        `pyxcp.transport.base.BaseTransport.timestampOrigin`.
+    """
+
+    def __init__(self, filename, chunkSize=DEFAULT_CHUNK_SIZE, timestampOrigin=None):
+        if chunkSize < RECORD_HEADER.size + 0xffff:
+            raise ValueError("chunkSize too small.")
+        self.filename = filename
+        self.chunkSize = chunkSize
+        self._file = open(filename, "wb")
+        wall, perf = timestampOrigin or (time.time(), perf_counter_ns())
+        self._file.write(FILE_HEADER.pack(MAGIC, VERSION, 0, wall, perf))
+        self._buffer = bytearray(chunkSize)
+        self._view = memoryview(self._buffer)
+        self._used = 0
+        self._frames = 0
+        self._first = 0
+        self._last = 0
+        self.index = []
+        self.totalFrames = 0
+        self.totalBytes = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def add(self, payload, counter, timestamp):
+        """Add a single packet.
+
+        Parameters
+        ----------
+        payload : bytes-like
+            DTO (PID + data).
+        counter : int
+            Transport-layer counter.
+        timestamp : int
+            Receive timestamp (`perf_counter_ns`).
+        """
+        length = len(payload)
+        used = self._used
+        end = used + RECORD_HEADER.size + length
+        if end > self.chunkSize:
+            self.flush()
+            used = 0
+            end = RECORD_HEADER.size + length
+        if not self._frames:
+            self._first = timestamp
+        RECORD_HEADER.pack_into(self._buffer, used, timestamp, counter & 0xffff, length)
+        self._view[used + RECORD_HEADER.size:end] = payload
+        self._used = end
+        self._frames += 1
+        self._last = timestamp
+
+    def addMany(self, packets):
+        """Add packets as queued by the transport-layer.
+
+        Parameters
+        ----------
+        packets : iterable of (response, counter, length, timestamp)
+        """
+        add = self.add
+        for response, counter, _, timestamp in packets:
+            add(response, counter, timestamp)
+
+    def flush(self):
+        """Write current chunk (if any) to disk.
+        """
+        if not self._frames:
+            return
+        offset = self._file.tell()
+        self._file.write(CHUNK_HEADER.pack(
+            CHUNK_MAGIC, self._frames, self._used, self._first, self._last))
+        self._file.write(self._view[:self._used])
+        self.index.append(ChunkInfo(offset, self._frames, self._used, self._first, self._last))
+        self.totalFrames += self._frames
+        self.totalBytes += self._used
+        self._used = 0
+        self._frames = 0
+
+    def close(self):
+        if self._file is None:
+            return
+        self.flush()
+        indexOffset = self._file.tell()
+        for entry in self.index:
+            self._file.write(INDEX_ENTRY.pack(*entry))
+        self._file.write(INDEX_TRAILER.pack(INDEX_MAGIC, len(self.index), indexOffset))
+        self._file.close()
+        self._file = None
+        self._view.release()
+
+
+class RecorderReader:
+    """Memory-mapped access to a recording.
+
+    Parameters
+    ----------
+    filename : str
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        self._file = open(filename, "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        if size < FILE_HEADER.size:
+            raise RecorderError("'{}' is not a recording.".format(filename))
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, _, wall, perf = FILE_HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            raise RecorderError("'{}' is not a recording.".format(filename))
+        if version > VERSION:
+            raise RecorderError("Unsupported recording version {}.".format(version))
+        self.timestampOrigin = (wall, perf)
+        self.size = size
+        self.index = self._readIndex()
+        if self.index is None:
+            self.index = self._scanChunks()
+            self.complete = False
+        else:
+            self.complete = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __len__(self):
+        return sum(c.frames for c in self.index)
+
+    def __iter__(self):
+        return self.frames()
+
+    def _readIndex(self):
+        if self.size < FILE_HEADER.size + INDEX_TRAILER.size:
+            return None
+        magic, count, offset = INDEX_TRAILER.unpack_from(self._mm, self.size - INDEX_TRAILER.size)
+        if magic != INDEX_MAGIC or offset + count * INDEX_ENTRY.size + INDEX_TRAILER.size != self.size:
+            return None
+        return [ChunkInfo(*INDEX_ENTRY.unpack_from(self._mm, offset + idx * INDEX_ENTRY.size))
+                for idx in range(count)]
+
+    def _scanChunks(self):
+        """Rebuild index of an incomplete recording.
+        """
+        result = []
+        offset = FILE_HEADER.size
+        while offset + CHUNK_HEADER.size <= self.size:
+            magic, frames, size, first, last = CHUNK_HEADER.unpack_from(self._mm, offset)
+            if magic != CHUNK_MAGIC or offset + CHUNK_HEADER.size + size > self.size:
+                break
+            result.append(ChunkInfo(offset, frames, size, first, last))
+            offset += CHUNK_HEADER.size + size
+        return result
+
+    def chunk(self, number):
+        """Iterate over the frames of a single chunk.
+
+        Yields
+        ------
+        `Frame`
+            `payload` is a `memoryview` into the mapped file.
+        """
+        info = self.index[number]
+        return iterRecords(memoryview(self._mm), info.offset + CHUNK_HEADER.size, info.frames)
+
+    def frames(self, start=None, stop=None):
+        """Iterate over all frames, optionally restricted to a time range.
+
+        Parameters
+        ----------
+        start : int
+            Timestamp of first frame of interest (`perf_counter_ns`).
+        stop : int
+            Timestamp after the last frame of interest.
+        """
+        for number, info in enumerate(self.index):
+            if (start is not None and info.last < start) or (stop is not None and info.first >= stop):
+                continue
+            for frame in self.chunk(number):
+                if start is not None and frame.timestamp < start:
+                    continue
+                if stop is not None and frame.timestamp >= stop:
+                    return
+                yield frame
+
+    def wallClock(self, timestamp):
+        """Convert a receive timestamp to seconds since the epoch.
+        """
+        wall, perf = self.timestampOrigin
+        return wall + (timestamp - perf) / 1000000000
+
+    def close(self):
+        if self._mm is not None:
+            try:
+                self._mm.close()
+            except BufferError:
+                pass    # Frames still referenced, mapping is released by GC.
+            self._mm = None
+            self._file.close()
+
+
+class Recorder:
+    """Drain the DAQ queue of a transport-layer into a recording.
+
+    Runs a thread that moves packets from `transport.daqQueue` to a
+    `RecorderWriter` until `stop` is called.
+
+    Parameters
+    ----------
+    transport : `pyxcp.transport.base.BaseTransport`
+    filename : str
+    chunkSize : int
+    checker : `pyxcp.daq.integrity.IntegrityChecker`
+        Optional, checks every packet while recording.
+    """
+
+    POLL_INTERVAL = 0.1
+
+    def __init__(self, transport, filename, chunkSize=DEFAULT_CHUNK_SIZE, checker=None):
+        self.transport = transport
+        self.checker = checker
+        self.logger = Logger("daq.Recorder")
+        self.writer = RecorderWriter(filename, chunkSize, transport.timestampOrigin)
+        self._stopEvent = threading.Event()
+        self._thread = threading.Thread(target=self.run, name="DAQ-Recorder")
+        self._thread.daemon = True
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def start(self):
+        if self.checker is not None:
+            self.checker.attach(self.transport)
+        self._thread.start()
+
+    def run(self):
+        get = self.transport.daqQueue.get
+        get_nowait = self.transport.daqQueue.get_nowait
+        add = self.writer.add
+        if self.checker is not None:
+            write, check = self.writer.add, self.checker.add
+
+            def add(response, counter, timestamp):
+                write(response, counter, timestamp)
+                check(response, counter, timestamp)
+        stopped = self._stopEvent.is_set
+        timeout = self.POLL_INTERVAL
+        while not stopped():
+            try:
+                response, counter, _, timestamp = get(timeout=timeout)
+            except queue.Empty:
+                continue
+            add(response, counter, timestamp)
+        # Packets pending at stop time are written, later ones are left to the caller.
+        for _ in range(self.transport.daqQueue.qsize()):
+            try:
+                response, counter, _, timestamp = get_nowait()
+            except queue.Empty:
+                break
+            add(response, counter, timestamp)
+
+    def stop(self):
+        """Stop recording, remaining packets are written, file is closed.
+        """
+        self._stopEvent.set()
+        if self._thread.is_alive():
+            self._thread.join()
+        if self.checker is not None:
+            self.checker.detach(self.transport)
+        self.writer.close()
+        self.logger.info("Recorded {} frames ({} bytes) to '{}'.".format(
+            self.writer.totalFrames, self.writer.totalBytes, self.writer.filename))
+        if self.checker is not None and not self.checker.complete:
+            transport, lists = self.checker.statistics()
+            self.logger.warn("Recording '{}' is incomplete: {}, {}.".format(self.writer.filename, transport, lists))
@@ -0,0 +1,268 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Stimulation (STIM): writing ECU variables by DTOs from the master.
+
+`Stim` packs the signals into the ODTs of a DAQ list in STIM direction
+and prebuilds one frame (transport-layer header, identification field and
+data) per ODT. Setting a signal patches its frame in place by
+`struct.Struct.pack_into`; `send` hands the frames to the transport-layer
+as they are, so the send path does not allocate::
+
+    stim = Stim(xm, eventChannel=1)
+    stim.add("throttle", 0x2000, "H")
+    stim.add("load", 0x2004, A_Float32(INTEL))
+    stim.configure()
+    stim.start()
+    stim["throttle"] = 1200
+    stim.send()                                     # on demand...
+    stim.startTimer(1000, lambda s: s.set("load", model.step()))    # ...or timed
+
+The slave applies the received data when the event channel fires.
+"""
+
+__copyright__ = """
+    pySART - Simplified AUTOSAR-Toolkit for Python.
+
+   (C) 2009-2019 by Christoph Schueler <cpu12.gems@googlemail.com>
+
+   All Rights Reserved
+
+  This program is free software; you can redistribute it and/or modify
+  it under the terms of the GNU General Public License as published by
+  the Free Software Foundation; either version 2 of the License, or
+  (at your option) any later version.
+
+  This program is distributed in the hope that it will be useful,
+  but WITHOUT ANY WARRANTY; without even the implied warranty of
+  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+  GNU General Public License for more details.
+
+  You should have received a copy of the GNU General Public License along
+  with this program; if not, write to the Free Software Foundation, Inc.,
+  51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+"""
+
+from collections import namedtuple
+import threading
+
+from pyxcp.daq.decoder import IDENTIFICATION_SIZES, structOf
+from pyxcp.logger import Logger
+from pyxcp.timing import perf_counter_ns, sleepUntil
+import pyxcp.types as types
+
+NS_PER_SECOND = 1000000000
+
+DIRECTION_STIM = 0x02
+DAQ_STOP = 0
+DAQ_START = 1
+DAQ_SELECT = 2
+
+StimSignal = namedtuple("StimSignal", "name address ext codec")
+StimSlot = namedtuple("StimSlot", "frame codec offset")     # offset in frame
+
+
+class Stim(object):
+    """STIM engine for one DAQ list.
+
+    Parameters
+    ----------
+    master : `pyxcp.master.Master`
+        Connected master.
+    daqList : int
+        DAQ list number.
+    eventChannel : int
+        Event channel at which the slave applies the data.
+    prescaler, priority : int
+    """
+
+    def __init__(self, master, daqList=0, eventChannel=0, prescaler=1, priority=0, loglevel="WARN"):
+        self.master = master
+        self.transport = master.transport
+        self.daqList = daqList
+        self.eventChannel = eventChannel
+        self.prescaler = prescaler
+        self.priority = priority
+        self.logger = Logger("daq.Stim")
+        self.logger.setLevel(loglevel)
+        self.signals = []
+        self.odts = []          # ODT number -> [StimSignal, ...]
+        self.frames = []
+        self.slots = {}
+        self.firstPid = None
+        self.framesSent = 0
+        self.cycles = 0
+        self.overruns = 0
+        self._thread = None
+        self._stopEvent = threading.Event()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def add(self, name, address, codec, ext=0):
+        """Add a signal.
+
+        Parameters
+        ----------
+        codec : str or `pyxcp.asam.types.AsamBaseType`
+            struct format, e.g. "H" (slave byte order if not given) or an
+            ASAM codec.
+        """
+        if self.frames:
+            raise RuntimeError("Signals can't be added after `configure`.")
+        self.signals.append(StimSignal(name, address, ext, structOf(codec, self._byteOrderPrefix())))
+
+    def addMeasurement(self, catalogue, name):
+        """Add MEASUREMENT or VALUE CHARACTERISTIC `name` of an A2L catalogue.
+        """
+        symbol = catalogue[name]
+        self.add(name, symbol.address, catalogue.codec(symbol), symbol.ext)
+
+    def _byteOrderPrefix(self):
+        return "<" if self.master.slaveProperties.byteOrder == types.ByteOrder.INTEL else ">"
+
+    def configure(self, freeDaq=True):
+        """Configure the DAQ list in STIM direction and prebuild the frames.
+
+        Parameters
+        ----------
+        freeDaq : bool
+            Start from scratch (FREE_DAQ, ALLOC_DAQ); otherwise `daqList`
+            must already be allocated (without ODTs).
+        """
+        master = self.master
+        info = master.getDaqProcessorInfo()
+        idSize = IDENTIFICATION_SIZES[str(info.daqKeyByte.Identification_Field)]
+        payload = master.slaveProperties.maxDto - idSize
+        self.odts = self._pack(payload)
+        if freeDaq:
+            master.freeDaq()
+            master.allocDaq(self.daqList + 1)
+        master.allocOdt(self.daqList, len(self.odts))
+        for number, signals in enumerate(self.odts):
+            master.allocOdtEntry(self.daqList, number, len(signals))
+        # Direction first, the slave needn't reserve space for timestamps.
+        master.setDaqListMode(DIRECTION_STIM, self.daqList, self.eventChannel, self.prescaler, self.priority)
+        for number, signals in enumerate(self.odts):
+            master.setDaqPtr(self.daqList, number, 0)
+            for signal in signals:
+                master.writeDaq(0xff, signal.codec.size, signal.ext, signal.address)
+        self.firstPid = master.startStopDaqList(DAQ_SELECT, self.daqList).firstPid
+        self._buildFrames(idSize)
+
+    def _pack(self, payload):
+        odts = []
+        used = payload
+        for signal in self.signals:
+            size = signal.codec.size
+            if size > payload:
+                raise ValueError("Signal '{}' does not fit into a DTO.".format(signal.name))
+            if used + size > payload:
+                odts.append([])
+                used = 0
+            odts[-1].append(signal)
+            used += size
+        return odts
+
+    def _buildFrames(self, idSize):
+        header = self.transport.HEADER_SIZE
+        daqList = self.daqList.to_bytes(2, "little" if self._byteOrderPrefix() == "<" else "big")
+        self.frames = []
+        self.slots = {}
+        for number, signals in enumerate(self.odts):
+            size = idSize + sum(s.codec.size for s in signals)
+            frame = self.transport.allocFrame(size)
+            if idSize == 1:
+                frame[header] = self.firstPid + number
+            else:
+                frame[header] = number
+                if idSize == 2:
+                    frame[header + 1] = self.daqList
+                else:
+                    frame[header + idSize - 2:header + idSize] = daqList
+            offset = header + idSize
+            for signal in signals:
+                self.slots[signal.name] = StimSlot(frame, signal.codec, offset)
+                offset += signal.codec.size
+            self.frames.append(frame)
+
+    def __setitem__(self, name, value):
+        frame, codec, offset = self.slots[name]
+        codec.pack_into(frame, offset, value)
+
+    set = __setitem__
+
+    def __getitem__(self, name):
+        frame, codec, offset = self.slots[name]
+        return codec.unpack_from(frame, offset)[0]
+
+    def start(self):
+        """Start the DAQ list (the slave accepts STIM DTOs from now on).
+        """
+        self.master.startStopDaqList(DAQ_START, self.daqList)
+
+    def stop(self):
+        """Stop the timer and the DAQ list.
+        """
+        self.stopTimer()
+        if self.frames and self.master.transport.connectionError is None:
+            try:
+                self.master.startStopDaqList(DAQ_STOP, self.daqList)
+            except types.XcpTimeoutError as e:
+                self.logger.warn("Could not stop STIM DAQ list: %s", e)
+
+    def send(self):
+        """Send the current values (one DTO per ODT).
+        """
+        sendFrame = self.transport.sendFrame
+        for frame in self.frames:
+            sendFrame(frame)
+        self.framesSent += len(self.frames)
+
+    def startTimer(self, rate, callback=None, spinTime=500000):
+        """Send `rate` times per second from a background thread.
+
+        Parameters
+        ----------
+        callback : callable
+            `callback(stim)` is called before every send to update values.
+        spinTime : int
+            s. `pyxcp.timing.sleepUntil`.
+        """
+        self.stopTimer()
+        self._stopEvent.clear()
+        period = int(round(NS_PER_SECOND / rate))
+        self._thread = threading.Thread(target=self._run, args=(period, callback, spinTime), name="XCP-Stim")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stopTimer(self):
+        self._stopEvent.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self, period, callback, spinTime):
+        stopEvent = self._stopEvent
+        deadline = perf_counter_ns()
+        while not stopEvent.is_set():
+            sleepUntil(deadline, spinTime, stopEvent)
+            if stopEvent.is_set():
+                break
+            try:
+                if callback is not None:
+                    callback(self)
+                self.send()
+            except Exception as e:
+                self.logger.error("STIM cycle failed: %s", e)
+                break
+            self.cycles += 1
+            deadline += period
+            now = perf_counter_ns()
+            if now > deadline:
+                missed = (now - deadline) // period + 1
+                self.overruns += missed
+                deadline += missed * period
@@ -31,17 +31,12 @@ import subprocess
 import sys
 
 
+from pyxcp.seedkey import (ACK, ERR_PRIVILEGE_NOT_AVAILABLE, ERR_INVALID_SEED_LENGTH,   # noqa: F401
+    ERR_UNSUFFICIENT_KEY_LENGTH, ERR_COULD_NOT_LOAD_DLL, ERR_COULD_NOT_LOAD_FUNC, HelperProvider)
+
 CMD_GET_KEY = 0x20
 CMD_QUIT    = 0x30
 
-ACK                         = 0 # o.k.
-ERR_PRIVILEGE_NOT_AVAILABLE = 1 # the requested privilege can not be unlocked with this DLL
-ERR_INVALID_SEED_LENGTH     = 2 # the seed length is wrong, key could not be computed
-ERR_UNSUFFICIENT_KEY_LENGTH = 3 # the space for the key is too small
-
-ERR_COULD_NOT_LOAD_DLL      = 16
-ERR_COULD_NOT_LOAD_FUNC     = 17
-
 bwidth, _ = platform.architecture()
 
 if sys.platform == 'win32' and bwidth == '64bit':
@@ -51,6 +46,15 @@ elif sys.platform == 'win32' and bwidth == '32bit':
 else:
   raise RuntimeError("Platform '{}' currently not supported.".format(sys.platform))
     
+def dllProvider(dllName, cacheSize=0):
+    """Seed & key provider keeping one `asamkeydll` process per DLL alive.
+
+    Returns
+    -------
+    `pyxcp.seedkey.HelperProvider`
+    """
+    return HelperProvider([prgName, dllName], cacheSize)
+
 def getKey(dllName, privilege, seed):
     p0 = subprocess.Popen([prgName, dllName, str(privilege), binascii.hexlify(seed).decode("ascii")], stdout=subprocess.PIPE, shell = True)
     key = p0.stdout.read()
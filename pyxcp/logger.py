@@ -50,26 +50,34 @@ class Logger(object):
         self.lastSeverity = self.lastMessage = None
         return result
 
-    def log(self, message, level):
-        self.lastSeverity = level
-        self.lastMessage = message
-        self.logger.log(level, "{0}".format(message))
-        # print("{0}{1}".format(level, message))
+    def isEnabledFor(self, level):
+        return self.logger.isEnabledFor(level)
 
-    def info(self, message):
-        self.log(message, logging.INFO)
+    def log(self, message, level, *args):
+        """Log `message`, %-style `args` are only merged if the message is emitted.
 
-    def warn(self, message):
-        self.log(message, logging.WARN)
+        Only warnings and above are remembered for `getLastError`.
+        """
+        if level >= logging.WARN:
+            self.lastSeverity = level
+            self.lastMessage = message % args if args else message
+        if self.logger.isEnabledFor(level):
+            self.logger.log(level, message, *args)
 
-    def debug(self, message):
-        self.log(message, logging.DEBUG)
+    def info(self, message, *args):
+        self.log(message, logging.INFO, *args)
 
-    def error(self, message):
-        self.log(message, logging.ERROR)
+    def warn(self, message, *args):
+        self.log(message, logging.WARN, *args)
 
-    def critical(self, message):
-        self.log(message, logging.CRITICAL)
+    def debug(self, message, *args):
+        self.log(message, logging.DEBUG, *args)
+
+    def error(self, message, *args):
+        self.log(message, logging.ERROR, *args)
+
+    def critical(self, message, *args):
+        self.log(message, logging.CRITICAL, *args)
 
     def verbose(self):
         self.logger.setLevel(logging.DEBUG)
@@ -40,6 +40,7 @@ from pyxcp import types
 from pyxcp.constants import (
     makeWordPacker, makeDWordPacker, makeWordUnpacker, makeDWordUnpacker)
 from pyxcp.master.errorhandler import wrapped
+from pyxcp.utils import packBytes
 
 
 class SlaveProperties(dict):
@@ -77,6 +78,14 @@ class MasterBaseType:
         self.transport.parent = self
         self.service = None
 
+        # s. `pyxcp.master.errorhandler`; set to False to get errors unaltered.
+        self.errorHandling = True
+        self._recovering = False
+        # Last known MTA (address, addressExt), required to repeat transfers.
+        self.mta = None
+        # `pyxcp.seedkey.SeedKeyProvider`, enables automatic unlocking.
+        self.seedKeyProvider = None
+
         # (D)Word (un-)packers are byte-order dependent
         # -- byte-order is returned by CONNECT_Resp (COMM_MODE_BASIC)
         self.WORD_pack = None
@@ -124,6 +133,19 @@ class MasterBaseType:
         """
         self.transport.close()
 
+    @staticmethod
+    def _payload(data):
+        """`*data` arguments as bytes-like object.
+        """
+        if len(data) == 1 and isinstance(data[0], (bytes, bytearray, memoryview)):
+            return data[0]
+        return packBytes(data)
+
+    def _advanceMta(self, count):
+        if self.mta is not None:
+            address, addressExt = self.mta
+            self.mta = (address + count, addressExt)
+
     # Mandatory Commands.
     @wrapped
     def connect(self):
@@ -285,6 +307,7 @@ class MasterBaseType:
         result = types.GetIDResponse.parse(
             response, byteOrder=self.slaveProperties.byteOrder)
         result.length = self.DWORD_unpack(response[3:7])[0]
+        self.mta = None     # Slave may have set the MTA to the identification.
         return result
 
     @wrapped
@@ -355,6 +378,39 @@ class MasterBaseType:
         return types.ResourceType.parse(
             response, byteOrder=self.slaveProperties.byteOrder)
 
+    def unlockResource(self, resource, provider=None):
+        """Run the complete GET_SEED / UNLOCK sequence.
+
+        Parameters
+        ----------
+        resource : int
+            `pyxcp.seedkey` RESOURCE_* bit.
+        provider : `pyxcp.seedkey.SeedKeyProvider`
+            Defaults to `seedKeyProvider`.
+
+        Returns
+        -------
+        bool
+            `False` if the resource wasn't protected.
+        """
+        provider = provider or self.seedKeyProvider
+        if provider is None:
+            raise RuntimeError("No seed & key provider.")
+        response = self.getSeed(0, resource)
+        if not response.length:
+            return False
+        seed = bytes(response.seed)
+        while len(seed) < response.length:
+            seed += bytes(self.getSeed(1, resource).seed)
+        key = provider.getKey(resource, seed)
+        chunkSize = self.slaveProperties.maxCto - 2
+        remaining = len(key)
+        while remaining > 0:
+            offset = len(key) - remaining
+            self.unlock(remaining, key[offset:offset + chunkSize])
+            remaining -= chunkSize
+        return True
+
     @wrapped
     def setMta(self, address, addressExt=0x00):
         """Set Memory Transfer Address in slave.
@@ -371,6 +427,7 @@ class MasterBaseType:
         addr = self.DWORD_pack(address)
         response = self.transport.request(
             types.Command.SET_MTA, 0, 0, addressExt, *addr)
+        self.mta = (address, addressExt)
         return response
 
     @wrapped
@@ -394,6 +451,7 @@ class MasterBaseType:
             block_response = self.transport.block_receive(
                 length_required=(length - len(response)))
             response += block_response
+        self._advanceMta(length)
         return response
 
     @wrapped
@@ -542,14 +600,17 @@ class MasterBaseType:
 
         Parameters
         ----------
-        data : bytes
+        data : int or bytes-like
+            Either the data bytes as separate arguments or a single
+            bytes-like object (sent without copying).
 
         .. note:: Adress is set via `setMta`
         """
-
-        length = len(data)
-        response = self.transport.request(
-            types.Command.DOWNLOAD, length, *data)
+        payload = self._payload(data)
+        length = len(payload)
+        response = self.transport.requestPayload(
+            types.Command.DOWNLOAD, bytes((length, )), payload)
+        self._advanceMta(length)
         return response
 
     @wrapped
@@ -558,12 +619,14 @@ class MasterBaseType:
 
         Parameters
         ----------
-        data : bytes
+        data : int or bytes-like
+            s. `download`.
         """
-
-        length = len(data)
-        response = self.transport.request(
-            types.Command.DOWNLOAD_NEXT, length, *data)
+        payload = self._payload(data)
+        length = len(payload)
+        response = self.transport.requestPayload(
+            types.Command.DOWNLOAD_NEXT, bytes((length, )), payload)
+        self._advanceMta(length)
         return response
 
     @wrapped
@@ -572,9 +635,12 @@ class MasterBaseType:
 
         Parameters
         ----------
-        data : bytes
+        data : int or bytes-like
+            s. `download`.
         """
-        response = self.transport.request(types.Command.DOWNLOAD_MAX, *data)
+        payload = self._payload(data)
+        response = self.transport.requestPayload(types.Command.DOWNLOAD_MAX, b"", payload)
+        self._advanceMta(len(payload))
         return response
 
     # Page Switching Commands (PAG)
@@ -1047,7 +1113,7 @@ class MasterBaseType:
             d.extend(b'\x00\x00')  # alignment bytes
         for e in data:
             d.extend(self.AG_pack(e))
-        return self.transport.request(types.Command.PROGRAM, *d)
+        return self.transport.requestPayload(types.Command.PROGRAM, b"", d)
 
     def programReset(self):
         """Indicate the end of a programming sequence."""
@@ -1090,7 +1156,7 @@ class MasterBaseType:
             d.extend(b'\x00\x00')  # alignment bytes
         for e in data:
             d.extend(self.AG_pack(e))
-        return self.transport.request(types.Command.PROGRAM_NEXT, *d)
+        return self.transport.requestPayload(types.Command.PROGRAM_NEXT, b"", d)
 
     def programMax(self, data):
         d = bytearray()
@@ -1102,7 +1168,7 @@ class MasterBaseType:
             d.extend(b'\x00\x00\x00')  # alignment bytes
         for e in data:
             d.extend(self.AG_pack(e))
-        return self.transport.request(types.Command.PROGRAM_MAX, *d)
+        return self.transport.requestPayload(types.Command.PROGRAM_MAX, b"", d)
 
     def programVerify(self, verMode, verType, verValue):
         data = bytearray()
@@ -1135,10 +1201,9 @@ class MasterBaseType:
         """
         self.setMta(addr)
         cs = self.buildChecksum(length)
-        self.logger.debug("BuildChecksum return'd: 0x{:08X} [{}]".format(
-            cs.checksum, cs.checksumType))
+        self.logger.debug("BuildChecksum return'd: 0x%08X [%s]", cs.checksum, cs.checksumType)
         self.setMta(addr)
         data = self.fetch(length)
         cc = checksum.check(data, cs.checksumType)
-        self.logger.debug("Our checksum          : 0x{:08X}".format(cc))
+        self.logger.debug("Our checksum          : 0x%08X", cc)
         return cs.checksum == cc
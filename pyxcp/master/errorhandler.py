@@ -1,7 +1,13 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
-"""
+"""XCP error handling, s. XCP spec, Part 2, chapter 1.6.
+
+The error matrix (`pyxcp.errormatrix.ERROR_MATRIX`) is compiled at import
+into per-service policy tables. The success path of a `wrapped` service is
+a single call; on `XcpResponseError` or `XcpTimeoutError` the pre-actions
+of the matching policy are executed and the service is repeated, with a
+bounded exponential backoff.
 """
 
 __copyright__ = """
@@ -26,131 +32,176 @@ __copyright__ = """
   51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
 """
 
-import inspect
 import functools
+from collections import namedtuple
+import time
+
+from pyxcp.seedkey import (CATEGORY_RESOURCES, RESOURCE_CALPAG, RESOURCE_DAQ, RESOURCE_PGM, RESOURCE_STIM,
+                           SeedKeyError)
+from pyxcp.types import COMMAND_CATEGORIES, XcpResponseError, XcpTimeoutError
+from pyxcp.errormatrix import ERROR_MATRIX, TIMEOUT, PreAction, Action, Timeout
+
+RETRY_BACKOFF = 0.005       # First delay (seconds), doubled on every repetition...
+RETRY_BACKOFF_MAX = 0.5     # ...up to this limit.
+REPEAT_LIMIT = 16           # Upper bound for "repeat infinite times".
+TIMEOUT_REPEAT_LIMIT = 2    # Upper bound on timeouts (each repetition waits a full timeout).
+
+REPEATS = {
+    Action.REPEAT: REPEAT_LIMIT,
+    Action.REPEAT_2_TIMES: 2,
+    Action.REPEAT_INF_TIMES: REPEAT_LIMIT,
+}
+
+Policy = namedtuple("Policy", "preActions action repeats")
 
-from pprint import pprint
 
-from pyxcp.types import XcpResponseError, XcpTimeoutError
-from pyxcp.errormatrix import ERROR_MATRIX, TIMEOUT, PreAction, Action
+def compilePolicies(matrix):
+    """Translate the error matrix into lookup tables.
 
-def getErrorHandler(service):
-    return ERROR_MATRIX.get(service)
+    Parameters
+    ----------
+    matrix : dict
+        service -> {error code or `TIMEOUT` -> (pre-action(s), action)}
 
-def getTimeoutHandler(service):
-    handler = getErrorHandler(service)
-    return handler.get(TIMEOUT)
+    Returns
+    -------
+    dict
+        service -> {error code or `TIMEOUT` -> `Policy`}
+    """
+    policies = {}
+    for service, handlers in matrix.items():
+        table = {}
+        for error, (preActions, action) in handlers.items():
+            if not isinstance(preActions, (tuple, list)):
+                preActions = (preActions, )
+            preActions = tuple(p for p in preActions if p != PreAction.NONE)
+            repeats = REPEATS.get(action, 0)
+            if error == TIMEOUT:
+                repeats = min(repeats, TIMEOUT_REPEAT_LIMIT)
+            table[error] = Policy(preActions, action, repeats)
+        policies[service] = table
+    return policies
+
+
+POLICIES = compilePolicies(ERROR_MATRIX)
 
-def execute(inst, func, arguments):
-    handler = Handler(inst, func, arguments)
+
+def getPolicy(service, error):
+    """
+    Returns
+    -------
+    `Policy` or None
+    """
+    table = POLICIES.get(service)
+    if table is None:
+        return None
+    return table.get(error)
+
+
+def _synch(inst, service, error):
+    try:
+        inst.synch()
+    except XcpResponseError:
+        pass    # ERR_CMD_SYNCH, slave is responsive again.
+    except XcpTimeoutError:
+        return False    # Slave doesn't respond, repeating would only add timeouts.
+    return True
+
+
+def _setMta(inst, service, error):
+    if inst.mta is None:
+        return False
+    inst.setMta(*inst.mta)
+    return True
+
+
+def _displayError(inst, service, error):
+    inst.logger.warning("%s: %s", service.name, error)
+    return True
+
+
+def _unlockSlave(inst, service, error):
+    if inst.seedKeyProvider is None:
+        return False
+    resource = CATEGORY_RESOURCES.get(COMMAND_CATEGORIES.get(service))
+    if resource is not None:
+        resources = (resource, )
+    else:   # No resource associated with command, unlock everything locked.
+        status = inst.getStatus().resourceProtectionStatus
+        resources = [r for r, locked in ((RESOURCE_CALPAG, status.calpag), (RESOURCE_DAQ, status.daq),
+                                         (RESOURCE_STIM, status.stim), (RESOURCE_PGM, status.pgm)) if locked]
     try:
-        res = func(*arguments.args, **arguments.kwargs)
-    except XcpResponseError as e:
-        errorCode = XcpResponseError(e.args[0])
-        handler.handleError(errorCode)
-        raise
-    except XcpTimeoutError as e:
-        handler.handleTimeout()
-        raise
-    except Exception:
-        raise
-    else:
-        return res
-
-class Arguments:
-    """Container for positional and keyword arguments.
+        for resource in resources:
+            inst.unlockResource(resource)
+    except SeedKeyError as e:
+        inst.logger.error("Unlocking resource 0x%02X failed: %s", resource, e)
+        return False
+    return bool(resources)
+
+
+def _wait(inst, service, error):
+    time.sleep(inst.transport.timeouts[Timeout.T7])    # The backoff of `recover` adds to it.
+    return True
+
+
+PRE_ACTIONS = {
+    PreAction.WAIT_T7: _wait,
+    PreAction.SYNCH: _synch,
+    PreAction.SET_MTA: _setMta,
+    PreAction.DISPLAY_ERROR: _displayError,
+    PreAction.UNLOCK_SLAVE: _unlockSlave,
+}
+
+
+def recover(inst, func, args, kwargs, exc):
+    """Run the policies for `exc` and repeat `func` until it succeeds.
+
+    The original exception is re-raised if there is no applicable policy,
+    a pre-action is not supported or the repetitions are exhausted.
     """
-    def __init__(self, args, kwargs):
-        self.args = args
-        self.kwargs = kwargs
-
-
-class Handler:
-
-    def __init__(self, instance, func, args):
-        self.instance = instance
-        self.func = func
-        self.args = args
-
-    def handleError(self, errorCode):
-        eh = getErrorHandler(self.service)
-
-    def handleTimeout(self):
-        preActions, actions = getTimeoutHandler(self.service)
-        print("\tTOH", preActions, actions)
-        self.doPreActions(preActions)
-        self.doActions(actions)
-
-    def doPreActions(self, preActions):
-        """
-            NONE
-            WAIT_T7
-            SYNCH
-            GET_SEED_UNLOCK
-            SET_MTA
-            SET_DAQ_PTR
-            START_STOP_X
-            REINIT_DAQ
-            DISPLAY_ERROR
-            DOWNLOAD
-            PROGRAM
-            UPLOAD
-            UNLOCK_SLAVE
-        """
-        if isinstance(preActions, (tuple, list)):
-            for item in preActions:
-                print("\t", item)
-                self.doPreAction(item)
-        else:
-            self.doPreAction(preActions)
-
-    def doPreAction(self, preAction):
-        if preAction == PreAction.NONE:
-            print("\t\tNOP")
-
-    def doActions(self, actions):
-        if isinstance(actions, (tuple, list)):
-            for item in actions:
-                print("\t", item)
-                self.doAction(item)
-        else:
-            self.doAction(actions)
-
-
-    def doAction(self, action):
-        """
-            NONE
-            DISPLAY_ERROR
-            RETRY_SYNTAX
-            RETRY_PARAM
-            USE_A2L
-            USE_ALTERATIVE
-            REPEAT
-            REPEAT_2_TIMES
-            REPEAT_INF_TIMES
-            RESTART_SESSION
-            TERMINATE_SESSION
-            SKIP
-            NEW_FLASH_WARE
-        """
-        #print("ACTION", action)
-        if action in (Action.NONE, Action.SKIP):
-            print("\t\tNOP")
-        elif action == Action.REPEAT_INF_TIMES:
-            print("\tREPEAT_INF_TIMES", self.func)
-
-    @property
-    def service(self):
-        return self.instance.service
+    if inst._recovering or not inst.errorHandling:
+        raise exc
+    inst._recovering = True
+    try:
+        backoff = RETRY_BACKOFF
+        repetition = 0
+        while True:
+            service = inst.service
+            error = TIMEOUT if isinstance(exc, XcpTimeoutError) else exc.args[0]
+            policy = getPolicy(service, error)
+            if policy is None:
+                raise exc
+            if policy.action == Action.RESTART_SESSION:
+                # The service itself is not repeated, the session state is gone.
+                inst.logger.warning("%s: %s -- restarting session.", service.name, error)
+                inst.connect()
+                raise exc
+            if repetition >= policy.repeats:
+                raise exc
+            for preAction in policy.preActions:
+                handler = PRE_ACTIONS.get(preAction)
+                if handler is None or not handler(inst, service, error):
+                    raise exc
+            if error != TIMEOUT:
+                time.sleep(backoff)
+                backoff = min(backoff * 2, RETRY_BACKOFF_MAX)
+            repetition += 1
+            inst.logger.debug("Repeating %s after %s (%d/%d).", service.name, error, repetition, policy.repeats)
+            try:
+                return func(*args, **kwargs)
+            except (XcpResponseError, XcpTimeoutError) as e:
+                exc = e
+    finally:
+        inst._recovering = False
 
 
 def wrapped(func):
-    """WIP: This decorator will do XCP error-handling.
+    """Apply XCP error-handling to a service of `pyxcp.master.base.MasterBaseType`.
     """
     @functools.wraps(func)
-    def inner(*args, **kwargs):
-        inst = args[0] # First parameter is 'self'.
-        arguments = Arguments(args, kwargs)
-        handler = Handler(inst, func, arguments)
-        return execute(inst, func, arguments)
+    def inner(self, *args, **kwargs):
+        try:
+            return func(self, *args, **kwargs)
+        except (XcpResponseError, XcpTimeoutError) as e:
+            return recover(self, func, (self, ) + args, kwargs, e)
     return inner
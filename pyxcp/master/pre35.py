@@ -34,12 +34,11 @@ class Master(MasterBaseType):
 
     @wrapped
     def shortDownload(self, address, addressExt, *data):
-        length = len(data)
+        payload = self._payload(data)
         addr = self.DWORD_pack(address)
-        addr_data = flatten(addr, data)
-        response = self.transport.request(
+        response = self.transport.requestPayload(
             types.Command.SHORT_DOWNLOAD,
-            length, 0, addressExt, *addr_data)
+            bytes([len(payload), 0, addressExt] + list(addr)), payload)
         return response
 
     @wrapped
@@ -33,10 +33,10 @@ class Master(MasterBaseType):
 
     @wrapped
     def shortDownload(self, address, addressExt, *data):
-        length = len(data)
+        payload = self._payload(data)
         addr = self.DWORD_pack(address)
-        response = self.transport.request(
-            types.Command.SHORT_DOWNLOAD, length, 0, addressExt, *addr, *data)
+        response = self.transport.requestPayload(
+            types.Command.SHORT_DOWNLOAD, bytes((len(payload), 0, addressExt, *addr)), payload)
         return response
 
     @wrapped
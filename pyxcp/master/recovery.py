@@ -0,0 +1,279 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Automatic session recovery.
+
+If the transport-layer loses its connection (e.g. the ECU was reset), the
+session is re-established in the background: reconnect with exponential
+backoff, CONNECT, unlock the previously unlocked resources, restore the
+calibration pages and replay the DAQ configuration, finally the DAQ lists
+are restarted::
+
+    xm.connect()
+    recovery = SessionRecovery(xm, keyFunction=myKeyFunction)
+    ... configure and start DAQ ...
+
+Detection is currently supported by `pyxcp.transport.eth.Eth` (TCP);
+`SessionRecovery.recover` may be called to trigger a recovery manually.
+"""
+
+__copyright__ = """
+    pySART - Simplified AUTOSAR-Toolkit for Python.
+
+   (C) 2009-2019 by Christoph Schueler <cpu12.gems@googlemail.com>
+
+   All Rights Reserved
+
+  This program is free software; you can redistribute it and/or modify
+  it under the terms of the GNU General Public License as published by
+  the Free Software Foundation; either version 2 of the License, or
+  (at your option) any later version.
+
+  This program is distributed in the hope that it will be useful,
+  but WITHOUT ANY WARRANTY; without even the implied warranty of
+  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+  GNU General Public License for more details.
+
+  You should have received a copy of the GNU General Public License along
+  with this program; if not, write to the Free Software Foundation, Inc.,
+  51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+"""
+
+from collections import OrderedDict
+import threading
+
+from pyxcp.logger import Logger
+from pyxcp.seedkey import CallbackProvider
+from pyxcp.types import Command, XcpResponseError
+
+# Commands building up the DAQ configuration, replayed in order.
+DAQ_CONFIGURATION = frozenset((
+    Command.CLEAR_DAQ_LIST,
+    Command.SET_DAQ_PTR,
+    Command.WRITE_DAQ,
+    Command.WRITE_DAQ_MULTIPLE,
+    Command.SET_DAQ_LIST_MODE,
+    Command.ALLOC_DAQ,
+    Command.ALLOC_ODT,
+    Command.ALLOC_ODT_ENTRY,
+    Command.SET_DAQ_PACKED_MODE,
+    Command.DTO_CTR_PROPERTIES,
+))
+
+DAQ_STOPPED = 0
+DAQ_STARTED = 1
+DAQ_SELECTED = 2
+
+
+class SessionJournal:
+    """Records the session state established by successful requests.
+
+    Installed as `pyxcp.transport.base.BaseTransport.journal`.
+    """
+
+    def __init__(self):
+        self.daqConfiguration = []
+        self.daqListState = OrderedDict()   # packed DAQ list number -> DAQ_*
+        self.calPages = OrderedDict()       # (mode, segment) -> page
+        self.unlockedResources = set()
+        self._seedResource = None
+        self._lock = threading.Lock()
+
+    def record(self, cmd, data):
+        with self._lock:
+            if cmd in DAQ_CONFIGURATION:
+                self.daqConfiguration.append((cmd, data))
+            elif cmd == Command.FREE_DAQ:
+                self.daqConfiguration = []
+                self.daqListState.clear()
+            elif cmd == Command.START_STOP_DAQ_LIST:
+                self.daqListState[tuple(data[1:])] = data[0]
+            elif cmd == Command.START_STOP_SYNCH:
+                self._startStopSynch(data[0])
+            elif cmd == Command.SET_CAL_PAGE:
+                mode, segment, page = data
+                self.calPages[(mode, segment)] = page
+            elif cmd == Command.GET_SEED:
+                first, resource = data
+                if first == 0:
+                    self._seedResource = resource
+            elif cmd == Command.UNLOCK:
+                if self._seedResource is not None:
+                    self.unlockedResources.add(self._seedResource)
+                    self._seedResource = None
+
+    def _startStopSynch(self, mode):
+        state = self.daqListState
+        for daqList, current in state.items():
+            if mode == 0:
+                state[daqList] = DAQ_STOPPED
+            elif current == DAQ_SELECTED:
+                state[daqList] = DAQ_STARTED if mode == 1 else DAQ_STOPPED
+
+    def clear(self):
+        with self._lock:
+            self.daqConfiguration = []
+            self.daqListState.clear()
+            self.calPages.clear()
+            self.unlockedResources.clear()
+            self._seedResource = None
+
+    def snapshot(self):
+        with self._lock:
+            return (list(self.daqConfiguration), OrderedDict(self.daqListState),
+                    OrderedDict(self.calPages), set(self.unlockedResources))
+
+
+class SessionRecovery:
+    """Re-establish a broken session.
+
+    Parameters
+    ----------
+    master : `pyxcp.master.Master`
+        Connected master.
+    keyFunction : callable
+        `keyFunction(resource, seed) -> key` (bytes), required to unlock
+        protected resources again if the master has no `seedKeyProvider`.
+    backoff : float
+        First delay between reconnect attempts (seconds), doubled on every
+        failed attempt...
+    maxBackoff : float
+        ...up to this limit.
+    maxAttempts : int
+        Give up after so many attempts, `None` means never.
+    """
+
+    def __init__(self, master, keyFunction=None, backoff=0.1, maxBackoff=5.0,
+                 maxAttempts=20, loglevel="WARN"):
+        self.master = master
+        self.transport = master.transport
+        self.seedKeyProvider = CallbackProvider(keyFunction) if keyFunction else None
+        self.backoff = backoff
+        self.maxBackoff = maxBackoff
+        self.maxAttempts = maxAttempts
+        self.logger = Logger("master.Recovery")
+        self.logger.setLevel(loglevel)
+        self.journal = SessionJournal()
+        self.recoveries = 0
+        self.lastError = None
+        self.recovered = threading.Event()
+        self.recovered.set()
+        self._thread = None
+        self._stopEvent = threading.Event()
+        self.transport.journal = self.journal
+        self.transport.onConnectionLost = self._connectionLost
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        """Stop observing the transport-layer.
+        """
+        self._stopEvent.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+        if self.transport.journal is self.journal:
+            self.transport.journal = None
+        if self.transport.onConnectionLost == self._connectionLost:
+            self.transport.onConnectionLost = None
+
+    @property
+    def active(self):
+        return not self.recovered.is_set()
+
+    def wait(self, timeout=None):
+        """Wait until a running recovery is finished.
+
+        Returns
+        -------
+        bool
+            `False` on timeout.
+        """
+        return self.recovered.wait(timeout)
+
+    def _connectionLost(self, exc):
+        self.recover()
+
+    def recover(self):
+        """Start recovery in a background thread (no-op if already running).
+        """
+        if self._stopEvent.is_set() or self.active:
+            return
+        self.recovered.clear()
+        self._thread = threading.Thread(target=self._run, name="XCP-Recovery")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _run(self):
+        delay = self.backoff
+        attempt = 0
+        master = self.master
+        try:
+            # Hold the request lock, user requests are blocked meanwhile.
+            with self.transport.requestLock:
+                master._recovering = True
+                while not self._stopEvent.is_set():
+                    attempt += 1
+                    try:
+                        self.transport.reconnect()
+                        master.connect()
+                        self._restore()
+                    except XcpResponseError as e:
+                        self.lastError = e
+                        self.logger.error("Session recovery failed: %s", e)
+                        return
+                    except Exception as e:
+                        self.lastError = e
+                        self.logger.warn("Reconnect attempt %d failed: %s", attempt, e)
+                        if self.maxAttempts is not None and attempt >= self.maxAttempts:
+                            self.logger.error("Giving up session recovery after %d attempts.", attempt)
+                            return
+                        self._stopEvent.wait(delay)
+                        delay = min(delay * 2, self.maxBackoff)
+                    else:
+                        self.recoveries += 1
+                        self.lastError = None
+                        self.logger.info("Session recovered after %d attempt(s).", attempt)
+                        return
+        finally:
+            master._recovering = False
+            self.recovered.set()
+
+    def _restore(self):
+        # Replayed requests must not be journaled again.
+        self.transport.journal = None
+        try:
+            self._replay()
+        finally:
+            self.transport.journal = self.journal
+
+    def _replay(self):
+        daqConfiguration, daqListState, calPages, unlockedResources = self.journal.snapshot()
+        master = self.master
+        request = self.transport.request
+        for resource in sorted(unlockedResources):
+            self._unlock(resource)
+        for (mode, segment), page in calPages.items():
+            master.setCalPage(mode, segment, page)
+        if any(cmd == Command.ALLOC_DAQ for cmd, _ in daqConfiguration):
+            master.freeDaq()    # Dynamic configuration, static DAQ lists can't be freed.
+        for cmd, data in daqConfiguration:
+            request(cmd, *data)
+        started = [daqList for daqList, state in daqListState.items() if state == DAQ_STARTED]
+        selected = [daqList for daqList, state in daqListState.items() if state == DAQ_SELECTED]
+        for daqList in started:
+            request(Command.START_STOP_DAQ_LIST, DAQ_SELECTED, *daqList)
+        if started:
+            request(Command.START_STOP_SYNCH, 1)
+        for daqList in selected:
+            request(Command.START_STOP_DAQ_LIST, DAQ_SELECTED, *daqList)
+
+    def _unlock(self, resource):
+        provider = self.seedKeyProvider or self.master.seedKeyProvider
+        if provider is None:
+            self.logger.warn("No seed & key provider, resource 0x%02X stays locked.", resource)
+            return
+        self.master.unlockResource(resource, provider)
@@ -0,0 +1,238 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Runtime metrics of the transport-layer.
+
+Metrics are disabled by default; the hot paths only test
+`transport.metrics` for `None`. Enable them with
+`pyxcp.transport.base.BaseTransport.enableMetrics`::
+
+    metrics = xm.transport.enableMetrics()
+    ...
+    print(metrics.prometheus())
+
+`TransportMetrics` defines the hook methods called by the transport-layer,
+derive from it to forward events elsewhere (statsd, logging, ...).
+"""
+
+__copyright__ = """
+    pySART - Simplified AUTOSAR-Toolkit for Python.
+
+   (C) 2009-2019 by Christoph Schueler <cpu12.gems@googlemail.com>
+
+   All Rights Reserved
+
+  This program is free software; you can redistribute it and/or modify
+  it under the terms of the GNU General Public License as published by
+  the Free Software Foundation; either version 2 of the License, or
+  (at your option) any later version.
+
+  This program is distributed in the hope that it will be useful,
+  but WITHOUT ANY WARRANTY; without even the implied warranty of
+  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+  GNU General Public License for more details.
+
+  You should have received a copy of the GNU General Public License along
+  with this program; if not, write to the Free Software Foundation, Inc.,
+  51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+"""
+
+from collections import OrderedDict
+import threading
+
+from pyxcp.timing import Histogram
+
+PACKET_TYPES = {
+    0xff: "RES",
+    0xfe: "ERR",
+    0xfd: "EV",
+    0xfc: "SERV",
+}
+
+SUMMARY_QUANTILES = (50.0, 90.0, 99.0, 99.9)
+
+
+def _labelText(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join('{}="{}"'.format(k, str(v).replace('"', '\\"')) for k, v in labels) + "}"
+
+
+class Metric:
+    """Base class of all metric types.
+
+    Values are kept per label set; labels are tuples of (name, value) pairs,
+    e.g. `(("command", "CONNECT"), )`.
+    """
+
+    kind = None
+
+    def __init__(self, name, help=""):
+        self.name = name
+        self.help = help
+        self.values = {}
+
+    def reset(self):
+        self.values = {}
+
+    def snapshot(self):
+        return {labels: value for labels, value in list(self.values.items())}
+
+    def prometheusLines(self):
+        for labels, value in sorted(self.snapshot().items()):
+            yield "{}{} {}".format(self.name, _labelText(labels), value)
+
+
+class Counter(Metric):
+
+    kind = "counter"
+
+    def inc(self, value=1, labels=()):
+        values = self.values
+        values[labels] = values.get(labels, 0) + value
+
+
+class Gauge(Metric):
+
+    kind = "gauge"
+
+    def set(self, value, labels=()):
+        self.values[labels] = value
+
+
+class Summary(Metric):
+    """Distribution of observed values, backed by `pyxcp.timing.Histogram`.
+
+    Parameters
+    ----------
+    scale : float
+        Factor applied on export, e.g. 1e-9 to report nanoseconds as seconds.
+    """
+
+    kind = "summary"
+
+    def __init__(self, name, help="", scale=1.0):
+        super(Summary, self).__init__(name, help)
+        self.scale = scale
+
+    def observe(self, value, labels=()):
+        histogram = self.values.get(labels)
+        if histogram is None:
+            histogram = self.values[labels] = Histogram()
+        histogram.record(value)
+
+    def snapshot(self):
+        return {labels: h.snapshot() for labels, h in list(self.values.items())}
+
+    def prometheusLines(self):
+        scale = self.scale
+        for labels, histogram in sorted(self.snapshot().items()):
+            for quantile, value in sorted(histogram.percentiles(SUMMARY_QUANTILES).items()):
+                quantileLabels = labels + (("quantile", "{:g}".format(quantile / 100.0)), )
+                yield "{}{} {}".format(self.name, _labelText(quantileLabels), value * scale)
+            yield "{}_sum{} {}".format(self.name, _labelText(labels), histogram.total * scale)
+            yield "{}_count{} {}".format(self.name, _labelText(labels), histogram.count)
+
+
+class MetricsRegistry:
+    """Collection of named metrics.
+    """
+
+    def __init__(self):
+        self.metrics = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _register(self, klass, name, *args):
+        with self._lock:
+            metric = self.metrics.get(name)
+            if metric is None:
+                metric = self.metrics[name] = klass(name, *args)
+            elif not isinstance(metric, klass):
+                raise TypeError("Metric '{}' already registered as {}.".format(name, metric.kind))
+            return metric
+
+    def counter(self, name, help=""):
+        return self._register(Counter, name, help)
+
+    def gauge(self, name, help=""):
+        return self._register(Gauge, name, help)
+
+    def summary(self, name, help="", scale=1.0):
+        return self._register(Summary, name, help, scale)
+
+    def reset(self):
+        for metric in self.metrics.values():
+            metric.reset()
+
+    def snapshot(self):
+        """Current values as nested dict.
+
+        Returns
+        -------
+        dict
+            metric name -> {label string -> value}; summaries are reported
+            as `pyxcp.timing.Histogram.summary` dicts.
+        """
+        result = OrderedDict()
+        for name, metric in self.metrics.items():
+            values = {}
+            for labels, value in metric.snapshot().items():
+                key = ",".join("{}={}".format(k, v) for k, v in labels)
+                values[key] = value.summary() if isinstance(metric, Summary) else value
+            result[name] = values
+        return result
+
+    def prometheus(self):
+        """Prometheus text exposition format.
+        """
+        lines = []
+        for name, metric in self.metrics.items():
+            if metric.help:
+                lines.append("# HELP {} {}".format(name, metric.help))
+            lines.append("# TYPE {} {}".format(name, metric.kind))
+            lines.extend(metric.prometheusLines())
+        return "\n".join(lines) + "\n"
+
+
+class TransportMetrics(MetricsRegistry):
+    """Metrics updated by `pyxcp.transport.base.BaseTransport`.
+    """
+
+    def __init__(self):
+        super(TransportMetrics, self).__init__()
+        self.requests = self.counter("pyxcp_requests_total", "Requests sent.")
+        self.bytesSent = self.counter("pyxcp_sent_bytes_total", "Bytes sent, including transport-layer header.")
+        self.bytesReceived = self.counter("pyxcp_received_bytes_total", "Packet bytes received.")
+        self.packets = self.counter("pyxcp_received_packets_total", "Packets received by type.")
+        self.errors = self.counter("pyxcp_errors_total", "Error responses.")
+        self.timeouts = self.counter("pyxcp_timeouts_total", "Requests without response.")
+        self.latency = self.summary("pyxcp_request_latency_seconds", "Request round trip time.", 1e-9)
+        self.daqQueueDepth = self.gauge("pyxcp_daq_queue_depth", "Packets waiting in DAQ queue.")
+        self._commandLabels = {}
+
+    def _labels(self, cmd):
+        labels = self._commandLabels.get(cmd)
+        if labels is None:
+            labels = self._commandLabels[cmd] = (("command", cmd.name), )
+        return labels
+
+    def requestSent(self, cmd, length):
+        labels = self._labels(cmd)
+        self.requests.inc(1, labels)
+        self.bytesSent.inc(length)
+
+    def responseReceived(self, cmd, length, elapsed):
+        self.latency.observe(elapsed, self._labels(cmd))
+
+    def errorReceived(self, cmd, error):
+        self.errors.inc(1, self._labels(cmd) + (("error", str(error)), ))
+
+    def timeout(self, cmd):
+        self.timeouts.inc(1, self._labels(cmd))
+
+    def packetReceived(self, pid, length):
+        self.packets.inc(1, (("type", PACKET_TYPES.get(pid, "DAQ")), ))
+        self.bytesReceived.inc(length)
+
+    def daqReceived(self, length, queueDepth):
+        self.daqQueueDepth.set(queueDepth)
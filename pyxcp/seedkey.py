@@ -0,0 +1,305 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Seed & key computation.
+
+A `SeedKeyProvider` computes the key to unlock a protected resource. Assign
+one to `pyxcp.master.Master.seedKeyProvider` and protected resources are
+unlocked on demand (`ERR_ACCESS_LOCKED`), s. `pyxcp.master.errorhandler`::
+
+    xm.seedKeyProvider = CallbackProvider(myAlgorithm)         # in-process
+    xm.seedKeyProvider = HelperProvider(["python", "-m", "pyxcp.seedkey", "mypkg.keys:compute"])
+
+`HelperProvider` talks to a long-lived helper process via a line based
+pipe protocol, one request per line::
+
+    -> <resource> <seed as hex>
+    <- <return code> <key as hex>
+
+`serve` implements the helper side, `python -m pyxcp.seedkey module:function`
+runs a Python function `function(resource, seed) -> key` as helper.
+"""
+
+__copyright__ = """
+    pySART - Simplified AUTOSAR-Toolkit for Python.
+
+   (C) 2009-2019 by Christoph Schueler <cpu12.gems@googlemail.com>
+
+   All Rights Reserved
+
+  This program is free software; you can redistribute it and/or modify
+  it under the terms of the GNU General Public License as published by
+  the Free Software Foundation; either version 2 of the License, or
+  (at your option) any later version.
+
+  This program is distributed in the hope that it will be useful,
+  but WITHOUT ANY WARRANTY; without even the implied warranty of
+  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+  GNU General Public License for more details.
+
+  You should have received a copy of the GNU General Public License along
+  with this program; if not, write to the Free Software Foundation, Inc.,
+  51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+"""
+
+import abc
+import binascii
+from collections import OrderedDict
+import importlib
+import queue
+import subprocess
+import sys
+import threading
+
+from pyxcp.types import CommandCategory
+
+ACK                         = 0 # o.k.
+ERR_PRIVILEGE_NOT_AVAILABLE = 1 # the requested privilege can not be unlocked with this DLL
+ERR_INVALID_SEED_LENGTH     = 2 # the seed length is wrong, key could not be computed
+ERR_UNSUFFICIENT_KEY_LENGTH = 3 # the space for the key is too small
+
+ERR_COULD_NOT_LOAD_DLL      = 16
+ERR_COULD_NOT_LOAD_FUNC     = 17
+ERR_HELPER                  = 32 # helper process died or misbehaved
+
+HELPER_TIMEOUT = 5.0
+
+RESOURCE_CALPAG = 0x01
+RESOURCE_DAQ = 0x04
+RESOURCE_STIM = 0x08
+RESOURCE_PGM = 0x10
+
+CATEGORY_RESOURCES = {
+    CommandCategory.CAL: RESOURCE_CALPAG,
+    CommandCategory.PAG: RESOURCE_CALPAG,
+    CommandCategory.DAQ: RESOURCE_DAQ,
+    CommandCategory.PGM: RESOURCE_PGM,
+}
+
+
+class SeedKeyError(Exception):
+    """Key could not be computed.
+
+    Parameters
+    ----------
+    returnCode : int
+        ERR_* code.
+    """
+
+    def __init__(self, returnCode, message=""):
+        super(SeedKeyError, self).__init__(returnCode, message)
+        self.returnCode = returnCode
+
+
+def hexlify(data):
+    return binascii.hexlify(bytes(data)).decode("ascii")
+
+
+class SeedKeyProvider(metaclass=abc.ABCMeta):
+    """Base class of seed & key providers.
+
+    Parameters
+    ----------
+    cacheSize : int
+        Remember so many seed -> key pairs; only safe for deterministic
+        algorithms. 0 disables the cache.
+    """
+
+    def __init__(self, cacheSize=0):
+        self.cacheSize = cacheSize
+        self._cache = OrderedDict()
+        self._cacheLock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def getKey(self, resource, seed):
+        """Key for `seed`.
+
+        Parameters
+        ----------
+        resource : int
+            RESOURCE_* bit.
+        seed : bytes
+
+        Returns
+        -------
+        bytes
+
+        Raises
+        ------
+        `SeedKeyError`
+        """
+        seed = bytes(seed)
+        if not self.cacheSize:
+            return self.computeKey(resource, seed)
+        cacheKey = (resource, seed)
+        with self._cacheLock:
+            key = self._cache.get(cacheKey)
+            if key is not None:
+                self._cache.move_to_end(cacheKey)
+                self.hits += 1
+                return key
+        key = self.computeKey(resource, seed)
+        with self._cacheLock:
+            self.misses += 1
+            self._cache[cacheKey] = key
+            if len(self._cache) > self.cacheSize:
+                self._cache.popitem(last=False)
+        return key
+
+    @abc.abstractmethod
+    def computeKey(self, resource, seed):
+        pass
+
+    def close(self):
+        pass
+
+
+class CallbackProvider(SeedKeyProvider):
+    """In-process computation by `function(resource, seed) -> key`.
+    """
+
+    def __init__(self, function, cacheSize=0):
+        super(CallbackProvider, self).__init__(cacheSize)
+        self.function = function
+
+    def computeKey(self, resource, seed):
+        return bytes(self.function(resource, seed))
+
+
+class HelperProvider(SeedKeyProvider):
+    """Computation by a long-lived helper process (s. module docstring).
+
+    The helper is started on first use and restarted if it died.
+
+    Parameters
+    ----------
+    args : list of str
+        Command line of the helper.
+    timeout : float
+        Seconds to wait for a key; a helper exceeding it is killed.
+    """
+
+    def __init__(self, args, cacheSize=0, timeout=HELPER_TIMEOUT):
+        super(HelperProvider, self).__init__(cacheSize)
+        self.args = list(args)
+        self.timeout = timeout
+        self.process = None
+        self._lock = threading.Lock()
+
+    def _start(self):
+        self.process = subprocess.Popen(
+            self.args, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+            universal_newlines=True, bufsize=1)
+
+    def computeKey(self, resource, seed):
+        with self._lock:
+            if self.process is None or self.process.poll() is not None:
+                self._start()
+            try:
+                self.process.stdin.write("{} {}\n".format(resource, hexlify(seed)))
+                self.process.stdin.flush()
+                line = self._readLine()
+            except OSError as e:
+                self._stop()
+                raise SeedKeyError(ERR_HELPER, str(e)) from None
+            if line is None:
+                self.process.kill()
+                self._stop()
+                raise SeedKeyError(ERR_HELPER, "Helper process timed out.")
+        fields = line.split()
+        if not fields:
+            with self._lock:
+                self._stop()
+            raise SeedKeyError(ERR_HELPER, "Helper process terminated.")
+        returnCode = int(fields[0])
+        if returnCode != ACK:
+            raise SeedKeyError(returnCode)
+        return binascii.unhexlify(fields[1]) if len(fields) > 1 else b""
+
+    def _readLine(self):
+        """Next line of the helper or None after `timeout` (pipes can't be
+        polled portably, so a thread does the blocking read).
+        """
+        lines = queue.Queue()
+        stdout = self.process.stdout
+
+        def read():
+            try:
+                lines.put(stdout.readline())
+            except (OSError, ValueError):
+                lines.put("")
+        reader = threading.Thread(target=read, name="SeedKey-Helper")
+        reader.daemon = True
+        reader.start()
+        try:
+            return lines.get(timeout=self.timeout)
+        except queue.Empty:
+            return None
+
+    def _stop(self):
+        process, self.process = self.process, None
+        if process is None:
+            return
+        try:
+            process.stdin.close()
+        except OSError:
+            pass
+        try:
+            process.wait(1.0)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+        process.stdout.close()
+
+    def close(self):
+        with self._lock:
+            self._stop()
+
+
+def serve(function, infile=None, outfile=None):
+    """Helper side of the pipe protocol.
+
+    Parameters
+    ----------
+    function : callable
+        `function(resource, seed) -> key`, may raise `SeedKeyError`.
+    """
+    infile = infile or sys.stdin
+    outfile = outfile or sys.stdout
+    for line in infile:
+        fields = line.split()
+        if not fields:
+            continue
+        try:
+            resource = int(fields[0])
+            seed = binascii.unhexlify(fields[1]) if len(fields) > 1 else b""
+            key = hexlify(function(resource, seed))
+        except SeedKeyError as e:
+            outfile.write("{}\n".format(e.returnCode))
+        except Exception:
+            outfile.write("{}\n".format(ERR_PRIVILEGE_NOT_AVAILABLE))
+        else:
+            outfile.write("{} {}\n".format(ACK, key))
+        outfile.flush()
+
+
+def main(args=None):
+    args = sys.argv[1:] if args is None else args
+    if len(args) != 1 or ":" not in args[0]:
+        sys.stderr.write("usage: python -m pyxcp.seedkey module:function\n")
+        return 2
+    moduleName, functionName = args[0].split(":", 1)
+    function = getattr(importlib.import_module(moduleName), functionName)
+    serve(function)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
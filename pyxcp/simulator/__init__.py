@@ -0,0 +1,43 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""In-process XCP slave simulator.
+
+Usable without hardware, e.g. for tests and benchmarks::
+
+    from pyxcp.master import Master
+    from pyxcp.simulator import EthServer, Slave
+    from pyxcp.transport.eth import Eth
+
+    with EthServer(Slave()) as server:
+        with Master(Eth(port=server.port)) as xm:
+            xm.connect()
+"""
+
+__copyright__ = """
+    pySART - Simplified AUTOSAR-Toolkit for Python.
+
+   (C) 2009-2019 by Christoph Schueler <cpu12.gems@googlemail.com>
+
+   All Rights Reserved
+
+  This program is free software; you can redistribute it and/or modify
+  it under the terms of the GNU General Public License as published by
+  the Free Software Foundation; either version 2 of the License, or
+  (at your option) any later version.
+
+  This program is distributed in the hope that it will be useful,
+  but WITHOUT ANY WARRANTY; without even the implied warranty of
+  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+  GNU General Public License for more details.
+
+  You should have received a copy of the GNU General Public License along
+  with this program; if not, write to the Free Software Foundation, Inc.,
+  51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+"""
+
+from .slave import (
+    CalSegment, EventChannel, Memory, Region, Slave, SlaveError, xorKey,
+    RESOURCE_CALPAG, RESOURCE_DAQ, RESOURCE_PGM, RESOURCE_STIM,
+)
+from .server import CanServer, EthServer, SxIServer
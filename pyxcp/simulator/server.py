@@ -0,0 +1,321 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Transport-layer frontends of the simulated XCP slave.
+
+Every server owns a `pyxcp.simulator.slave.Slave`, runs a receive thread
+feeding CTOs to `Slave.handle` and is registered as the slave's `output`.
+"""
+
+__copyright__ = """
+    pySART - Simplified AUTOSAR-Toolkit for Python.
+
+   (C) 2009-2019 by Christoph Schueler <cpu12.gems@googlemail.com>
+
+   All Rights Reserved
+
+  This program is free software; you can redistribute it and/or modify
+  it under the terms of the GNU General Public License as published by
+  the Free Software Foundation; either version 2 of the License, or
+  (at your option) any later version.
+
+  This program is distributed in the hope that it will be useful,
+  but WITHOUT ANY WARRANTY; without even the implied warranty of
+  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+  GNU General Public License for more details.
+
+  You should have received a copy of the GNU General Public License along
+  with this program; if not, write to the Free Software Foundation, Inc.,
+  51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+"""
+
+import abc
+import os
+import queue
+import select
+import socket
+import struct
+import threading
+
+try:
+    import tty
+except ImportError:
+    HAS_PTY = False
+else:
+    HAS_PTY = hasattr(os, "openpty")
+
+from pyxcp.logger import Logger
+from pyxcp.transport.virtualcan import VirtualCan
+
+HEADER = struct.Struct("<HH")   # XCP on Ethernet / SxI: length, counter.
+
+POLL_INTERVAL = 0.1
+
+
+class SimulatorServer(metaclass=abc.ABCMeta):
+    """Common part of the simulator frontends.
+
+    Parameters
+    ----------
+    slave : `pyxcp.simulator.slave.Slave`
+    """
+
+    def __init__(self, slave, loglevel="WARN"):
+        self.slave = slave
+        self.logger = Logger("simulator.{}".format(self.__class__.__name__))
+        self.logger.setLevel(loglevel)
+        self.counter = 0
+        self._sendLock = threading.Lock()
+        self._stopEvent = threading.Event()
+        self._thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def start(self):
+        self.slave.output = self.send
+        self._stopEvent.clear()
+        self._thread = threading.Thread(target=self.run, name="XCP-Simulator-{}".format(
+            self.__class__.__name__))
+        self._thread.daemon = True
+        self._thread.start()
+        self.slave.start()
+
+    def stop(self):
+        self.slave.stop()
+        self._stopEvent.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.slave.output = None
+        self.closeConnection()
+
+    def frame(self, packet):
+        """Prepend transport-layer header (XCP on Ethernet / SxI).
+        """
+        header = HEADER.pack(len(packet), self.counter)
+        self.counter = (self.counter + 1) & 0xffff
+        return header + packet
+
+    @abc.abstractmethod
+    def send(self, packet):
+        pass
+
+    @abc.abstractmethod
+    def run(self):
+        pass
+
+    def closeConnection(self):
+        pass
+
+
+class EthServer(SimulatorServer):
+    """XCP on Ethernet (TCP or UDP) frontend.
+
+    Parameters
+    ----------
+    slave : `pyxcp.simulator.slave.Slave`
+    host : str
+    port : int
+        0 picks a free port, s. `port` attribute after construction.
+    protocol : ["TCP", "UDP"]
+    """
+
+    def __init__(self, slave, host="localhost", port=0, protocol="TCP", loglevel="WARN"):
+        super(EthServer, self).__init__(slave, loglevel)
+        self.useTcp = protocol == "TCP"
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM if self.useTcp else socket.SOCK_DGRAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.sock.bind((host, port))
+        self.host, self.port = self.sock.getsockname()[:2]
+        if self.useTcp:
+            self.sock.listen(1)
+        self.sock.settimeout(POLL_INTERVAL)
+        self.client = None
+        self.peer = None
+
+    def send(self, packet):
+        with self._sendLock:
+            frame = self.frame(packet)
+            try:
+                if self.useTcp:
+                    if self.client is not None:
+                        self.client.sendall(frame)
+                elif self.peer is not None:
+                    self.sock.sendto(frame, self.peer)
+            except OSError as e:
+                self.logger.warn("Send failed: {}".format(e))
+
+    def dropClient(self):
+        """Close the TCP connection to the master, like an ECU reset would.
+        """
+        with self._sendLock:
+            client = self.client
+        if client is not None:
+            try:
+                client.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def run(self):
+        if self.useTcp:
+            self._runTcp()
+        else:
+            self._runUdp()
+
+    def _runUdp(self):
+        handle = self.slave.handle
+        while not self._stopEvent.is_set():
+            try:
+                data, peer = self.sock.recvfrom(0xffff)
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            self.peer = peer
+            pos = 0
+            while pos + HEADER.size <= len(data):
+                length, _ = HEADER.unpack_from(data, pos)
+                pos += HEADER.size
+                handle(data[pos:pos + length])
+                pos += length
+
+    def _runTcp(self):
+        while not self._stopEvent.is_set():
+            try:
+                client, _ = self.sock.accept()
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            client.settimeout(POLL_INTERVAL)
+            with self._sendLock:
+                self.client = client
+                self.counter = 0
+            try:
+                self._serveClient(client)
+            finally:
+                with self._sendLock:
+                    self.client = None
+                client.close()
+                self.slave.reset()
+
+    def _serveClient(self, client):
+        handle = self.slave.handle
+        buffer = b""
+        while not self._stopEvent.is_set():
+            try:
+                data = client.recv(0xffff)
+            except socket.timeout:
+                continue
+            except OSError:
+                return
+            if not data:
+                return  # Master closed connection.
+            buffer += data
+            while len(buffer) >= HEADER.size:
+                length, _ = HEADER.unpack_from(buffer, 0)
+                end = HEADER.size + length
+                if len(buffer) < end:
+                    break
+                handle(buffer[HEADER.size:end])
+                buffer = buffer[end:]
+
+    def closeConnection(self):
+        self.sock.close()
+
+
+class SxIServer(SimulatorServer):
+    """XCP on SxI frontend using a pseudo-terminal (POSIX only).
+
+    Connect `pyxcp.transport.sxi.SxI` to `portName`.
+    """
+
+    def __init__(self, slave, loglevel="WARN"):
+        if not HAS_PTY:
+            raise RuntimeError("Pseudo-terminals are not supported on this platform.")
+        super(SxIServer, self).__init__(slave, loglevel)
+        self.masterFd, self.slaveFd = os.openpty()
+        tty.setraw(self.slaveFd)
+        self.portName = os.ttyname(self.slaveFd)
+
+    def send(self, packet):
+        with self._sendLock:
+            frame = self.frame(packet)
+            while frame:
+                written = os.write(self.masterFd, frame)
+                frame = frame[written:]
+
+    def run(self):
+        handle = self.slave.handle
+        buffer = b""
+        while not self._stopEvent.is_set():
+            readable, _, _ = select.select([self.masterFd], [], [], POLL_INTERVAL)
+            if not readable:
+                continue
+            try:
+                buffer += os.read(self.masterFd, 4096)
+            except OSError:
+                break
+            while len(buffer) >= HEADER.size:
+                length, _ = HEADER.unpack_from(buffer, 0)
+                end = HEADER.size + length
+                if len(buffer) < end:
+                    break
+                handle(buffer[HEADER.size:end])
+                buffer = buffer[end:]
+
+    def closeConnection(self):
+        for fd in (self.masterFd, self.slaveFd):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+
+class CanServer(SimulatorServer):
+    """XCP on CAN frontend attached to a `pyxcp.transport.virtualcan.VirtualCanBus`.
+
+    Parameters
+    ----------
+    slave : `pyxcp.simulator.slave.Slave`
+    channel : str
+    canIdMaster : int
+        Identifier used by the master (CAN_ID_MASTER).
+    canIdSlave : int
+        Identifier used by the slave (CAN_ID_SLAVE).
+    """
+
+    def __init__(self, slave, channel="virtual0", canIdMaster=0x101, canIdSlave=0x102, loglevel="WARN"):
+        super(CanServer, self).__init__(slave, loglevel)
+        self.node = VirtualCan(channel)
+        self.node.init(canIdSlave, canIdMaster, self.received)
+        self._requests = queue.Queue()
+
+    def start(self):
+        self.node.connect()
+        super(CanServer, self).start()
+
+    def received(self, payload, timestamp):
+        # Decouple from the sender, `VirtualCanBus` delivers synchronously.
+        self._requests.put(payload)
+
+    def send(self, packet):
+        with self._sendLock:
+            self.node.transmit(packet)
+
+    def run(self):
+        handle = self.slave.handle
+        while not self._stopEvent.is_set():
+            try:
+                payload = self._requests.get(timeout=POLL_INTERVAL)
+            except queue.Empty:
+                continue
+            handle(payload)
+
+    def closeConnection(self):
+        self.node.close()
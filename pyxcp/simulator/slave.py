@@ -0,0 +1,872 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Protocol engine of the simulated XCP slave.
+
+`Slave` implements the command processor (STD, CAL, PAG and dynamic DAQ
+commands, incl. STIM) on top of a `Memory` model. It is transport-agnostic:
+requests and STIM DTOs are passed in as packets (without transport-layer
+header) and all
+outgoing packets -- responses, errors and DTOs -- are handed to
+`Slave.output`, which is set by one of the servers in
+`pyxcp.simulator.server`.
+"""
+
+__copyright__ = """
+    pySART - Simplified AUTOSAR-Toolkit for Python.
+
+   (C) 2009-2019 by Christoph Schueler <cpu12.gems@googlemail.com>
+
+   All Rights Reserved
+
+  This program is free software; you can redistribute it and/or modify
+  it under the terms of the GNU General Public License as published by
+  the Free Software Foundation; either version 2 of the License, or
+  (at your option) any later version.
+
+  This program is distributed in the hope that it will be useful,
+  but WITHOUT ANY WARRANTY; without even the implied warranty of
+  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+  GNU General Public License for more details.
+
+  You should have received a copy of the GNU General Public License along
+  with this program; if not, write to the Free Software Foundation, Inc.,
+  51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+"""
+
+from collections import namedtuple
+import os
+import random
+import struct
+import threading
+import time
+
+from pyxcp import checksum
+from pyxcp.logger import Logger
+from pyxcp.timing import perf_counter_ns
+import pyxcp.types as types
+
+# Resource bits as used by CONNECT, GET_STATUS, GET_SEED and UNLOCK.
+RESOURCE_CALPAG = 0x01
+RESOURCE_DAQ = 0x04
+RESOURCE_STIM = 0x08
+RESOURCE_PGM = 0x10
+
+CATEGORY_RESOURCES = {
+    types.CommandCategory.CAL: RESOURCE_CALPAG,
+    types.CommandCategory.PAG: RESOURCE_CALPAG,
+    types.CommandCategory.DAQ: RESOURCE_DAQ,
+    types.CommandCategory.PGM: RESOURCE_PGM,
+}
+
+ERR_CMD_SYNCH = 0x00
+ERR_DAQ_ACTIVE = 0x11
+ERR_CMD_UNKNOWN = 0x20
+ERR_CMD_SYNTAX = 0x21
+ERR_OUT_OF_RANGE = 0x22
+ERR_ACCESS_DENIED = 0x24
+ERR_ACCESS_LOCKED = 0x25
+ERR_PAGE_NOT_VALID = 0x26
+ERR_MODE_NOT_VALID = 0x27
+ERR_SEGMENT_NOT_VALID = 0x28
+ERR_SEQUENCE = 0x29
+ERR_DAQ_CONFIG = 0x2A
+ERR_MEMORY_OVERFLOW = 0x30
+
+DAQ_TIMESTAMP_SIZE = 4
+DAQ_TIMESTAMP_MODE = 0x34   # DAQ_TIMESTAMP_UNIT_1US, S4.
+MIN_COMMAND_PID = 0xc0      # Lower PIDs are STIM DTOs.
+
+EventChannel = namedtuple("EventChannel", "name cycle priority")
+EventChannel.__new__.__defaults__ = (0, )
+EventChannel.__doc__ = """Event channel of the simulated ECU.
+
+`cycle` is given in seconds, 0 means sporadic (see `Slave.trigger`).
+"""
+
+DEFAULT_EVENTS = (
+    EventChannel("1ms", 0.001),
+    EventChannel("10ms", 0.01),
+    EventChannel("100ms", 0.1),
+    EventChannel("sporadic", 0),
+)
+
+
+class SlaveError(Exception):
+    """Raised by command handlers, answered with an ERR packet.
+    """
+
+    def __init__(self, code):
+        super(SlaveError, self).__init__(code)
+        self.code = code
+
+
+def xorKey(resource, seed):
+    """Default seed & key algorithm of the simulator.
+    """
+    return bytes(b ^ 0x5A ^ resource for b in seed)
+
+
+class Region:
+    """Plain RAM area.
+    """
+
+    def __init__(self, address, data):
+        self.address = address
+        self.data = bytearray(data)
+        self.end = address + len(self.data)
+
+    def buffer(self, ecu=False):
+        return self.data
+
+
+class CalSegment(Region):
+    """Calibration segment with switchable pages.
+
+    ECU and XCP access page are selected independently, like on real
+    hardware; all pages are initialized with `data`.
+    """
+
+    def __init__(self, number, address, data, pages=2):
+        super(CalSegment, self).__init__(address, data)
+        self.number = number
+        self.pages = [bytearray(self.data) for _ in range(pages)]
+        self.ecuPage = 0
+        self.xcpPage = 0
+
+    def buffer(self, ecu=False):
+        return self.pages[self.ecuPage if ecu else self.xcpPage]
+
+
+class Memory:
+    """Sparse, byte addressable memory of the simulated ECU.
+    """
+
+    def __init__(self):
+        self.regions = []
+        self.segments = []
+
+    def addRegion(self, address, data):
+        """Add RAM area, `data` is either a size or initial contents.
+        """
+        if isinstance(data, int):
+            data = bytes(data)
+        region = Region(address, data)
+        self.regions.append(region)
+        return region
+
+    def addCalSegment(self, address, data, pages=2):
+        """Add calibration segment, `data` is either a size or initial contents.
+        """
+        if isinstance(data, int):
+            data = bytes(data)
+        segment = CalSegment(len(self.segments), address, data, pages)
+        self.regions.append(segment)
+        self.segments.append(segment)
+        return segment
+
+    def find(self, address, length):
+        """Locate a memory range.
+
+        Returns
+        -------
+        tuple (`Region`, int)
+            Region and offset within; raises `SlaveError` if the range is
+            not mapped.
+        """
+        for region in self.regions:
+            if region.address <= address and address + length <= region.end:
+                return region, address - region.address
+        raise SlaveError(ERR_ACCESS_DENIED)
+
+    def read(self, address, length, ecu=False):
+        region, offset = self.find(address, length)
+        return bytes(region.buffer(ecu)[offset:offset + length])
+
+    def write(self, address, data, ecu=False):
+        region, offset = self.find(address, len(data))
+        region.buffer(ecu)[offset:offset + len(data)] = data
+
+
+class DaqList:
+
+    def __init__(self):
+        self.odts = []
+        self.mode = 0
+        self.eventChannel = 0
+        self.prescaler = 1
+        self.priority = 0
+        self.running = False
+        self.selected = False
+        self.firstPid = 0
+        self.stimData = {}      # ODT number -> last received STIM DTO payload
+        self._prescalerCounter = 0
+
+    @property
+    def timestamp(self):
+        return bool(self.mode & 0x10)
+
+    @property
+    def stim(self):
+        return bool(self.mode & 0x02)
+
+    def clear(self):
+        for odt in self.odts:
+            for idx in range(len(odt)):
+                odt[idx] = None
+        self.running = False
+        self.selected = False
+        self.stimData = {}
+
+
+class Slave:
+    """Simulated XCP slave.
+
+    Parameters
+    ----------
+    memory : `Memory`
+        Defaults to 64KiB RAM at 0x00000000 plus a 4KiB calibration
+        segment at 0x00010000.
+    events : sequence of `EventChannel`
+    byteOrder : ["INTEL", "MOTOROLA"]
+    maxCto : int
+    maxDto : int
+    slaveBlockMode : bool
+        Answer UPLOAD requests larger than `maxCto` - 1 with multiple
+        responses.
+    masterBlockMode : bool
+        Accept DOWNLOAD/DOWNLOAD_NEXT sequences.
+    maxBs, minSt, queueSize : int
+        Reported by GET_COMM_MODE_INFO.
+    maxDaq : int
+        Maximum number of dynamically allocatable DAQ lists.
+    identifier : str
+        Returned by GET_ID(0).
+    protection : int
+        Initially locked resources (`RESOURCE_CALPAG`, `RESOURCE_DAQ`, ...).
+    keyFunction : callable
+        (resource, seed) -> key, s. `xorKey`.
+    latency : float
+        Delay before packets are put on the wire in seconds.
+    jitter : float
+        Maximum additional random delay in seconds.
+    lossRate : float
+        Probability of dropping an outgoing packet.
+    randomSeed : int
+        Seed for loss and jitter, for reproducible runs.
+    ecuTask : callable
+        Called as `ecuTask(slave, eventNumber)` before an event is
+        sampled, e.g. to update simulated signals in `memory`.
+    """
+
+    def __init__(self, memory=None, events=DEFAULT_EVENTS, byteOrder="INTEL",
+                 maxCto=8, maxDto=8, slaveBlockMode=True, masterBlockMode=True,
+                 maxBs=255, minSt=0, queueSize=0, maxDaq=16,
+                 identifier="pyXCP simulator", protection=0, keyFunction=xorKey,
+                 latency=0.0, jitter=0.0, lossRate=0.0, randomSeed=None,
+                 ecuTask=None, loglevel="WARN"):
+        if memory is None:
+            memory = Memory()
+            memory.addRegion(0x00000000, 0x10000)
+            memory.addCalSegment(0x00010000, 0x1000)
+        self.memory = memory
+        self.events = list(events)
+        self.byteOrder = byteOrder
+        prefix = "<" if byteOrder == "INTEL" else ">"
+        self.WORD = struct.Struct(prefix + "H")
+        self.DWORD = struct.Struct(prefix + "I")
+        self.maxCto = maxCto
+        self.maxDto = maxDto
+        self.slaveBlockMode = slaveBlockMode
+        self.masterBlockMode = masterBlockMode
+        self.maxBs = maxBs
+        self.minSt = minSt
+        self.queueSize = queueSize
+        self.maxDaq = maxDaq
+        self.identifier = identifier.encode("ascii")
+        self.initialProtection = protection
+        self.keyFunction = keyFunction
+        self.latency = latency
+        self.jitter = jitter
+        self.lossRate = lossRate
+        self.random = random.Random(randomSeed)
+        self.ecuTask = ecuTask
+        self.logger = Logger("simulator.Slave")
+        self.logger.setLevel(loglevel)
+        self.output = None
+        self.commandsProcessed = 0
+        self.dtosSent = 0
+        self.stimsReceived = 0
+        self.packetsDropped = 0
+        self._lock = threading.RLock()
+        self._stopEvent = threading.Event()
+        self._thread = None
+        self._handlers = {
+            types.Command.CONNECT: self.connect,
+            types.Command.DISCONNECT: self.disconnect,
+            types.Command.GET_STATUS: self.getStatus,
+            types.Command.SYNCH: self.synch,
+            types.Command.GET_COMM_MODE_INFO: self.getCommModeInfo,
+            types.Command.GET_ID: self.getId,
+            types.Command.GET_SEED: self.getSeed,
+            types.Command.UNLOCK: self.unlock,
+            types.Command.SET_MTA: self.setMta,
+            types.Command.UPLOAD: self.upload,
+            types.Command.SHORT_UPLOAD: self.shortUpload,
+            types.Command.BUILD_CHECKSUM: self.buildChecksum,
+            types.Command.DOWNLOAD: self.download,
+            types.Command.DOWNLOAD_NEXT: self.downloadNext,
+            types.Command.DOWNLOAD_MAX: self.downloadMax,
+            types.Command.SHORT_DOWNLOAD: self.shortDownload,
+            types.Command.MODIFY_BITS: self.modifyBits,
+            types.Command.SET_CAL_PAGE: self.setCalPage,
+            types.Command.GET_CAL_PAGE: self.getCalPage,
+            types.Command.GET_PAG_PROCESSOR_INFO: self.getPagProcessorInfo,
+            types.Command.GET_SEGMENT_INFO: self.getSegmentInfo,
+            types.Command.COPY_CAL_PAGE: self.copyCalPage,
+            types.Command.CLEAR_DAQ_LIST: self.clearDaqList,
+            types.Command.SET_DAQ_PTR: self.setDaqPtr,
+            types.Command.WRITE_DAQ: self.writeDaq,
+            types.Command.WRITE_DAQ_MULTIPLE: self.writeDaqMultiple,
+            types.Command.SET_DAQ_LIST_MODE: self.setDaqListMode,
+            types.Command.GET_DAQ_LIST_MODE: self.getDaqListMode,
+            types.Command.START_STOP_DAQ_LIST: self.startStopDaqList,
+            types.Command.START_STOP_SYNCH: self.startStopSynch,
+            types.Command.GET_DAQ_CLOCK: self.getDaqClock,
+            types.Command.GET_DAQ_PROCESSOR_INFO: self.getDaqProcessorInfo,
+            types.Command.GET_DAQ_RESOLUTION_INFO: self.getDaqResolutionInfo,
+            types.Command.GET_DAQ_EVENT_INFO: self.getDaqEventInfo,
+            types.Command.FREE_DAQ: self.freeDaq,
+            types.Command.ALLOC_DAQ: self.allocDaq,
+            types.Command.ALLOC_ODT: self.allocOdt,
+            types.Command.ALLOC_ODT_ENTRY: self.allocOdtEntry,
+        }
+        self.reset()
+
+    def reset(self):
+        """Power-on reset: disconnected, DAQ configuration cleared.
+        """
+        with self._lock:
+            self.connected = False
+            self.protection = self.initialProtection
+            self.mta = 0
+            self.mtaData = None
+            self.daqLists = []
+            self.daqPtr = None
+            self._seed = None
+            self._downloadRemaining = 0
+            for segment in self.memory.segments:
+                segment.ecuPage = segment.xcpPage = 0
+
+    # Packet I/O.
+    def handle(self, cto):
+        """Process a command packet (CTO without transport-layer header)
+        or a STIM DTO.
+        """
+        cto = bytes(cto)
+        if not cto:
+            return
+        with self._lock:
+            code = cto[0]
+            if not self.connected and code != types.Command.CONNECT:
+                return  # Slave is silent until connected.
+            if code < MIN_COMMAND_PID:
+                self._receiveStim(cto)
+                return
+            handler = self._handlers.get(code)
+            try:
+                if handler is None:
+                    raise SlaveError(ERR_CMD_UNKNOWN)
+                category = types.COMMAND_CATEGORIES.get(code)
+                resource = CATEGORY_RESOURCES.get(category, 0)
+                if resource & self.protection:
+                    raise SlaveError(ERR_ACCESS_LOCKED)
+                result = handler(cto)
+            except SlaveError as e:
+                packets = [bytes((0xfe, e.code))]
+            except (IndexError, struct.error):
+                packets = [bytes((0xfe, ERR_CMD_SYNTAX))]
+            else:
+                if result is None:
+                    packets = []
+                elif isinstance(result, list):
+                    packets = result
+                else:
+                    packets = [b"\xff" + result]
+            self.commandsProcessed += 1
+        self.transmit(packets)
+
+    def transmit(self, packets):
+        """Hand packets to `output`, applying loss and latency injection.
+        """
+        if not packets or self.output is None:
+            return
+        if self.latency or self.jitter:
+            time.sleep(self.latency + self.jitter * self.random.random())
+        output = self.output
+        lossRate = self.lossRate
+        for packet in packets:
+            if lossRate and self.random.random() < lossRate:
+                self.packetsDropped += 1
+                continue
+            output(packet)
+
+    # Event processing.
+    def start(self):
+        """Start the cyclic event channels.
+        """
+        if self._thread is not None:
+            return
+        self._stopEvent.clear()
+        self._thread = threading.Thread(target=self._run, name="XCP-Simulator-Events")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        self._stopEvent.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        cyclic = [(number, int(event.cycle * 1000000000))
+                  for number, event in enumerate(self.events) if event.cycle > 0]
+        if not cyclic:
+            return
+        now = perf_counter_ns()
+        due = {number: now + cycle for number, cycle in cyclic}
+        while True:
+            nextDue = min(due.values())
+            delay = (nextDue - perf_counter_ns()) / 1000000000
+            if self._stopEvent.wait(delay if delay > 0 else 0):
+                break
+            now = perf_counter_ns()
+            for number, cycle in cyclic:
+                if due[number] <= now:
+                    # Scheduled drift-free; missed cycles are skipped.
+                    missed = (now - due[number]) // cycle
+                    due[number] += (missed + 1) * cycle
+                    self.trigger(number)
+
+    def trigger(self, eventNumber):
+        """Process an event: sample all running DAQ lists assigned to it.
+        """
+        if self.ecuTask is not None:
+            self.ecuTask(self, eventNumber)
+        with self._lock:
+            packets = []
+            for daqList in self.daqLists:
+                if not daqList.running or daqList.eventChannel != eventNumber:
+                    continue
+                if daqList.stim:
+                    self._applyStim(daqList)
+                    continue
+                daqList._prescalerCounter += 1
+                if daqList._prescalerCounter < daqList.prescaler:
+                    continue
+                daqList._prescalerCounter = 0
+                packets.extend(self._sample(daqList))
+            self.dtosSent += len(packets)
+        self.transmit(packets)
+
+    def _sample(self, daqList):
+        timestamp = self.DWORD.pack((perf_counter_ns() // 1000) & 0xffffffff)
+        read = self.memory.read
+        result = []
+        for number, odt in enumerate(daqList.odts):
+            packet = bytearray((daqList.firstPid + number, ))
+            if number == 0 and daqList.timestamp:
+                packet.extend(timestamp)
+            for entry in odt:
+                if entry is not None:
+                    packet.extend(read(entry[1], entry[0], ecu=True))
+            result.append(bytes(packet))
+        return result
+
+    def _receiveStim(self, dto):
+        pid = dto[0]
+        for daqList in self.daqLists:
+            if daqList.stim and daqList.running and daqList.firstPid <= pid < daqList.firstPid + len(daqList.odts):
+                daqList.stimData[pid - daqList.firstPid] = dto[1:]
+                self.stimsReceived += 1
+                return
+
+    def _applyStim(self, daqList):
+        """Write the buffered STIM data to memory (consistency on ODT level).
+        """
+        write = self.memory.write
+        for number, data in daqList.stimData.items():
+            offset = 0
+            for entry in daqList.odts[number]:
+                if entry is not None:
+                    size, address = entry
+                    write(address, data[offset:offset + size], ecu=True)
+                    offset += size
+        daqList.stimData = {}
+
+    # Helpers.
+    def _readMta(self, length):
+        if self.mtaData is not None:
+            data = self.mtaData[self.mta:self.mta + length]
+            if len(data) != length:
+                raise SlaveError(ERR_OUT_OF_RANGE)
+        else:
+            data = self.memory.read(self.mta, length)
+        self.mta += length
+        return data
+
+    def _writeMta(self, data):
+        if self.mtaData is not None:
+            raise SlaveError(ERR_ACCESS_DENIED)
+        self.memory.write(self.mta, data)
+        self.mta += len(data)
+
+    def _daqList(self, cto, offset):
+        number = self.WORD.unpack_from(cto, offset)[0]
+        if number >= len(self.daqLists):
+            raise SlaveError(ERR_OUT_OF_RANGE)
+        return self.daqLists[number]
+
+    def _segment(self, number):
+        if number >= len(self.memory.segments):
+            raise SlaveError(ERR_SEGMENT_NOT_VALID)
+        return self.memory.segments[number]
+
+    def _daqRunning(self):
+        return any(d.running for d in self.daqLists)
+
+    def _writeDaqEntry(self, size, address):
+        if self.daqPtr is None:
+            raise SlaveError(ERR_DAQ_CONFIG)
+        daqList, odtNumber, entryNumber = self.daqPtr
+        odt = daqList.odts[odtNumber]
+        if entryNumber >= len(odt):
+            raise SlaveError(ERR_OUT_OF_RANGE)
+        self.memory.find(address, size)
+        odt[entryNumber] = (size, address)
+        overhead = 1 + (DAQ_TIMESTAMP_SIZE if odtNumber == 0 and not daqList.stim else 0)
+        if overhead + sum(e[0] for e in odt if e is not None) > self.maxDto:
+            odt[entryNumber] = None
+            raise SlaveError(ERR_DAQ_CONFIG)
+        self.daqPtr = (daqList, odtNumber, entryNumber + 1)
+
+    def _assignPids(self):
+        pid = 0
+        for daqList in self.daqLists:
+            daqList.firstPid = pid
+            pid += len(daqList.odts)
+        if pid > 0xfc:
+            raise SlaveError(ERR_MEMORY_OVERFLOW)
+
+    # STD.
+    def connect(self, cto):
+        self.connected = True
+        resource = RESOURCE_CALPAG | RESOURCE_DAQ | RESOURCE_STIM
+        commModeBasic = 0x80 | (0x40 if self.slaveBlockMode else 0x00) | \
+            (0x01 if self.byteOrder == "MOTOROLA" else 0x00)
+        return bytes((resource, commModeBasic, self.maxCto)) + \
+            self.WORD.pack(self.maxDto) + b"\x01\x01"
+
+    def disconnect(self, cto):
+        for daqList in self.daqLists:
+            daqList.running = False
+        self.connected = False
+        self.protection = self.initialProtection
+        return b""
+
+    def getStatus(self, cto):
+        sessionStatus = 0x40 if self._daqRunning() else 0x00
+        return bytes((sessionStatus, self.protection, 0)) + self.WORD.pack(0)
+
+    def synch(self, cto):
+        raise SlaveError(ERR_CMD_SYNCH)
+
+    def getCommModeInfo(self, cto):
+        commModeOptional = 0x01 if self.masterBlockMode else 0x00
+        return bytes((0, commModeOptional, 0, self.maxBs, self.minSt, self.queueSize, 0x10))
+
+    def getId(self, cto):
+        mode = cto[1]
+        if mode != types.XcpGetIdType.ASCII_TEXT:
+            raise SlaveError(ERR_OUT_OF_RANGE)
+        self.mtaData = self.identifier
+        self.mta = 0
+        return bytes((0, 0, 0)) + self.DWORD.pack(len(self.identifier))
+
+    def getSeed(self, cto):
+        mode, resource = cto[1], cto[2]
+        if mode != 0:
+            raise SlaveError(ERR_OUT_OF_RANGE)
+        if not resource & self.protection:
+            return b"\x00"
+        self._seed = (resource, os.urandom(min(4, self.maxCto - 2)))
+        return bytes((len(self._seed[1]), )) + self._seed[1]
+
+    def unlock(self, cto):
+        if self._seed is None:
+            raise SlaveError(ERR_SEQUENCE)
+        length = cto[1]
+        resource, seed = self._seed
+        self._seed = None
+        if bytes(cto[2:2 + length]) != bytes(self.keyFunction(resource, seed)):
+            raise SlaveError(ERR_ACCESS_LOCKED)
+        self.protection &= ~resource
+        return bytes((self.protection, ))
+
+    def setMta(self, cto):
+        self.mtaData = None
+        self.mta = self.DWORD.unpack_from(cto, 4)[0]
+        return b""
+
+    def upload(self, cto):
+        length = cto[1]
+        payload = self.maxCto - 1
+        if length > payload and not self.slaveBlockMode:
+            raise SlaveError(ERR_OUT_OF_RANGE)
+        data = self._readMta(length)
+        return [b"\xff" + data[pos:pos + payload] for pos in range(0, length, payload)] or [b"\xff"]
+
+    def shortUpload(self, cto):
+        length = cto[1]
+        if length > self.maxCto - 1:
+            raise SlaveError(ERR_OUT_OF_RANGE)
+        self.mtaData = None
+        self.mta = self.DWORD.unpack_from(cto, 4)[0]
+        return self._readMta(length)
+
+    def buildChecksum(self, cto):
+        blockSize = self.DWORD.unpack_from(cto, 4)[0]
+        data = self._readMta(blockSize)
+        return bytes((0x09, 0, 0)) + self.DWORD.pack(checksum.CRC32(data))
+
+    # CAL.
+    def download(self, cto):
+        length = cto[1]
+        payload = self.maxCto - 2
+        if length > payload:
+            if not self.masterBlockMode:
+                raise SlaveError(ERR_OUT_OF_RANGE)
+            self._writeMta(cto[2:2 + payload])
+            self._downloadRemaining = length - payload
+            return None
+        self._downloadRemaining = 0
+        self._writeMta(cto[2:2 + length])
+        return b""
+
+    def downloadNext(self, cto):
+        length = cto[1]
+        if not self._downloadRemaining or length != self._downloadRemaining:
+            self._downloadRemaining = 0
+            raise SlaveError(ERR_SEQUENCE)
+        chunk = min(length, self.maxCto - 2)
+        self._writeMta(cto[2:2 + chunk])
+        self._downloadRemaining -= chunk
+        return None if self._downloadRemaining else b""
+
+    def downloadMax(self, cto):
+        self._writeMta(cto[1:self.maxCto])
+        return b""
+
+    def shortDownload(self, cto):
+        length = cto[1]
+        if length > self.maxCto - 8:
+            raise SlaveError(ERR_OUT_OF_RANGE)
+        self.mtaData = None
+        self.mta = self.DWORD.unpack_from(cto, 4)[0]
+        self._writeMta(cto[8:8 + length])
+        return b""
+
+    def modifyBits(self, cto):
+        shift = cto[1]
+        andMask = self.WORD.unpack_from(cto, 2)[0]
+        xorMask = self.WORD.unpack_from(cto, 4)[0]
+        value = self.DWORD.unpack(self.memory.read(self.mta, 4))[0]
+        value = (value & ~(((~andMask) & 0xffff) << shift)) ^ (xorMask << shift)
+        self.memory.write(self.mta, self.DWORD.pack(value & 0xffffffff))
+        return b""
+
+    # PAG.
+    def setCalPage(self, cto):
+        mode, segmentNumber, page = cto[1], cto[2], cto[3]
+        if not mode & 0x03:
+            raise SlaveError(ERR_MODE_NOT_VALID)
+        segments = self.memory.segments if mode & 0x80 else [self._segment(segmentNumber)]
+        for segment in segments:
+            if page >= len(segment.pages):
+                raise SlaveError(ERR_PAGE_NOT_VALID)
+        for segment in segments:
+            if mode & 0x01:
+                segment.ecuPage = page
+            if mode & 0x02:
+                segment.xcpPage = page
+        return b""
+
+    def getCalPage(self, cto):
+        mode, segment = cto[1], self._segment(cto[2])
+        if mode == 0x01:
+            page = segment.ecuPage
+        elif mode == 0x02:
+            page = segment.xcpPage
+        else:
+            raise SlaveError(ERR_MODE_NOT_VALID)
+        return bytes((0, 0, page))
+
+    def getPagProcessorInfo(self, cto):
+        return bytes((len(self.memory.segments), 0))
+
+    def getSegmentInfo(self, cto):
+        mode, segment, info = cto[1], self._segment(cto[2]), cto[3]
+        if mode == 0:
+            if info == 0:
+                return bytes(3) + self.DWORD.pack(segment.address)
+            elif info == 1:
+                return bytes(3) + self.DWORD.pack(segment.end - segment.address)
+            raise SlaveError(ERR_OUT_OF_RANGE)
+        elif mode == 1:
+            return bytes((len(segment.pages), 0, 0, 0, 0))
+        raise SlaveError(ERR_MODE_NOT_VALID)
+
+    def copyCalPage(self, cto):
+        src = self._segment(cto[1])
+        dst = self._segment(cto[3])
+        srcPage, dstPage = cto[2], cto[4]
+        if srcPage >= len(src.pages) or dstPage >= len(dst.pages):
+            raise SlaveError(ERR_PAGE_NOT_VALID)
+        if len(src.data) != len(dst.data):
+            raise SlaveError(ERR_SEGMENT_NOT_VALID)
+        dst.pages[dstPage][:] = src.pages[srcPage]
+        return b""
+
+    # DAQ.
+    def clearDaqList(self, cto):
+        self._daqList(cto, 2).clear()
+        return b""
+
+    def setDaqPtr(self, cto):
+        daqList = self._daqList(cto, 2)
+        odtNumber, entryNumber = cto[4], cto[5]
+        if odtNumber >= len(daqList.odts) or entryNumber >= len(daqList.odts[odtNumber]):
+            raise SlaveError(ERR_OUT_OF_RANGE)
+        self.daqPtr = (daqList, odtNumber, entryNumber)
+        return b""
+
+    def writeDaq(self, cto):
+        size = cto[2]
+        address = self.DWORD.unpack_from(cto, 4)[0]
+        self._writeDaqEntry(size, address)
+        return b""
+
+    def writeDaqMultiple(self, cto):
+        count = cto[1]
+        for idx in range(count):
+            offset = 2 + idx * 8
+            size = cto[offset + 1]
+            address = self.DWORD.unpack_from(cto, offset + 2)[0]
+            self._writeDaqEntry(size, address)
+        return b""
+
+    def setDaqListMode(self, cto):
+        mode = cto[1]
+        daqList = self._daqList(cto, 2)
+        eventChannel = self.WORD.unpack_from(cto, 4)[0]
+        if eventChannel >= len(self.events):
+            raise SlaveError(ERR_OUT_OF_RANGE)
+        if mode & 0x20:     # PID_OFF is not supported.
+            raise SlaveError(ERR_MODE_NOT_VALID)
+        daqList.mode = mode
+        daqList.eventChannel = eventChannel
+        daqList.prescaler = max(cto[6], 1)
+        daqList.priority = cto[7]
+        return b""
+
+    def getDaqListMode(self, cto):
+        daqList = self._daqList(cto, 2)
+        mode = (daqList.mode & 0x10) | (0x40 if daqList.running else 0) | \
+            (0x01 if daqList.selected else 0)
+        return bytes((mode, 0, 0)) + self.WORD.pack(daqList.eventChannel) + \
+            bytes((daqList.prescaler, daqList.priority))
+
+    def startStopDaqList(self, cto):
+        mode = cto[1]
+        daqList = self._daqList(cto, 2)
+        if mode == 0:
+            daqList.running = False
+        elif mode == 1:
+            daqList.running = True
+            daqList._prescalerCounter = 0
+        elif mode == 2:
+            daqList.selected = True
+        else:
+            raise SlaveError(ERR_MODE_NOT_VALID)
+        return bytes((daqList.firstPid, ))
+
+    def startStopSynch(self, cto):
+        mode = cto[1]
+        for daqList in self.daqLists:
+            if mode == 0:
+                daqList.running = False
+            elif daqList.selected:
+                daqList.running = (mode == 1)
+                daqList._prescalerCounter = 0
+                daqList.selected = False
+        if mode > 2:
+            raise SlaveError(ERR_MODE_NOT_VALID)
+        return b""
+
+    def getDaqClock(self, cto):
+        return bytes(3) + self.DWORD.pack((perf_counter_ns() // 1000) & 0xffffffff)
+
+    def getDaqProcessorInfo(self, cto):
+        properties = 0x1b   # Dynamic config., prescaler, STIM and timestamps supported.
+        return bytes((properties, )) + self.WORD.pack(self.maxDaq) + \
+            self.WORD.pack(len(self.events)) + bytes((0, 0))
+
+    def getDaqResolutionInfo(self, cto):
+        maxEntrySize = self.maxDto - 1 - DAQ_TIMESTAMP_SIZE
+        return bytes((1, maxEntrySize, 1, maxEntrySize, DAQ_TIMESTAMP_MODE)) + self.WORD.pack(1)
+
+    def getDaqEventInfo(self, cto):
+        number = self.WORD.unpack_from(cto, 2)[0]
+        if number >= len(self.events):
+            raise SlaveError(ERR_OUT_OF_RANGE)
+        event = self.events[number]
+        name = event.name.encode("ascii")
+        cycle, unit = 0, 0
+        if event.cycle > 0:
+            cycle = int(round(event.cycle * 1e9))
+            while cycle > 255:
+                cycle = int(round(cycle / 10.0))
+                unit += 1
+        self.mtaData = name
+        self.mta = 0
+        return bytes((0x04, 0xff, len(name), cycle, unit, event.priority))
+
+    def freeDaq(self, cto):
+        self.daqLists = []
+        self.daqPtr = None
+        return b""
+
+    def allocDaq(self, cto):
+        if self._daqRunning():
+            raise SlaveError(ERR_DAQ_ACTIVE)
+        count = self.WORD.unpack_from(cto, 2)[0]
+        if self.daqLists or count > self.maxDaq:
+            raise SlaveError(ERR_SEQUENCE if self.daqLists else ERR_MEMORY_OVERFLOW)
+        self.daqLists = [DaqList() for _ in range(count)]
+        return b""
+
+    def allocOdt(self, cto):
+        daqList = self._daqList(cto, 2)
+        if daqList.odts:
+            raise SlaveError(ERR_SEQUENCE)
+        daqList.odts = [[] for _ in range(cto[4])]
+        self._assignPids()
+        return b""
+
+    def allocOdtEntry(self, cto):
+        daqList = self._daqList(cto, 2)
+        odtNumber = cto[4]
+        if odtNumber >= len(daqList.odts):
+            raise SlaveError(ERR_OUT_OF_RANGE)
+        daqList.odts[odtNumber] = [None] * cto[5]
+        return b""
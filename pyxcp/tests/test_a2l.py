@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import pytest
+
+from pyxcp.asam import a2l
+from pyxcp.asam.a2l import A2LCatalogue, A2LError
+from pyxcp.asam.types import INTEL, MOTOROLA
+
+A2L = """
+ASAP2_VERSION 1 61
+/begin PROJECT demo ""
+  /begin MODULE ecu "ECU /* not a comment */"
+    /begin MOD_COMMON "" BYTE_ORDER MSB_FIRST /end MOD_COMMON
+    /* /begin MEASUREMENT commented "" UBYTE NO_COMPU_METHOD 0 0 0 255 /end MEASUREMENT */
+    /begin IF_DATA XCP
+      /begin DAQ STATIC 2 0 0 OPTIMISATION_TYPE_DEFAULT ADDRESS_EXTENSION_FREE
+        /begin EVENT "10ms" "10ms" 0 DAQ 1 10 6 0 /end EVENT
+        /begin EVENT "100ms" "100ms" 1 DAQ 1 100 6 0 /end EVENT
+      /end DAQ
+    /end IF_DATA
+    /begin MEASUREMENT EngineSpeed "Engine speed, \\"rpm\\""
+      UWORD CM_Speed 1 100 0 8000
+      ECU_ADDRESS 0x001BE068
+      BYTE_ORDER MSB_LAST // Intel despite MOD_COMMON
+      /begin IF_DATA XCP
+        /begin DAQ_EVENT FIXED_EVENT_LIST EVENT 0x1 /end DAQ_EVENT
+      /end IF_DATA
+    /end MEASUREMENT
+    /begin MEASUREMENT Gear "" UBYTE CM_Gear 1 100 0 6 ECU_ADDRESS 0x1BE06A ARRAY_SIZE 4 /end MEASUREMENT
+    /begin CHARACTERISTIC Map "" MAP 0x4000 RL_Map 0 CM_Speed 0 8000
+      ECU_ADDRESS_EXTENSION 1
+      /begin AXIS_DESCR STD_AXIS NO_INPUT_QUANTITY NO_COMPU_METHOD 4 0 100 FIX_AXIS_PAR_DIST 0 10 4 /end AXIS_DESCR
+      /begin AXIS_DESCR FIX_AXIS NO_INPUT_QUANTITY NO_COMPU_METHOD 3 0 100 FIX_AXIS_PAR 1 1 3 /end AXIS_DESCR
+    /end CHARACTERISTIC
+    /begin RECORD_LAYOUT RL_Map FNC_VALUES 1 SWORD COLUMN_DIR DIRECT /end RECORD_LAYOUT
+    /begin COMPU_METHOD CM_Speed "" LINEAR "%6.1" "rpm" COEFFS_LINEAR 0.5 0 /end COMPU_METHOD
+    /begin COMPU_METHOD CM_Gear "" TAB_VERB "%1.0" "" COMPU_TAB_REF VT_Gear /end COMPU_METHOD
+    /begin COMPU_VTAB VT_Gear "" TAB_VERB 2 0 "Neutral" 1 "First" DEFAULT_VALUE "Other" /end COMPU_VTAB
+  /end MODULE
+/end PROJECT
+"""
+
+
+def testCatalogue():
+    cat = A2LCatalogue.fromString(A2L)
+    assert len(cat) == 3
+    assert "commented" not in cat
+    speed = cat["EngineSpeed"]
+    assert speed.address == 0x1BE068
+    assert speed.events == (1, )
+    assert cat.codec(speed).decode(b"\x10\x00") == 16
+    assert cat.conversion("EngineSpeed").physical(16) == 8.0
+    assert cat.conversion(speed).unit == "rpm"
+    assert cat.conversion("Gear").physical([0, 1, 5]) == ["Neutral", "First", "Other"]
+    assert cat["Gear"].dims == (4, )
+    assert cat.events == {0: "10ms", 1: "100ms"}
+    m = cat["Map"]
+    assert (m.kind, m.address, m.ext) == ("MAP", 0x4000, 1)
+    assert [axis.fixAxis for axis in m.axes] == [(0, 10, 20, 30), (1, 3, 5)]
+    assert cat.datatype(m) == "SWORD"
+    assert cat.codec(m).byteorder == MOTOROLA
+    assert cat.codec(speed).byteorder == INTEL
+    assert cat.find("E*") == ["EngineSpeed"]
+    assert cat.symbolsAt(0x1BE06A) == ["Gear"]
+    assert cat.symbolsAt(0x4000) == []
+    assert cat.symbolsAt(0x4000, 1) == ["Map"]
+
+
+def testUnbalancedBlocks():
+    with pytest.raises(A2LError):
+        A2LCatalogue.fromString("/begin PROJECT p /begin MODULE m /end PROJECT")
+
+
+def testCache(tmpdir, monkeypatch):
+    filename = tmpdir.join("ecu.a2l")
+    filename.write(A2L)
+    first = A2LCatalogue.load(str(filename))
+    assert tmpdir.join("ecu.a2l" + a2l.CACHE_SUFFIX).check()
+
+    def noParsing(text):
+        raise AssertionError("Cached catalogue not used.")
+    monkeypatch.setattr(A2LCatalogue, "fromString", staticmethod(noParsing))
+    second = A2LCatalogue.load(str(filename))
+    assert second.measurements == first.measurements
+    assert second.conversion("Gear").physical(1) == "First"
+
+    monkeypatch.undo()
+    filename.write(A2L.replace("0x001BE068", "0x2000"))
+    assert A2LCatalogue.load(str(filename))["EngineSpeed"].address == 0x2000
@@ -22,3 +22,35 @@ def testBigEndian():
 def testInvalidByteOrderRaisesTypeError():
     with pytest.raises(ValueError):
         types.AsamBaseType('#')
+
+
+CODECS = [types.A_Uint8, types.A_Uint16, types.A_Uint32, types.A_Uint64,
+          types.A_Int8, types.A_Int16, types.A_Int32, types.A_Int64,
+          types.A_Float32, types.A_Float64]
+
+
+def testEncodeIsPrecompiled():
+    codec = types.A_Int16(types.MOTOROLA)
+    assert codec.size == 2
+    assert codec.encode(-2) == b"\xff\xfe"
+    assert codec.decode(memoryview(b"\xff\xfe")) == -2
+
+
+@pytest.mark.parametrize("numpy", [True, False])
+@pytest.mark.parametrize("byteorder", [types.INTEL, types.MOTOROLA])
+@pytest.mark.parametrize("codec", CODECS)
+def testArrayCodecs(codec, byteorder, numpy, monkeypatch):
+    if numpy and not types.HAS_NUMPY:
+        pytest.skip("NumPy not installed.")
+    monkeypatch.setattr(types, "HAS_NUMPY", numpy)
+    c = codec(byteorder)
+    values = list(range(0, 100, 3))
+    data = c.encodeArray(values)
+    assert data == b"".join(c.encode(v) for v in values)
+    assert list(c.decodeArray(data)) == values
+    assert list(c.decodeArray(memoryview(data))) == values
+
+
+def testDecodeArrayChecksSize():
+    with pytest.raises(ValueError):
+        types.A_Uint32(types.INTEL).decodeArray(bytes(6))
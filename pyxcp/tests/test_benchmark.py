@@ -0,0 +1,39 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import json
+
+import pytest
+
+from pyxcp import benchmark
+
+
+def testStatistics():
+    stats = benchmark.statistics(range(1, 101))
+    assert stats["count"] == 100
+    assert stats["min"] == 1
+    assert stats["p50"] == 51
+    assert stats["p99"] == 100
+
+
+def testPayloadSizes():
+    assert benchmark.payloadSizes(7) == [7]
+    sizes = benchmark.payloadSizes(254)
+    assert sizes[0] == 8
+    assert sizes[-1] == 254
+
+
+@pytest.mark.parametrize("transport", ["tcp", "can"])
+def testQuickRun(transport):
+    results = benchmark.run(transport, "quick")
+    names = {r["name"] for r in results["results"]}
+    assert names == set(benchmark.BENCHMARKS)
+    assert all(r["value"] > 0 for r in results["results"])
+    assert results["meta"]["transport"] == transport
+
+
+def testJsonOutput(tmpdir):
+    out = tmpdir.join("bench.json")
+    benchmark.main(["-q", "--only", "roundTrip", "parse", "-o", str(out)])
+    results = json.loads(out.read())
+    assert {r["name"] for r in results["results"]} == {"roundTrip", "parse"}
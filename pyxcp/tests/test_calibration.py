@@ -0,0 +1,107 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import struct
+
+import pytest
+
+from pyxcp.asam.a2l import A2LCatalogue
+from pyxcp.master import Master
+from pyxcp.simulator import EthServer, Slave
+from pyxcp.transport.eth import Eth
+
+np = pytest.importorskip("numpy")
+
+A2L = """
+/begin PROJECT demo ""
+  /begin MODULE ecu ""
+    /begin CHARACTERISTIC Map "" MAP 0x1000 RL_Map 0 CM_Half 0 1000
+      /begin AXIS_DESCR STD_AXIS NO_INPUT_QUANTITY NO_COMPU_METHOD 4 0 100 /end AXIS_DESCR
+      /begin AXIS_DESCR COM_AXIS NO_INPUT_QUANTITY NO_COMPU_METHOD 3 0 100 AXIS_PTS_REF Shared /end AXIS_DESCR
+    /end CHARACTERISTIC
+    /begin AXIS_PTS Shared "" 0x2000 NO_INPUT_QUANTITY RL_Axis 0 NO_COMPU_METHOD 3 0 100 /end AXIS_PTS
+    /begin CHARACTERISTIC Curve "" CURVE 0x3000 RL_Curve 0 NO_COMPU_METHOD 0 100
+      /begin AXIS_DESCR FIX_AXIS NO_INPUT_QUANTITY NO_COMPU_METHOD 3 0 100 FIX_AXIS_PAR_DIST 0 5 3 /end AXIS_DESCR
+    /end CHARACTERISTIC
+    /begin CHARACTERISTIC Block "" VAL_BLK 0x3100 RL_Block 0 NO_COMPU_METHOD 0 100 MATRIX_DIM 2 3 1 /end CHARACTERISTIC
+    /begin CHARACTERISTIC Value "" VALUE 0x3200 RL_Value 0 CM_Half 0 100 /end CHARACTERISTIC
+    /begin RECORD_LAYOUT RL_Map
+      NO_AXIS_PTS_X 1 UBYTE
+      AXIS_PTS_X 2 UWORD INDEX_INCR DIRECT
+      FNC_VALUES 3 SWORD ROW_DIR DIRECT
+    /end RECORD_LAYOUT
+    /begin RECORD_LAYOUT RL_Axis AXIS_PTS_X 1 UBYTE INDEX_INCR DIRECT /end RECORD_LAYOUT
+    /begin RECORD_LAYOUT RL_Curve FNC_VALUES 1 FLOAT32_IEEE COLUMN_DIR DIRECT /end RECORD_LAYOUT
+    /begin RECORD_LAYOUT RL_Block FNC_VALUES 1 UBYTE COLUMN_DIR DIRECT /end RECORD_LAYOUT
+    /begin RECORD_LAYOUT RL_Value FNC_VALUES 1 UWORD COLUMN_DIR DIRECT /end RECORD_LAYOUT
+    /begin COMPU_METHOD CM_Half "" LINEAR "%6.1" "" COEFFS_LINEAR 0.5 0 /end COMPU_METHOD
+  /end MODULE
+/end PROJECT
+"""
+
+
+def makeSlave():
+    slave = Slave()
+    # 3 of 4 axis points used, one padding byte before the UWORD axis.
+    mapData = struct.pack("<B x 3H", 3, 10, 20, 30) + struct.pack("<9h", *range(9))
+    slave.memory.write(0x1000, mapData)
+    slave.memory.write(0x2000, bytes((1, 2, 3)))
+    slave.memory.write(0x3000, struct.pack("<3f", 0.5, 1.5, 2.5))
+    slave.memory.write(0x3100, bytes(range(6)))
+    slave.memory.write(0x3200, struct.pack("<H", 84))
+    return slave
+
+
+@pytest.fixture
+def calibration():
+    from pyxcp.calibration import Calibration
+    slave = makeSlave()
+    with EthServer(slave) as server:
+        with Master(Eth(port=server.port)) as xm:
+            xm.connect()
+            yield slave, Calibration(xm, A2LCatalogue.fromString(A2L))
+            xm.disconnect()
+
+
+def testReadMap(calibration):
+    _, cal = calibration
+    m = cal.read("Map")
+    assert m.values.shape == (3, 3)
+    # ROW_DIR: x varies fastest in memory.
+    assert m.values[:, 0].tolist() == [0, 1, 2]
+    assert m.values[0, :].tolist() == [0, 3, 6]
+    assert [a.tolist() for a in m.axes] == [[10, 20, 30], [1, 2, 3]]
+    assert m.physical()[2, 2] == 4.0
+
+
+def testReadOthers(calibration):
+    _, cal = calibration
+    curve = cal.read("Curve")
+    assert curve.values.tolist() == [0.5, 1.5, 2.5]
+    assert curve.axes[0].tolist() == [0, 5, 10]
+    assert cal.read("Block").values.tolist() == [[0, 1, 2], [3, 4, 5]]
+    value = cal.read("Value")
+    assert value.values.shape == ()
+    assert value.physical() == 42.0
+
+
+def testWriteModifiedCellsOnly(calibration):
+    slave, cal = calibration
+    m = cal.read("Map")
+    assert cal.write(m) == 0
+    m.values[1, 0] = -1
+    m.values[2, 2] = 100
+    assert m.modified
+    assert m.dirtyRanges(m.encode()) == [(10, 12), (24, 26)]
+    assert cal.write(m) == 4
+    assert not m.modified
+    assert struct.unpack("<9h", slave.memory.read(0x1008, 18)) == (0, -1, 2, 3, 4, 5, 6, 7, 100)
+    m.axes[0][0] = 5
+    m.values[0, 0] = 7
+    assert cal.write(m) == 8   # Gap of 4 bytes merged: one range.
+    assert cal.read("Map").axes[0].tolist() == [5, 20, 30]
+
+    value = cal.read("Value")
+    value.setPhysical(21.3)
+    cal.write(value)
+    assert cal.read("Value").values == 43
@@ -0,0 +1,159 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import socket
+import struct
+import time
+
+import pytest
+
+from pyxcp import cmdline
+from pyxcp.master import Master
+from pyxcp.transport.can import Can
+from pyxcp.transport import socketcan
+from pyxcp.transport.virtualcan import VirtualCan
+
+
+CONFIG = {
+    "CAN_ID_MASTER": 0x101,
+    "CAN_ID_SLAVE": 0x102,
+}
+
+
+class Responder:
+    """Minimal slave node answering CONNECT on a virtual bus.
+    """
+
+    def __init__(self, channel):
+        self.node = VirtualCan(channel)
+        self.node.init(0x102, 0x101, self.received)
+        self.node.connect()
+        self.requests = []
+
+    def received(self, payload, timestamp):
+        self.requests.append(payload)
+        if payload[0] == 0xff:
+            self.node.transmit(bytes((0xff, 0x1d, 0xc0, 0x08, 0x08, 0x00, 0x01, 0x01)))
+        else:
+            self.node.transmit(b"\xff")
+
+
+def testCanFilterStandard():
+    canId, mask = struct.unpack("=II", socketcan.canFilter(0x102))
+    assert canId == 0x102
+    assert mask == socketcan.CAN_EFF_FLAG | socketcan.CAN_RTR_FLAG | socketcan.CAN_SFF_MASK
+
+
+def testCanFilterExtended():
+    canId, mask = struct.unpack("=II", socketcan.canFilter(0x80012345))
+    assert canId == 0x80012345
+    assert mask == socketcan.CAN_EFF_FLAG | socketcan.CAN_RTR_FLAG | socketcan.CAN_EFF_MASK
+
+
+def testCanFdPadLength():
+    assert socketcan.canFdPadLength(8) == 8
+    assert socketcan.canFdPadLength(9) == 12
+    assert socketcan.canFdPadLength(33) == 48
+    with pytest.raises(ValueError):
+        socketcan.canFdPadLength(65)
+
+
+def testVirtualCanConnect():
+    responder = Responder("test-connect")
+    with Master(Can(VirtualCan("test-connect"), config=CONFIG)) as xm:
+        res = xm.connect()
+        assert res.maxCto == 8
+        assert res.maxDto == 8
+        assert xm.disconnect() == b''
+    assert responder.requests == [b'\xff\x00', b'\xfe']
+
+
+def testVirtualCanIgnoresForeignIds():
+    received = []
+    node = VirtualCan("test-filter")
+    node.init(0x101, 0x102, lambda payload, timestamp: received.append(payload))
+    node.connect()
+    other = VirtualCan("test-filter")
+    other.init(0x200, 0x300, None)
+    other.connect()
+    other.transmit(b"\x01\x02")
+    assert received == []
+    node.close()
+    other.close()
+
+
+def _vcanAvailable():
+    if not socketcan.HAS_SOCKETCAN:
+        return False
+    try:
+        sock = socket.socket(socket.AF_CAN, socket.SOCK_RAW, socket.CAN_RAW)
+        sock.bind(("vcan0", ))
+    except OSError:
+        return False
+    sock.close()
+    return True
+
+
+@pytest.mark.skipif(not _vcanAvailable(), reason="vcan0 not available")
+def testSocketCanLoopback():
+    received = []
+    slave = socketcan.SocketCAN("vcan0")
+    slave.init(0x102, 0x101, lambda payload, timestamp: received.append((payload, timestamp)))
+    slave.connect()
+    master = socketcan.SocketCAN("vcan0")
+    master.init(0x101, 0x102, lambda payload, timestamp: None)
+    master.connect()
+    master.transmit(b"\xff\x00")
+    for _ in range(100):
+        if received:
+            break
+        time.sleep(0.01)
+    master.close()
+    slave.close()
+    assert received[0][0] == b"\xff\x00"
+    assert isinstance(received[0][1], int)
+
+
+def testDaqPacketsAreTimestamped():
+    responder = Responder("test-daq")
+    tr = Can(VirtualCan("test-daq"), config=CONFIG)
+    with Master(tr) as xm:
+        xm.connect()
+        responder.node.transmit(b"\x00\x01\x02\x03")
+        responder.node.transmit(b"\x01\x04\x05\x06")
+        first = tr.daqQueue.get(timeout=1.0)
+        second = tr.daqQueue.get(timeout=1.0)
+    assert first[0] == b"\x00\x01\x02\x03"
+    assert first[2] == 4
+    assert isinstance(first[3], int)
+    assert second[3] >= first[3]
+    assert abs(tr.wallClock(first[3]) - time.time()) < 60.0
+
+
+def testVirtualCanBurstKeepsTimestamps():
+    tr = Can(VirtualCan("test-burst"), config=CONFIG)
+    node = tr.canInterface
+    node.connect()
+    for idx in range(1000):
+        node.deliver(0x102, bytes((idx & 0x7f, idx >> 8, idx & 0xff)), 1000000 + idx)
+    node.deliver(0x103, b"\x00\x00\x00", 1)     # Foreign identifier.
+    packets = []
+    while not tr.daqQueue.empty():
+        packets.append(tr.daqQueue.get_nowait())
+    tr.close()
+    assert len(packets) == 1000
+    assert [p[3] for p in packets] == list(range(1000000, 1001000))
+    assert [(p[0][1] << 8) | p[0][2] for p in packets] == list(range(1000))
+
+
+def testCanDriverOptions():
+    config = {"CAN_ID_MASTER": 0x101, "CAN_ID_SLAVE": 0x102, "TIMESTAMPS": False}
+    params = cmdline.mergeParameters("can", config, {"driver": "virtual", "batchSize": 16})
+    assert params == {"driver": "virtual", "batchSize": 16, "timestamps": False}
+    assert "TIMESTAMPS" not in cmdline.removeParameters("can", config)
+    with pytest.raises(ValueError):
+        cmdline.createCanTransport(CONFIG, driver="virtual", channel="test-options", fd=True)
+    if socketcan.HAS_SOCKETCAN:
+        tr = cmdline.createCanTransport(CONFIG, driver="socketcan", channel="vcan0", fd=True, batchSize=16,
+                                        timestamps=False)
+        assert (tr.canInterface.fd, tr.canInterface.batchSize, tr.canInterface.timestamps) == (True, 16, False)
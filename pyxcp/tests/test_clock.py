@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import pytest
+
+from pyxcp.daq import clock
+
+
+def makeSync(drift=50e-6, offset=1000000, size=2):
+    """Slave with 1us ticks running `drift` too fast, 32-bit DAQ clock.
+    """
+    sync = clock.ClockSync(timestampSize=size, tickNs=1000.0)
+    slope = 1000.0 / (1.0 + drift)
+    for idx in range(20):
+        host = offset + idx * 500000000
+        ticks = int(round((host - offset) / slope)) + 0xFFFF0000
+        sync.addSample(host, ticks & 0xFFFFFFFF)
+    return sync, slope
+
+
+def testUnwrapList():
+    assert clock.unwrap([250, 255, 3, 200, 10], 1) == [250, 255, 259, 456, 522]
+
+
+def testFitOffsetAndDrift():
+    sync, slope = makeSync()
+    assert sync.slope == pytest.approx(slope, rel=1e-9)
+    assert sync.driftPpm == pytest.approx(-50.0 / 1.00005, rel=1e-3)
+
+
+def testDaqClockWraparound():
+    sync, _ = makeSync()
+    ticks = [s.ticks for s in sync.samples]
+    assert ticks == sorted(ticks)
+    assert ticks[-1] > 0xFFFFFFFF
+
+
+def testConvertTruncatedTimestamps():
+    sync, slope = makeSync()
+    sampled = [sync.ticksToHost(t) for t in (0xFFFF0000 + 1000000, 0xFFFF0000 + 1070000)]
+    timestamps = [int(round(sync.hostToTicks(h))) & 0xFFFF for h in sampled]
+    received = [h + 200000 for h in sampled]    # 200us transport latency.
+    result = sync.convert(timestamps, received)
+    assert result == pytest.approx(sampled, abs=slope)
+
+
+def testConvertNumpy():
+    np = pytest.importorskip("numpy")
+    sync, slope = makeSync()
+    sampled = np.array([sync.ticksToHost(0xFFFF0000 + t) for t in range(0, 3000000, 7919)])
+    ticks = np.round((sampled - sync.offset) / sync.slope).astype(np.int64)
+    result = sync.convert(ticks & 0xFFFF, sampled + 50000)
+    assert np.allclose(result, sampled, atol=slope)
+
+
+def testTimestampProperties():
+    class Mode:
+        unit = "DAQ_TIMESTAMP_UNIT_10US"
+        size = "S4"
+
+    class Info:
+        timestampMode = Mode
+        timestampTicks = 5
+
+    size, tickNs = clock.timestampProperties(Info)
+    assert size == 4
+    assert tickNs == pytest.approx(50000.0)
@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import pytest
+
+from pyxcp.asam import compumethod
+from pyxcp.asam.compumethod import createCompuMethod, Linear, RatFunc, TabIntp, TabNoIntp, TabVerb
+from pyxcp.asam.types import A_Int16, INTEL
+
+np = pytest.importorskip("numpy")
+
+
+def testLinearOverColumn():
+    cm = createCompuMethod("linear", coeffs=(0.1, -40.0), unit="degC")
+    codec = A_Int16(INTEL)
+    column = codec.decodeArray(codec.encodeArray([0, 400, 1000]))
+    assert np.allclose(cm.physical(column), [-40.0, 0.0, 60.0])
+    assert cm(400) == pytest.approx(0.0)
+    assert cm.raw([0.0]) == [pytest.approx(400.0)]
+
+
+def testRatFunc():
+    # raw = (2 * phys + 4) / 1  <=>  phys = (raw - 4) / 2
+    cm = RatFunc((0, 2, 4, 0, 0, 1))
+    assert cm.physical(10) == 3.0
+    assert np.allclose(cm.physical(np.array([4, 6])), [0.0, 1.0])
+    assert cm.raw(3.0) == 10.0
+    with pytest.raises(ValueError):
+        RatFunc((1, 0, 0, 0, 0, 1)).physical(1)
+
+
+def testTabIntp():
+    cm = TabIntp({0: 0.0, 10: 100.0, 20: 150.0})
+    values = [-5, 0, 5, 10, 15, 25]
+    expected = [0.0, 0.0, 50.0, 100.0, 125.0, 150.0]
+    assert cm.physical(np.array(values)).tolist() == expected
+    assert [cm.physical(v) for v in values] == expected
+
+
+def testTabNoIntp():
+    cm = TabNoIntp([(0, 1.0), (10, 2.0), (20, 3.0)])
+    values = [0, 4, 6, 10, 30]
+    assert cm.physical(np.array(values)).tolist() == [1.0, 1.0, 2.0, 2.0, 3.0]
+    assert [cm.physical(v) for v in values] == [1.0, 1.0, 2.0, 2.0, 3.0]
+    cm = TabNoIntp([(0, 1.0), (10, 2.0)], default=-1.0)
+    assert cm.physical([0, 5, 10]) == [1.0, -1.0, 2.0]
+    assert cm.physical(5) == -1.0
+
+
+@pytest.mark.parametrize("dense", [True, False])
+def testTabVerb(dense, monkeypatch):
+    if not dense:
+        monkeypatch.setattr(compumethod, "DENSE_LIMIT", 0)
+    cm = TabVerb({0: "OFF", 1: "ON"}, ranges=[(10, 19, "ERROR")], default="INVALID")
+    values = [0, 1, 2, 15, 0.5, -3]
+    expected = ["OFF", "ON", "INVALID", "ERROR", "INVALID", "INVALID"]
+    assert cm.physical(np.array(values)).tolist() == expected
+    assert [cm.physical(v) for v in values] == expected
+    assert cm.raw("ON") == 1
+    assert cm.raw("ERROR") == 10
+
+
+def testWithoutNumpy(monkeypatch):
+    monkeypatch.setattr(compumethod, "HAS_NUMPY", False)
+    assert Linear((2, 1)).physical([1, 2]) == [3, 5]
+    assert TabIntp([(0, 0.0), (2, 1.0)]).physical((1, )) == [0.5]
+    assert TabVerb({1: "ON"}).physical([1, 2]) == ["ON", None]
+
+
+def testUnsupportedKind():
+    with pytest.raises(ValueError):
+        createCompuMethod("FORM", formula="X1*2")
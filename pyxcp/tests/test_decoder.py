@@ -0,0 +1,66 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import struct
+
+import pytest
+
+from pyxcp.asam.compumethod import Linear
+from pyxcp.asam.types import A_Int16
+from pyxcp.daq.decoder import DaqDecoder
+
+np = pytest.importorskip("numpy")
+
+ODTS = [[("a", "H"), ("b", A_Int16("<"))], [("c", "f", Linear((2.0, 1.0)))]]
+
+
+def packets(count, timestamp=False):
+    result = []
+    for idx in range(count):
+        odt0 = bytes((4, )) + (struct.pack("<H", idx) if timestamp else b"") + struct.pack("<Hh", idx, -idx)
+        result.append((odt0, idx, len(odt0), 1000 * idx))
+        odt1 = bytes((5, )) + struct.pack("<f", idx / 2)
+        result.append((odt1, idx, len(odt1), 1000 * idx + 10))
+    return result
+
+
+def testDecode():
+    decoder = DaqDecoder(idSize=1)
+    layout = decoder.addList(3, 4, ODTS)
+    assert layout.recordSize == 8 and [f.offset for f in layout.fields] == [0, 2, 4]
+    decoder.addPackets(packets(100))
+    batch, = decoder.flush()
+    assert batch.daqList == 3 and batch.slaveTimestamps is None
+    assert batch.timestamps.tolist() == [1000 * i for i in range(100)]
+    assert batch.columns["a"].tolist() == list(range(100))
+    assert batch.columns["b"].tolist() == [-i for i in range(100)]
+    assert np.allclose(batch.columns["c"], np.arange(100) + 1.0)
+    assert decoder.flush() == []
+    assert decoder.statistics() == {3: (100, 0)}
+
+
+def testDecodeTimestampAndLoss():
+    decoder = DaqDecoder(idSize=1, timestampSize=2)
+    decoder.addList(3, 4, ODTS, timestamp=True)
+    data = packets(10, timestamp=True)
+    del data[7]                                 # ODT 1 of sample 3.
+    data.insert(0, (b"\x09\x00", 0, 2, 0))      # Unknown PID.
+    decoder.addPackets(data)
+    batch, = decoder.flush()
+    assert batch.slaveTimestamps.tolist() == [0, 1, 2, 4, 5, 6, 7, 8, 9]
+    assert batch.columns["a"].tolist() == [0, 1, 2, 4, 5, 6, 7, 8, 9]
+    assert decoder.statistics() == {3: (9, 1)}
+    assert decoder.unknownFrames == 1
+
+
+def testRelativeOdtNumbers():
+    decoder = DaqDecoder(idSize=4, byteOrder=">")
+    decoder.addList(0x102, 0, [[("x", "I")], [("y", "b")]])
+    frames = []
+    for idx in range(5):
+        frames.append((idx, 0, b"\x00\x00\x01\x02" + struct.pack(">I", idx * 1000)))
+        frames.append((idx, 0, b"\x01\x00\x01\x02" + struct.pack(">b", -idx)))
+    batches = list(decoder.batches(frames, batchFrames=4))
+    assert [len(b.timestamps) for b in batches] == [2, 2, 1]
+    assert np.concatenate([b.columns["x"] for b in batches]).tolist() == [0, 1000, 2000, 3000, 4000]
+    assert batches[-1].columns["y"].tolist() == [-4]
@@ -0,0 +1,138 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import logging
+import time
+
+import pytest
+
+from pyxcp import types
+from pyxcp.errormatrix import Action, PreAction, TIMEOUT, Timeout
+from pyxcp.master import errorhandler
+from pyxcp.master.errorhandler import getPolicy, wrapped
+from pyxcp.timeouts import TimeoutPolicy
+
+
+class FakeTransport:
+
+    def __init__(self):
+        self.timeouts = TimeoutPolicy({Timeout.T7: 0.01})
+
+
+class FakeMaster:
+    """Just enough of `MasterBaseType` to exercise `wrapped`.
+    """
+
+    def __init__(self, failures):
+        self.failures = list(failures)
+        self.logger = logging.getLogger("pyXCP")
+        self.errorHandling = True
+        self._recovering = False
+        self.service = None
+        self.mta = (0x1000, 0)
+        self.calls = []
+        self.synchResponds = True
+        self.transport = FakeTransport()
+
+    def _request(self, service):
+        self.service = service
+        self.calls.append(service)
+        if service == types.Command.SYNCH and not self.synchResponds:
+            raise types.XcpTimeoutError("Response timed out.")
+        if self.failures and service != types.Command.SYNCH:
+            failure = self.failures.pop(0)
+            if failure == TIMEOUT:
+                raise types.XcpTimeoutError("Response timed out.")
+            raise types.XcpResponseError(types.XcpError.parse(bytes((failure, ))))
+        return b"\x00"
+
+    @wrapped
+    def getStatus(self):
+        return self._request(types.Command.GET_STATUS)
+
+    @wrapped
+    def upload(self, length):
+        return self._request(types.Command.UPLOAD)
+
+    @wrapped
+    def setMta(self, address, addressExt=0):
+        return self._request(types.Command.SET_MTA)
+
+    @wrapped
+    def synch(self):
+        return self._request(types.Command.SYNCH)
+
+
+ERR_CMD_BUSY = 0x10
+ERR_CMD_SYNTAX = 0x21
+
+
+def testPoliciesCompiled():
+    policy = getPolicy(types.Command.UPLOAD, TIMEOUT)
+    assert policy.preActions == (PreAction.SYNCH, PreAction.SET_MTA)
+    assert policy.action == Action.REPEAT_2_TIMES
+    assert policy.repeats == 2
+    policy = getPolicy(types.Command.DISCONNECT, types.XcpError.ERR_CMD_BUSY)
+    assert policy.preActions == (PreAction.WAIT_T7, )
+    assert policy.repeats == errorhandler.REPEAT_LIMIT
+    policy = getPolicy(types.Command.CONNECT, TIMEOUT)
+    assert policy.action == Action.REPEAT_INF_TIMES
+    assert policy.repeats == errorhandler.TIMEOUT_REPEAT_LIMIT
+
+
+def testSuccess():
+    xm = FakeMaster([])
+    assert xm.getStatus() == b"\x00"
+    assert xm.calls == [types.Command.GET_STATUS]
+
+
+def testBusyIsRepeated():
+    xm = FakeMaster([ERR_CMD_BUSY] * 3)
+    assert xm.upload(4) == b"\x00"
+    assert xm.calls == [types.Command.UPLOAD] * 4
+    assert not xm._recovering
+
+
+def testBusyWaitsT7():
+    xm = FakeMaster([ERR_CMD_BUSY] * 3)
+    xm.transport.timeouts = TimeoutPolicy({Timeout.T7: 0.05})
+    start = time.perf_counter()
+    xm.upload(4)
+    backoff = sum(min(errorhandler.RETRY_BACKOFF * 2 ** n, errorhandler.RETRY_BACKOFF_MAX) for n in range(3))
+    assert time.perf_counter() - start >= 3 * 0.05 + backoff
+
+
+def testTimeoutPreActions():
+    xm = FakeMaster([TIMEOUT])
+    assert xm.upload(4) == b"\x00"
+    assert xm.calls == [types.Command.UPLOAD, types.Command.SYNCH, types.Command.SET_MTA, types.Command.UPLOAD]
+
+
+def testSynchTimeoutAbortsRecovery():
+    xm = FakeMaster([TIMEOUT])
+    xm.synchResponds = False
+    with pytest.raises(types.XcpTimeoutError):
+        xm.upload(4)
+    assert xm.calls == [types.Command.UPLOAD, types.Command.SYNCH]
+    assert not xm._recovering
+
+
+def testRepetitionsBounded():
+    xm = FakeMaster([TIMEOUT] * 3)
+    with pytest.raises(types.XcpTimeoutError):
+        xm.getStatus()
+    assert xm.calls.count(types.Command.GET_STATUS) == 3
+
+
+def testNotRepeatable():
+    xm = FakeMaster([ERR_CMD_SYNTAX, ERR_CMD_BUSY])
+    with pytest.raises(types.XcpResponseError):
+        xm.upload(4)
+    assert xm.calls == [types.Command.UPLOAD]
+
+
+def testErrorHandlingDisabled():
+    xm = FakeMaster([ERR_CMD_BUSY])
+    xm.errorHandling = False
+    with pytest.raises(types.XcpResponseError):
+        xm.upload(4)
@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import struct
+
+import pytest
+
+from pyxcp.daq import export
+from pyxcp.daq.decoder import DaqDecoder
+from pyxcp.daq.recorder import RecorderReader, RecorderWriter
+
+np = pytest.importorskip("numpy")
+
+COUNT = 5000
+ORIGIN = (1500000000.0, 1000)
+
+
+def makeRecording(fname):
+    with RecorderWriter(fname, chunkSize=0x10000 + 1024, timestampOrigin=ORIGIN) as writer:
+        for idx in range(COUNT):
+            writer.add(b"\x00" + struct.pack("<Hf", idx & 0xffff, idx / 4), idx, 1000 + idx * 10)
+            if idx % 2 == 0:
+                writer.add(b"\x01" + struct.pack("<i", -idx), idx, 1005 + idx * 10)
+
+
+def makeDecoder():
+    decoder = DaqDecoder()
+    decoder.addList(0, 0, [[("speed", "H"), ("load", "f")]])
+    decoder.addList(1, 1, [[("slow", "i")]])
+    return decoder
+
+
+def testParquet(tmpdir):
+    pq = pytest.importorskip("pyarrow.parquet")
+    recording = str(tmpdir.join("run.xrec"))
+    makeRecording(recording)
+    fname = str(tmpdir.join("run.parquet"))
+    with RecorderReader(recording) as reader:
+        with export.ParquetExporter(fname, columnCompression={"load": "zstd"},
+                                    timestampOrigin=reader.timestampOrigin) as exporter:
+            stats = export.exportRecording(reader, makeDecoder(), exporter, batchFrames=1000)
+    assert stats == {0: (COUNT, 0), 1: (COUNT // 2, 0)}
+    assert exporter.rows == {0: COUNT, 1: COUNT // 2}
+    meta = pq.ParquetFile(export.listFilename(fname, 0)).metadata
+    assert meta.num_row_groups > 1
+    assert meta.row_group(0).column(2).compression == "ZSTD"
+    table = pq.read_table(export.listFilename(fname, 0))
+    assert table.column("speed").to_pylist() == list(range(COUNT))
+    assert table.column("timestamp").cast("int64").to_pylist()[:2] == [1500000000000000000, 1500000000000000010]
+    slow = pq.read_table(export.listFilename(fname, 1))
+    assert slow.column("slow").to_pylist() == list(range(0, -COUNT, -2))
+
+
+def testArrowIpc(tmpdir):
+    pa = pytest.importorskip("pyarrow")
+    recording = str(tmpdir.join("run.xrec"))
+    makeRecording(recording)
+    fname = str(tmpdir.join("run.arrow"))
+    with RecorderReader(recording) as reader:
+        with export.ArrowExporter(fname, compression="lz4") as exporter:
+            export.exportRecording(reader, makeDecoder(), exporter, batchFrames=1000)
+    table = pa.ipc.open_file(export.listFilename(fname, 0)).read_all()
+    assert table.column("timestamp").to_pylist()[:2] == [1000, 1010]
+    assert np.allclose(table.column("load").to_numpy(), np.arange(COUNT) / 4)
+
+
+def testHDF5(tmpdir):
+    h5py = pytest.importorskip("h5py")
+    recording = str(tmpdir.join("run.xrec"))
+    makeRecording(recording)
+    fname = str(tmpdir.join("run.h5"))
+    with RecorderReader(recording) as reader:
+        with export.HDF5Exporter(fname, chunkRows=1024, columnCompression={"speed": ("gzip", 9)}) as exporter:
+            export.exportRecording(reader, makeDecoder(), exporter, batchFrames=1000)
+    with h5py.File(fname, "r") as f:
+        assert f["daq0/speed"][:].tolist() == list(range(COUNT))
+        assert f["daq0/speed"].compression_opts == 9
+        assert f["daq0/timestamp"][:3].tolist() == [1000, 1010, 1020]
+        assert f["daq1/slow"].shape == (COUNT // 2, )
@@ -0,0 +1,183 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import queue
+
+from pyxcp.daq import integrity, recorder
+from pyxcp.daq.decoder import DaqDecoder
+from pyxcp.master import Master
+from pyxcp.simulator import EthServer, EventChannel, Slave
+from pyxcp.transport.eth import Eth
+
+
+def makePackets(samples, odts=2, firstPid=0, ctr=False):
+    packets = []
+    counter = 0
+    for idx in range(samples):
+        for odt in range(odts):
+            payload = bytes((firstPid + odt, )) + (bytes((idx & 0xff, )) if ctr and odt == 0 else b"") + b"\x00\x00"
+            packets.append((payload, counter & 0xffff, len(payload), 1000 * counter))
+            counter += 1
+    return packets
+
+
+def testComplete():
+    checker = integrity.IntegrityChecker(transportCounter=True)
+    checker.addList(0, 0, 2)
+    checker.addPackets(makePackets(40000))      # Transport counter wraps.
+    transport, lists = checker.statistics()
+    assert checker.complete
+    assert transport.packets == 80000 and transport.missing == 0
+    assert lists[0].samples == 40000 and lists[0].lossRate == 0.0
+
+
+def testGapsDuplicatesReorders():
+    checker = integrity.IntegrityChecker(transportCounter=True)
+    checker.addList(0, 0, 3)
+    packets = makePackets(10, odts=3)
+    del packets[4]              # Sample 1, ODT 1.
+    del packets[8:11]           # Sample 3 lost completely.
+    packets.insert(3, packets[2])                       # Duplicate.
+    packets[-2], packets[-1] = packets[-1], packets[-2]  # Reorder.
+    checker.addPackets(packets)
+    transport, lists = checker.statistics()
+    assert not checker.complete
+    assert transport.missing == 4 and transport.duplicates == 1 and transport.reorders == 1
+    stats = lists[0]
+    assert stats.missingOdts == 1           # A lost sample is only visible in the counters.
+    assert stats.duplicates == 1 and stats.reorders == 1
+    assert stats.samples == 9
+    gaps = [e for e in checker.events if e.kind == integrity.TRANSPORT_GAP]
+    assert [(e.start, e.end, e.count) for e in gaps[:2]] == [(3000, 5000, 1), (8000, 12000, 3)]
+    odtGap = [e for e in checker.events if e.kind == integrity.ODT_GAP][0]
+    assert odtGap == integrity.LossEvent(integrity.ODT_GAP, 0, 3000, 5000, 1)
+
+
+def testLossAcrossSamples():
+    checker = integrity.IntegrityChecker()
+    checker.addList(0, 0, 5)
+    packets = makePackets(3, odts=5)
+    del packets[4:6]        # Tail of sample 0 and ODT 0 of sample 1.
+    checker.addPackets(packets)
+    _, lists = checker.statistics()
+    assert lists[0].missingOdts == 2 and lists[0].reorders == 0
+    event, = checker.events
+    assert event.count == 2
+
+
+def testLateOdtOfOtherSample():
+    checker = integrity.IntegrityChecker()
+    checker.addList(0, 0, 3)
+    packets = makePackets(3, odts=3)
+    packets.insert(5, packets.pop(4))   # Sample 1: 0, 2, 1 (late ODT of this sample).
+    packets.append(packets[1])          # ODT 1 of sample 0 after sample 2: not a late ODT of sample 2.
+    checker.addPackets(packets)
+    _, lists = checker.statistics()
+    assert lists[0].reorders == 1
+    assert lists[0].missingOdts == 1    # ODT 0 of a new sample.
+
+
+def testSkippedCounters():
+
+    class Transport:
+        HAS_COUNTER = True
+        counterObserver = None
+
+    checker = integrity.IntegrityChecker()
+    checker.addList(0, 0, 2)
+    checker.attach(Transport)
+    assert checker.transportCounter
+    packets = makePackets(20)
+    for packet in packets[5:8]:     # Responses instead of DTOs.
+        Transport.counterObserver(packet[1])
+    del packets[5:8]
+    del packets[10]                 # Really lost.
+    checker.addPackets(packets)
+    checker.detach(Transport)
+    assert Transport.counterObserver is None
+    transport, _ = checker.statistics()
+    assert transport.missing == 1
+    event = [e for e in checker.events if e.kind == integrity.TRANSPORT_GAP]
+    assert [e.count for e in event] == [1]
+
+
+def testNoCounterOnCan():
+
+    class Transport:
+        HAS_COUNTER = False
+        counterObserver = None
+
+    checker = integrity.IntegrityChecker()
+    checker.addList(0, 0, 2)
+    checker.attach(Transport)
+    assert not checker.transportCounter and Transport.counterObserver is None
+    checker.addPackets([(payload, 0, length, timestamp) for payload, _, length, timestamp in makePackets(10)])
+    assert checker.complete
+
+
+def testDtoCtr():
+    decoder = DaqDecoder(idSize=2)
+    decoder.addList(5, 0, [[("ctr", "B"), ("x", "H")]])
+    checker = integrity.IntegrityChecker.fromDecoder(decoder, transportCounter=False, dtoCtr=[5])
+    packets = [(b"\x00\x05" + bytes((idx & 0xff, )) + b"\x00\x00", 0, 5, idx) for idx in range(600)]
+    del packets[300:303]
+    checker.addPackets(packets)
+    _, lists = checker.statistics()
+    assert lists[5].lostSamples == 3 and lists[5].samples == 597
+    assert abs(lists[5].lossRate - 3 / 600) < 1e-9
+    event, = checker.events
+    assert event == integrity.LossEvent(integrity.SAMPLE_GAP, 5, 299, 303, 3)
+
+
+def testRecorderWithChecker(tmpdir):
+
+    class Transport:
+        daqQueue = queue.Queue()
+        timestampOrigin = (0.0, 0)
+
+    checker = integrity.IntegrityChecker(transportCounter=True)
+    checker.addList(0, 0, 2)
+    fname = str(tmpdir.join("checked.xrec"))
+    packets = makePackets(100)
+    del packets[50]
+    with recorder.Recorder(Transport, fname, checker=checker):
+        for packet in packets:
+            Transport.daqQueue.put(packet)
+    assert checker.statistics()[0].missing == 1
+    with recorder.RecorderReader(fname) as reader:
+        offline = integrity.checkRecording(reader, integrity.IntegrityChecker.fromDecoder(DaqDecoder(), transportCounter=True))
+    assert offline.statistics()[0].missing == 1
+
+
+def testSimulator():
+    slave = Slave(events=[EventChannel("sporadic", 0)])
+    with EthServer(slave) as server:
+        tr = Eth(port=server.port)
+        with Master(tr) as xm:
+            xm.connect()
+            xm.freeDaq()
+            xm.allocDaq(1)
+            xm.allocOdt(0, 2)
+            xm.allocOdtEntry(0, 0, 1)
+            xm.allocOdtEntry(0, 1, 1)
+            xm.setDaqPtr(0, 0, 0)
+            xm.writeDaq(0xff, 2, 0, 0x100)
+            xm.setDaqPtr(0, 1, 0)
+            xm.writeDaq(0xff, 4, 0, 0x104)
+            xm.setDaqListMode(0x00, 0, 0, 1, 0)
+            firstPid = xm.startStopDaqList(0x02, 0).firstPid
+            checker = integrity.IntegrityChecker()
+            checker.addList(0, firstPid, 2)
+            checker.attach(tr)
+            xm.startStopSynch(0x01)
+            for idx in range(200):
+                slave.trigger(0)
+                if idx % 50 == 0:
+                    xm.getStatus()      # Responses take counters too.
+            packets = [tr.daqQueue.get(timeout=1.0) for _ in range(400)]
+            xm.startStopSynch(0x00)
+            checker.detach(tr)
+    checker.addPackets(packets)
+    assert checker.transportCounter
+    assert checker.complete
+    assert checker.statistics()[1][0].samples == 200
@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import struct
+
+import pytest
+
+from pyxcp.asam.a2l import A2LCatalogue
+from pyxcp.asam.compumethod import Linear, RatFunc, TabIntp, TabVerb
+from pyxcp.daq import mdf
+from pyxcp.daq.decoder import DaqDecoder
+
+np = pytest.importorskip("numpy")
+
+A2L = """
+/begin PROJECT p "" /begin MODULE m ""
+  /begin MEASUREMENT speed "" UWORD NO_COMPU_METHOD 0 0 0 300 ECU_ADDRESS 0x100 /end MEASUREMENT
+/end MODULE /end PROJECT
+"""
+
+COUNT = 1000
+ORIGIN = (1600000000.0, 5000)
+
+
+def writeFile(fname):
+    decoder = DaqDecoder(timestampSize=2)
+    decoder.addList(0, 0, [
+        [("speed", "H"), ("load", "f", Linear((2.0, 1.0), unit="%"))],
+        [("ratio", "h", RatFunc((0, 4, 0, 0, 0, 1))), ("curve", "B", TabIntp({0: 0.0, 10: 100.0}))],
+    ], timestamp=True)
+    decoder.addList(1, 2, [[("state", "b", TabVerb({0: "off", 1: "on"}, ranges=[(5, 9, "fault")], default="?"))]])
+    packets = []
+    for idx in range(COUNT):
+        timestamp = ORIGIN[1] + idx * 1000000
+        packets.append((b"\x00" + struct.pack("<HHf", idx, idx, idx / 2), idx, 0, timestamp))
+        packets.append((b"\x01" + struct.pack("<hB", 4 * idx, idx % 20), idx, 0, timestamp))
+        if idx % 4 == 0:
+            packets.append((b"\x02" + struct.pack("<b", idx % 10), idx, 0, timestamp))
+    with mdf.MdfWriter(fname, decoder, A2LCatalogue.fromString(A2L), timestampOrigin=ORIGIN,
+                       batchFrames=512) as writer:
+        writer.addPackets(packets)
+    return writer
+
+
+def testBlocks(tmpdir):
+    fname = str(tmpdir.join("daq.mf4"))
+    writer = writeFile(fname)
+    assert writer.cycles == {0: COUNT, 1: COUNT // 4}
+    assert len(writer.dataBlocks[0]) > 1
+    with open(fname, "rb") as f:
+        data = f.read()
+    fileId, version, _, versionNumber, _, _ = mdf.ID_BLOCK.unpack_from(data, 0)
+    assert fileId == mdf.FINALIZED and versionNumber == 410
+    blockId, _, links = mdf.BLOCK_HEADER.unpack_from(data, mdf.HD_OFFSET)
+    assert blockId == b"##HD" and links == mdf.HD_LINKS
+    dg = struct.unpack_from("<Q", data, mdf.HD_OFFSET + mdf.BLOCK_HEADER.size)[0]
+    groups = 0
+    while dg:
+        assert data[dg:dg + 4] == b"##DG"
+        groups += 1
+        dg = struct.unpack_from("<Q", data, dg + mdf.BLOCK_HEADER.size)[0]
+    assert groups == 2
+    assert len(data) % 8 == 0
+
+
+def testRead(tmpdir):
+    asammdf = pytest.importorskip("asammdf")
+    fname = str(tmpdir.join("daq.mf4"))
+    writeFile(fname)
+    m = asammdf.MDF(fname)
+    assert [c.name for c in m.groups[0].channels] == ["time", "timestamp", "speed", "load", "ratio", "curve"]
+    speed = m.get("speed")
+    assert speed.samples.tolist() == list(range(COUNT))
+    assert np.allclose(speed.timestamps[:3], [0.0, 0.001, 0.002])
+    load = m.get("load")
+    assert load.unit == "%" and np.allclose(load.samples, np.arange(COUNT) + 1.0)
+    assert np.allclose(m.get("ratio").samples, np.arange(COUNT))
+    assert np.allclose(m.get("curve").samples[:12], [0, 10, 20, 30, 40, 50, 60, 70, 80, 90, 100, 100])
+    assert m.get("state").samples[:4].tolist() == [b"off", b"?", b"fault", b"?"]
+    assert m.get("timestamp").samples[:3].tolist() == [0, 1, 2]
+    assert m.groups[0].channels[2].upper_limit == 300
+    m.close()
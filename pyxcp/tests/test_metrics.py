@@ -0,0 +1,66 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import pytest
+
+from pyxcp.master import Master
+from pyxcp.metrics import MetricsRegistry, TransportMetrics
+from pyxcp.simulator import EthServer, Slave
+from pyxcp.transport.eth import Eth
+from pyxcp import types
+
+
+def testRegistry():
+    registry = MetricsRegistry()
+    counter = registry.counter("requests_total", "Requests.")
+    counter.inc()
+    counter.inc(2, (("command", "CONNECT"), ))
+    registry.gauge("depth").set(5)
+    assert registry.counter("requests_total") is counter
+    with pytest.raises(TypeError):
+        registry.gauge("requests_total")
+    snapshot = registry.snapshot()
+    assert snapshot["requests_total"] == {"": 1, "command=CONNECT": 2}
+    assert snapshot["depth"] == {"": 5}
+
+
+def testPrometheusText():
+    registry = MetricsRegistry()
+    registry.counter("c_total", "A counter.").inc(3, (("command", "GET_STATUS"), ))
+    summary = registry.summary("latency_seconds", scale=1e-9)
+    for value in (1000, 2000, 3000):
+        summary.observe(value)
+    text = registry.prometheus()
+    assert "# HELP c_total A counter.\n# TYPE c_total counter\n" in text
+    assert 'c_total{command="GET_STATUS"} 3\n' in text
+    assert "# TYPE latency_seconds summary" in text
+    assert 'latency_seconds{quantile="0.5"}' in text
+    assert "latency_seconds_count 3" in text
+
+
+def testTransportMetrics():
+    slave = Slave()
+    with EthServer(slave) as server:
+        tr = Eth(port=server.port)
+        metrics = tr.enableMetrics()
+        with Master(tr) as xm:
+            xm.connect()
+            xm.getStatus()
+            with pytest.raises(types.XcpResponseError):
+                xm.shortUpload(4, 0xfffff000)
+            xm.disconnect()
+    snapshot = metrics.snapshot()
+    assert snapshot["pyxcp_requests_total"]["command=GET_STATUS"] == 1
+    assert snapshot["pyxcp_errors_total"]["command=SHORT_UPLOAD,error=ERR_ACCESS_DENIED"] == 1
+    assert snapshot["pyxcp_received_packets_total"]["type=ERR"] == 1
+    assert snapshot["pyxcp_request_latency_seconds"]["command=CONNECT"]["count"] == 1
+    assert snapshot["pyxcp_sent_bytes_total"][""] > 0
+
+
+def testMetricsDisabledByDefault():
+    tr = Eth()
+    assert tr.metrics is None
+    assert isinstance(tr.enableMetrics(), TransportMetrics)
+    tr.disableMetrics()
+    assert tr.metrics is None
+    tr.close()
@@ -0,0 +1,149 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from functools import partial
+import itertools
+import multiprocessing
+import queue
+import struct
+import threading
+import time
+
+import pytest
+
+from pyxcp.daq import pipeline
+from pyxcp.daq.decoder import DaqDecoder
+
+np = pytest.importorskip("numpy")
+
+pytestmark = pytest.mark.skipif(not pipeline.HAS_SHARED_MEMORY, reason="no multiprocessing.shared_memory")
+
+COUNT = 20000
+SLOT_SIZE = 0x20000
+
+
+def makeDecoder():
+    decoder = DaqDecoder()
+    decoder.addList(0, 0, [[("a", "I"), ("b", "H")], [("c", "i")]])
+    return decoder
+
+
+class SumExporter(object):
+
+    def __init__(self, index):
+        self.samples = 0
+        self.total = 0
+
+    def write(self, batch):
+        self.samples += len(batch.timestamps)
+        self.total += int(batch.columns["a"].sum()) + int(batch.columns["c"].sum())
+
+    def close(self):
+        pass
+
+
+class SummingHandler(pipeline.DecodeHandler):
+
+    def __init__(self, index, delay=0.0):
+        super(SummingHandler, self).__init__(makeDecoder, SumExporter, index)
+        self.delay = delay
+
+    def __call__(self, sequence, frames):
+        time.sleep(self.delay)
+        super(SummingHandler, self).__call__(sequence, frames)
+
+    def close(self):
+        statistics, sequences = super(SummingHandler, self).close()
+        return statistics, sequences, self.exporter.samples, self.exporter.total
+
+
+def packets(count):
+    for idx in range(count):
+        yield (b"\x00" + struct.pack("<IH", idx, idx & 0xffff), idx, 7, idx * 1000)
+        yield (b"\x01" + struct.pack("<i", -2 * idx), idx, 5, idx * 1000 + 10)
+
+
+def testPipeline():
+
+    class Transport:
+        daqQueue = queue.Queue()
+
+    with pipeline.Pipeline(SummingHandler, workers=2, slots=16, slotSize=SLOT_SIZE, startPids=(0, ),
+                           context=multiprocessing.get_context("spawn")) as pipe:
+        for packet in packets(COUNT):
+            Transport.daqQueue.put(packet)
+        pipe.attach(Transport)
+        while not Transport.daqQueue.empty():
+            time.sleep(0.01)
+    results = pipe.results
+    statistics = pipe.statistics()
+    assert statistics.frames == 2 * COUNT and statistics.droppedFrames == 0
+    assert [r.index for r in results] == [0, 1]
+    assert sum(r.statistics.frames for r in results) == 2 * COUNT
+    assert all(r.statistics.mismatches == 0 for r in results)
+    sequences = sorted(s for r in results for s in r.result[1])
+    assert sequences == list(range(statistics.published))
+    # Slots are cut at ODT 0, no sample is split between workers.
+    assert sum(r.result[0][0][1] for r in results) == 0
+    assert sum(r.result[2] for r in results) == COUNT
+    assert sum(r.result[3] for r in results) == -sum(range(COUNT))
+
+
+def testOverrun():
+    pipe = pipeline.Pipeline(partial(SummingHandler, delay=0.2), workers=1, slots=2, slotSize=SLOT_SIZE,
+                             startPids=(0, ))
+    pipe.start()
+    pipe.addMany(packets(COUNT))
+    time.sleep(0.5)     # Slots are released again.
+    pipe.addMany(packets(100))
+    results = pipe.stop()
+    statistics = pipe.statistics()
+    assert statistics.droppedFrames > 0 and statistics.overruns >= 1
+    assert statistics.frames + statistics.droppedFrames == 2 * (COUNT + 100)
+    assert results[0].statistics.frames == statistics.frames
+    sequences = results[0].result[1]
+    assert len(sequences) == statistics.published
+    assert sequences[-1] == statistics.published + statistics.overruns - 1     # Gaps in sequence.
+
+
+def testAttachStopUnderLoad():
+
+    class Transport:
+        daqQueue = queue.Queue()
+
+    feeding = threading.Event()
+    feeding.set()
+
+    def feed():
+        for packet in itertools.cycle(packets(100)):
+            if not feeding.is_set():
+                break
+            Transport.daqQueue.put(packet)
+            time.sleep(0.005)
+
+    feeder = threading.Thread(target=feed)
+    pipe = pipeline.Pipeline(SummingHandler, workers=1, slots=4, slotSize=SLOT_SIZE, startPids=(0, ))
+    pipe.start()
+    feeder.start()
+    try:
+        pipe.attach(Transport)
+        time.sleep(0.3)
+        start = time.perf_counter()
+        results = pipe.stop()
+        assert time.perf_counter() - start < 5.0
+    finally:
+        feeding.clear()
+        feeder.join()
+    assert pipe.statistics().frames > 0
+    assert results[0].statistics.frames == pipe.statistics().frames
+
+
+def testKilledWorker():
+    pipe = pipeline.Pipeline(SummingHandler, workers=2, slots=4, slotSize=SLOT_SIZE)
+    pipe.start()
+    pipe._workers[1].kill()
+    pipe._workers[1].join()
+    results = pipe.stop()
+    assert [r.index for r in results] == [0, 1]
+    assert results[0].statistics is not None
+    assert results[1].statistics is None and isinstance(results[1].result, RuntimeError)
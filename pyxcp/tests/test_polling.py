@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import time
+
+from pyxcp.asam.a2l import A2LCatalogue
+from pyxcp.daq.polling import mergeSignals, PollingScheduler, Signal
+from pyxcp.master import Master
+from pyxcp.simulator import EthServer, Slave
+from pyxcp.transport.eth import Eth
+
+A2L = """
+/begin PROJECT p "" /begin MODULE m ""
+  /begin MEASUREMENT temp "" SWORD NO_COMPU_METHOD 0 0 -40 200 ECU_ADDRESS 0x120 ARRAY_SIZE 2 /end MEASUREMENT
+/end MODULE /end PROJECT
+"""
+
+
+def testMergeSignals():
+    signals = [
+        Signal("c", 0x110, 0, 2, 1), Signal("a", 0x100, 0, 4, 1), Signal("b", 0x106, 0, 1, 1),
+        Signal("d", 0x100, 1, 1, 1), Signal("e", 0x200, 0, 2, 1),
+    ]
+    blocks = mergeSignals(signals, maxSize=7, gap=8)
+    assert [(b.address, b.ext, b.size) for b in blocks] == [(0x100, 0, 7), (0x110, 0, 2), (0x200, 0, 2), (0x100, 1, 1)]
+    assert blocks[0].signals == (("a", 0, 4), ("b", 6, 1))
+
+
+def testPolling():
+    slave = Slave()
+    slave.memory.write(0x100, bytes(range(0x10, 0x50)))
+    with EthServer(slave) as server:
+        with Master(Eth(port=server.port)) as xm:
+            xm.connect()
+            with PollingScheduler(xm) as poller:
+                poller.add("a", 0x100, 2, rate=200)
+                poller.add("b", 0x103, 4, rate=200)
+                poller.add("big", 0x100, 0x20, rate=20)
+                poller.addMeasurement(A2LCatalogue.fromString(A2L), "temp", rate=20)
+                groups = poller.plan()
+                assert [g.rate for g in groups] == [200, 20]
+                assert len(groups[0].blocks) == 1
+                poller.start()
+                time.sleep(0.5)
+                poller.stop()
+                stats = poller.statistics()
+            xm.disconnect()
+    samples = []
+    while not poller.queue.empty():
+        samples.append(poller.queue.get())
+    fast = [values for _, rate, values in samples if rate == 200]
+    slow = [values for _, rate, values in samples if rate == 20]
+    assert fast[0] == {"a": b"\x10\x11", "b": b"\x13\x14\x15\x16"}
+    assert slow[0]["big"] == bytes(range(0x10, 0x30))
+    assert slow[0]["temp"] == bytes(range(0x30, 0x34))
+    assert stats[200].cycles == len(fast) and stats[200].errors == 0
+    assert abs(stats[20].achieved - 20) < 2
+    assert stats[200].achieved > 100
+
+
+def testOverruns():
+    slave = Slave()
+    with EthServer(slave) as server:
+        with Master(Eth(port=server.port)) as xm:
+            xm.connect()
+            with PollingScheduler(xm, callback=lambda *args: time.sleep(0.01)) as poller:
+                poller.add("a", 0x100, 1, rate=1000)
+                poller.start()
+                time.sleep(0.2)
+            xm.disconnect()
+    stats = poller.statistics()[1000]
+    assert stats.overruns > stats.cycles
+    assert stats.achieved < 200
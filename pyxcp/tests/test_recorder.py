@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import queue
+import threading
+import time
+
+import pytest
+
+from pyxcp.daq import recorder
+
+
+def makePackets(count):
+    return [(bytes((idx & 0xff, 0x00)) + bytes(idx % 17), idx, 2 + idx % 17, 1000 + idx * 10)
+            for idx in range(count)]
+
+
+def testRoundTrip(tmpdir):
+    fname = str(tmpdir.join("roundtrip.xrec"))
+    packets = makePackets(10000)
+    with recorder.RecorderWriter(fname, chunkSize=0x10000 + 1024) as writer:
+        writer.addMany(packets)
+    assert len(writer.index) > 1
+    with recorder.RecorderReader(fname) as reader:
+        assert reader.complete
+        assert len(reader) == len(packets)
+        for frame, packet in zip(reader, packets):
+            assert bytes(frame.payload) == packet[0]
+            assert frame.counter == packet[1] & 0xffff
+            assert frame.timestamp == packet[3]
+            frame.payload.release()
+
+
+def testTimeRange(tmpdir):
+    fname = str(tmpdir.join("range.xrec"))
+    with recorder.RecorderWriter(fname, chunkSize=0x10000 + 64) as writer:
+        writer.addMany(makePackets(20000))
+    with recorder.RecorderReader(fname) as reader:
+        stamps = [f.timestamp for f in reader.frames(start=50000, stop=60000)]
+    assert stamps == list(range(50000, 60000, 10))
+
+
+def testIncompleteRecording(tmpdir):
+    fname = str(tmpdir.join("crashed.xrec"))
+    writer = recorder.RecorderWriter(fname)
+    writer.addMany(makePackets(100))
+    writer.flush()
+    writer._file.flush()
+    with recorder.RecorderReader(fname) as reader:
+        assert not reader.complete
+        assert len(reader) == 100
+    writer.close()
+
+
+def testNotARecording(tmpdir):
+    fname = tmpdir.join("garbage.bin")
+    fname.write_binary(b"\x00" * 100)
+    with pytest.raises(recorder.RecorderError):
+        recorder.RecorderReader(str(fname))
+
+
+def testRecorderDrainsQueue(tmpdir):
+
+    class Transport:
+        daqQueue = queue.Queue()
+        timestampOrigin = (0.0, 0)
+
+    fname = str(tmpdir.join("drain.xrec"))
+    packets = makePackets(500)
+    with recorder.Recorder(Transport, fname):
+        for packet in packets:
+            Transport.daqQueue.put(packet)
+    with recorder.RecorderReader(fname) as reader:
+        assert len(reader) == 500
+
+
+def testRecorderStopsWhilePacketsArrive(tmpdir):
+
+    class Transport:
+        daqQueue = queue.Queue()
+        timestampOrigin = (0.0, 0)
+
+    feeding = threading.Event()
+    feeding.set()
+
+    def feed():
+        counter = 0
+        while feeding.is_set():
+            Transport.daqQueue.put((b"\x00\x01\x02\x03", counter & 0xffff, 4, counter))
+            counter += 1
+            time.sleep(0.001)
+
+    feeder = threading.Thread(target=feed)
+    feeder.start()
+    try:
+        fname = str(tmpdir.join("load.xrec"))
+        rec = recorder.Recorder(Transport, fname)
+        rec.start()
+        time.sleep(0.2)
+        start = time.perf_counter()
+        rec.stop()
+        assert time.perf_counter() - start < 2.0
+        assert not rec._thread.is_alive()
+    finally:
+        feeding.clear()
+        feeder.join()
+    with recorder.RecorderReader(fname) as reader:
+        assert len(reader) > 0
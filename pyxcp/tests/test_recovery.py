@@ -0,0 +1,145 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import queue
+import time
+
+import pytest
+
+from pyxcp import types
+from pyxcp.master import Master
+from pyxcp.master.recovery import SessionJournal, SessionRecovery, DAQ_SELECTED, DAQ_STARTED, DAQ_STOPPED
+from pyxcp.simulator import EthServer, EventChannel, Slave, RESOURCE_DAQ, xorKey
+from pyxcp.transport.eth import Eth
+
+SPORADIC = 0
+
+
+def configureDaq(xm):
+    xm.freeDaq()
+    xm.allocDaq(1)
+    xm.allocOdt(0, 1)
+    xm.allocOdtEntry(0, 0, 1)
+    xm.setDaqPtr(0, 0, 0)
+    xm.writeDaq(0xff, 2, 0, 0x0)
+    xm.setDaqListMode(0x10, 0, SPORADIC, 1, 0)
+    xm.startStopDaqList(0x02, 0)
+    xm.startStopSynch(0x01)
+
+
+def unlock(xm, resource):
+    seed = bytes(xm.getSeed(0, resource).seed)
+    key = xorKey(resource, seed)
+    xm.unlock(len(key), key)
+
+
+def nextDaq(daqQueue, timeout=2.0):
+    return daqQueue.get(timeout=timeout)[0]
+
+
+def testJournal():
+    journal = SessionJournal()
+    journal.record(types.Command.ALLOC_DAQ, (0, 1, 0))
+    journal.record(types.Command.START_STOP_DAQ_LIST, (DAQ_SELECTED, 0, 0))
+    journal.record(types.Command.START_STOP_DAQ_LIST, (DAQ_SELECTED, 1, 0))
+    journal.record(types.Command.START_STOP_SYNCH, (1, ))
+    journal.record(types.Command.START_STOP_DAQ_LIST, (DAQ_STOPPED, 1, 0))
+    journal.record(types.Command.SET_CAL_PAGE, (0x83, 0, 1))
+    journal.record(types.Command.GET_SEED, (0, RESOURCE_DAQ))
+    journal.record(types.Command.UNLOCK, (4, 1, 2, 3, 4))
+    daqConfiguration, daqListState, calPages, unlocked = journal.snapshot()
+    assert daqConfiguration == [(types.Command.ALLOC_DAQ, (0, 1, 0))]
+    assert list(daqListState.items()) == [((0, 0), DAQ_STARTED), ((1, 0), DAQ_STOPPED)]
+    assert calPages == {(0x83, 0): 1}
+    assert unlocked == {RESOURCE_DAQ}
+    journal.record(types.Command.FREE_DAQ, ())
+    assert journal.snapshot()[:2] == ([], {})
+
+
+def testStaticDaqNotFreed():
+
+    class Transport:
+        journal = None
+        onConnectionLost = None
+
+        def __init__(self):
+            self.calls = []
+
+        def request(self, cmd, *data):
+            self.calls.append(cmd)
+            if self.journal is not None:
+                self.journal.record(cmd, data)
+
+    class FakeMaster:
+        seedKeyProvider = None
+
+        def __init__(self):
+            self.transport = Transport()
+
+        def freeDaq(self):
+            self.transport.request(types.Command.FREE_DAQ)
+
+    xm = FakeMaster()
+    recovery = SessionRecovery(xm)
+    recovery.journal.record(types.Command.SET_DAQ_PTR, (0, 0, 0, 0))
+    recovery.journal.record(types.Command.WRITE_DAQ, (0xff, 2, 0, 0, 0, 0, 0))
+    recovery.journal.record(types.Command.START_STOP_DAQ_LIST, (DAQ_SELECTED, 0, 0))
+    recovery.journal.record(types.Command.START_STOP_SYNCH, (1, ))
+    for _ in range(3):      # Replayed requests are not journaled again.
+        xm.transport.calls = []
+        recovery._restore()
+        assert xm.transport.calls == [types.Command.SET_DAQ_PTR, types.Command.WRITE_DAQ,
+                                      types.Command.START_STOP_DAQ_LIST, types.Command.START_STOP_SYNCH]
+        assert len(recovery.journal.snapshot()[0]) == 2
+    assert xm.transport.journal is recovery.journal
+    recovery.journal.record(types.Command.ALLOC_DAQ, (0, 1, 0))
+    xm.transport.calls = []
+    recovery._restore()
+    assert xm.transport.calls[0] == types.Command.FREE_DAQ
+    recovery.close()
+
+
+def testRecoveryAfterReset():
+    slave = Slave(events=(EventChannel("sporadic", 0), ), protection=RESOURCE_DAQ)
+    with EthServer(slave) as server:
+        tr = Eth(port=server.port)
+        with Master(tr) as xm:
+            xm.connect()
+            with SessionRecovery(xm, keyFunction=xorKey, backoff=0.01) as recovery:
+                unlock(xm, RESOURCE_DAQ)
+                xm.setCalPage(0x83, 0, 1)
+                configureDaq(xm)
+                slave.trigger(SPORADIC)
+                nextDaq(tr.daqQueue)
+
+                server.dropClient()
+                deadline = time.time() + 5.0
+                while recovery.recoveries == 0 and time.time() < deadline:
+                    time.sleep(0.01)
+                assert recovery.recoveries == 1
+                assert recovery.lastError is None
+
+                while True:
+                    try:
+                        tr.daqQueue.get_nowait()
+                    except queue.Empty:
+                        break
+                slave.trigger(SPORADIC)
+                assert nextDaq(tr.daqQueue)[0] == 0     # PID of DAQ list 0, ODT 0.
+                assert xm.getCalPage(0x02, 0) == 1
+                assert slave.protection & RESOURCE_DAQ == 0
+            xm.disconnect()
+
+
+def testRequestsFailFastWithoutRecovery():
+    slave = Slave()
+    with EthServer(slave) as server:
+        tr = Eth(port=server.port)
+        with Master(tr) as xm:
+            xm.connect()
+            xm.errorHandling = False
+            server.dropClient()
+            tr.listener.join(2.0)
+            assert tr.connectionError is not None
+            with pytest.raises(types.XcpTimeoutError):
+                xm.getStatus()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import struct
+
+import pytest
+
+from pyxcp.master import Master
+from pyxcp.transport.can import Can
+from pyxcp.transport import replay
+from pyxcp.transport.replay import Capture, ReplayTransport
+from pyxcp.transport.trace import readTrace, RECEIVED, SENT, TraceError
+from pyxcp.transport.virtualcan import VirtualCan
+
+
+CONFIG = {
+    "CAN_ID_MASTER": 0x101,
+    "CAN_ID_SLAVE": 0x102,
+}
+
+
+class Responder:
+
+    def __init__(self, channel):
+        self.node = VirtualCan(channel)
+        self.node.init(0x102, 0x101, self.received)
+        self.node.connect()
+
+    def received(self, payload, timestamp):
+        if payload[0] == 0xff:
+            self.node.transmit(bytes((0xff, 0x1d, 0xc0, 0x08, 0x08, 0x00, 0x01, 0x01)))
+            self.node.transmit(b"\x00\x11\x22\x33")     # DAQ packet.
+        else:
+            self.node.transmit(b"\xff")
+
+
+def makeCapture(filename):
+    responder = Responder("test-replay")
+    tr = Can(VirtualCan("test-replay"), config=CONFIG)
+    with Master(tr) as xm:
+        with Capture(tr, filename):
+            xm.connect()
+            tr.daqQueue.get(timeout=1.0)
+            xm.disconnect()
+    responder.node.close()
+
+
+def testCaptureContents(tmpdir):
+    filename = str(tmpdir.join("session.xcpcap"))
+    makeCapture(filename)
+    maxDatagramSize, fmt, records = readTrace(filename)
+    assert maxDatagramSize == Can.MAX_DATAGRAM_SIZE
+    assert fmt == ""
+    assert [r.direction for r in records] == [SENT, RECEIVED, RECEIVED, SENT, RECEIVED]
+    assert records[0].data == b"\xff\x00"
+    assert records[2].data == b"\x00\x11\x22\x33"
+    assert all(b.timestamp >= a.timestamp for a, b in zip(records, records[1:]))
+
+
+@pytest.mark.parametrize("speed", [1.0, 10.0, 0])
+def testReplay(tmpdir, speed):
+    filename = str(tmpdir.join("session.xcpcap"))
+    makeCapture(filename)
+    tr = ReplayTransport(filename, speed=speed, strict=True)
+    with Master(tr) as xm:
+        res = xm.connect()
+        assert res.maxCto == 8
+        assert tr.daqQueue.get(timeout=1.0)[0] == b"\x00\x11\x22\x33"
+        assert xm.disconnect() == b""
+        assert tr.exhausted
+    assert tr.mismatches == 0
+
+
+def testReplayStrictMismatch(tmpdir):
+    filename = str(tmpdir.join("session.xcpcap"))
+    makeCapture(filename)
+    tr = ReplayTransport(filename, speed=0, strict=True)
+    tr.connect()
+    with pytest.raises(TraceError):
+        tr.send(b"\xfe")
+    tr.close()
+
+
+def testVersion1Capture(tmpdir):
+    # Written field by field as by the first `Capture` implementation.
+    filename = str(tmpdir.join("v1.xcpcap"))
+    record = struct.Struct("<qBxHH")
+    with open(filename, "wb") as outf:
+        outf.write(struct.pack("<8sHHB7x", b"XCPCAP\x00\x00", 1, 7, 0))
+        outf.write(record.pack(100, SENT, 0, 2) + b"\xff\x00")
+        outf.write(record.pack(200, RECEIVED, 0, 8) + b"\xff\x1d\xc0\x08\x08\x00\x01\x01")
+    maxDatagramSize, fmt, records = replay.readCapture(filename)
+    assert (maxDatagramSize, fmt) == (7, "")
+    assert records == [replay.CaptureRecord(100, SENT, 0, b"\xff\x00"),
+                       replay.CaptureRecord(200, RECEIVED, 0, b"\xff\x1d\xc0\x08\x08\x00\x01\x01")]
+    tr = ReplayTransport(filename, speed=0, strict=True)
+    with Master(tr) as xm:
+        assert xm.connect().maxCto == 8
@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import io
+import sys
+
+import pytest
+
+from pyxcp.master import Master
+from pyxcp.seedkey import (CallbackProvider, HelperProvider, SeedKeyError, serve,
+                           ERR_HELPER, ERR_PRIVILEGE_NOT_AVAILABLE, RESOURCE_CALPAG, RESOURCE_DAQ)
+from pyxcp.simulator import EthServer, Slave, xorKey
+from pyxcp.transport.eth import Eth
+
+
+def testCallbackProviderCache():
+    calls = []
+
+    def keyFunction(resource, seed):
+        calls.append(seed)
+        return xorKey(resource, seed)
+
+    provider = CallbackProvider(keyFunction, cacheSize=2)
+    for seed in (b"\x01\x02", b"\x01\x02", b"\x03\x04", b"\x05\x06", b"\x01\x02"):
+        assert provider.getKey(RESOURCE_DAQ, seed) == xorKey(RESOURCE_DAQ, seed)
+    assert provider.hits == 1
+    assert calls == [b"\x01\x02", b"\x03\x04", b"\x05\x06", b"\x01\x02"]
+
+
+def testServe():
+    def keyFunction(resource, seed):
+        if resource != RESOURCE_CALPAG:
+            raise SeedKeyError(ERR_PRIVILEGE_NOT_AVAILABLE)
+        return seed[::-1]
+
+    outfile = io.StringIO()
+    serve(keyFunction, io.StringIO("1 0102\n\n4 0102\n"), outfile)
+    assert outfile.getvalue() == "0 0201\n1\n"
+
+
+def testHelperProvider():
+    args = [sys.executable, "-m", "pyxcp.seedkey", "pyxcp.simulator:xorKey"]
+    with HelperProvider(args) as provider:
+        for idx in range(10):
+            seed = bytes((idx, idx + 1, idx + 2, idx + 3))
+            assert provider.getKey(RESOURCE_DAQ, seed) == xorKey(RESOURCE_DAQ, seed)
+        pid = provider.process.pid
+        provider.getKey(RESOURCE_DAQ, b"\xaa")
+        assert provider.process.pid == pid     # One process for all requests.
+    assert provider.process is None
+
+
+def testAutomaticUnlock():
+    slave = Slave(protection=RESOURCE_CALPAG | RESOURCE_DAQ)
+    with EthServer(slave) as server:
+        with Master(Eth(port=server.port)) as xm:
+            xm.connect()
+            xm.seedKeyProvider = CallbackProvider(xorKey)
+            xm.setMta(0x1000)
+            xm.download(1, 2, 3)
+            assert slave.protection == RESOURCE_DAQ
+            assert xm.shortUpload(3, 0x1000) == b"\x01\x02\x03"
+            xm.disconnect()
+
+
+def testHelperProviderTimeout():
+    args = [sys.executable, "-c", "import time; time.sleep(60)"]
+    with HelperProvider(args, timeout=0.2) as provider:
+        with pytest.raises(SeedKeyError) as exc:
+            provider.getKey(RESOURCE_DAQ, b"\x01\x02")
+        assert exc.value.returnCode == ERR_HELPER
+        assert provider.process is None
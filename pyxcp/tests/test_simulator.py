@@ -0,0 +1,171 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import pytest
+
+from pyxcp.master import Master
+from pyxcp.simulator import server as simserver
+from pyxcp.simulator import CanServer, EthServer, Slave, SxIServer, RESOURCE_CALPAG, xorKey
+from pyxcp.timing import perf_counter_ns
+from pyxcp.transport.can import Can
+from pyxcp.transport.eth import Eth
+from pyxcp.transport.trace import readTrace, SENT
+from pyxcp.transport.virtualcan import VirtualCan
+import pyxcp.types as types
+
+
+def ethMaster(server, protocol="TCP"):
+    return Master(Eth(port=server.port, protocol=protocol))
+
+
+@pytest.mark.parametrize("protocol", ["TCP", "UDP"])
+def testEthConnectUploadDownload(protocol):
+    slave = Slave(maxCto=64, maxDto=64)
+    with EthServer(slave, protocol=protocol) as server:
+        with ethMaster(server, protocol) as xm:
+            res = xm.connect()
+            assert res.maxCto == 64
+            xm.setMta(0x1000)
+            xm.download(*range(20))
+            assert xm.shortUpload(20, 0x1000) == bytes(range(20))
+            assert xm.getId(0x00).length == len(b"pyXCP simulator")
+            assert xm.upload(len(b"pyXCP simulator")) == b"pyXCP simulator"
+            assert xm.verify(0x1000, 40)
+            xm.disconnect()
+
+
+def testEthKernelTimestamps():
+    slave = Slave()
+    with EthServer(slave, protocol="UDP") as server:
+        tr = Eth(port=server.port, protocol="UDP", config={"KERNEL_TIMESTAMPS": True})
+        if not tr.kernelTimestamps:
+            pytest.skip("SO_TIMESTAMPNS not supported")
+        with Master(tr) as xm:
+            xm.connect()
+            for _ in range(10):
+                before = perf_counter_ns()
+                xm.getStatus()
+                assert before - 1000000 <= tr.timestampResponse <= perf_counter_ns()
+            xm.disconnect()
+
+
+@pytest.mark.parametrize("protocol", ["TCP", "UDP"])
+def testEthBulkDownload(protocol, tmpdir):
+    slave = Slave(maxCto=255, maxDto=255)
+    data = bytes(range(200))
+    with EthServer(slave, protocol=protocol) as server:
+        with ethMaster(server, protocol) as xm:
+            trace = xm.transport.enableFrameTrace(str(tmpdir.join("bulk.xcpcap")))
+            xm.connect()
+            xm.setMta(0x1000)
+            xm.download(data)
+            xm.downloadMax(bytearray(254))
+            xm.shortDownload(0x2000, 0, memoryview(data)[:100])
+            trace.close()
+            assert slave.memory.read(0x1000, 200) == data
+            assert slave.memory.read(0x10c8, 254) == bytes(254)
+            assert slave.memory.read(0x2000, 100) == data[:100]
+            xm.disconnect()
+    frames = [r.data for r in readTrace(str(tmpdir.join("bulk.xcpcap")))[2] if r.direction == SENT]
+    assert frames[2][4:] == bytes((types.Command.DOWNLOAD, 200)) + data
+
+
+def testCanSlaveAndMasterBlockMode():
+    slave = Slave()
+    slave.memory.write(0x2000, bytes(range(100, 140)))
+    config = {"CAN_ID_MASTER": 0x101, "CAN_ID_SLAVE": 0x102}
+    with CanServer(slave, channel="test-simulator"):
+        with Master(Can(VirtualCan("test-simulator"), config=config)) as xm:
+            xm.connect()
+            xm.setMta(0x2000)
+            assert xm.upload(20) == bytes(range(100, 120))
+            xm.setMta(0x3000)
+            xm.transport.send(bytes((types.Command.DOWNLOAD, 10)) + bytes(range(6)))
+            assert xm.downloadNext(*range(6, 10)) == b""
+            assert slave.memory.read(0x3000, 10) == bytes(range(10))
+
+
+def testCalibrationPages():
+    slave = Slave()
+    with EthServer(slave) as server:
+        with ethMaster(server) as xm:
+            xm.connect()
+            xm.setCalPage(0x83, 0, 1)
+            xm.setMta(0x10000)
+            xm.download(1, 2, 3)
+            assert xm.getCalPage(0x02, 0) == 1
+            xm.setCalPage(0x02, 0, 0)
+            assert xm.shortUpload(3, 0x10000) == b"\x00\x00\x00"
+            xm.copyCalPage(0, 1, 0, 0)
+            assert xm.shortUpload(3, 0x10000) == b"\x01\x02\x03"
+            with pytest.raises(types.XcpResponseError):
+                xm.setCalPage(0x03, 0, 7)
+
+
+def testSeedAndKey():
+    slave = Slave(protection=RESOURCE_CALPAG)
+    with EthServer(slave) as server:
+        with ethMaster(server) as xm:
+            xm.connect()
+            with pytest.raises(types.XcpResponseError):
+                xm.setMta(0x1000)
+                xm.download(1)
+            seed = xm.getSeed(0, RESOURCE_CALPAG)
+            key = xorKey(RESOURCE_CALPAG, bytes(seed.seed))
+            xm.unlock(len(key), key)
+            xm.setMta(0x1000)
+            xm.download(1)
+
+
+def testDaqList():
+    counter = [0]
+
+    def ecuTask(slave, event):
+        counter[0] += 1
+        slave.memory.write(0x100, counter[0].to_bytes(4, "little"))
+
+    slave = Slave(ecuTask=ecuTask)
+    with EthServer(slave) as server:
+        tr = Eth(port=server.port)
+        with Master(tr) as xm:
+            xm.connect()
+            xm.freeDaq()
+            xm.allocDaq(1)
+            xm.allocOdt(0, 2)
+            xm.allocOdtEntry(0, 0, 1)
+            xm.allocOdtEntry(0, 1, 2)
+            xm.setDaqPtr(0, 0, 0)
+            xm.writeDaq(0xff, 2, 0, 0x104)
+            xm.setDaqPtr(0, 1, 0)
+            xm.writeDaq(0xff, 4, 0, 0x100)
+            xm.writeDaq(0xff, 1, 0, 0x108)
+            xm.setDaqListMode(0x10, 0, 1, 1, 0)    # 10ms, timestamped.
+            assert xm.startStopDaqList(0x02, 0).firstPid == 0
+            xm.startStopSynch(0x01)
+            first = tr.daqQueue.get(timeout=1.0)
+            second = tr.daqQueue.get(timeout=1.0)
+            xm.startStopSynch(0x00)
+    assert first[0][0] == 0
+    assert len(first[0]) == 1 + 4 + 2
+    assert second[0][0] == 1
+    assert len(second[0]) == 1 + 4 + 1
+    assert int.from_bytes(second[0][1:5], "little") > 0
+
+
+def testLossInjection():
+    slave = Slave(lossRate=1.0)
+    slave.output = lambda packet: pytest.fail("packet not dropped")
+    slave.handle(b"\xff\x00")
+    assert slave.packetsDropped == 1
+    assert slave.connected
+
+
+@pytest.mark.skipif(not simserver.HAS_PTY, reason="no pseudo-terminals")
+def testSxI():
+    pytest.importorskip("serial")
+    from pyxcp.transport.sxi import SxI
+    with SxIServer(Slave()) as server:
+        with Master(SxI(server.portName, 115200)) as xm:
+            assert xm.connect().maxCto == 8
+            assert xm.shortUpload(4, 0x0) == b"\x00\x00\x00\x00"
+            xm.disconnect()
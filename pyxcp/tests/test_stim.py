@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import time
+
+from pyxcp.asam.types import A_Float32
+from pyxcp.daq.stim import Stim
+from pyxcp.master import Master
+from pyxcp.simulator import EthServer, EventChannel, Slave
+from pyxcp.transport.eth import Eth
+
+
+def waitFor(condition, timeout=2.0):
+    deadline = time.time() + timeout
+    while not condition():
+        if time.time() > deadline:
+            return False
+        time.sleep(0.005)
+    return True
+
+
+def testStim():
+    slave = Slave(events=[EventChannel("sporadic", 0)])
+    with EthServer(slave) as server:
+        with Master(Eth(port=server.port)) as xm:
+            xm.connect()
+            with Stim(xm, eventChannel=0) as stim:
+                stim.add("a", 0x100, "H")
+                stim.add("b", 0x104, "I")
+                stim.add("c", 0x108, A_Float32("<"))
+                stim.configure()
+                assert [len(odt) for odt in stim.odts] == [2, 1]
+                stim.start()
+                stim["a"] = 0x1234
+                stim["b"] = 0xdeadbeef
+                stim.set("c", 1.5)
+                assert stim["b"] == 0xdeadbeef
+                stim.send()
+                assert waitFor(lambda: slave.stimsReceived == 2)
+                assert slave.memory.read(0x100, 2) == b"\x00\x00"     # Applied on event.
+                slave.trigger(0)
+                assert slave.memory.read(0x100, 2) == b"\x34\x12"
+                assert slave.memory.read(0x104, 4) == b"\xef\xbe\xad\xde"
+                assert slave.memory.read(0x108, 4) == b"\x00\x00\xc0\x3f"
+
+                def update(s):
+                    s["a"] = s.cycles & 0xffff
+                stim.startTimer(500, update)
+                time.sleep(0.3)
+                stim.stopTimer()
+                assert 50 < stim.cycles <= 155
+                assert stim.framesSent == 2 * (stim.cycles + 1)
+                assert waitFor(lambda: slave.stimsReceived == stim.framesSent)
+                slave.trigger(0)
+                assert slave.memory.read(0x100, 2) == (stim.cycles - 1).to_bytes(2, "little")
+            xm.disconnect()
+
+
+def testStimConcurrentRequests():
+    slave = Slave(events=[EventChannel("sporadic", 0)])
+    with EthServer(slave) as server:
+        tr = Eth(port=server.port)
+        counters = []
+        send = tr.send
+
+        def recordingSend(frame):
+            counters.append(tr.HEADER.unpack_from(frame)[1])
+            send(frame)
+        tr.send = recordingSend
+        with Master(tr) as xm:
+            xm.connect()
+            with Stim(xm, eventChannel=0) as stim:
+                stim.add("a", 0x100, "I")
+                stim.configure()
+                stim.start()
+                stim.startTimer(2000)
+                for _ in range(100):
+                    xm.getStatus()
+                stim.stopTimer()
+            xm.disconnect()
+    assert counters == [c & 0xffff for c in range(counters[0], counters[0] + len(counters))]
@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import time
+
+import pytest
+
+from pyxcp import types
+from pyxcp.config import Config
+from pyxcp.errormatrix import Timeout
+from pyxcp.master import Master
+from pyxcp.simulator import EthServer, Slave
+from pyxcp.timeouts import DEFAULT_TIMEOUTS, TimeoutPolicy
+from pyxcp.timing import Histogram, Timing
+from pyxcp.transport.eth import Eth
+
+
+def testStaticTimeouts():
+    policy = TimeoutPolicy({Timeout.T4: 60.0, Timeout.T6: 0.5})
+    assert not policy.adaptive
+    assert policy.timeout(types.Command.CONNECT) == 0.5
+    assert policy.timeout(types.Command.GET_STATUS) == DEFAULT_TIMEOUTS[Timeout.T1]
+    assert policy.timeout(types.Command.BUILD_CHECKSUM) == DEFAULT_TIMEOUTS[Timeout.T2]
+    assert policy.timeout(types.Command.PROGRAM_CLEAR) == 60.0
+    assert policy[Timeout.T7] == DEFAULT_TIMEOUTS[Timeout.T7]
+
+
+def testFromConfig():
+    config = Config({"TIMEOUT_T1": 0.5, "TIMEOUT_T7": 0.05, "ADAPTIVE_TIMEOUTS": True,
+                     "ADAPTIVE_TIMEOUT_FACTOR": 2})
+    timing = Timing()
+    policy = TimeoutPolicy.fromConfig(config, timing)
+    assert policy[Timeout.T7] == 0.05   # Read by the WAIT_T7 pre-action.
+    assert policy.adaptive
+    assert policy.factor == 2.0
+    assert policy.timeout(types.Command.UPLOAD) == 0.5
+    assert not TimeoutPolicy.fromConfig(Config({}), timing).adaptive
+
+
+def testAdaptive():
+    timing = Timing()
+    policy = TimeoutPolicy(timing=timing, factor=4.0, minimum=0.001)
+    cmd = types.Command.GET_STATUS
+    histogram = timing.histograms[cmd] = Histogram()
+    for _ in range(10):
+        histogram.record(1000000)    # 1 ms
+    assert policy.timeout(cmd) == DEFAULT_TIMEOUTS[Timeout.T1]  # Too few samples.
+    for _ in range(100):
+        histogram.record(1000000)
+    assert policy.timeout(cmd) == pytest.approx(0.004, rel=0.05)
+    policy.timedOut(cmd)
+    assert policy.timeout(cmd) == pytest.approx(0.008, rel=0.05)
+
+
+def testLostResponseDetectedQuickly():
+    slave = Slave()
+    with EthServer(slave, protocol="UDP") as server:
+        tr = Eth(port=server.port, protocol="UDP", config={"ADAPTIVE_TIMEOUTS": True, "ADAPTIVE_TIMEOUT_MIN": 0.05})
+        with Master(tr) as xm:
+            xm.connect()
+            for _ in range(50):
+                xm.getStatus()
+            xm.errorHandling = False
+            slave.lossRate = 1.0
+            start = time.time()
+            with pytest.raises(types.XcpTimeoutError):
+                xm.getStatus()
+            assert time.time() - start < 1.0
+            slave.lossRate = 0.0
+            xm.getStatus()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import random
+import time
+
+import pytest
+
+from pyxcp.master import Master
+from pyxcp.simulator import EthServer, Slave
+from pyxcp.timing import Histogram, Timing, time_ns
+from pyxcp.transport.eth import Eth
+from pyxcp import types
+
+
+def testHistogramPercentiles():
+    rnd = random.Random(4711)
+    values = sorted(rnd.randint(1000, 50000000) for _ in range(20000))
+    hist = Histogram()
+    for value in values:
+        hist.record(value)
+    assert hist.count == len(values)
+    assert hist.min == values[0]
+    assert hist.max == values[-1]
+    for percent in (50.0, 90.0, 99.0, 99.9):
+        exact = values[int(percent / 100.0 * len(values)) - 1]
+        assert hist.percentile(percent) == pytest.approx(exact, rel=0.01)
+    assert hist.percentiles() == {p: hist.percentile(p) for p in Histogram.PERCENTILES}
+
+
+def testHistogramFixedMemory():
+    hist = Histogram(highest=1000000)
+    size = len(hist.counts)
+    hist.record(10 ** 12)
+    assert len(hist.counts) == size
+    assert hist.max == 10 ** 12
+    assert hist.percentile(100) == 10 ** 12
+
+
+def testHistogramSnapshotReset():
+    hist = Histogram()
+    for value in range(1, 101):
+        hist.record(value)
+    snap = hist.snapshot(reset=True)
+    assert snap.count == 100
+    assert hist.count == 0
+    assert hist.percentile(50) is None
+    hist.record(1000)
+    snap.merge(hist)
+    assert snap.count == 101
+    assert snap.max == 1000
+
+
+def testHistogramSummary():
+    hist = Histogram()
+    for value in range(1, 1001):
+        hist.record(value)
+    summary = hist.summary()
+    assert set(summary) == {"count", "min", "max", "mean", "p50", "p90", "p99", "p999"}
+    assert summary["mean"] == 500.5
+
+
+def testTimingMinMaxOverAllSamples():
+    tm = Timing(record=True, recordSize=2)
+    for _ in range(3):
+        tm.start()
+        tm.stop()
+    assert tm.min <= tm.avg <= tm.max
+    assert tm.histogram.count == 3
+    assert len(tm.values) == 2
+
+
+def testPerCommandBreakdown():
+    with EthServer(Slave()) as server:
+        tr = Eth(port=server.port)
+        with Master(tr) as xm:
+            xm.connect()
+            for _ in range(5):
+                xm.getStatus()
+            xm.disconnect()
+    assert tr.timing.histograms[types.Command.GET_STATUS].count == 5
+    assert tr.timing.histogram.count == 7
+    assert tr.timing.percentile(99, types.Command.GET_STATUS) > 0
+    assert "GET_STATUS" in tr.timing.summary()
+
+
+def testTimeNs():
+    assert isinstance(time_ns(), int)
+    assert abs(time_ns() / 1000000000 - time.time()) < 0.1
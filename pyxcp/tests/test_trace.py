@@ -0,0 +1,56 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import logging
+
+from pyxcp.logger import Logger
+from pyxcp.master import Master
+from pyxcp.simulator import EthServer, Slave
+from pyxcp.transport.eth import Eth
+from pyxcp.transport.trace import readTrace, RECEIVED, SENT
+
+
+class Unprintable:
+
+    def __str__(self):
+        raise AssertionError("Formatted although not emitted.")
+
+
+def testLoggerIsLazy():
+    logger = Logger("test.lazy")
+    logger.setLevel("WARN")
+    logger.debug("%s", Unprintable())
+    assert logger.getLastError() == (None, None)
+
+
+def testLoggerRemembersWarnings():
+    logger = Logger("test.lastError")
+    logger.silent()
+    logger.info("not remembered")
+    logger.warn("value %d", 42)
+    assert logger.getLastError() == (logging.WARN, "value 42")
+
+
+def testFrameTrace(tmpdir):
+    filename = str(tmpdir.join("eth.xcpcap"))
+    server = EthServer(Slave())
+    server.start()
+    try:
+        tr = Eth(port=server.port)
+        with Master(tr) as xm:
+            trace = tr.enableFrameTrace(filename)
+            xm.connect()
+            xm.getStatus()
+            xm.disconnect()
+        assert trace.closed
+        assert tr.frameTrace is None
+    finally:
+        server.stop()
+    maxDatagramSize, fmt, records = readTrace(filename)
+    assert maxDatagramSize == Eth.MAX_DATAGRAM_SIZE
+    assert fmt == "<HH"
+    directions = [r.direction for r in records]
+    assert directions == [SENT, RECEIVED] * 3
+    assert records[0].data[4] == 0xff    # CONNECT
+    assert records[1].counter == 0
+    assert all(r.timestamp for r in records)
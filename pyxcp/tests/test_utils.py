@@ -0,0 +1,15 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from pyxcp.utils import flatten, packBytes
+
+
+def testPackBytesInts():
+    assert packBytes((1, 2, 3)) == b"\x01\x02\x03"
+    assert packBytes(()) == b""
+
+
+def testPackBytesMixed():
+    items = (0xf0, b"\x01\x02", bytearray(b"\x03"), memoryview(b"\x04"), [5, (6, 7)])
+    assert packBytes(items) == b"\xf0" + bytes(range(1, 8))
+    assert packBytes([1, [2, 3]]) == bytes(flatten(1, [2, 3]))
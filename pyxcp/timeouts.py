@@ -0,0 +1,154 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Per-command response timeouts.
+
+Every command belongs to one of the timeout classes T1..T7 of the XCP spec
+(`pyxcp.errormatrix.Timeout`). With adaptive timeouts enabled, the timeout
+of a command is derived from its observed latency (p99 times `factor`),
+bounded by `minimum` and the static value of its class; a lost frame on a
+fast link is then detected in milliseconds instead of seconds.
+
+Transport-layer configuration (all optional)::
+
+    {
+        "TIMEOUT_T1": 2.0,              # seconds
+        "TIMEOUT_T4": 30.0,
+        "ADAPTIVE_TIMEOUTS": True,
+        "ADAPTIVE_TIMEOUT_FACTOR": 4.0,
+        "ADAPTIVE_TIMEOUT_MIN": 0.005,
+    }
+"""
+
+__copyright__ = """
+    pySART - Simplified AUTOSAR-Toolkit for Python.
+
+   (C) 2009-2019 by Christoph Schueler <cpu12.gems@googlemail.com>
+
+   All Rights Reserved
+
+  This program is free software; you can redistribute it and/or modify
+  it under the terms of the GNU General Public License as published by
+  the Free Software Foundation; either version 2 of the License, or
+  (at your option) any later version.
+
+  This program is distributed in the hope that it will be useful,
+  but WITHOUT ANY WARRANTY; without even the implied warranty of
+  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+  GNU General Public License for more details.
+
+  You should have received a copy of the GNU General Public License along
+  with this program; if not, write to the Free Software Foundation, Inc.,
+  51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+"""
+
+from pyxcp.errormatrix import Timeout
+from pyxcp.types import Command
+
+# Static timeouts in seconds.
+DEFAULT_TIMEOUTS = {
+    Timeout.T1: 2.0,    # Standard commands.
+    Timeout.T2: 5.0,    # BUILD_CHECKSUM.
+    Timeout.T3: 5.0,    # PROGRAM_START.
+    Timeout.T4: 30.0,   # PROGRAM_CLEAR.
+    Timeout.T5: 5.0,    # PROGRAM, PROGRAM_NEXT, ...
+    Timeout.T6: 2.0,    # CONNECT (user defined).
+    Timeout.T7: 0.2,    # WAIT_T7 pre-action (ERR_CMD_BUSY, ...), s. `pyxcp.master.errorhandler._wait`.
+}
+
+COMMAND_TIMEOUTS = {
+    Command.CONNECT: Timeout.T6,
+    Command.BUILD_CHECKSUM: Timeout.T2,
+    Command.PROGRAM_START: Timeout.T3,
+    Command.PROGRAM_CLEAR: Timeout.T4,
+    Command.PROGRAM: Timeout.T5,
+    Command.PROGRAM_NEXT: Timeout.T5,
+    Command.PROGRAM_MAX: Timeout.T5,
+    Command.PROGRAM_VERIFY: Timeout.T5,
+    Command.PROGRAM_FORMAT: Timeout.T5,
+    Command.PROGRAM_PREPARE: Timeout.T5,
+}
+
+ADAPTIVE_FACTOR = 4.0
+ADAPTIVE_MINIMUM = 0.005
+ADAPTIVE_MIN_SAMPLES = 20
+ADAPTIVE_REFRESH = 64       # Recalculate after so many new samples.
+NS_PER_SECOND = 1000000000
+
+
+class TimeoutPolicy:
+    """Response timeouts per command.
+
+    Parameters
+    ----------
+    timeouts : dict
+        `pyxcp.errormatrix.Timeout` -> seconds, overrides `DEFAULT_TIMEOUTS`.
+    timing : `pyxcp.timing.Timing`
+        Latency source for adaptive timeouts, `None` disables adaptation.
+    factor : float
+        Adaptive timeout is `factor` times the 99th percentile...
+    minimum : float
+        ...but never less than `minimum` seconds.
+    """
+
+    def __init__(self, timeouts=None, timing=None, factor=ADAPTIVE_FACTOR, minimum=ADAPTIVE_MINIMUM):
+        self.timeouts = dict(DEFAULT_TIMEOUTS)
+        if timeouts:
+            self.timeouts.update(timeouts)
+        self.timing = timing
+        self.factor = factor
+        self.minimum = minimum
+        self._static = {}
+        self._adaptive = {}     # cmd -> [timeout, sample count at calculation]
+        for cmd in Command:
+            self._static[cmd] = self.timeouts[COMMAND_TIMEOUTS.get(cmd, Timeout.T1)]
+
+    @classmethod
+    def fromConfig(cls, config, timing):
+        """Create policy from transport-layer configuration, s. module docstring.
+        """
+        timeouts = {}
+        for t in Timeout:
+            value = getattr(config, "TIMEOUT_{}".format(t.name), None)
+            if value is not None:
+                timeouts[t] = float(value)
+        adaptive = getattr(config, "ADAPTIVE_TIMEOUTS", False)
+        return cls(
+            timeouts, timing if adaptive else None,
+            float(getattr(config, "ADAPTIVE_TIMEOUT_FACTOR", ADAPTIVE_FACTOR)),
+            float(getattr(config, "ADAPTIVE_TIMEOUT_MIN", ADAPTIVE_MINIMUM)),
+        )
+
+    @property
+    def adaptive(self):
+        return self.timing is not None
+
+    def __getitem__(self, timeout):
+        """Static value of timeout class `timeout` (`pyxcp.errormatrix.Timeout`).
+        """
+        return self.timeouts[timeout]
+
+    def timeout(self, cmd):
+        """Response timeout for `cmd` in seconds.
+        """
+        static = self._static.get(cmd, self.timeouts[Timeout.T1])
+        if self.timing is None:
+            return static
+        histogram = self.timing.histograms.get(cmd)
+        if histogram is None or histogram.count < ADAPTIVE_MIN_SAMPLES:
+            return static
+        entry = self._adaptive.get(cmd)
+        if entry is None or histogram.count - entry[1] >= ADAPTIVE_REFRESH:
+            value = histogram.percentile(99.0) * self.factor / NS_PER_SECOND
+            entry = self._adaptive[cmd] = [max(self.minimum, value), histogram.count]
+        return min(entry[0], static)
+
+    def timedOut(self, cmd):
+        """Widen the adaptive timeout of `cmd` after a timeout.
+
+        Late responses are not recorded in the latency histogram, so without
+        this a too tight timeout would never recover.
+        """
+        entry = self._adaptive.get(cmd)
+        if entry is not None:
+            entry[0] *= 2
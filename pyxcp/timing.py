@@ -23,10 +23,225 @@ __copyright__ = """
   51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
 """
 
+from collections import deque
 import time
 
+try:
+    perf_counter_ns = time.perf_counter_ns
+except AttributeError:
+    # Python < 3.7
+    def perf_counter_ns():
+        """Integer nanosecond variant of `time.perf_counter`.
+        """
+        return int(time.perf_counter() * 1000000000)
+
+try:
+    time_ns = time.time_ns
+except AttributeError:
+    # Python < 3.7
+    def time_ns():
+        """Integer nanosecond variant of `time.time`.
+        """
+        return int(time.time() * 1000000000)
+
+
+def sleepUntil(deadline, spinTime=500000, stopEvent=None):
+    """Wait until `perf_counter_ns` reaches `deadline`.
+
+    Sleeps until `spinTime` nanoseconds before the deadline and busy-waits
+    for the rest, OS sleep granularity would be too coarse otherwise.
+
+    Parameters
+    ----------
+    deadline : int
+    spinTime : int
+    stopEvent : `threading.Event`
+        Interrupts the wait if set.
+    """
+    remaining = deadline - perf_counter_ns()
+    if remaining > spinTime:
+        if stopEvent is not None:
+            stopEvent.wait((remaining - spinTime) / 1000000000)
+        else:
+            time.sleep((remaining - spinTime) / 1000000000)
+    while perf_counter_ns() < deadline:
+        if stopEvent is not None and stopEvent.is_set():
+            return
+
+
+class Histogram:
+    """Fixed-memory latency histogram (HDR style).
+
+    Values are counted in logarithmic buckets, each split into linear
+    sub-buckets, so the relative error of every reported value is bounded
+    by `significantFigures` regardless of magnitude, while memory usage
+    only depends on the trackable range.
+
+    Parameters
+    ----------
+    highest : int
+        Highest trackable value (larger values are counted in the last
+        bucket, `max` is still exact). Default: 100s in nanoseconds.
+    significantFigures : int
+        Number of significant decimal digits maintained (1..4).
+
+    Note
+    ----
+    `record` is not synchronized; `snapshot` may be called from another
+    thread, at worst a concurrently recorded value is missed.
+    """
+
+    PERCENTILES = (50.0, 90.0, 99.0, 99.9)
+
+    def __init__(self, highest=100 * 1000000000, significantFigures=2):
+        if not 1 <= significantFigures <= 4:
+            raise ValueError("significantFigures must be in range 1..4.")
+        self.highest = highest
+        self.significantFigures = significantFigures
+        self._subBucketBits = (2 * 10 ** significantFigures - 1).bit_length()
+        self._subBucketCount = 1 << self._subBucketBits
+        self._halfCount = self._subBucketCount >> 1
+        self._size = self._index(highest) + 1
+        self.reset()
+
+    def _index(self, value):
+        shift = value.bit_length() - self._subBucketBits
+        if shift <= 0:
+            return value
+        return shift * self._halfCount + (value >> shift)
+
+    def _highestEquivalent(self, index):
+        if index < self._subBucketCount:
+            return index
+        shift = index // self._halfCount - 1
+        sub = index - shift * self._halfCount
+        return ((sub + 1) << shift) - 1
+
+    def _valueAt(self, index):
+        if index == self._size - 1:
+            return self.max     # Overflow bucket.
+        return min(self._highestEquivalent(index), self.max)
+
+    def reset(self):
+        self.counts = [0] * self._size
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+
+    def record(self, value):
+        """Record a value (non-negative int, e.g. nanoseconds).
+        """
+        index = self._index(value)
+        if index >= self._size:
+            index = self._size - 1
+        self.counts[index] += 1
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else None
+
+    def percentile(self, percent):
+        """Value below or equal to which `percent` of the recorded values fall.
+
+        Returns the upper bound of the matching bucket (clipped to `max`),
+        `None` if nothing was recorded.
+        """
+        if not self.count:
+            return None
+        threshold = max(1, int(round(percent / 100.0 * self.count + 0.4999999)))
+        running = 0
+        for index, count in enumerate(self.counts):
+            running += count
+            if running >= threshold:
+                return self._valueAt(index)
+        return self.max
+
+    def percentiles(self, percents=PERCENTILES):
+        """Several percentiles in one pass.
+
+        Returns
+        -------
+        dict
+            percent -> value
+        """
+        result = {}
+        if not self.count:
+            return {p: None for p in percents}
+        pending = sorted(percents)
+        running = 0
+        for index, count in enumerate(self.counts):
+            if not count:
+                continue
+            running += count
+            while pending and running >= max(1, int(round(pending[0] / 100.0 * self.count + 0.4999999))):
+                result[pending.pop(0)] = self._valueAt(index)
+            if not pending:
+                break
+        for p in pending:
+            result[p] = self.max
+        return result
+
+    def merge(self, other):
+        """Add counts of another histogram with the same parameters.
+        """
+        if (other.highest, other.significantFigures) != (self.highest, self.significantFigures):
+            raise ValueError("Histograms are not compatible.")
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.count += other.count
+        self.total += other.total
+        if other.count:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+            self.max = other.max if self.max is None else max(self.max, other.max)
+
+    def snapshot(self, reset=False):
+        """Independent copy, optionally starting a new interval.
+        """
+        result = Histogram(self.highest, self.significantFigures)
+        counts = self.counts
+        if reset:
+            self.counts = [0] * self._size
+        result.counts = list(counts)
+        result.count = self.count
+        result.total = self.total
+        result.min = self.min
+        result.max = self.max
+        if reset:
+            self.count = 0
+            self.total = 0
+            self.min = self.max = None
+        return result
+
+    def summary(self):
+        """count, min, max, mean and `PERCENTILES` as dict.
+        """
+        result = {"count": self.count, "min": self.min, "max": self.max, "mean": self.mean}
+        for percent, value in self.percentiles().items():
+            result["p" + "{:g}".format(percent).replace(".", "")] = value
+        return result
+
 
 class Timing:
+    """Request latency statistics.
+
+    Measures the time between `start` and `stop` and collects it in an
+    overall `Histogram` and -- if `stop` is given a key, usually a
+    `pyxcp.types.Command` -- in per-key histograms.
+
+    Parameters
+    ----------
+    unit : [T_US, T_MS, T_S]
+        Unit of the `min`, `max`, `avg` and `last` attributes and `__str__`.
+    record : bool
+        Keep the most recent `recordSize` samples (seconds) in `values`.
+    recordSize : int
+    """
 
     T_US = 1000 * 1000
     T_MS = 1000
@@ -40,43 +255,109 @@ class Timing:
     FMT = ("min:  {0:2.3f} {4}\nmax:  {1:2.3f} {4}\n"
            "avg:  {2:2.3f} {4}\nlast: {3:2.3f} {4}")
 
-    def __init__(self, unit=T_MS, record=False):
-        self.min = None
-        self.max = None
-        self.avg = None
-        self._previous = None
+    def __init__(self, unit=T_MS, record=False, recordSize=10000):
         self.unit = unit
         self._record = record
-        self._values = []
+        self._values = deque(maxlen=recordSize)
+        self._start = None
+        self._previous = None
+        self.histogram = Histogram()
+        self.histograms = {}
 
     def start(self):
-        self._start = time.perf_counter()
+        self._start = perf_counter_ns()
+
+    def stop(self, key=None):
+        """Stop measurement.
 
-    def stop(self):
-        self._stop = time.perf_counter()
-        elapsed = self._stop - self._start
+        Parameters
+        ----------
+        key : hashable
+            Additionally account to this key, e.g. a `pyxcp.types.Command`.
+
+        Returns
+        -------
+        int
+            Elapsed time in nanoseconds.
+        """
+        elapsed = perf_counter_ns() - self._start
+        self.histogram.record(elapsed)
+        if key is not None:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.record(elapsed)
         if self._record:
-            self._values.append(elapsed)
-        if self._previous:
-            self.min = min(self._previous, elapsed)
-            self.max = max(self._previous, elapsed)
-            self.avg = (self._previous + elapsed) / 2
-        else:
-            self.min = self.max = self.avg = elapsed
+            self._values.append(elapsed / 1000000000)
         self._previous = elapsed
+        return elapsed
+
+    def _seconds(self, value):
+        return None if value is None else value / 1000000000
+
+    @property
+    def min(self):
+        return self._seconds(self.histogram.min)
+
+    @property
+    def max(self):
+        return self._seconds(self.histogram.max)
+
+    @property
+    def avg(self):
+        return self._seconds(self.histogram.mean)
+
+    @property
+    def last(self):
+        return self._seconds(self._previous)
+
+    def percentile(self, percent, key=None):
+        """Latency percentile in nanoseconds (overall or for `key`).
+        """
+        histogram = self.histogram if key is None else self.histograms.get(key)
+        return histogram.percentile(percent) if histogram else None
+
+    def reset(self):
+        self.histogram.reset()
+        self.histograms = {}
+        self._values.clear()
+        self._previous = None
+
+    def snapshot(self, reset=False):
+        """Copy of the current statistics.
+
+        Parameters
+        ----------
+        reset : bool
+            Start a new interval, i.e. report interval instead of
+            cumulative statistics on subsequent calls.
+
+        Returns
+        -------
+        tuple (`Histogram`, dict)
+            Overall and per-key histograms.
+        """
+        histograms = self.histograms
+        if reset:
+            self.histograms = {}
+        return (self.histogram.snapshot(reset),
+                {key: h.snapshot() for key, h in histograms.items()})
+
+    def summary(self):
+        """Statistics (ns) as dict, per-key entries are keyed by name.
+        """
+        result = {"all": self.histogram.summary()}
+        for key, histogram in list(self.histograms.items()):
+            result[getattr(key, "name", str(key))] = histogram.summary()
+        return result
 
     def __str__(self):
         unitName = Timing.UNIT_MAP.get(self.unit, "??")
-        self.min = 0 if self.min is None else self.min
-        self.max = 0 if self.max is None else self.max
-        self.avg = 0 if self.avg is None else self.avg
-        self._previous = 0 if self._previous is None else self._previous
-        return Timing.FMT.format(
-            self.min * self.unit, self.max * self.unit, self.avg * self.unit,
-            self._previous * self.unit, unitName)
+        values = [v or 0 for v in (self.min, self.max, self.avg, self.last)]
+        return Timing.FMT.format(*[v * self.unit for v in values], unitName)
 
     __repr__ = __str__
 
     @property
     def values(self):
-        return self._values
+        return list(self._values)
@@ -35,3 +35,5 @@ if PY36_OR_HIGHER:
     # only import can transport with Python 3.6 or higher because it uses
     # variable annotations (introduced in 3.6 - PEP526)
     from .can import Can
+    from .socketcan import SocketCAN
+    from .virtualcan import VirtualCan
@@ -24,22 +24,36 @@ __copyright__ = """
 """
 
 import abc
+import logging
 import queue
 import threading
+import time
 
 from ..logger import Logger
-from ..utils import flatten, hexDump, PYTHON_VERSION
+from ..utils import hexDump, packBytes, PYTHON_VERSION
 
 import pyxcp.types as types
 from pyxcp.config import Config
 
-from ..timing import Timing
+from ..metrics import TransportMetrics
+from .trace import FrameTrace
+from ..timeouts import TimeoutPolicy
+from ..timing import Timing, perf_counter_ns
 
 from datetime import datetime
 
+# Payloads of at least this size are sent via `sendParts` instead of being
+# copied into the frame buffer.
+SCATTER_GATHER_THRESHOLD = 64
+
+COMMAND_BYTES = {cmd: cmd.to_bytes(cmd.bit_length() // 8, "big") for cmd in types.Command}
+
 
 class BaseTransport(metaclass=abc.ABCMeta):
 
+    # The transport-layer header carries a packet counter (not on CAN).
+    HAS_COUNTER = True
+
     def __init__(self, config=None, loglevel='WARN'):
         self.parent = None
         self.config = Config(config or {})
@@ -49,17 +63,32 @@ class BaseTransport(metaclass=abc.ABCMeta):
         self.counterSend = 0
         self.counterReceived = 0
         self.timing = Timing()
+        self.timeouts = TimeoutPolicy.fromConfig(self.config, self.timing)
+        self._responseTimedOut = False
         self.resQueue = queue.Queue()
         self.daqQueue = queue.Queue()
         self.evQueue = queue.Queue()
         self.servQueue = queue.Queue()
-        self.listener = threading.Thread(
-            target=self.listen,
-            args=(),
-            kwargs={},
-        )
+        self.listener = self._createListener()
 
         self.first_daq_timestamp = None
+        # Receive timestamps are integer nanoseconds of `perf_counter_ns`;
+        # use `wallClock` to convert them to seconds since the epoch.
+        self.timestampOrigin = (time.time(), perf_counter_ns())
+        self.timestampResponse = None
+        self.metrics = None
+        self.frameTrace = None
+        self.journal = None
+        # Called with the counter of every non-DAQ packet, s.
+        # `pyxcp.daq.integrity.IntegrityChecker.attach`.
+        self.counterObserver = None
+        # Set by `connectionLost`, requests fail fast until `reconnect`.
+        self.connectionError = None
+        self.onConnectionLost = None
+        self.requestLock = threading.RLock()
+        # Counter update and send, shared by requests and `sendFrame`.
+        self.sendLock = threading.Lock()
+        self._frameBuffer = bytearray(self.HEADER_SIZE + 8)
 
     def __del__(self):
         self.finishListener()
@@ -67,50 +96,213 @@ class BaseTransport(metaclass=abc.ABCMeta):
 
     def close(self):
         self.finishListener()
-        if self.listener.isAlive():
+        if self.listener.is_alive():
             self.listener.join()
         self.closeConnection()
+        self.disableFrameTrace()
 
     @abc.abstractmethod
     def connect(self):
         pass
 
+    def _createListener(self):
+        return threading.Thread(
+            target=self.listen,
+            args=(),
+            kwargs={},
+        )
+
     def startListener(self):
+        if self.listener.ident is not None:
+            # Threads can only be started once, e.g. after `reconnect`.
+            self.listener = self._createListener()
         self.listener.start()
 
+    def connectionLost(self, exc):
+        """Called from `listen` if the connection broke down.
+
+        Parameters
+        ----------
+        exc : Exception
+        """
+        if self.closeEvent.is_set():
+            return  # Regular shutdown.
+        self.connectionError = exc
+        self.logger.error("Connection lost: %s", exc)
+        if self.onConnectionLost is not None:
+            self.onConnectionLost(exc)
+
+    def reconnect(self):
+        """Tear down and re-establish the connection (new listener thread).
+
+        Not supported by every transport-layer.
+        """
+        raise NotImplementedError("{} does not support reconnect.".format(self.__class__.__name__))
+
     def finishListener(self):
         if hasattr(self, "closeEvent"):
             self.closeEvent.set()
 
+    def enableMetrics(self, metrics=None):
+        """Start collecting runtime metrics.
+
+        Parameters
+        ----------
+        metrics : `pyxcp.metrics.TransportMetrics`
+            Defaults to a new instance.
+
+        Returns
+        -------
+        `pyxcp.metrics.TransportMetrics`
+        """
+        if metrics is None:
+            metrics = TransportMetrics()
+        self.metrics = metrics
+        return metrics
+
+    def disableMetrics(self):
+        self.metrics = None
+
+    def enableFrameTrace(self, filename):
+        """Write all frames to a binary trace file.
+
+        Returns
+        -------
+        `pyxcp.transport.trace.FrameTrace`
+        """
+        self.disableFrameTrace()
+        self.frameTrace = FrameTrace.forTransport(self, filename)
+        return self.frameTrace
+
+    def disableFrameTrace(self):
+        if self.frameTrace is not None:
+            self.frameTrace.close()
+            self.frameTrace = None
+
     def request(self, cmd, *data):
-        self.logger.debug(cmd.name)
-        self.parent._setService(cmd)
-        cmdlen = cmd.bit_length()//8  # calculate bytes needed for cmd
-        header = self.HEADER.pack(cmdlen + len(data), self.counterSend)
-        self.counterSend = (self.counterSend + 1) & 0xffff
-
-        frame = header + bytes(flatten(cmd.to_bytes(cmdlen, 'big'), data))
-        self.logger.debug("-> {}".format(hexDump(frame)))
-        self.timing.start()
-        self.send(frame)
-
-        try:
-            xcpPDU = self.resQueue.get(timeout=2.0)
-        except queue.Empty:
-            if PYTHON_VERSION >= (3, 3):
-                raise types.XcpTimeoutError("Response timed out.") from None
+        """Send command and wait for the response.
+
+        Parameters
+        ----------
+        cmd : `pyxcp.types.Command`
+        data : int or bytes-like
+            Command parameters.
+
+        Returns
+        -------
+        bytes
+            Response without PID.
+        """
+        return self.requestPayload(cmd, packBytes(data))
+
+    def requestPayload(self, cmd, params, payload=b""):
+        """Like `request`, but with prebuilt parameters and bulk payload.
+
+        Parameters
+        ----------
+        cmd : `pyxcp.types.Command`
+        params : bytes
+            Command parameters.
+        payload : bytes-like
+            Appended to `params`, e.g. DOWNLOAD data; large payloads are
+            passed to `sendParts` without copying.
+        """
+        with self.requestLock:
+            if self.connectionError is not None:
+                raise types.XcpTimeoutError("Connection lost: {}".format(self.connectionError))
+            debug = self.logger.isEnabledFor(logging.DEBUG)
+            if debug:
+                self.logger.debug("%s", cmd.name)
+            self.parent._setService(cmd)
+            cmdBytes = COMMAND_BYTES[cmd]
+            prefixSize = self.HEADER_SIZE + len(cmdBytes) + len(params)
+            payloadSize = len(payload)
+            frameSize = prefixSize + payloadSize
+            scatter = payloadSize >= SCATTER_GATHER_THRESHOLD
+            buffer = self._frameBuffer
+            needed = prefixSize if scatter else frameSize
+            if len(buffer) < needed:
+                buffer.extend(bytes(needed - len(buffer)))
+            metrics = self.metrics
+            if metrics is not None:
+                metrics.requestSent(cmd, frameSize)
+            if self._responseTimedOut:
+                self._dropLateResponses()
+            timeout = self.timeouts.timeout(cmd)
+            with self.sendLock:
+                self.HEADER.pack_into(buffer, 0, frameSize - self.HEADER_SIZE, self.counterSend)
+                self.counterSend = (self.counterSend + 1) & 0xffff
+                offset = self.HEADER_SIZE + len(cmdBytes)
+                buffer[self.HEADER_SIZE:offset] = cmdBytes
+                buffer[offset:prefixSize] = params
+                if scatter:
+                    prefix = bytes(memoryview(buffer)[:prefixSize])
+                    frame = None
+                else:
+                    if payloadSize:
+                        buffer[prefixSize:frameSize] = payload
+                    frame = bytes(memoryview(buffer)[:frameSize])
+                if debug or self.frameTrace is not None:
+                    fullFrame = frame if frame is not None else prefix + bytes(payload)
+                    if debug:
+                        self.logger.debug("-> %s", hexDump(fullFrame))
+                    if self.frameTrace is not None:
+                        self.frameTrace.sent(fullFrame)
+                self.timing.start()
+                if frame is not None:
+                    self.send(frame)
+                else:
+                    self.sendParts(prefix, payload)
+
+            try:
+                xcpPDU = self.resQueue.get(timeout=timeout)
+            except queue.Empty:
+                self._responseTimedOut = True
+                self.timeouts.timedOut(cmd)
+                if metrics is not None:
+                    metrics.timeout(cmd)
+                if PYTHON_VERSION >= (3, 3):
+                    raise types.XcpTimeoutError("Response timed out.") from None
+                else:
+                    raise types.XcpTimeoutError("Response timed out.")
+            self.resQueue.task_done()   # TODO: move up!?
+            elapsed = self.timing.stop(cmd)
+            if metrics is not None:
+                metrics.responseReceived(cmd, len(xcpPDU), elapsed)
+
+            pid = types.Response.parse(xcpPDU).type
+            if pid == 'ERR' and cmd.name != 'SYNCH':
+                err = types.XcpError.parse(xcpPDU[1:])
+                if metrics is not None:
+                    metrics.errorReceived(cmd, err)
+                raise types.XcpResponseError(err)
             else:
-                raise types.XcpTimeoutError("Response timed out.")
-        self.resQueue.task_done()   # TODO: move up!?
-        self.timing.stop()
-
-        pid = types.Response.parse(xcpPDU).type
-        if pid == 'ERR' and cmd.name != 'SYNCH':
-            err = types.XcpError.parse(xcpPDU[1:])
-            raise types.XcpResponseError(err)
-        else:
-            pass    # Und nu??
-        return xcpPDU[1:]
+                pass    # Und nu??
+            if self.journal is not None:
+                self.journal.record(cmd, params)
+            return xcpPDU[1:]
+
+    def allocFrame(self, size):
+        """Zero-initialized frame buffer for a packet of `size` bytes, s. `sendFrame`.
+
+        The packet starts at offset `HEADER_SIZE`.
+        """
+        return bytearray(self.HEADER_SIZE + size)
+
+    def sendFrame(self, frame):
+        """Send a prebuilt packet (e.g. a STIM DTO) without waiting for a response.
+
+        The transport-layer header of `frame` (from `allocFrame`) is
+        updated in place, so repeated sends don't allocate. Only the send
+        lock is taken; a request waiting for its response doesn't delay the
+        packet.
+        """
+        with self.sendLock:
+            self.HEADER.pack_into(frame, 0, len(frame) - self.HEADER_SIZE, self.counterSend)
+            self.counterSend = (self.counterSend + 1) & 0xffff
+            if self.frameTrace is not None:
+                self.frameTrace.sent(bytes(frame))
+            self.send(frame)
 
     def block_receive(self, length_required: int) -> bytes:
         """
@@ -118,19 +310,39 @@ class BaseTransport(metaclass=abc.ABCMeta):
         :param length_required: number of bytes to be expected in block response packets
         :return: all payload bytes received in block response packets
         """
+        timeout = self.timeouts.timeout(self.parent.service)
         block_response = b''
         while len(block_response) < length_required:
             try:
-                partial_response = self.resQueue.get(timeout=2.0)
+                partial_response = self.resQueue.get(timeout=timeout)
                 block_response += partial_response[1:]
             except queue.Empty:
+                self._responseTimedOut = True
                 raise types.XcpTimeoutError("Response timed out.") from None
         return block_response
 
+    def _dropLateResponses(self):
+        """Discard responses to requests which already timed out.
+        """
+        self._responseTimedOut = False
+        while True:
+            try:
+                self.resQueue.get_nowait()
+            except queue.Empty:
+                break
+
     @abc.abstractmethod
     def send(self, frame):
         pass
 
+    def sendParts(self, *parts):
+        """Send a frame given as consecutive parts (scatter/gather).
+
+        Transport-layers able to send without joining the parts should
+        override this.
+        """
+        self.send(b"".join(parts))
+
     @abc.abstractmethod
     def closeConnection(self):
         pass
@@ -139,7 +351,40 @@ class BaseTransport(metaclass=abc.ABCMeta):
     def listen(self):
         pass
 
-    def processResponse(self, response, length, counter):
+    def wallClock(self, timestamp):
+        """Convert a receive timestamp to seconds since the epoch.
+
+        Parameters
+        ----------
+        timestamp : int
+            `perf_counter_ns` value, as stored with every DAQ packet.
+
+        Returns
+        -------
+        float
+        """
+        wall, perf = self.timestampOrigin
+        return wall + (timestamp - perf) / 1000000000
+
+    def processResponse(self, response, length, counter, timestamp=None):
+        """Dispatch a received packet.
+
+        Parameters
+        ----------
+        response : bytes
+            XCP packet (without transport-layer header).
+        length : int
+        counter : int
+        timestamp : int
+            Receive time in `pyxcp.timing.perf_counter_ns` domain, should be
+            taken as close as possible to the wire; `None` means "now".
+
+        Notes
+        -----
+        DAQ packets are queued as `(response, counter, length, timestamp)`.
+        """
+        if timestamp is None:
+            timestamp = perf_counter_ns()
         self.counterReceived = counter
         if hasattr(self, 'use_tcp'):
             use_tcp = self.use_tcp
@@ -152,15 +397,18 @@ class BaseTransport(metaclass=abc.ABCMeta):
             if len(response) != length:
                 raise types.FrameSizeError("Size mismatch.")
         pid = response[0]
+        metrics = self.metrics
+        if metrics is not None:
+            metrics.packetReceived(pid, length)
+        if self.frameTrace is not None:
+            self.frameTrace.received(response, counter, timestamp)
         if pid >= 0xFC:
-            self.logger.debug(
-                "<- L{} C{} {}".format(
-                    length,
-                    counter,
-                    hexDump(response),
-                )
-            )
+            if self.logger.isEnabledFor(logging.DEBUG):
+                self.logger.debug("<- L%d C%d %s", length, counter, hexDump(response))
+            if self.counterObserver is not None:
+                self.counterObserver(counter)
             if pid >= 0xfe:
+                self.timestampResponse = timestamp
                 self.resQueue.put(response)
             elif pid == 0xfd:
                 self.evQueue.put(response)
@@ -169,4 +417,6 @@ class BaseTransport(metaclass=abc.ABCMeta):
         else:
             if self.first_daq_timestamp is None:
                 self.first_daq_timestamp = datetime.now()
-            self.daqQueue.put((response, counter, length))
+            self.daqQueue.put((response, counter, length, timestamp))
+            if metrics is not None:
+                metrics.daqReceived(length, self.daqQueue.qsize())
@@ -40,7 +40,8 @@ class CanInterfaceBase(metaclass=abc.ABCMeta):
         Must implement any required action for initing the can interface
         :param master_id_with_ext: CAN ID on 32 bit, where MSB bit indicates extended ID format
         :param slave_id_with_ext: CAN ID on 32 bit, where MSB bit indicates extended ID format
-        :param receive_callback: receive callback function to register with the following argument: payload: bytes
+        :param receive_callback: receive callback function to register with the following arguments:
+            payload: bytes, timestamp: int (receive time in `pyxcp.timing.perf_counter_ns` domain, optional)
         """
         pass
 
@@ -66,15 +67,21 @@ class CanInterfaceBase(metaclass=abc.ABCMeta):
 
 class EmptyHeader:
     """ There is no header for XCP on CAN  """
+    size = 0
+
     def pack(self, *args, **kwargs):
         return b''
 
+    def pack_into(self, *args, **kwargs):
+        pass
+
 
 class Can(BaseTransport):
 
     MAX_DATAGRAM_SIZE = 7
     HEADER = EmptyHeader()
     HEADER_SIZE = 0
+    HAS_COUNTER = False
 
     def __init__(self, canInterface: CanInterfaceBase, config=None, loglevel="WARN"):
         super().__init__(config, loglevel)
@@ -102,14 +109,14 @@ class Can(BaseTransport):
         self.canInterface.init(self.can_id_master, self.can_id_slave, self.dataReceived)
         self.startListener()
 
-    def dataReceived(self, payload: bytes):
-        self.processResponse(payload, len(payload), counter=0)
+    def dataReceived(self, payload: bytes, timestamp: int = None):
+        self.processResponse(payload, len(payload), counter=0, timestamp=timestamp)
 
     def listen(self):
         pass
 
     def connect(self):
-        self.CanInterface.connect()
+        self.canInterface.connect()
         self.status = 1  # connected
 
     def send(self, frame):
@@ -117,7 +124,7 @@ class Can(BaseTransport):
         if self.max_dlc_required:
             # append fill bytes up to MAX DLC (=8)
             if len(frame) < 8:
-                frame += b'\x00' * (8 - len(frame))
+                frame = frame + b'\x00' * (8 - len(frame))    # Don't extend prebuilt frames.
         # send the request
         self.canInterface.transmit(payload=frame)
 
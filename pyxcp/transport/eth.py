@@ -26,11 +26,16 @@ __copyright__ = """
 import selectors
 import socket
 import struct
+import threading
 
+from pyxcp.timing import perf_counter_ns, time_ns
 from pyxcp.transport.base import BaseTransport
 
 DEFAULT_XCP_PORT = 5555
 
+SO_TIMESTAMPNS = getattr(socket, "SO_TIMESTAMPNS", 35)   # Linux only.
+TIMESPEC = struct.Struct("@ll")
+
 
 class Eth(BaseTransport):
     """
@@ -45,25 +50,41 @@ class Eth(BaseTransport):
         if ipv6 and not socket.has_ipv6:
             raise RuntimeError("IPv6 not supported by your platform.")
         else:
-            addressFamily = socket.AF_INET6 if ipv6 else socket.AF_INET
-        self.sock = socket.socket(
-            addressFamily,
-            socket.SOCK_STREAM if protocol == 'TCP' else socket.SOCK_DGRAM
-        )
+            self.addressFamily = socket.AF_INET6 if ipv6 else socket.AF_INET
         if host.lower() == "localhost":
             self.host = "::1" if ipv6 else "localhost"
         else:
             self.host = host
         self.port = port
         self.status = 0
+        self.use_tcp = protocol == 'TCP'
         self.selector = selectors.DefaultSelector()
+        self._createSocket()
+        super(Eth, self).__init__(config, loglevel)
+        self.kernelTimestamps = False
+        if getattr(self.config, "KERNEL_TIMESTAMPS", False) and not self.use_tcp:
+            self._enableKernelTimestamps()
+
+    def _createSocket(self):
+        self.sock = socket.socket(
+            self.addressFamily,
+            socket.SOCK_STREAM if self.use_tcp else socket.SOCK_DGRAM
+        )
         self.selector.register(self.sock, selectors.EVENT_READ)
-        self.use_tcp = protocol == 'TCP'
         self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
         if hasattr(socket, "SO_REUSEPORT"):
             self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
         self.sock.settimeout(0.5)
-        super(Eth, self).__init__(config, loglevel)
+
+    def _enableKernelTimestamps(self):
+        """Let the kernel stamp incoming datagrams (`SO_TIMESTAMPNS`).
+        """
+        try:
+            self.sock.setsockopt(socket.SOL_SOCKET, SO_TIMESTAMPNS, 1)
+        except OSError as e:
+            self.logger.warn("Kernel timestamps not available: %s", e)
+        else:
+            self.kernelTimestamps = True
 
     def connect(self):
         if self.status == 0:
@@ -71,6 +92,23 @@ class Eth(BaseTransport):
             self.startListener()
             self.status = 1  # connected
 
+    def reconnect(self):
+        """Open a new socket and listener, e.g. after the slave was reset.
+        """
+        self.finishListener()
+        if self.listener.is_alive() and self.listener is not threading.current_thread():
+            self.listener.join()
+        self.selector.unregister(self.sock)
+        self.sock.close()
+        self.status = 0
+        self._createSocket()
+        if self.kernelTimestamps:
+            self._enableKernelTimestamps()
+        self._dropLateResponses()
+        self.closeEvent.clear()
+        self.connect()
+        self.connectionError = None
+
     def listen(self):
         HEADER_UNPACK = self.HEADER.unpack
         HEADER_SIZE = self.HEADER_SIZE
@@ -82,8 +120,12 @@ class Eth(BaseTransport):
         socket_fileno = self.sock.fileno
         select = self.selector.select
 
+        kernelTimestamps = self.kernelTimestamps
         if use_tcp:
             sock_recv = self.sock.recv
+        elif kernelTimestamps:
+            sock_recvmsg = self.sock.recvmsg
+            ancSize = socket.CMSG_SPACE(TIMESPEC.size)
         else:
             sock_recv = self.sock.recvfrom
 
@@ -94,6 +136,7 @@ class Eth(BaseTransport):
                 sel = select(0.1)
                 for _, events in sel:
                     if events & EVENT_READ:
+                        timestamp = perf_counter_ns()
                         if use_tcp:
 
                             # first try to get the header in one go
@@ -102,13 +145,16 @@ class Eth(BaseTransport):
                             header = sock_recv(HEADER_SIZE)
                             size = len(header)
                             if size != HEADER_SIZE:
+                                if not size:
+                                    raise ConnectionError("Connection closed by slave.")
 
                                 header = bytearray(header)
 
                                 while len(header) != HEADER_SIZE:
-                                    header.extend(
-                                        sock_recv(HEADER_SIZE - len(header))
-                                    )
+                                    chunk = sock_recv(HEADER_SIZE - len(header))
+                                    if not chunk:
+                                        raise ConnectionError("Connection closed by slave.")
+                                    header.extend(chunk)
 
                             length, counter = HEADER_UNPACK(header)
 
@@ -122,10 +168,33 @@ class Eth(BaseTransport):
 
                                     response = bytearray(response)
                                     while len(response) != length:
-                                        response.extend(
-                                            sock_recv(length - len(response))
-                                        )
+                                        chunk = sock_recv(length - len(response))
+                                        if not chunk:
+                                            raise ConnectionError("Connection closed by slave.")
+                                        response.extend(chunk)
 
+                            except ConnectionError:
+                                raise
+                            except Exception as e:
+                                self.logger.error(str(e))
+                                continue
+                        elif kernelTimestamps:
+                            # Map kernel (CLOCK_REALTIME) stamps onto `perf_counter_ns`,
+                            # on every wake-up to follow clock adjustments.
+                            clockOffset = time_ns() - perf_counter_ns()
+                            try:
+                                response, ancdata, _, _ = sock_recvmsg(
+                                    Eth.MAX_DATAGRAM_SIZE, ancSize
+                                )
+                                for level, kind, data in ancdata:
+                                    if level == socket.SOL_SOCKET and \
+                                            kind == SO_TIMESTAMPNS:
+                                        sec, nsec = TIMESPEC.unpack(data)
+                                        timestamp = (sec * 1000000000 + nsec) - clockOffset
+                                length, counter = HEADER_UNPACK(
+                                    response[:HEADER_SIZE]
+                                )
+                                response = response[HEADER_SIZE:]
                             except Exception as e:
                                 self.logger.error(str(e))
                                 continue
@@ -142,14 +211,24 @@ class Eth(BaseTransport):
                                 self.logger.error(str(e))
                                 continue
 
-                        processResponse(response, length, counter)
-            except Exception:
+                        processResponse(response, length, counter, timestamp)
+            except Exception as e:
                 self.status = 0  # disconnected
+                self.connectionLost(e)
                 break
 
     def send(self, frame):
         self.sock.send(frame)
 
+    def sendParts(self, *parts):
+        if not hasattr(self.sock, "sendmsg"):   # Windows.
+            self.sock.send(b"".join(parts))
+            return
+        sent = self.sock.sendmsg(parts)
+        total = sum(len(part) for part in parts)
+        if sent < total:
+            self.sock.sendall(b"".join(parts)[sent:])
+
     def closeConnection(self):
         if not self.invalidSocket:
             # Seems to be problematic /w IPv6
@@ -0,0 +1,185 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Capture and replay of transport-layer traffic.
+
+`Capture` attaches a binary frame trace (`pyxcp.transport.trace`) to an
+existing transport-layer instance, logging every frame sent and every
+packet received with its `perf_counter_ns` timestamp.
+`ReplayTransport` plays such a capture back, either with original timing,
+accelerated or as fast as possible, which makes decode/record pipelines
+benchmarkable without hardware.
+"""
+
+__copyright__ = """
+    pySART - Simplified AUTOSAR-Toolkit for Python.
+
+   (C) 2009-2019 by Christoph Schueler <cpu12.gems@googlemail.com>
+
+   All Rights Reserved
+
+  This program is free software; you can redistribute it and/or modify
+  it under the terms of the GNU General Public License as published by
+  the Free Software Foundation; either version 2 of the License, or
+  (at your option) any later version.
+
+  This program is distributed in the hope that it will be useful,
+  but WITHOUT ANY WARRANTY; without even the implied warranty of
+  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+  GNU General Public License for more details.
+
+  You should have received a copy of the GNU General Public License along
+  with this program; if not, write to the Free Software Foundation, Inc.,
+  51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+"""
+
+import queue
+import struct
+import time
+
+from pyxcp.logger import Logger
+from pyxcp.timing import perf_counter_ns
+from pyxcp.transport.base import BaseTransport
+from pyxcp.transport.can import EmptyHeader
+from pyxcp.transport.trace import FrameTrace, readTrace, RECEIVED, SENT, TraceError, TraceRecord
+
+# Names of the capture API before the format moved to `pyxcp.transport.trace`
+# (captures are traces of version 1).
+CaptureError = TraceError
+CaptureRecord = TraceRecord
+readCapture = readTrace
+
+
+class Capture:
+    """Log traffic of a transport-layer instance to a file.
+
+    Thin wrapper installing a `pyxcp.transport.trace.FrameTrace` as
+    `transport.frameTrace`.
+
+    Parameters
+    ----------
+    transport : `pyxcp.transport.base.BaseTransport`
+    filename : str
+    """
+
+    def __init__(self, transport, filename):
+        self.transport = transport
+        self.filename = filename
+        self.trace = FrameTrace.forTransport(transport, filename)
+        self._previous = transport.frameTrace
+        transport.frameTrace = self.trace
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    @property
+    def records(self):
+        return self.trace.records
+
+    def stop(self):
+        """Detach from transport-layer and close capture file.
+        """
+        if self.transport.frameTrace is self.trace:
+            self.transport.frameTrace = self._previous
+        self.trace.close()
+
+
+class ReplayTransport(BaseTransport):
+    """Transport-layer feeding back captured traffic.
+
+    Received packets are grouped into segments: those recorded before the
+    first sent frame are played on `connect`, the others after the sent
+    frame they followed in the capture has been replayed, keeping their
+    original distance (divided by `speed`) to that frame.
+
+    Parameters
+    ----------
+    filename : str
+        Capture file written by `Capture` (or any other frame trace).
+    speed : float
+        Time scaling, 1.0 is original speed, 0 (or `None`) means as fast
+        as possible.
+    strict : bool
+        Raise `pyxcp.transport.trace.TraceError` if a sent frame differs
+        from the captured one (otherwise mismatches are only counted).
+    """
+
+    def __init__(self, filename, speed=1.0, strict=False, config=None, loglevel="WARN"):
+        maxDatagramSize, fmt, records = readTrace(filename)
+        self.MAX_DATAGRAM_SIZE = maxDatagramSize
+        self.HEADER = struct.Struct(fmt) if fmt else EmptyHeader()
+        self.HEADER_SIZE = self.HEADER.size if fmt else 0
+        self.HAS_COUNTER = bool(fmt)
+        self.speed = speed
+        self.strict = strict
+        self.mismatches = 0
+        self.sentFrames = []
+        self.segments = []
+        self._buildSegments(records)
+        self._sendIndex = 0
+        self._pending = queue.Queue()
+        self.status = 0
+        super(ReplayTransport, self).__init__(config, loglevel)
+        self.logger = Logger("transport.Replay")
+        self.logger.setLevel(loglevel)
+
+    def _buildSegments(self, records):
+        trigger = records[0].timestamp if records else 0
+        current = []
+        self.segments.append((trigger, current))
+        for record in records:
+            if record.direction == SENT:
+                self.sentFrames.append(record.data)
+                current = []
+                self.segments.append((record.timestamp, current))
+            else:
+                current.append(record)
+
+    def connect(self):
+        if self.status == 0:
+            self.startListener()
+            self._pending.put(self.segments[0])
+            self.status = 1
+
+    def send(self, frame):
+        index = self._sendIndex
+        if index >= len(self.sentFrames):
+            raise TraceError("Capture exhausted after {} frames.".format(index))
+        if bytes(frame) != self.sentFrames[index]:
+            self.mismatches += 1
+            if self.strict:
+                raise TraceError("Frame #{} differs from capture.".format(index))
+        self._sendIndex = index + 1
+        self._pending.put(self.segments[index + 1])
+
+    def listen(self):
+        processResponse = self.processResponse
+        close_event_set = self.closeEvent.is_set
+        while not close_event_set():
+            try:
+                trigger, records = self._pending.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            start = perf_counter_ns()
+            speed = self.speed
+            for record in records:
+                if speed:
+                    due = start + (record.timestamp - trigger) / speed
+                    delay = (due - perf_counter_ns()) / 1000000000
+                    if delay > 0:
+                        time.sleep(delay)
+                if close_event_set():
+                    return
+                processResponse(record.data, len(record.data), record.counter, perf_counter_ns())
+
+    @property
+    def exhausted(self):
+        """All captured requests have been replayed.
+        """
+        return self._sendIndex >= len(self.sentFrames)
+
+    def closeConnection(self):
+        self.status = 0
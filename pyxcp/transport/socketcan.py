@@ -0,0 +1,277 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Linux SocketCAN driver for XCPonCAN.
+
+Uses raw `AF_CAN` sockets; the slave identifier is installed as a kernel
+receive filter, so unrelated bus traffic never reaches Python.
+Works with real hardware (e.g. `can0`) as well as with virtual CAN
+interfaces (`vcan0`)::
+
+    $ sudo modprobe vcan
+    $ sudo ip link add dev vcan0 type vcan
+    $ sudo ip link set up vcan0
+"""
+
+__copyright__ = """
+    pySART - Simplified AUTOSAR-Toolkit for Python.
+
+   (C) 2009-2019 by Christoph Schueler <cpu12.gems@googlemail.com>
+
+   All Rights Reserved
+
+  This program is free software; you can redistribute it and/or modify
+  it under the terms of the GNU General Public License as published by
+  the Free Software Foundation; either version 2 of the License, or
+  (at your option) any later version.
+
+  This program is distributed in the hope that it will be useful,
+  but WITHOUT ANY WARRANTY; without even the implied warranty of
+  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+  GNU General Public License for more details.
+
+  You should have received a copy of the GNU General Public License along
+  with this program; if not, write to the Free Software Foundation, Inc.,
+  51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+"""
+
+import selectors
+import socket
+import struct
+import threading
+
+from pyxcp.logger import Logger
+from pyxcp.timing import perf_counter_ns, time_ns
+from pyxcp.transport.can import CanInterfaceBase
+
+HAS_SOCKETCAN = hasattr(socket, "AF_CAN")
+
+CAN_EFF_FLAG = 0x80000000
+CAN_RTR_FLAG = 0x40000000
+CAN_ERR_FLAG = 0x20000000
+CAN_SFF_MASK = 0x000007FF
+CAN_EFF_MASK = 0x1FFFFFFF
+
+CANFD_BRS = 0x01
+
+# Not (yet) exported by the `socket` module.
+SOL_CAN_RAW = getattr(socket, "SOL_CAN_RAW", 101)
+CAN_RAW_FILTER = getattr(socket, "CAN_RAW_FILTER", 1)
+CAN_RAW_ERR_FILTER = getattr(socket, "CAN_RAW_ERR_FILTER", 2)
+CAN_RAW_FD_FRAMES = getattr(socket, "CAN_RAW_FD_FRAMES", 5)
+SO_TIMESTAMPNS = getattr(socket, "SO_TIMESTAMPNS", 35)
+SO_TIMESTAMPING = getattr(socket, "SO_TIMESTAMPING", 37)
+SCM_TIMESTAMPNS = SO_TIMESTAMPNS
+SCM_TIMESTAMPING = SO_TIMESTAMPING
+
+SOF_TIMESTAMPING_RX_HARDWARE = 0x04
+SOF_TIMESTAMPING_RX_SOFTWARE = 0x08
+SOF_TIMESTAMPING_SOFTWARE = 0x10
+SOF_TIMESTAMPING_RAW_HARDWARE = 0x40
+
+CAN_FRAME = struct.Struct("=IB3x8s")        # struct can_frame
+CANFD_FRAME = struct.Struct("=IBB2x64s")    # struct canfd_frame
+CAN_FILTER = struct.Struct("=II")           # struct can_filter
+TIMESPEC = struct.Struct("@ll")             # struct timespec
+
+CANFD_DLC_LENGTHS = (0, 1, 2, 3, 4, 5, 6, 7, 8, 12, 16, 20, 24, 32, 48, 64)
+
+
+def canFdPadLength(length):
+    """Round `length` up to the next valid CAN-FD payload size.
+    """
+    for value in CANFD_DLC_LENGTHS:
+        if value >= length:
+            return value
+    raise ValueError("CAN-FD payload too large: {} bytes.".format(length))
+
+
+def canFilter(identifier):
+    """Build a `struct can_filter` exactly matching `identifier`.
+
+    Parameters
+    ----------
+    identifier : int
+        CAN ID on 32 bit, where MSB bit indicates extended ID format.
+    """
+    if identifier & CAN_EFF_FLAG:
+        mask = CAN_EFF_FLAG | CAN_RTR_FLAG | CAN_EFF_MASK
+        identifier &= (CAN_EFF_FLAG | CAN_EFF_MASK)
+    else:
+        mask = CAN_EFF_FLAG | CAN_RTR_FLAG | CAN_SFF_MASK
+        identifier &= CAN_SFF_MASK
+    return CAN_FILTER.pack(identifier, mask)
+
+
+class SocketCAN(CanInterfaceBase):
+    """CAN interface handler based on Linux SocketCAN.
+
+    Parameters
+    ----------
+    channel : str
+        Network interface name, e.g. "can0" or "vcan0".
+    fd : bool
+        Use CAN-FD frames (payloads up to 64 bytes).
+    batchSize : int
+        Max. number of frames drained from the socket per wake-up.
+    timestamps : bool
+        Request kernel receive timestamps (hardware if supported by the
+        controller, software otherwise).
+    loglevel : ["INFO", "WARN", "ERROR", "DEBUG"]
+    """
+
+    POLL_INTERVAL = 0.1
+
+    def __init__(self, channel="vcan0", fd=False, batchSize=64,
+                 timestamps=True, loglevel="WARN"):
+        if not HAS_SOCKETCAN:
+            raise RuntimeError("SocketCAN not supported by your platform.")
+        self.channel = channel
+        self.fd = fd
+        self.batchSize = batchSize
+        self.timestamps = timestamps
+        self.logger = Logger("transport.SocketCAN")
+        self.logger.setLevel(loglevel)
+        self.sock = None
+        self.receiveCallback = None
+        self.masterId = None
+        self.slaveId = None
+        self.soTimestamping = False
+        self._hardwareOffset = None
+        self.framesReceived = 0
+        self.closeEvent = threading.Event()
+        self.receiver = None
+
+    def init(self, master_id_with_ext, slave_id_with_ext, receive_callback):
+        self.masterId = master_id_with_ext
+        self.slaveId = slave_id_with_ext
+        self.receiveCallback = receive_callback
+
+    def connect(self):
+        if self.sock is not None:
+            return
+        sock = socket.socket(socket.AF_CAN, socket.SOCK_RAW, socket.CAN_RAW)
+        # Kernel-side filtering: only slave responses, no error frames.
+        sock.setsockopt(SOL_CAN_RAW, CAN_RAW_FILTER, canFilter(self.slaveId))
+        sock.setsockopt(SOL_CAN_RAW, CAN_RAW_ERR_FILTER, 0)
+        if self.fd:
+            sock.setsockopt(SOL_CAN_RAW, CAN_RAW_FD_FRAMES, 1)
+        if self.timestamps:
+            self._enableTimestamps(sock)
+        sock.bind((self.channel, ))
+        sock.setblocking(False)
+        self.sock = sock
+        self.closeEvent.clear()
+        self.receiver = threading.Thread(target=self.receive, name="SocketCAN-Rx")
+        self.receiver.daemon = True
+        self.receiver.start()
+
+    def _enableTimestamps(self, sock):
+        flags = (SOF_TIMESTAMPING_RX_HARDWARE | SOF_TIMESTAMPING_RAW_HARDWARE |
+                 SOF_TIMESTAMPING_RX_SOFTWARE | SOF_TIMESTAMPING_SOFTWARE)
+        try:
+            sock.setsockopt(socket.SOL_SOCKET, SO_TIMESTAMPING, flags)
+        except OSError:
+            self.soTimestamping = False
+            sock.setsockopt(socket.SOL_SOCKET, SO_TIMESTAMPNS, 1)
+        else:
+            self.soTimestamping = True
+
+    def transmit(self, payload):
+        length = len(payload)
+        if self.fd:
+            padded = canFdPadLength(length)
+            frame = CANFD_FRAME.pack(
+                self.masterId, padded, CANFD_BRS,
+                bytes(payload) + bytes(padded - length))
+        else:
+            frame = CAN_FRAME.pack(self.masterId, length, bytes(payload))
+        self.sock.send(frame)
+
+    def receive(self):
+        """Receiver thread: drain up to `batchSize` frames per wake-up.
+        """
+        frameSize = CANFD_FRAME.size if self.fd else CAN_FRAME.size
+        ancSize = socket.CMSG_SPACE(TIMESPEC.size * 3) if self.timestamps else 0
+        selector = selectors.DefaultSelector()
+        selector.register(self.sock, selectors.EVENT_READ)
+        select = selector.select
+        close_event_set = self.closeEvent.is_set
+        recvmsg = self.sock.recvmsg
+        decode = self._decode
+        callback = self.receiveCallback
+        batchSize = self.batchSize
+        offset = time_ns() - perf_counter_ns() if self.timestamps else 0
+
+        while not close_event_set():
+            try:
+                if not select(self.POLL_INTERVAL):
+                    continue
+            except (OSError, ValueError):
+                break
+            if self.timestamps:
+                # Map kernel (CLOCK_REALTIME) stamps onto `perf_counter_ns`.
+                offset = time_ns() - perf_counter_ns()
+            for _ in range(batchSize):
+                try:
+                    frame, ancdata, _, _ = recvmsg(frameSize, ancSize)
+                except BlockingIOError:
+                    break
+                except OSError as e:
+                    self.logger.error(str(e))
+                    return
+                self.framesReceived += 1
+                payload = decode(frame)
+                if payload is None:
+                    continue
+                if ancdata:
+                    timestamp = self._kernelTimestamp(ancdata, offset)
+                else:
+                    timestamp = perf_counter_ns()
+                callback(payload, timestamp)
+        selector.close()
+
+    def _decode(self, frame):
+        if len(frame) == CANFD_FRAME.size:
+            canId, length, _, data = CANFD_FRAME.unpack(frame)
+        else:
+            canId, length, data = CAN_FRAME.unpack(frame)
+        if canId & (CAN_RTR_FLAG | CAN_ERR_FLAG):
+            return None
+        return data[:length]
+
+    def _kernelTimestamp(self, ancdata, offset):
+        """Convert ancillary timestamp data to `perf_counter_ns` domain.
+
+        Software stamps are CLOCK_REALTIME and are shifted by `offset`.
+        Raw hardware stamps run on the controller's clock, they are anchored
+        once against the software stamp of the same frame and thereafter
+        provide the (better) relative accuracy of the hardware.
+        """
+        for level, kind, data in ancdata:
+            if level != socket.SOL_SOCKET:
+                continue
+            if kind == SCM_TIMESTAMPING:
+                # struct scm_timestamping: software, (deprecated), hardware.
+                sw_s, sw_ns = TIMESPEC.unpack_from(data, 0)
+                hw_s, hw_ns = TIMESPEC.unpack_from(data, 2 * TIMESPEC.size)
+                software = sw_s * 1000000000 + sw_ns - offset
+                if hw_s or hw_ns:
+                    hardware = hw_s * 1000000000 + hw_ns
+                    if self._hardwareOffset is None:
+                        self._hardwareOffset = hardware - software
+                    return hardware - self._hardwareOffset
+                return software
+            elif kind == SCM_TIMESTAMPNS:
+                sec, nsec = TIMESPEC.unpack_from(data, 0)
+                return sec * 1000000000 + nsec - offset
+        return perf_counter_ns()
+
+    def close(self):
+        self.closeEvent.set()
+        if self.receiver is not None and self.receiver is not threading.current_thread():
+            self.receiver.join()
+        self.receiver = None
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
@@ -27,6 +27,7 @@ import struct
 
 import serial
 
+from pyxcp.timing import perf_counter_ns
 from pyxcp.transport.base import BaseTransport
 
 
@@ -51,16 +52,15 @@ class SxI(BaseTransport):
         self.closeConnection()
 
     def connect(self):
-        self.logger.debug(
-            "Trying to open serial commPort {}.".format(self.portName))
+        self.logger.debug("Trying to open serial commPort %s.", self.portName)
         try:
             self.commPort = serial.Serial(
                 self.portName, self._baudrate, timeout=SxI.TIMEOUT)
         except serial.SerialException as e:
-            self.logger.error("{}".format(e))
+            self.logger.error("%s", e)
             raise
-        self.logger.info("Serial commPort openend as '{}' @ {} Bits/Sec.".format(
-            self.commPort.portstr, self.commPort.baudrate))
+        self.logger.info("Serial commPort openend as '%s' @ %d Bits/Sec.",
+                         self.commPort.portstr, self.commPort.baudrate)
         self.startListener()
 
     def output(self, enable):
@@ -80,13 +80,13 @@ class SxI(BaseTransport):
                 return
             if not self.commPort.inWaiting():
                 continue
+            timestamp = perf_counter_ns()
             length, counter = self.HEADER.unpack(
                 self.commPort.read(self.HEADER_SIZE))
 
             response = self.commPort.read(length)
-            self.timing.stop()
 
-            self.processResponse(response, length, counter)
+            self.processResponse(response, length, counter, timestamp)
 
     def send(self, frame):
         self.commPort.write(frame)
@@ -0,0 +1,158 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Binary frame trace.
+
+Records every frame sent and every packet received by a transport-layer
+with its `perf_counter_ns` timestamp -- much cheaper than hex dumps in
+the debug log. Traces are replayable by
+`pyxcp.transport.replay.ReplayTransport`.
+
+File layout (little-endian)::
+
+    FILE_HEADER     magic, version, max. datagram size, length of header format
+    bytes           `struct` format of the transport-layer header ("" for CAN)
+    Record*         RECORD_HEADER followed by `length` bytes
+
+Sent frames include the transport-layer header, received packets do not
+(as passed to `processResponse`).
+
+Version 1 is also the format of the captures written by
+`pyxcp.transport.replay.Capture`; readers must keep accepting it.
+"""
+
+__copyright__ = """
+    pySART - Simplified AUTOSAR-Toolkit for Python.
+
+   (C) 2009-2019 by Christoph Schueler <cpu12.gems@googlemail.com>
+
+   All Rights Reserved
+
+  This program is free software; you can redistribute it and/or modify
+  it under the terms of the GNU General Public License as published by
+  the Free Software Foundation; either version 2 of the License, or
+  (at your option) any later version.
+
+  This program is distributed in the hope that it will be useful,
+  but WITHOUT ANY WARRANTY; without even the implied warranty of
+  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+  GNU General Public License for more details.
+
+  You should have received a copy of the GNU General Public License along
+  with this program; if not, write to the Free Software Foundation, Inc.,
+  51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+"""
+
+from collections import namedtuple
+import struct
+import threading
+
+from pyxcp.timing import perf_counter_ns
+
+MAGIC = b"XCPCAP\x00\x00"
+VERSION = 1
+
+FILE_HEADER = struct.Struct("<8sHHB7x")     # magic, version, max. datagram size, header format length
+RECORD_HEADER = struct.Struct("<qBxHH")     # timestamp, direction, counter, length
+
+SENT = 0
+RECEIVED = 1
+
+TraceRecord = namedtuple("TraceRecord", "timestamp direction counter data")
+
+
+class TraceError(Exception):
+    pass
+
+
+def headerFormat(transport):
+    """`struct` format of the transport-layer header ("" if there is none).
+    """
+    header = getattr(transport, "HEADER", None)
+    return header.format if isinstance(header, struct.Struct) else ""
+
+
+class FrameTrace:
+    """Binary frame trace sink.
+
+    Parameters
+    ----------
+    filename : str
+    maxDatagramSize : int
+    headerFormat : str
+        s. `headerFormat`.
+    """
+
+    def __init__(self, filename, maxDatagramSize, headerFormat=""):
+        self.filename = filename
+        self.records = 0
+        self._lock = threading.Lock()
+        fmt = headerFormat.encode("ascii")
+        self._file = open(filename, "wb", buffering=1024 * 1024)
+        self._file.write(FILE_HEADER.pack(MAGIC, VERSION, maxDatagramSize, len(fmt)))
+        self._file.write(fmt)
+
+    @classmethod
+    def forTransport(cls, transport, filename):
+        return cls(filename, transport.MAX_DATAGRAM_SIZE, headerFormat(transport))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    @property
+    def closed(self):
+        return self._file is None
+
+    def write(self, timestamp, direction, counter, data):
+        with self._lock:
+            if self._file is None:
+                return
+            self._file.write(RECORD_HEADER.pack(timestamp, direction, counter & 0xffff, len(data)))
+            self._file.write(data)
+            self.records += 1
+
+    def sent(self, frame):
+        self.write(perf_counter_ns(), SENT, 0, frame)
+
+    def received(self, response, counter, timestamp):
+        self.write(timestamp, RECEIVED, counter, response)
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+def readTrace(filename):
+    """Read a trace file.
+
+    Returns
+    -------
+    tuple (int, str, list of `TraceRecord`)
+        max. datagram size, header format, records.
+    """
+    with open(filename, "rb") as inf:
+        data = inf.read()
+    if len(data) < FILE_HEADER.size:
+        raise TraceError("'{}' is not a frame trace.".format(filename))
+    magic, version, maxDatagramSize, fmtLength = FILE_HEADER.unpack_from(data, 0)
+    if magic != MAGIC or version > VERSION:
+        raise TraceError("'{}' is not a frame trace.".format(filename))
+    pos = FILE_HEADER.size
+    fmt = data[pos:pos + fmtLength].decode("ascii")
+    pos += fmtLength
+    view = memoryview(data)
+    records = []
+    size = len(data)
+    while pos + RECORD_HEADER.size <= size:
+        timestamp, direction, counter, length = RECORD_HEADER.unpack_from(data, pos)
+        pos += RECORD_HEADER.size
+        if pos + length > size:
+            break   # Truncated trace.
+        records.append(TraceRecord(timestamp, direction, counter, bytes(view[pos:pos + length])))
+        pos += length
+    return maxDatagramSize, fmt, records
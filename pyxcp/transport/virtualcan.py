@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""In-process virtual CAN bus.
+
+Lets master and (simulated) slave exchange CAN frames without any
+hardware or kernel support, e.g. on CI machines or non-Linux hosts.
+"""
+
+__copyright__ = """
+    pySART - Simplified AUTOSAR-Toolkit for Python.
+
+   (C) 2009-2019 by Christoph Schueler <cpu12.gems@googlemail.com>
+
+   All Rights Reserved
+
+  This program is free software; you can redistribute it and/or modify
+  it under the terms of the GNU General Public License as published by
+  the Free Software Foundation; either version 2 of the License, or
+  (at your option) any later version.
+
+  This program is distributed in the hope that it will be useful,
+  but WITHOUT ANY WARRANTY; without even the implied warranty of
+  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+  GNU General Public License for more details.
+
+  You should have received a copy of the GNU General Public License along
+  with this program; if not, write to the Free Software Foundation, Inc.,
+  51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+"""
+
+import threading
+
+from pyxcp.timing import perf_counter_ns
+from pyxcp.transport.can import CanInterfaceBase
+
+
+class VirtualCanBus:
+    """Broadcast medium connecting `VirtualCan` nodes.
+
+    Frames are delivered synchronously from within `transmit`, the sender
+    never sees its own frames (like SocketCAN with loopback disabled).
+    """
+
+    _buses = {}
+    _lock = threading.Lock()
+
+    def __init__(self):
+        self.nodes = []
+        self.framesTransmitted = 0
+        self._nodesLock = threading.Lock()
+
+    @classmethod
+    def get(cls, channel):
+        """Get (or create) the bus named `channel`.
+        """
+        with cls._lock:
+            bus = cls._buses.get(channel)
+            if bus is None:
+                bus = cls._buses[channel] = cls()
+            return bus
+
+    def attach(self, node):
+        with self._nodesLock:
+            if node not in self.nodes:
+                self.nodes.append(node)
+
+    def detach(self, node):
+        with self._nodesLock:
+            if node in self.nodes:
+                self.nodes.remove(node)
+
+    def transmit(self, sender, identifier, payload):
+        self.framesTransmitted += 1
+        timestamp = perf_counter_ns()
+        for node in tuple(self.nodes):
+            if node is not sender:
+                node.deliver(identifier, payload, timestamp)
+
+
+class VirtualCan(CanInterfaceBase):
+    """CAN interface handler attached to a `VirtualCanBus`.
+
+    Parameters
+    ----------
+    channel : str
+        Name of the bus, nodes using the same name talk to each other.
+    """
+
+    def __init__(self, channel="virtual0", loglevel="WARN"):
+        self.channel = channel
+        self.bus = VirtualCanBus.get(channel)
+        self.masterId = None
+        self.slaveId = None
+        self.receiveCallback = None
+        self.connected = False
+
+    def init(self, master_id_with_ext, slave_id_with_ext, receive_callback):
+        self.masterId = master_id_with_ext
+        self.slaveId = slave_id_with_ext
+        self.receiveCallback = receive_callback
+
+    def connect(self):
+        self.bus.attach(self)
+        self.connected = True
+
+    def transmit(self, payload):
+        self.bus.transmit(self, self.masterId, bytes(payload))
+
+    def deliver(self, identifier, payload, timestamp):
+        # Same semantics as the SocketCAN kernel filter.
+        if identifier == self.slaveId and self.receiveCallback:
+            self.receiveCallback(payload, timestamp)
+
+    def close(self):
+        self.bus.detach(self)
+        self.connected = False
@@ -63,6 +63,26 @@ def flatten(*args):
     return result
 
 
+def packBytes(items):
+    """Concatenate ints and bytes-like objects (nested iterables allowed).
+
+    Fast replacement for `bytes(flatten(...))`.
+    """
+    try:
+        return bytes(items)     # Common case: ints only.
+    except TypeError:
+        pass
+    result = bytearray()
+    for item in items:
+        if isinstance(item, int):
+            result.append(item)
+        elif isinstance(item, (bytes, bytearray, memoryview)):
+            result += item
+        else:
+            result += packBytes(item)
+    return bytes(result)
+
+
 def intToArray(value):
     result = []
     while value:
@@ -210,8 +210,8 @@ def cstest():
         print("XCP roundtrip timing")
         print("=" * 20)
     for _ in range(tr.daqQueue.qsize()):
-        daq = tr.daqQueue.get(timeout = 1.0)
-        print(types.DAQ.parse(daq))
+        response, counter, length, timestamp = tr.daqQueue.get(timeout = 1.0)
+        print(tr.wallClock(timestamp), types.DAQ.parse(response))
 
     #dq = construct.Struct(
     #     "odt" / construct.Byte,
@@ -223,25 +223,25 @@ def cstest():
     #print(ev)
  #   print(tr.timing)
 
-from collections import OrderedDict
-from pprint import pprint
-#import pandas as pd
-
 def bench(xm):
-    result = OrderedDict()
-    for pn in range(8, 257, 8):
-    #for pn in range(8, 257, 32):
-        result[pn] = list()
+    """Fetch time vs. payload size.
+
+    Superseded by `pyxcp.benchmark`, which runs against the simulator and
+    emits JSON.
+    """
+    from pprint import pprint
+    from pyxcp.benchmark import payloadSizes, statistics
+
+    result = {}
+    for pn in payloadSizes(xm.slaveProperties.maxCto - 1):
+        samples = []
         for i in range(10):
             gid = xm.getID(0x4)
             start = time.perf_counter()
             xm.fetch(gid.length, pn)
-            stop = time.perf_counter()
-            eta = stop - start
-            result[pn].append(eta)
+            samples.append(time.perf_counter() - start)
+        result[pn] = statistics(samples)
     pprint(result)
-    df = pd.DataFrame(result)
-    df.to_csv("payloads01.csv")
 
 # A2L linearizer
 